@@ -4,15 +4,24 @@ Script para gerar gráficos de métricas (throughput vs carga)
 para o relatório IEEE.
 
 Uso:
-    python3 generate_metricas.py
+    python3 generate_metricas.py                       # dados da Tabela 2
+    python3 generate_metricas.py results/bench.json    # resultados do benchmark
+    python3 generate_metricas.py a.json b.json         # compara execuções
+
+Os arquivos JSON são os gerados por scripts/benchmark/bench.py; cada
+combinação (arquivo, carga) vira uma série nos gráficos.
 
 Output:
     metricas_throughput.png - Gráfico de throughput
     metricas_latencia.png - Gráfico de latência
+    metricas_convergencia.png - Tempo de convergência das réplicas (só com JSON)
 """
 
+import json
+import os
+import sys
+
 import matplotlib.pyplot as plt
-import numpy as np
 
 # Configurar estilo para paper acadêmico
 plt.rcParams['font.family'] = 'serif'
@@ -26,41 +35,128 @@ throughput = [10.75, 19.61, 26.19, 2.70]
 tempo = [0.930, 1.275, 1.909, 36.976]
 latencia_media = [93.0, 51.0, 38.2, 369.8]
 
-# ========== FIGURA 1: Throughput vs Carga ==========
-fig1, ax1 = plt.subplots(figsize=(6, 4))
-
-ax1.plot(cargas, throughput, 'o-', linewidth=2, markersize=8, color='#2E86AB', label='Throughput')
-ax1.axvline(x=50, color='red', linestyle='--', linewidth=1, alpha=0.5, label='Ponto de saturação (~50 msg)')
-ax1.set_xlabel('Carga (mensagens)', fontsize=11, fontweight='bold')
-ax1.set_ylabel('Throughput (msg/s)', fontsize=11, fontweight='bold')
-ax1.set_title('Throughput sob Diferentes Cargas', fontsize=12, fontweight='bold')
-ax1.grid(True, alpha=0.3, linestyle='--')
-ax1.legend(fontsize=9)
-ax1.set_ylim(0, 30)
-
-plt.tight_layout()
-plt.savefig('metricas_throughput.png', dpi=300, bbox_inches='tight', facecolor='white')
-plt.close()
-print("✅ Figura 'metricas_throughput.png' gerada com sucesso!")
-
-# ========== FIGURA 2: Latência Média vs Carga ==========
-fig2, ax2 = plt.subplots(figsize=(6, 4))
-
-ax2.plot(cargas, latencia_media, 's-', linewidth=2, markersize=8, color='#A23B72', label='Latência média')
-ax2.axhline(y=100, color='orange', linestyle='--', linewidth=1, alpha=0.5, label='Limite aceitável (100ms)')
-ax2.set_xlabel('Carga (mensagens)', fontsize=11, fontweight='bold')
-ax2.set_ylabel('Latência Média (ms/msg)', fontsize=11, fontweight='bold')
-ax2.set_title('Latência Média por Mensagem', fontsize=12, fontweight='bold')
-ax2.grid(True, alpha=0.3, linestyle='--')
-ax2.legend(fontsize=9)
-ax2.set_yscale('log')  # Escala logarítmica para mostrar melhor a degradação
-
-plt.tight_layout()
-plt.savefig('metricas_latencia.png', dpi=300, bbox_inches='tight', facecolor='white')
-plt.close()
-print("✅ Figura 'metricas_latencia.png' gerada com sucesso!")
-
-print("\n📊 Resumo:")
-print("   - metricas_throughput.png: Throughput vs Carga")
-print("   - metricas_latencia.png: Latência vs Carga")
-print("   Resolução: 1800x1200px @ 300 DPI cada")
+
+def load_series(paths):
+    """
+    Lê resultados do benchmark
+
+    Returns:
+        list: (rótulo, modo, lista de resultados ordenada por carga)
+    """
+    series = []
+    for path in paths:
+        with open(path) as f:
+            report = json.load(f)
+        name = os.path.splitext(os.path.basename(path))[0]
+        by_workload = {}
+        for result in report["results"]:
+            by_workload.setdefault(result["workload"], []).append(result)
+        for workload, results in by_workload.items():
+            label = workload if len(paths) == 1 else f"{name} ({workload})"
+            series.append((label, report["config"]["mode"], sorted(results, key=lambda r: r["load"])))
+    return series
+
+
+def save(fig, filename):
+    plt.tight_layout()
+    plt.savefig(filename, dpi=300, bbox_inches='tight', facecolor='white')
+    plt.close(fig)
+    print(f"✅ Figura '{filename}' gerada com sucesso!")
+
+
+def plot_benchmark(paths):
+    series = load_series(paths)
+    modes = {mode for _, mode, _ in series}
+    xlabel = 'Clientes concorrentes' if modes == {'closed'} else 'Carga (clientes ou req/s)'
+    if modes == {'open'}:
+        xlabel = 'Taxa de chegada (req/s)'
+
+    # ========== FIGURA 1: Throughput vs Carga ==========
+    fig1, ax1 = plt.subplots(figsize=(6, 4))
+    for label, _, results in series:
+        ax1.plot([r["load"] for r in results], [r["throughput_rps"] for r in results],
+                 'o-', linewidth=2, markersize=6, label=label)
+    ax1.set_xlabel(xlabel, fontsize=11, fontweight='bold')
+    ax1.set_ylabel('Throughput (req/s)', fontsize=11, fontweight='bold')
+    ax1.set_title('Throughput sob Diferentes Cargas', fontsize=12, fontweight='bold')
+    ax1.grid(True, alpha=0.3, linestyle='--')
+    ax1.legend(fontsize=9)
+    save(fig1, 'metricas_throughput.png')
+
+    # ========== FIGURA 2: Latência (p50/p95/p99) vs Carga ==========
+    fig2, ax2 = plt.subplots(figsize=(6, 4))
+    styles = {'p50': 'o-', 'p95': 's--', 'p99': '^:'}
+    for label, _, results in series:
+        color = None
+        for percentile, style in styles.items():
+            line, = ax2.plot([r["load"] for r in results], [r["latency_ms"][percentile] for r in results],
+                             style, linewidth=1.5, markersize=5, color=color, label=f"{label} {percentile}")
+            color = line.get_color()
+    ax2.set_xlabel(xlabel, fontsize=11, fontweight='bold')
+    ax2.set_ylabel('Latência (ms)', fontsize=11, fontweight='bold')
+    ax2.set_title('Latência por Percentil', fontsize=12, fontweight='bold')
+    ax2.grid(True, alpha=0.3, linestyle='--')
+    ax2.legend(fontsize=7, ncol=2)
+    ax2.set_yscale('log')
+    save(fig2, 'metricas_latencia.png')
+
+    # ========== FIGURA 3: Convergência das réplicas ==========
+    fig3, ax3 = plt.subplots(figsize=(6, 4))
+    for label, _, results in series:
+        points = [(r["load"], r["convergence_s"] * 1000) for r in results if r["convergence_s"] is not None]
+        if points:
+            ax3.plot([p[0] for p in points], [p[1] for p in points], 'o-', linewidth=2, markersize=6, label=label)
+    ax3.set_xlabel(xlabel, fontsize=11, fontweight='bold')
+    ax3.set_ylabel('Convergência (ms)', fontsize=11, fontweight='bold')
+    ax3.set_title('Tempo até Todas as Réplicas Convergirem', fontsize=12, fontweight='bold')
+    ax3.grid(True, alpha=0.3, linestyle='--')
+    ax3.legend(fontsize=9)
+    save(fig3, 'metricas_convergencia.png')
+
+    print("\n📊 Resumo:")
+    for label, _, results in series:
+        best = max(results, key=lambda r: r["throughput_rps"])
+        print(f"   - {label}: pico de {best['throughput_rps']} req/s (carga {best['load']}, "
+              f"p99 {best['latency_ms']['p99']} ms)")
+
+
+def plot_table():
+    # ========== FIGURA 1: Throughput vs Carga ==========
+    fig1, ax1 = plt.subplots(figsize=(6, 4))
+
+    ax1.plot(cargas, throughput, 'o-', linewidth=2, markersize=8, color='#2E86AB', label='Throughput')
+    ax1.axvline(x=50, color='red', linestyle='--', linewidth=1, alpha=0.5, label='Ponto de saturação (~50 msg)')
+    ax1.set_xlabel('Carga (mensagens)', fontsize=11, fontweight='bold')
+    ax1.set_ylabel('Throughput (msg/s)', fontsize=11, fontweight='bold')
+    ax1.set_title('Throughput sob Diferentes Cargas', fontsize=12, fontweight='bold')
+    ax1.grid(True, alpha=0.3, linestyle='--')
+    ax1.legend(fontsize=9)
+    ax1.set_ylim(0, 30)
+
+    save(fig1, 'metricas_throughput.png')
+
+    # ========== FIGURA 2: Latência Média vs Carga ==========
+    fig2, ax2 = plt.subplots(figsize=(6, 4))
+
+    ax2.plot(cargas, latencia_media, 's-', linewidth=2, markersize=8, color='#A23B72', label='Latência média')
+    ax2.axhline(y=100, color='orange', linestyle='--', linewidth=1, alpha=0.5, label='Limite aceitável (100ms)')
+    ax2.set_xlabel('Carga (mensagens)', fontsize=11, fontweight='bold')
+    ax2.set_ylabel('Latência Média (ms/msg)', fontsize=11, fontweight='bold')
+    ax2.set_title('Latência Média por Mensagem', fontsize=12, fontweight='bold')
+    ax2.grid(True, alpha=0.3, linestyle='--')
+    ax2.legend(fontsize=9)
+    ax2.set_yscale('log')  # Escala logarítmica para mostrar melhor a degradação
+
+    save(fig2, 'metricas_latencia.png')
+
+    print("\n📊 Resumo:")
+    print("   - metricas_throughput.png: Throughput vs Carga")
+    print("   - metricas_latencia.png: Latência vs Carga")
+    print("   Resolução: 1800x1200px @ 300 DPI cada")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        plot_benchmark(sys.argv[1:])
+    else:
+        plot_table()
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Benchmark reprodutível do sistema em um cluster local
+
+Sobe um cluster de N nós (cluster.py), roda cargas de escrita/leitura em
+malha fechada (C clientes, cada um faz a próxima requisição quando a
+anterior termina) ou aberta (chegadas Poisson a uma taxa fixa, com a
+latência medida a partir do instante agendado, então filas no servidor
+aparecem na latência), e grava os resultados em JSON:
+vazão, p50/p95/p99 e tempo até todas as réplicas convergirem.
+
+Uso:
+    python3 scripts/benchmark/bench.py --workload write --concurrency 1,8,32
+    python3 scripts/benchmark/bench.py --mode open --rate 50,100,200 --link-delay gcp3
+    python3 scripts/benchmark/bench.py --workload write,read,mixed --env WRITE_ACK=majority
+
+Os gráficos do relatório saem direto do JSON:
+    python3 relatorio/generate_metricas.py results/bench.json
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import math
+import os
+import random
+import time
+
+import httpx
+
+from cluster import LocalCluster, parse_link_delays
+
+
+WORKLOADS = ("write", "read", "mixed")
+
+
+def percentile(sorted_values, p: float) -> float:
+    """Percentil p (0-100) pelo método do posto mais próximo"""
+    if not sorted_values:
+        return None
+    k = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[min(k, len(sorted_values) - 1)]
+
+
+def summarize(latencies, errors: int, elapsed: float) -> dict:
+    """Vazão e distribuição de latência (ms) de uma execução"""
+    values = sorted(latencies)
+
+    def ms(v):
+        return None if v is None else round(v * 1000, 3)
+
+    return {
+        "requests": len(values) + errors,
+        "ok": len(values),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(values) / elapsed, 2) if elapsed > 0 else 0.0,
+        "latency_ms": {
+            "mean": ms(sum(values) / len(values)) if values else None,
+            "p50": ms(percentile(values, 50)),
+            "p95": ms(percentile(values, 95)),
+            "p99": ms(percentile(values, 99)),
+            "max": ms(values[-1]) if values else None,
+        },
+    }
+
+
+class Workload:
+    """
+    Gera requisições de um tipo de carga contra os nós alvo
+
+    Args:
+        kind: "write", "read" ou "mixed"
+        targets: URLs dos nós que recebem as requisições (round-robin)
+        write_ratio: Fração de escritas na carga mixed
+        read_kind: "list" (GET /messages?limit=100) ou "get" (GET /?id=)
+        write_routing: "forward" (o nó alvo reencaminha ao líder) ou "client"
+                       (escritas vão direto ao líder, seguindo o 307 do
+                       follower e guardando o líder, como log_client.py)
+        node_urls: ID do nó -> URL (o Location do 307 aponta o endereço que
+                   o follower usa, que pode ser um proxy de atraso)
+    """
+
+    def __init__(self, kind: str, targets, write_ratio: float = 0.5, read_kind: str = "list",
+                 write_routing: str = "forward", node_urls: dict = None):
+        self.kind = kind
+        self.targets = list(targets)
+        self.write_ratio = write_ratio
+        self.read_kind = read_kind
+        self.write_routing = write_routing
+        self.node_urls = node_urls or {}
+        self.leader_url = None
+        self._next = 0
+        self.max_id = 1
+
+    def _target(self) -> str:
+        url = self.targets[self._next % len(self.targets)]
+        self._next += 1
+        return url
+
+    async def request(self, client: httpx.AsyncClient) -> bool:
+        """Faz uma requisição; retorna True se ela teve sucesso"""
+        write = self.kind == "write" or (self.kind == "mixed" and random.random() < self.write_ratio)
+        url = self._target()
+        if write:
+            body = {"message": f"bench-{self._next}"}
+            if self.write_routing == "client":
+                response = await client.post((self.leader_url or url) + "/", json=body, headers={"X-No-Forward": "1"})
+                if response.status_code == 307:
+                    leader_id = int(response.headers["x-leader-id"])
+                    self.leader_url = self.node_urls.get(leader_id, response.headers["location"].rstrip("/"))
+                    response = await client.post(self.leader_url + "/", json=body, headers={"X-No-Forward": "1"})
+            else:
+                response = await client.post(url + "/", json=body)
+            if response.status_code != 200:
+                return False
+            body = response.json()
+            if isinstance(body, dict) and "partition" in body:
+                # Log particionado: o ID é o da partição
+                return True
+            if not isinstance(body, int):
+                return False
+            self.max_id = max(self.max_id, body)
+            return True
+        if self.read_kind == "get":
+            response = await client.get(url + "/", params={"id": random.randint(1, self.max_id)})
+        else:
+            response = await client.get(url + "/messages", params={"limit": 100})
+        return response.status_code == 200
+
+
+async def run_closed(workload: Workload, client, concurrency: int, duration: float) -> dict:
+    """C clientes em malha fechada durante duration segundos"""
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                ok = await workload.request(client)
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+async def run_open(workload: Workload, client, rate: float, duration: float) -> dict:
+    """Chegadas Poisson a rate req/s durante duration segundos"""
+    latencies = []
+    errors = 0
+    tasks = []
+
+    async def one(scheduled):
+        nonlocal errors
+        try:
+            ok = await workload.request(client)
+        except httpx.HTTPError:
+            ok = False
+        if ok:
+            latencies.append(time.perf_counter() - scheduled)
+        else:
+            errors += 1
+
+    start = time.perf_counter()
+    scheduled = start
+    while scheduled < start + duration:
+        now = time.perf_counter()
+        if scheduled > now:
+            await asyncio.sleep(scheduled - now)
+        tasks.append(asyncio.ensure_future(one(scheduled)))
+        scheduled += random.expovariate(rate)
+    await asyncio.gather(*tasks)
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+async def measure_convergence(client, cluster: LocalCluster, leader_url: str, timeout: float):
+    """
+    Tempo até todas as réplicas terem, sem lacunas, o log do líder
+
+    Sem líder (modo leaderless), o alvo é a última seq de cada origem:
+    os IDs de origens diferentes se intercalam, e uma origem que escreveu
+    menos deixa lacunas permanentes no espaço de IDs.
+
+    Returns:
+        float: Segundos desde o fim da carga, ou None se passou o timeout
+    """
+    start = time.perf_counter()
+    if leader_url is None:
+        return await measure_origin_convergence(client, cluster, timeout)
+    if cluster.partitioned:
+        return await measure_partition_convergence(client, cluster, timeout)
+    target = (await client.get(leader_url + "/replication_status")).json()["last_id"]
+    while time.perf_counter() - start < timeout:
+        statuses = await asyncio.gather(
+            *(client.get(node["url"] + "/replication_status") for node in cluster.nodes),
+            return_exceptions=True,
+        )
+        if all(
+            not isinstance(status, Exception) and status.json()["contiguous_id"] >= target
+            for status in statuses
+        ):
+            return round(time.perf_counter() - start, 4)
+        await asyncio.sleep(0.01)
+    return None
+
+
+async def measure_origin_convergence(client, cluster: LocalCluster, timeout: float):
+    """Convergência no modo leaderless: todo nó tem cada origem até a última seq"""
+    start = time.perf_counter()
+    target = {
+        str(node["id"]): (await client.get(node["url"] + "/multi_writer/status")).json()["next_seq"] - 1
+        for node in cluster.nodes
+    }
+    while time.perf_counter() - start < timeout:
+        statuses = await asyncio.gather(
+            *(client.get(node["url"] + "/multi_writer/status") for node in cluster.nodes),
+            return_exceptions=True,
+        )
+        if all(
+            not isinstance(status, Exception)
+            and all(status.json()["origins"][origin]["received"] >= seq for origin, seq in target.items())
+            for status in statuses
+        ):
+            return round(time.perf_counter() - start, 4)
+        await asyncio.sleep(0.01)
+    return None
+
+
+async def measure_partition_convergence(client, cluster: LocalCluster, timeout: float):
+    """Convergência com PARTITIONS > 1: todo nó tem cada partição até o último ID do líder dela"""
+    start = time.perf_counter()
+    statuses = [(await client.get(node["url"] + "/partitions")).json() for node in cluster.nodes]
+    target = [
+        max(status["partitions"][i]["last_id"] for status in statuses if status["node_id"] == leader)
+        for i, leader in enumerate(partition["leader"] for partition in statuses[0]["partitions"])
+    ]
+    while time.perf_counter() - start < timeout:
+        statuses = await asyncio.gather(
+            *(client.get(node["url"] + "/partitions") for node in cluster.nodes),
+            return_exceptions=True,
+        )
+        if all(
+            not isinstance(status, Exception)
+            and all(p["contiguous_id"] >= last for p, last in zip(status.json()["partitions"], target))
+            for status in statuses
+        ):
+            return round(time.perf_counter() - start, 4)
+        await asyncio.sleep(0.01)
+    return None
+
+
+async def run_suite(args, cluster: LocalCluster) -> list:
+    # Sem líder, todo nó recebe escritas: --target vale como any
+    leader_id = None if cluster.leaderless else cluster.wait_for_leader()
+    leader = cluster.node_by_id(leader_id) if leader_id is not None else {"url": None}
+    if leader_id is None:
+        targets = [node["url"] for node in cluster.nodes]
+    elif args.target == "leader":
+        targets = [leader["url"]]
+    elif args.target == "followers":
+        targets = [node["url"] for node in cluster.nodes if node["id"] != leader_id]
+    else:
+        targets = [node["url"] for node in cluster.nodes]
+
+    loads = args.concurrency if args.mode == "closed" else args.rate
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    results = []
+    async with httpx.AsyncClient(limits=limits, timeout=args.request_timeout) as client:
+        for kind in args.workload:
+            workload = Workload(
+                kind, targets, args.write_ratio, args.read_kind, args.write_routing,
+                {node["id"]: node["url"] for node in cluster.nodes},
+            )
+            for load in loads:
+                if args.warmup > 0:
+                    if args.mode == "closed":
+                        await run_closed(workload, client, int(load), args.warmup)
+                    else:
+                        await run_open(workload, client, load, args.warmup)
+                if args.mode == "closed":
+                    summary = await run_closed(workload, client, int(load), args.duration)
+                else:
+                    summary = await run_open(workload, client, load, args.duration)
+                summary["convergence_s"] = await measure_convergence(
+                    client, cluster, leader["url"], args.convergence_timeout
+                )
+                result = {"workload": kind, "mode": args.mode, "load": load, **summary}
+                results.append(result)
+                lat = result["latency_ms"]
+                print(f"{kind:>6} {args.mode:>6} load={load:<6} {result['throughput_rps']:>9.1f} req/s  "
+                      f"p50={lat['p50']}ms p95={lat['p95']}ms p99={lat['p99']}ms  "
+                      f"errors={result['errors']}  convergence={result['convergence_s']}s")
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do log distribuído em cluster local")
+    parser.add_argument("--nodes", type=int, default=3)
+    parser.add_argument("--base-port", type=int, default=9100)
+    parser.add_argument("--workload", default="write",
+                        help="Cargas separadas por vírgula: " + ", ".join(WORKLOADS))
+    parser.add_argument("--mode", choices=("closed", "open"), default="closed")
+    parser.add_argument("--concurrency", default="1,8,32", help="Clientes (malha fechada), ex: 1,8,32")
+    parser.add_argument("--rate", default="50,100,200", help="Requisições/s (malha aberta), ex: 50,100")
+    parser.add_argument("--duration", type=float, default=10, help="Segundos por nível de carga")
+    parser.add_argument("--warmup", type=float, default=2, help="Segundos de aquecimento descartados")
+    parser.add_argument("--target", choices=("leader", "followers", "any"), default="leader")
+    parser.add_argument("--write-ratio", type=float, default=0.5, help="Fração de escritas em mixed")
+    parser.add_argument("--read-kind", choices=("list", "get"), default="list")
+    parser.add_argument("--write-routing", choices=("forward", "client"), default="forward",
+                        help="Escritas em followers: reencaminhadas pelo nó ou enviadas direto ao líder")
+    parser.add_argument("--link-delay", default="",
+                        help='Atraso de ida por enlace: "gcp3", "uniform:MS" ou "1-2=70,1-3=90"')
+    parser.add_argument("--env", action="append", default=[], help="KEY=VALUE repassado aos nós")
+    parser.add_argument("--max-connections", type=int, default=512)
+    parser.add_argument("--request-timeout", type=float, default=30)
+    parser.add_argument("--convergence-timeout", type=float, default=60)
+    parser.add_argument("--log-dir", default=None, help="Salvar a saída de cada nó neste diretório")
+    parser.add_argument("--output", default="results/bench.json")
+    args = parser.parse_args(argv)
+
+    args.workload = [w.strip() for w in args.workload.split(",") if w.strip()]
+    for kind in args.workload:
+        if kind not in WORKLOADS:
+            parser.error(f"unknown workload {kind!r}")
+    args.concurrency = [int(c) for c in args.concurrency.split(",")]
+    args.rate = [float(r) for r in args.rate.split(",")]
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    env = dict(item.split("=", 1) for item in args.env)
+    link_delays = parse_link_delays(args.link_delay, args.nodes)
+
+    cluster = LocalCluster(args.nodes, args.base_port, link_delays, env, args.log_dir)
+    print(f"Starting {args.nodes}-node cluster (link delays: {link_delays or 'none'})...")
+    cluster.start()
+    try:
+        results = asyncio.run(run_suite(args, cluster))
+    finally:
+        cluster.stop()
+
+    report = {
+        "generated_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "nodes": args.nodes,
+            "mode": args.mode,
+            "target": args.target,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "write_ratio": args.write_ratio,
+            "read_kind": args.read_kind,
+            "write_routing": args.write_routing,
+            "link_delays_ms": {f"{i}-{j}": ms for (i, j), ms in link_delays.items()},
+            "env": env,
+        },
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
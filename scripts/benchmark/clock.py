@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark do relógio lógico (src/lamport_clock.py) sob contenção
+
+T threads disputam o mesmo relógio. Cada cenário mede a vazão total
+(timestamps ou leituras por segundo):
+- increment: um increment() por mensagem, como o líder fazia antes
+- reserve: um reserve(batch) por lote de mensagens
+- get_time (lock): leitura com o lock, como antes
+- get_time (sem lock): leitura direta, com uma thread escrevendo ao lado
+
+Roda para os dois modos (lamport e hlc) e confere que nenhuma thread
+recebeu um timestamp repetido.
+
+Uso:
+    python3 scripts/benchmark/clock.py --threads 1,4,16 --batch 100
+"""
+
+import argparse
+import datetime
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "src"))
+
+from lamport_clock import create_clock  # noqa: E402
+
+
+MODES = ("lamport", "hlc")
+
+
+def run_threads(threads: int, target) -> float:
+    """Roda target(i) em T threads ao mesmo tempo; devolve o tempo total"""
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(i):
+        barrier.wait()
+        target(i)
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in pool:
+        t.join()
+    return time.perf_counter() - start
+
+
+def bench_writes(mode: str, threads: int, per_thread: int, batch: int) -> dict:
+    results = {}
+    for name in ("increment", "reserve"):
+        clock = create_clock(mode=mode)
+        got = [[] for _ in range(threads)]
+
+        def target(i):
+            out = got[i]
+            if name == "increment":
+                for _ in range(per_thread):
+                    out.append(clock.increment())
+            else:
+                for _ in range(per_thread // batch):
+                    first = clock.reserve(batch)
+                    out.extend(range(first, first + batch))
+
+        elapsed = run_threads(threads, target)
+        stamps = [ts for out in got for ts in out]
+        assert len(stamps) == len(set(stamps)), f"{mode}/{name}: duplicated timestamps"
+        results[name] = round(len(stamps) / elapsed)
+    return results
+
+
+def bench_reads(mode: str, threads: int, per_thread: int) -> dict:
+    results = {}
+    for name in ("get_time_lock", "get_time"):
+        clock = create_clock(mode=mode)
+        stop = threading.Event()
+
+        def writer():
+            while not stop.is_set():
+                clock.increment()
+
+        def target(i):
+            if name == "get_time_lock":
+                for _ in range(per_thread):
+                    with clock.lock:
+                        clock.time
+            else:
+                for _ in range(per_thread):
+                    clock.get_time()
+
+        background = threading.Thread(target=writer)
+        background.start()
+        try:
+            elapsed = run_threads(threads, target)
+        finally:
+            stop.set()
+            background.join()
+        results[name] = round(threads * per_thread / elapsed)
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", default="1,4,16", help="Threads concorrentes, ex: 1,4,16")
+    parser.add_argument("--ops", type=int, default=200000, help="Timestamps/leituras por thread")
+    parser.add_argument("--batch", type=int, default=100, help="Tamanho do lote em reserve()")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--output", default="results/clock.json")
+    args = parser.parse_args(argv)
+    args.threads = [int(t) for t in args.threads.split(",")]
+    args.modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = []
+    for mode in args.modes:
+        for threads in args.threads:
+            result = {"mode": mode, "threads": threads}
+            result.update(bench_writes(mode, threads, args.ops, args.batch))
+            result.update(bench_reads(mode, threads, args.ops))
+            results.append(result)
+            print(
+                f" {mode:7} threads={threads:<3} increment={result['increment']:>10,}/s  "
+                f"reserve={result['reserve']:>11,}/s  get_time lock={result['get_time_lock']:>10,}/s  "
+                f"lock-free={result['get_time']:>10,}/s"
+            )
+
+    report = {
+        "generated_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "config": {"ops": args.ops, "batch": args.batch},
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+"""
+Cluster local de N nós para benchmarks
+
+Sobe N processos `uvicorn main:app` (src/main.py) em portas de localhost,
+cada um com seu próprio DATA_DIR temporário, e espera todos concordarem
+sobre o líder.
+
+Latência por enlace: com link_delays, o tráfego entre dois nós passa por
+um proxy TCP (LinkProxy) que atrasa cada bloco de bytes pelo atraso de ida
+daquele enlace. Cada nó recebe em OTHER_SERVERS os endereços dos proxies
+dos SEUS enlaces, então o atraso vale por par de nós (como entre regiões),
+inclusive para o gRPC. O cliente do benchmark fala direto com os nós.
+"""
+
+import asyncio
+import os
+import pathlib
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+
+SRC_DIR = pathlib.Path(__file__).resolve().parents[2] / "src"
+
+# Atraso de ida (ms) entre as três regiões do deploy no GCP, a partir das
+# latências medidas no relatório (RTT / 2)
+GCP3_LINK_DELAYS = {
+    (1, 2): 70,    # Iowa ↔ São Paulo
+    (1, 3): 90,    # Iowa ↔ Sydney
+    (2, 3): 155,   # São Paulo ↔ Sydney
+}
+
+
+def parse_link_delays(spec: str, n_nodes: int) -> dict:
+    """
+    Converte a especificação de atrasos por enlace
+
+    Args:
+        spec: "gcp3", "uniform:MS" ou lista "1-2=70,1-3=90" (índices de nó a
+              partir de 1, atraso de ida em ms)
+        n_nodes: Número de nós do cluster
+
+    Returns:
+        dict: {(i, j): ms} com i < j
+    """
+    if not spec:
+        return {}
+    if spec == "gcp3":
+        return {pair: ms for pair, ms in GCP3_LINK_DELAYS.items() if max(pair) <= n_nodes}
+    if spec.startswith("uniform:"):
+        ms = float(spec.split(":", 1)[1])
+        return {(i, j): ms for i in range(1, n_nodes + 1) for j in range(i + 1, n_nodes + 1)}
+    delays = {}
+    for item in spec.split(","):
+        pair, ms = item.split("=")
+        i, j = (int(x) for x in pair.split("-"))
+        delays[(min(i, j), max(i, j))] = float(ms)
+    return delays
+
+
+class LinkProxy:
+    """
+    Proxy TCP que atrasa os bytes nos dois sentidos
+
+    Cada bloco lido é entregue delay segundos depois, preservando a ordem
+    (o atraso não se acumula: blocos seguidos saem no mesmo ritmo em que
+    chegaram).
+    """
+
+    def __init__(self, listen_port: int, target_port: int, delay: float):
+        self.listen_port = listen_port
+        self.target_port = target_port
+        self.delay = delay
+
+    async def _pipe(self, reader, writer):
+        queue = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+
+        async def deliver():
+            while True:
+                due, data = await queue.get()
+                if data is None:
+                    break
+                wait = due - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                writer.write(data)
+                await writer.drain()
+            writer.close()
+
+        sender = asyncio.ensure_future(deliver())
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                queue.put_nowait((loop.time() + self.delay, data))
+        except ConnectionError:
+            pass
+        finally:
+            queue.put_nowait((0, None))
+            try:
+                await sender
+            except ConnectionError:
+                pass
+
+    async def _handle(self, client_reader, client_writer):
+        try:
+            upstream_reader, upstream_writer = await asyncio.open_connection("127.0.0.1", self.target_port)
+        except OSError:
+            client_writer.close()
+            return
+        await asyncio.gather(
+            self._pipe(client_reader, upstream_writer),
+            self._pipe(upstream_reader, client_writer),
+            return_exceptions=True,
+        )
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", self.listen_port)
+
+
+class LocalCluster:
+    """
+    N nós de src/main.py em localhost
+
+    Attributes:
+        nodes (list): Um dict por nó com index, id, port, grpc_port, url
+    """
+
+    def __init__(self, n_nodes: int = 3, base_port: int = 9100, link_delays: dict = None,
+                 env: dict = None, log_dir: str = None):
+        self.n_nodes = n_nodes
+        self.base_port = base_port
+        self.link_delays = link_delays or {}
+        self.env = env or {}
+        self.log_dir = log_dir
+        self.nodes = [
+            {
+                "index": i,
+                "id": 8000 + i,
+                "port": base_port + i,
+                "grpc_port": base_port + 100 + i,
+                "url": f"http://127.0.0.1:{base_port + i}",
+            }
+            for i in range(1, n_nodes + 1)
+        ]
+        self._processes = []
+        self._data_dir = None
+        self._proxy_loop = None
+
+    def _proxy_port(self, src: int, dst: int, grpc: bool = False) -> int:
+        # Porta do proxy que o nó src usa para falar com dst
+        n = self.n_nodes
+        return self.base_port + 200 + (n * n if grpc else 0) + (src - 1) * n + (dst - 1)
+
+    def _other_servers(self, src: int) -> str:
+        entries = []
+        for node in self.nodes:
+            dst = node["index"]
+            delay = self.link_delays.get((min(src, dst), max(src, dst)))
+            if dst != src and delay:
+                port = self._proxy_port(src, dst)
+                grpc_port = self._proxy_port(src, dst, grpc=True)
+            else:
+                port, grpc_port = node["port"], node["grpc_port"]
+            entries.append(f"127.0.0.1:{port}:{node['id']}:{grpc_port}")
+        return ",".join(entries)
+
+    def _start_proxies(self):
+        proxies = []
+        for src in range(1, self.n_nodes + 1):
+            for node in self.nodes:
+                dst = node["index"]
+                delay = self.link_delays.get((min(src, dst), max(src, dst)))
+                if dst == src or not delay:
+                    continue
+                proxies.append(LinkProxy(self._proxy_port(src, dst), node["port"], delay / 1000))
+                proxies.append(LinkProxy(self._proxy_port(src, dst, True), node["grpc_port"], delay / 1000))
+        if not proxies:
+            return
+        self._proxy_loop = asyncio.new_event_loop()
+        for proxy in proxies:
+            self._proxy_loop.run_until_complete(proxy.start())
+        threading.Thread(target=self._proxy_loop.run_forever, daemon=True).start()
+
+    def start(self, timeout: float = 60):
+        """Sobe os nós (e os proxies) e espera um líder único"""
+        self._data_dir = tempfile.mkdtemp(prefix="bench-cluster-")
+        self._start_proxies()
+        for node in self.nodes:
+            env = dict(os.environ)
+            env.update({
+                "NODE_ID": str(node["id"]),
+                "OTHER_SERVERS": self._other_servers(node["index"]),
+                "GRPC_PORT": str(node["grpc_port"]),
+                "DATA_DIR": os.path.join(self._data_dir, f"node{node['index']}"),
+            })
+            env.update(self.env)
+            log = subprocess.DEVNULL
+            if self.log_dir:
+                os.makedirs(self.log_dir, exist_ok=True)
+                log = open(os.path.join(self.log_dir, f"node{node['index']}.log"), "w")
+            self._processes.append(subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "main:app", "--port", str(node["port"]),
+                 "--log-level", "warning"],
+                cwd=str(SRC_DIR), env=env, stdout=log, stderr=subprocess.STDOUT,
+            ))
+        try:
+            if self.leaderless:
+                self.wait_for_ready(timeout)
+            else:
+                self.wait_for_leader(timeout)
+                if self.partitioned:
+                    self.wait_for_partition_leaders(timeout)
+        except Exception:
+            self.stop()
+            raise
+
+    @property
+    def leaderless(self) -> bool:
+        """True se o cluster roda no modo multi-writer (sem líder)"""
+        return self.env.get("CONSENSUS_MODE", os.getenv("CONSENSUS_MODE", "")) == "leaderless"
+
+    @property
+    def partitioned(self) -> bool:
+        """True se o log é particionado (PARTITIONS > 1, ver src/partitions.py)"""
+        return int(self.env.get("PARTITIONS", os.getenv("PARTITIONS", "1"))) > 1
+
+    def partition_leaders(self) -> list:
+        """Líder de cada partição segundo cada nó (None se o nó não responde)"""
+        result = []
+        for node in self.nodes:
+            try:
+                status = httpx.get(node["url"] + "/partitions", timeout=2).json()["partitions"]
+                result.append([partition["leader"] for partition in status])
+            except (httpx.HTTPError, ValueError, KeyError):
+                result.append(None)
+        return result
+
+    def wait_for_partition_leaders(self, timeout: float = 60) -> list:
+        """
+        Espera todos os nós concordarem sobre o líder de cada partição
+
+        Returns:
+            list: ID do líder de cada partição
+
+        Raises:
+            TimeoutError: Se não houve acordo dentro do timeout
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            views = self.partition_leaders()
+            if views[0] and None not in views[0] and all(view == views[0] for view in views):
+                return views[0]
+            time.sleep(0.5)
+        raise TimeoutError(f"Nodes did not agree on partition leaders: {self.partition_leaders()}")
+
+    def wait_for_ready(self, timeout: float = 60):
+        """
+        Espera todos os nós aceitarem escritas (modo leaderless)
+
+        Raises:
+            TimeoutError: Se algum nó não ficou pronto dentro do timeout
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                if all(
+                    httpx.get(node["url"] + "/multi_writer/status", timeout=2).json().get("ready")
+                    for node in self.nodes
+                ):
+                    return
+            except (httpx.HTTPError, ValueError):
+                pass
+            time.sleep(0.5)
+        raise TimeoutError("Nodes did not become ready")
+
+    def leaders(self) -> list:
+        """Líder segundo cada nó (None se o nó não responde)"""
+        result = []
+        for node in self.nodes:
+            try:
+                text = httpx.get(node["url"] + "/leader", timeout=2).text.strip('"')
+                result.append(None if text == "null" else int(text))
+            except (httpx.HTTPError, ValueError):
+                result.append(None)
+        return result
+
+    def wait_for_leader(self, timeout: float = 60) -> int:
+        """
+        Espera todos os nós concordarem sobre o líder
+
+        Returns:
+            int: ID do líder
+
+        Raises:
+            TimeoutError: Se não houve acordo dentro do timeout
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            leaders = self.leaders()
+            if leaders[0] is not None and all(leader == leaders[0] for leader in leaders):
+                return leaders[0]
+            time.sleep(0.5)
+        raise TimeoutError(f"Nodes did not agree on a leader: {self.leaders()}")
+
+    def node_by_id(self, node_id: int) -> dict:
+        return next(node for node in self.nodes if node["id"] == node_id)
+
+    def stop(self):
+        """Encerra os nós e remove os dados temporários"""
+        for process in self._processes:
+            process.terminate()
+        for process in self._processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        self._processes = []
+        if self._proxy_loop is not None:
+            self._proxy_loop.call_soon_threadsafe(self._proxy_loop.stop)
+            self._proxy_loop = None
+        if self._data_dir:
+            shutil.rmtree(self._data_dir, ignore_errors=True)
+            self._data_dir = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
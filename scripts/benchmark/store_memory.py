@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Memória e tempo dos backends do MessageStore (src/message_store.py)
+
+Para cada backend (objects: lista de Message; compact: colunas em arrays;
+segmented: cauda compacta + segmentos selados mapeados em memória, num
+diretório temporário), guarda N mensagens geradas como no líder (IDs e
+timestamps Lamport crescentes) e mede:
+- memória retida pelo store (tracemalloc: heap do Python; as páginas dos
+  segmentos mapeados ficam no cache do SO e não entram na conta)
+- tempo de inserção, de get() aleatório, de um dump completo em blocos de
+  Message e de um dump NDJSON (o que GET /messages?format=ndjson envia)
+
+As mensagens entram uma a uma e só o store as guarda, como no nó.
+
+Uso:
+    python3 scripts/benchmark/store_memory.py --messages 100000,1000000
+    python3 scripts/benchmark/store_memory.py --content-size 200 --output results/store.json
+    HOT_MESSAGES=20000 python3 scripts/benchmark/store_memory.py --backends compact,segmented
+"""
+
+import argparse
+import datetime
+import gc
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from pydantic import BaseModel
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "src"))
+
+from message_store import create_store  # noqa: E402
+from segments import SegmentedMessageStore  # noqa: E402
+
+
+BACKENDS = ("objects", "compact", "segmented")
+
+
+class Message(BaseModel):
+    """Mesmo modelo de src/main.py (importar main subiria o nó)"""
+    id: int
+    content: str
+    lamport_timestamp: int
+    node_id: int
+    physical_timestamp: float
+
+
+def new_store(backend: str, directory: str):
+    if backend == "segmented":
+        return SegmentedMessageStore(Message, directory)
+    return create_store(Message, backend)
+
+
+def fill(store, n: int, content_size: int):
+    base = time.time()
+    for i in range(1, n + 1):
+        store.add(Message(
+            id=i,
+            content=f"message {i} ".ljust(content_size, "x"),
+            lamport_timestamp=i,
+            node_id=8001 + i % 3,
+            physical_timestamp=base + i / 1000,
+        ))
+
+
+def measure_memory(backend: str, n: int, content_size: int, directory: str) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    store = new_store(backend, directory)
+    fill(store, n, content_size)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del store
+    return {"retained_bytes": retained, "bytes_per_message": round(retained / n, 1)}
+
+
+def measure_time(backend: str, n: int, content_size: int, lookups: int, directory: str) -> dict:
+    store = new_store(backend, directory)
+    start = time.perf_counter()
+    fill(store, n, content_size)
+    insert_s = time.perf_counter() - start
+
+    ids = [random.randint(1, n) for _ in range(lookups)]
+    start = time.perf_counter()
+    for id in ids:
+        store.get(id)
+    get_us = (time.perf_counter() - start) / lookups * 1e6
+
+    start = time.perf_counter()
+    total = sum(len(chunk) for chunk in store.chunks(chunk_size=500))
+    dump_s = time.perf_counter() - start
+    assert total == n
+
+    start = time.perf_counter()
+    ndjson_bytes = sum(len(piece) for piece in store.ndjson(chunk_size=500))
+    ndjson_s = time.perf_counter() - start
+    return {
+        "insert_s": round(insert_s, 3),
+        "insert_us_per_message": round(insert_s / n * 1e6, 2),
+        "get_us": round(get_us, 2),
+        "dump_s": round(dump_s, 3),
+        "dump_ndjson_s": round(ndjson_s, 3),
+        "dump_ndjson_mib_s": round(ndjson_bytes / 2 ** 20 / ndjson_s, 1),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", default="100000,1000000", help="Tamanhos do log, ex: 100000,1000000")
+    parser.add_argument("--content-size", type=int, default=32, help="Bytes de conteúdo por mensagem")
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--lookups", type=int, default=100000, help="get() aleatórios medidos")
+    parser.add_argument("--output", default="results/store_memory.json")
+    args = parser.parse_args(argv)
+    args.messages = [int(n) for n in args.messages.split(",")]
+    args.backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = []
+    for n in args.messages:
+        for backend in args.backends:
+            result = {"backend": backend, "messages": n}
+            directory = tempfile.mkdtemp(prefix="store-bench-")
+            try:
+                result.update(measure_memory(backend, n, args.content_size, directory))
+                shutil.rmtree(directory)
+                result.update(measure_time(backend, n, args.content_size, args.lookups, directory))
+            finally:
+                shutil.rmtree(directory, ignore_errors=True)
+            results.append(result)
+            print(
+                f" {backend:8} n={n:<9} {result['bytes_per_message']:8.1f} B/msg "
+                f"({result['retained_bytes'] / 2 ** 20:7.1f} MiB)  insert={result['insert_us_per_message']}us/msg  "
+                f"get={result['get_us']}us  dump={result['dump_s']}s  ndjson={result['dump_ndjson_s']}s"
+            )
+
+    report = {
+        "generated_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "config": {"content_size": args.content_size, "lookups": args.lookups},
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
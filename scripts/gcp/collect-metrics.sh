@@ -228,6 +228,19 @@ for i in 1 2 3; do
     echo -e "  Total Messages: $msg_count"
 done
 
+# ============================================================================
+# TESTE 7: Métricas internas dos nós (GET /metrics)
+# ============================================================================
+echo -e "\n${YELLOW}━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━${NC}"
+echo -e "${YELLOW}TESTE 7: Métricas Internas (/metrics)${NC}"
+echo -e "${YELLOW}━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━${NC}"
+
+for ip in $NODE1_IP $NODE2_IP $NODE3_IP; do
+    echo -e "\n${BLUE}Node $ip${NC}"
+    # Só somas/contagens e gauges (os buckets ficam para o Prometheus)
+    curl -s http://$ip/metrics | grep -v '^#' | grep -v '_bucket' | sed 's/^/  /'
+done
+
 # ============================================================================
 # Resumo
 # ============================================================================
@@ -242,6 +255,7 @@ echo -e "  ✓ Convergência de relógios de Lamport"
 echo -e "  ✓ Latência de replicação geográfica"
 echo -e "  ✓ Throughput com cargas variáveis (10, 25, 50, 100 msg)"
 echo -e "  ✓ Estado final do sistema distribuído"
+echo -e "  ✓ Histogramas e contadores internos de cada nó (/metrics)"
 
 echo -e "\n${BLUE}Regiões geográficas:${NC}"
 echo -e "  • Iowa (us-central1-a)"
@@ -29,8 +29,14 @@ case $NODE in
         ;;
 esac
 
-echo "Monitoring messages on Node $NODE ($NAME) - http://$IP/messages"
+echo "Monitoring messages on Node $NODE ($NAME) - http://$IP/events"
 echo "Press Ctrl+C to stop"
 echo "========================================"
 
-watch -n 2 "curl -s http://$IP/messages | jq '.[] | {id, lamport_timestamp, node_id, content}'"
+# Assina o feed SSE do nó: as mensagens chegam assim que são confirmadas,
+# sem polling. O histórico é enviado primeiro, depois as novas.
+curl -sN "http://$IP/events" \
+    | grep --line-buffered '^data: ' \
+    | sed -u 's/^data: //' \
+    | jq -c --unbuffered 'select(.id != null) | {id, lamport_timestamp, node_id, content}'
+
@@ -0,0 +1,146 @@
+"""
+Feed de mudanças do nó (push para dashboard e clientes)
+
+Cada evento (mensagem confirmada, mudança do relógio, mudança de líder) é
+codificado UMA vez como frame Server-Sent Events e o mesmo bytes é colocado
+na fila de cada assinante. Assim, N assinantes custam N enfileiramentos, e
+não N leituras do log inteiro.
+
+Assinantes lentos não seguram o nó: se a fila de um assinante enche, ele é
+desconectado e o navegador reconecta com Last-Event-ID, retomando pelo
+cursor.
+"""
+
+import asyncio
+import json
+import os
+
+
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("FEED_QUEUE_SIZE", "1000"))
+
+# Marca de fim de stream para assinantes desconectados
+_CLOSED = object()
+
+
+def message_cursor(message) -> str:
+    """Cursor SSE de uma mensagem: "lamport:node_id:id" """
+    return f"{message.lamport_timestamp}:{message.node_id}:{message.id}"
+
+
+def parse_cursor(cursor: str):
+    """
+    Converte um cursor "lamport:node_id:id" na chave de ordenação do log
+
+    Returns:
+        tuple: (lamport, node_id, id), ou None se o cursor é inválido
+    """
+    try:
+        lamport, node_id, id = (int(part) for part in cursor.split(":"))
+    except (AttributeError, ValueError):
+        return None
+    return (lamport, node_id, id)
+
+
+def encode_event(event: str, data: str, event_id: str = None) -> bytes:
+    """Monta um frame SSE"""
+    frame = f"event: {event}\n"
+    if event_id is not None:
+        frame += f"id: {event_id}\n"
+    return (frame + f"data: {data}\n\n").encode()
+
+
+class Subscription:
+    """Fila de frames de um assinante"""
+
+    def __init__(self, maxsize: int):
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.closed = False
+
+    async def next_frame(self, timeout: float):
+        """
+        Espera o próximo frame
+
+        Returns:
+            bytes: Frame SSE, ou None se passou o timeout (enviar keep-alive)
+
+        Raises:
+            StopAsyncIteration: Se o assinante foi desconectado
+        """
+        try:
+            frame = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if frame is _CLOSED:
+            raise StopAsyncIteration
+        return frame
+
+
+class ChangeFeed:
+    """
+    Distribui eventos do nó para todos os assinantes
+
+    publish() pode ser chamado tanto do event loop quanto de threads
+    (eleição, health check); neste caso o frame é entregue via
+    call_soon_threadsafe.
+    """
+
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._loop = None
+
+    def bind(self, loop):
+        """Associa o feed ao event loop do FastAPI (chamar no startup)"""
+        self._loop = loop
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self.queue_size)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event: str, payload, event_id: str = None):
+        """
+        Publica um evento para todos os assinantes
+
+        Args:
+            event: Tipo do evento ("message", "clock", "leader")
+            payload: Dados já em JSON (str) ou objeto serializável
+            event_id: Cursor do evento (mensagens), usado para retomar
+        """
+        if not self._subscribers or self._loop is None:
+            return
+        data = payload if isinstance(payload, str) else json.dumps(payload)
+        frame = encode_event(event, data, event_id)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._deliver(frame)
+        else:
+            self._loop.call_soon_threadsafe(self._deliver, frame)
+
+    def publish_messages(self, messages):
+        """Publica um evento "message" por mensagem confirmada"""
+        for message in messages:
+            self.publish("message", message.model_dump_json(), message_cursor(message))
+
+    def _deliver(self, frame: bytes):
+        for subscription in list(self._subscribers):
+            if subscription.closed:
+                continue
+            try:
+                subscription.queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                # Assinante lento: desconectar; ele retoma pelo cursor
+                subscription.closed = True
+                self._subscribers.discard(subscription)
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                subscription.queue.put_nowait(_CLOSED)
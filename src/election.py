@@ -0,0 +1,334 @@
+"""
+Motor de eleição Bully: paralelo, sem recursão, com terms
+
+Uma única thread conduz as eleições deste nó:
+- trigger() só acorda essa thread; pedidos concorrentes (vários ELECTION
+  recebidos, suspeita do detector de falhas, falta de líder) viram uma
+  única eleição
+- cada rodada tem um term novo; ELECTION e COORDINATOR são enviados a todos
+  os nós em paralelo, então a rodada dura o RTT do nó mais lento (limitado
+  por ELECTION_TIMEOUT_SECONDS), não a soma dos timeouts
+- sem COORDINATOR depois de um OK, a rodada é repetida num loop com backoff
+  exponencial e jitter, em vez de chamar a eleição recursivamente
+
+Terms: cada nó guarda o maior term visto (os ELECTION propagam o term do
+candidato). Um COORDINATOR com term menor que o deste nó é de uma eleição
+já superada e é ignorado; term 0 (mensagem sem term) é aceito. Quem recusa
+responde com o próprio term: o novo líder (ex: um nó que voltou com term
+menor que o dos outros) adota esse term e repete a eleição com um term
+maior, em vez de ficar líder só na própria visão. Os heartbeats do líder
+levam o term da eleição e seguem a mesma regra (ver main.py).
+
+Partições (ver partitions.py): cada partição do log tem a sua própria
+BullyElection, com a prioridade dos nós rotacionada pelo índice da
+partição (rank), para que os líderes fiquem espalhados. As mensagens levam
+o parâmetro partition e vão sempre por HTTP.
+
+Configuração (variáveis de ambiente):
+- ELECTION_TIMEOUT_SECONDS:  timeout de cada ELECTION/COORDINATOR (padrão 1)
+- COORDINATOR_WAIT_SECONDS:  espera pelo COORDINATOR depois de um OK (padrão 2)
+- ELECTION_BACKOFF_SECONDS:  base do backoff entre rodadas (padrão 0.1)
+- ELECTION_BACKOFF_MAX_SECONDS: teto do backoff (padrão 2)
+"""
+
+import concurrent.futures
+import os
+import random
+import threading
+import time
+
+import grpc_transport
+import metrics
+from structured_log import get_logger
+
+
+ELECTION_TIMEOUT_SECONDS = float(os.getenv("ELECTION_TIMEOUT_SECONDS", "1"))
+COORDINATOR_WAIT_SECONDS = float(os.getenv("COORDINATOR_WAIT_SECONDS", "2"))
+ELECTION_BACKOFF_SECONDS = float(os.getenv("ELECTION_BACKOFF_SECONDS", "0.1"))
+ELECTION_BACKOFF_MAX_SECONDS = float(os.getenv("ELECTION_BACKOFF_MAX_SECONDS", "2"))
+
+log = get_logger("election")
+
+elections_total = metrics.Counter("elections_total", "Rodadas de eleição Bully iniciadas por este nó")
+election_seconds = metrics.Histogram(
+    "election_duration_seconds", "Duração das rodadas de eleição Bully iniciadas por este nó",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2, 3, 5, 10, 30),
+)
+
+
+def send_election(server, candidate_id: int, term: int, partition: int = None) -> bool:
+    """ELECTION por gRPC ou HTTP; True se o nó respondeu OK"""
+    if grpc_transport.USE_GRPC and partition is None:
+        return grpc_transport.send_election(server, candidate_id, term, timeout=ELECTION_TIMEOUT_SECONDS)
+    params = {"candidate_id": candidate_id, "term": term}
+    if partition is not None:
+        params["partition"] = partition
+    response = server.post("/election", params=params, timeout=ELECTION_TIMEOUT_SECONDS)
+    return response.status_code == 200
+
+
+def send_coordinator(server, leader_id: int, term: int, partition: int = None) -> int:
+    """COORDINATOR por gRPC ou HTTP; devolve o term do nó de destino (0 se desconhecido)"""
+    if grpc_transport.USE_GRPC and partition is None:
+        return grpc_transport.send_coordinator(server, leader_id, term, timeout=ELECTION_TIMEOUT_SECONDS)
+    params = {"new_leader": leader_id, "term": term}
+    if partition is not None:
+        params["partition"] = partition
+    response = server.post("/coordinator", params=params, timeout=ELECTION_TIMEOUT_SECONDS)
+    try:
+        return int(response.json().get("term") or 0)
+    except (ValueError, AttributeError):
+        return 0
+
+
+class BullyElection:
+    """
+    Estado e thread de eleição de um nó
+
+    Args:
+        my_id: ID deste nó
+        servers: Lista de Server do cluster (este nó incluído)
+        get_leader: get_leader() -> líder atual (ou None)
+        set_leader: set_leader(id) atualiza o líder
+        suspected: Conjunto de IDs de que o detector de falhas suspeita
+                   (não recebem ELECTION)
+        rank: rank(id) -> prioridade do nó na disputa (padrão: o próprio ID,
+              como no Bully clássico)
+        partition: Índice da partição eleita (None para o líder global)
+
+    Attributes:
+        term (int): Maior term visto por este nó
+    """
+
+    def __init__(self, my_id: int, servers, get_leader, set_leader, suspected: set,
+                 rank=None, partition: int = None):
+        self.my_id = my_id
+        self.servers = servers
+        self.get_leader = get_leader
+        self.set_leader = set_leader
+        self.suspected = suspected
+        self.rank = rank or (lambda node_id: node_id)
+        self.partition = partition
+        self.log = log if partition is None else get_logger(f"election.p{partition}")
+        self.term = 0
+        # Term em que o líder atual foi aceito (ver on_coordinator)
+        self._leader_term = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._coordinator = threading.Event()
+        self._pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(len(servers), 2), thread_name_prefix="election"
+        )
+        self._thread = None
+        # Candidato -> term do último ELECTION tratado (repetições no mesmo
+        # term não geram outra rodada nem outro COORDINATOR)
+        self._answered = {}
+
+    def start(self):
+        """Inicia a thread de eleição"""
+        if self._thread is None:
+            name = "election" if self.partition is None else f"election-p{self.partition}"
+            self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+            self._thread.start()
+
+    def trigger(self, reason: str):
+        """Pede uma eleição (não bloqueia; pedidos concorrentes viram uma só)"""
+        if not self._wake.is_set():
+            self.log.info("Election requested", reason=reason, term=self.term)
+        self._wake.set()
+
+    def _outranks(self, node_id: int) -> bool:
+        """True se node_id tem prioridade maior que este nó na disputa"""
+        return self.rank(node_id) > self.rank(self.my_id)
+
+    # --- mensagens recebidas ---
+
+    def observe_term(self, term: int, reason: str):
+        """
+        Term visto em uma resposta de outro nó (COORDINATOR ou heartbeat recusado)
+
+        Se é maior que o deste nó, a liderança deste nó é de um term superado:
+        adota o term e pede uma nova eleição, que vai usar um term maior.
+        """
+        with self._lock:
+            if not term or term <= self.term:
+                return
+            self.term = term
+        self.log.info("Higher term seen, restarting election", term=term, reason=reason)
+        self.trigger(reason)
+
+    def _observe(self, term) -> int:
+        with self._lock:
+            if term:
+                self.term = max(self.term, term)
+            return self.term
+
+    def on_election(self, candidate_id: int, term: int = None) -> int:
+        """
+        ELECTION recebido de um nó de ID menor: responder OK e disputar
+
+        Cada (candidato, term) é tratado uma vez. Se este nó já é o líder, a
+        disputa já foi vencida: em vez de uma nova rodada, o candidato recebe
+        um COORDINATOR direto.
+
+        Returns:
+            int: Term atual deste nó (vai na resposta)
+        """
+        current = self._observe(term)
+        if candidate_id is not None and term:
+            with self._lock:
+                if self._answered.get(candidate_id) == term:
+                    return current
+                self._answered[candidate_id] = term
+        if self.get_leader() == self.my_id:
+            self.log.info("Received ELECTION while leader, answering with COORDINATOR", candidate=candidate_id, term=term)
+            server = next((s for s in self.servers if s.id == candidate_id), None)
+            if server is not None:
+                self._pool.submit(self._send_coordinator, server, current)
+            return current
+        self.log.info("Received ELECTION, starting own election", candidate=candidate_id, term=term)
+        self.trigger("election from lower node")
+        return current
+
+    def on_leader_heartbeat(self, leader_id: int, term: int = None):
+        """
+        Heartbeat aceito de um líder: adota o term dele, e um líder de ID
+        maior encerra a espera pelo COORDINATOR
+        """
+        self._observe(term)
+        if self._outranks(leader_id):
+            self._coordinator.set()
+
+    def on_coordinator(self, leader_id: int, term: int = None) -> bool:
+        """
+        COORDINATOR recebido
+
+        Ignorado se é de um term já superado, se vem de um nó de ID menor
+        (como no Bully, este nó então disputa a eleição) ou se, no mesmo term
+        do líder atual, vem de um nó de prioridade menor que a dele. A
+        verificação e a troca do líder são feitas sob o lock: dois
+        COORDINATOR concorrentes não podem deixar o menor como líder.
+
+        Returns:
+            bool: True se o líder foi aceito
+        """
+        with self._lock:
+            if term and term < self.term:
+                self.log.info("Ignoring stale COORDINATOR", leader=leader_id, term=term, current_term=self.term)
+                return False
+            contest = leader_id != self.my_id and not self._outranks(leader_id)
+            if not contest:
+                current = self.get_leader()
+                if (term and term == self._leader_term and current is not None
+                        and self.rank(leader_id) < self.rank(current)):
+                    self.log.info("Ignoring COORDINATOR from lower node in the same term",
+                                  leader=leader_id, current_leader=current, term=term)
+                    return False
+                if term:
+                    self.term = max(self.term, term)
+                self._leader_term = term or self.term
+                self.log.info("Received COORDINATOR", leader=leader_id, term=term)
+                self.suspected.discard(leader_id)
+                self.set_leader(leader_id)
+        if contest:
+            self.log.info("COORDINATOR from lower node, contesting", leader=leader_id, term=term)
+            self.trigger("coordinator from lower node")
+            return False
+        self._coordinator.set()
+        return True
+
+    # --- rodadas ---
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            attempt = 0
+            while not self._round():
+                attempt += 1
+                # Backoff exponencial com jitter: nós que falharam juntos não
+                # voltam a disputar no mesmo instante
+                delay = min(ELECTION_BACKOFF_MAX_SECONDS, ELECTION_BACKOFF_SECONDS * 2 ** attempt)
+                delay *= random.uniform(0.5, 1.0)
+                self.log.warning("Did not receive COORDINATOR, retrying election", attempt=attempt, delay=round(delay, 3))
+                time.sleep(delay)
+
+    def _round(self) -> bool:
+        """
+        Uma rodada da eleição
+
+        Returns:
+            bool: True se terminou com um líder (este nó ou um de ID maior)
+        """
+        with self._lock:
+            self.term += 1
+            term = self.term
+        elections_total.inc()
+        self._coordinator.clear()
+        with election_seconds.time():
+            higher = [
+                server for server in self.servers
+                if server.id and self._outranks(server.id) and server.id not in self.suspected
+            ]
+            self.log.info("Starting Bully election", term=term, higher=[server.id for server in higher])
+
+            # PASSO 1: ELECTION para todos os nós de ID maior, em paralelo
+            if self._any_ok(higher, term):
+                # PASSO 2: Um nó maior está vivo; esperar o COORDINATOR dele
+                self.log.info("Waiting for COORDINATOR from higher node", term=term)
+                self._coordinator.wait(COORDINATOR_WAIT_SECONDS)
+                # (o líder também pode ter chegado por heartbeat)
+                leader = self.get_leader()
+                if leader is not None and self._outranks(leader):
+                    # O COORDINATOR do líder também responde a quem pediu eleição
+                    self._wake.clear()
+                    return True
+                return False
+
+            # PASSO 3: Ninguém maior respondeu: EU sou o líder. Pedidos de
+            # eleição até aqui são respondidos por este COORDINATOR.
+            self._wake.clear()
+            with self._lock:
+                self._leader_term = term
+                self.set_leader(self.my_id)
+            self.log.info("I am the new leader, broadcasting COORDINATOR", term=term)
+            self._broadcast_coordinator(term)
+            return True
+
+    def _any_ok(self, servers, term: int) -> bool:
+        # Retorna no primeiro OK, ou quando todos falharam / deu o timeout
+        if not servers:
+            return False
+        futures = {
+            self._pool.submit(send_election, server, self.my_id, term, self.partition): server for server in servers
+        }
+        try:
+            for future in concurrent.futures.as_completed(futures, timeout=ELECTION_TIMEOUT_SECONDS * 1.5):
+                server = futures[future]
+                try:
+                    if future.result():
+                        self.log.info("Received OK", node=server.id, term=term)
+                        return True
+                except Exception as e:
+                    self.log.info("Node did not respond to ELECTION", node=server.id, error=str(e))
+        except concurrent.futures.TimeoutError:
+            pass
+        return False
+
+    def _send_coordinator(self, server, term: int):
+        try:
+            remote_term = send_coordinator(server, self.my_id, term, self.partition)
+            self.log.info("Sent COORDINATOR", node=server.id, term=term)
+        except Exception as e:
+            self.log.warning("Failed to send COORDINATOR", node=server.id, error=str(e))
+            return
+        if remote_term > term:
+            # O nó ignorou o COORDINATOR por ser de um term antigo
+            self.observe_term(remote_term, "coordinator rejected as stale")
+
+    def _broadcast_coordinator(self, term: int):
+        futures = [
+            self._pool.submit(self._send_coordinator, server, term)
+            for server in self.servers if server.id and server.id != self.my_id
+        ]
+        concurrent.futures.wait(futures)
@@ -0,0 +1,119 @@
+"""
+Detector de falhas phi-accrual (Hayashibara et al.)
+
+Em vez de um timeout fixo, o follower guarda os intervalos entre os últimos
+heartbeats do líder e calcula phi = -log10(P(o próximo heartbeat ainda
+chegar)), assumindo intervalos com distribuição normal. Num enlace estável
+(LAN) o desvio é pequeno e phi sobe rápido depois de poucos heartbeats
+perdidos; num enlace com jitter (ex: São Paulo ↔ Sydney) o desvio aprendido
+é maior e o mesmo limiar tolera atrasos maiores, sem eleições falsas.
+
+Configuração (variáveis de ambiente):
+- PHI_THRESHOLD:         phi a partir do qual o líder é suspeito (padrão 8)
+- PHI_WINDOW:            intervalos guardados (padrão 100)
+- PHI_MIN_STD:           desvio mínimo em segundos (padrão 0.05)
+- PHI_ACCEPTABLE_PAUSE:  pausa tolerada além da média, ex: GC ou event loop
+                         ocupado (padrão 0.25s)
+"""
+
+import math
+import os
+import threading
+import time
+from collections import deque
+
+
+PHI_THRESHOLD = float(os.getenv("PHI_THRESHOLD", "8"))
+PHI_WINDOW = int(os.getenv("PHI_WINDOW", "100"))
+PHI_MIN_STD = float(os.getenv("PHI_MIN_STD", "0.05"))
+PHI_ACCEPTABLE_PAUSE = float(os.getenv("PHI_ACCEPTABLE_PAUSE", "0.25"))
+
+
+class PhiAccrualDetector:
+    """
+    Detector phi-accrual de um único nó monitorado
+
+    heartbeat() é chamado a cada batimento recebido (event loop); phi() e
+    suspect() podem ser chamados de outras threads.
+
+    Args:
+        first_interval: Intervalo esperado, usado antes de haver amostras
+                        (o intervalo de heartbeat configurado)
+        threshold: Limiar de phi para suspeitar do nó
+        window: Quantidade de intervalos guardados
+        min_std: Desvio padrão mínimo (s)
+        acceptable_pause: Atraso tolerado além da média (s)
+    """
+
+    def __init__(self, first_interval: float, threshold: float = PHI_THRESHOLD, window: int = PHI_WINDOW,
+                 min_std: float = PHI_MIN_STD, acceptable_pause: float = PHI_ACCEPTABLE_PAUSE):
+        self.first_interval = first_interval
+        self.threshold = threshold
+        self.min_std = min_std
+        self.acceptable_pause = acceptable_pause
+        self._intervals = deque(maxlen=window)
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._last = None
+        self._lock = threading.Lock()
+
+    def _add(self, interval: float):
+        if len(self._intervals) == self._intervals.maxlen:
+            dropped = self._intervals[0]
+            self._sum -= dropped
+            self._sum_sq -= dropped * dropped
+        self._intervals.append(interval)
+        self._sum += interval
+        self._sum_sq += interval * interval
+
+    def heartbeat(self, now: float = None):
+        """Registra um heartbeat recebido agora"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._last is None:
+                # Amostras iniciais em torno do intervalo esperado (como no Akka)
+                std = self.first_interval / 4
+                self._add(self.first_interval - std)
+                self._add(self.first_interval + std)
+            else:
+                self._add(now - self._last)
+            self._last = now
+
+    @property
+    def active(self) -> bool:
+        """True se já recebeu algum heartbeat"""
+        return self._last is not None
+
+    def phi(self, now: float = None) -> float:
+        """Suspeita atual; 0 se ainda não houve heartbeat"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._last is None:
+                return 0.0
+            n = len(self._intervals)
+            mean = self._sum / n
+            variance = max(self._sum_sq / n - mean * mean, 0.0)
+            elapsed = now - self._last
+        std = max(math.sqrt(variance), self.min_std)
+        # Aproximação logística da CDF normal (mesma do Akka)
+        y = (elapsed - (mean + self.acceptable_pause)) / std
+        if y < -10:
+            # Muito antes do esperado (e exp() estouraria)
+            return 0.0
+        e = math.exp(-y * (1.5976 + 0.070566 * y * y))
+        if y > 0:
+            return -math.log10(e / (1.0 + e)) if e > 0 else float("inf")
+        return max(0.0, -math.log10(1.0 - 1.0 / (1.0 + e)))
+
+    def suspect(self, now: float = None) -> bool:
+        """True se phi passou do limiar"""
+        return self.phi(now) >= self.threshold
+
+    def stats(self) -> dict:
+        """Média e desvio dos intervalos aprendidos (s) e phi atual"""
+        with self._lock:
+            n = len(self._intervals)
+            mean = self._sum / n if n else None
+            std = math.sqrt(max(self._sum_sq / n - mean * mean, 0.0)) if n else None
+        # phi infinito não cabe em JSON
+        return {"samples": n, "mean_s": mean, "std_s": std, "phi": round(min(self.phi(), 1e6), 2)}
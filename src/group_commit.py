@@ -0,0 +1,118 @@
+"""
+Group commit das escritas no líder
+
+Em vez de cada POST gerar uma rodada completa de replicação, as escritas que
+chegam dentro de uma janela curta (ou até atingir um tamanho máximo) são
+reunidas em um lote. O lote inteiro recebe IDs e timestamps Lamport
+consecutivos e é replicado aos followers numa única requisição.
+
+Configuração (variáveis de ambiente):
+- BATCH_WINDOW_MS: tempo máximo que uma escrita espera por companheiras (padrão 2)
+- BATCH_MAX_SIZE:  tamanho máximo de um lote (padrão 100)
+
+Por padrão os lotes são confirmados um de cada vez. Com max_in_flight > 1
+(modo Raft, ver raft.py) até max_in_flight lotes ficam em commit ao mesmo
+tempo; commit_fn precisa então fixar a ordem do lote (IDs, posição no log)
+antes do seu primeiro await.
+"""
+
+import asyncio
+import os
+
+
+BATCH_WINDOW_MS = float(os.getenv("BATCH_WINDOW_MS", "2"))
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "100"))
+
+
+class GroupCommitter:
+    """
+    Agrupa escritas concorrentes em lotes e os entrega a uma função de commit
+
+    A função de commit recebe a lista de itens do lote e deve retornar uma
+    lista de resultados na mesma ordem; cada chamador de submit() recebe o
+    resultado correspondente ao seu item. Até max_in_flight lotes são
+    confirmados ao mesmo tempo (padrão 1), e enquanto isso o próximo vai se
+    formando.
+
+    Attributes:
+        commit_fn: Corrotina commit_fn(items) -> list de resultados
+        window (float): Janela de agrupamento em segundos
+        max_batch (int): Tamanho máximo de lote
+        max_in_flight (int): Lotes em commit ao mesmo tempo
+    """
+
+    def __init__(self, commit_fn, window_ms: float = BATCH_WINDOW_MS, max_batch: int = BATCH_MAX_SIZE,
+                 max_in_flight: int = 1):
+        self.commit_fn = commit_fn
+        self.window = window_ms / 1000.0
+        self.max_batch = max(1, max_batch)
+        self.max_in_flight = max(1, max_in_flight)
+        self._in_flight = set()
+        self._pending = []
+        self._full = None
+        self._flusher = None
+
+    async def submit(self, item):
+        """
+        Enfileira um item no próximo lote e espera o seu commit
+
+        Args:
+            item: Item a confirmar (ex: conteúdo da mensagem)
+
+        Returns:
+            O resultado de commit_fn correspondente a este item
+
+        Raises:
+            Exception: A mesma exceção levantada por commit_fn para o lote
+            RuntimeError: Se commit_fn não devolveu um resultado para este item
+        """
+        loop = asyncio.get_running_loop()
+        if self._full is None:
+            self._full = asyncio.Event()
+
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.ensure_future(self._run())
+        return await future
+
+    async def _run(self):
+        """Forma e confirma lotes enquanto houver escritas pendentes"""
+        while self._pending:
+            while len(self._in_flight) >= self.max_in_flight:
+                await asyncio.wait(self._in_flight, return_when=asyncio.FIRST_COMPLETED)
+            if len(self._pending) < self.max_batch:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.window)
+                except asyncio.TimeoutError:
+                    pass
+            self._full.clear()
+
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+
+            task = asyncio.ensure_future(self._commit(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _commit(self, batch):
+        try:
+            results = await self.commit_fn([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+        if len(results) != len(batch):
+            # Sem resultado para alguns itens: falhar em vez de deixar quem
+            # chamou submit() esperando para sempre
+            error = RuntimeError(f"commit_fn returned {len(results)} results for a batch of {len(batch)}")
+            for _, future in batch[len(results):]:
+                if not future.done():
+                    future.set_exception(error)
@@ -0,0 +1,310 @@
+"""
+Serviço gRPC para o tráfego entre nós
+
+Roda ao lado da API FastAPI (no mesmo event loop), na porta GRPC_PORT, e
+implementa o NodeService de protos/replication.proto:
+
+- Replicate:   stream bidirecional; o líder envia LogBatch, o follower
+               responde um ReplicateAck por lote, na mesma ordem
+- Election / Coordinator: mensagens unárias do algoritmo Bully
+- Heartbeat:   stream bidirecional de batimentos do líder
+
+Do lado do líder, cada follower tem um ReplicationStream: um único stream
+Replicate de longa duração, multiplexado na mesma conexão HTTP/2, com até
+GRPC_MAX_IN_FLIGHT lotes sem confirmação (o controle de fluxo do HTTP/2
+segura o líder quando o follower não acompanha).
+
+REPLICATION_TRANSPORT=grpc faz a replicação e a eleição usarem este serviço;
+o padrão continua sendo HTTP.
+"""
+
+import asyncio
+import collections
+import os
+import threading
+
+import wire
+
+try:
+    import grpc
+    import grpc.aio
+    from vgrpc import replication_pb2, replication_pb2_grpc
+except ImportError:
+    grpc = None
+
+
+GRPC_PORT = int(os.getenv("GRPC_PORT", "50051"))
+GRPC_ENABLED = grpc is not None and os.getenv("GRPC_ENABLED", "1") == "1"
+REPLICATION_TRANSPORT = os.getenv("REPLICATION_TRANSPORT", "http").strip().lower()
+USE_GRPC = GRPC_ENABLED and REPLICATION_TRANSPORT == "grpc"
+GRPC_MAX_IN_FLIGHT = int(os.getenv("GRPC_MAX_IN_FLIGHT", "64"))
+GRPC_ACK_TIMEOUT = float(os.getenv("GRPC_ACK_TIMEOUT", "5"))
+# Timeout das chamadas unárias (eleição), como PEER_TIMEOUT no HTTP
+GRPC_TIMEOUT = float(os.getenv("PEER_TIMEOUT", "2"))
+
+_REPLICATE_METHOD = "/NodeService/Replicate"
+
+
+def target(server) -> str:
+    """Endereço gRPC de um peer"""
+    return f"{server.host}:{server.grpc_port or GRPC_PORT}"
+
+
+if grpc is not None:
+
+    class NodeServicer(replication_pb2_grpc.NodeServiceServicer):
+        """
+        Implementação do NodeService delegando ao nó
+
+        Args:
+            message_cls: Classe Message
+            on_batch: corrotina on_batch(messages, prev_id) -> dict com contiguous_id,
+                      local_lamport, received e, se recusou o lote, conflict_id
+                      (no modo leaderless, também origin_received)
+            on_election: on_election(candidate_id, term) -> term deste nó
+            on_coordinator: on_coordinator(leader_id, term) -> True se aceitou
+            on_heartbeat: on_heartbeat(leader_id, last_id, lamport, term) ->
+                          (contiguous_id, term deste nó)
+            term: term() -> term atual deste nó (vai na resposta ao COORDINATOR)
+            node_id: ID deste nó
+        """
+
+        def __init__(self, message_cls, on_batch, on_election, on_coordinator, on_heartbeat, node_id, term):
+            self.message_cls = message_cls
+            self.on_batch = on_batch
+            self.on_election = on_election
+            self.on_coordinator = on_coordinator
+            self.on_heartbeat = on_heartbeat
+            self.node_id = node_id
+            self.term = term
+
+        async def Replicate(self, request_iterator, context):
+            async for batch in request_iterator:
+                messages, prev_id = wire.messages_from_pb(batch, self.message_cls)
+                ack = await self.on_batch(messages, prev_id)
+                yield replication_pb2.ReplicateAck(
+                    contiguous_id=ack["contiguous_id"],
+                    local_lamport=ack["local_lamport"],
+                    received=ack["received"],
+                    conflict_id=ack.get("conflict_id", 0),
+                    origin_received=ack.get("origin_received"),
+                )
+
+        async def Election(self, request, context):
+            term = self.on_election(request.candidate_id, request.term)
+            return replication_pb2.ElectionReply(ok=True, term=term)
+
+        async def Coordinator(self, request, context):
+            accepted = self.on_coordinator(request.leader_id, request.term)
+            return replication_pb2.CoordinatorReply(ok=accepted, term=self.term())
+
+        async def Heartbeat(self, request_iterator, context):
+            async for ping in request_iterator:
+                contiguous_id, term = self.on_heartbeat(ping.leader_id, ping.last_id, ping.lamport, ping.term)
+                yield replication_pb2.HeartbeatPong(node_id=self.node_id, contiguous_id=contiguous_id, term=term)
+
+
+async def start_server(servicer, port: int = GRPC_PORT):
+    """
+    Inicia o servidor gRPC no event loop atual
+
+    Returns:
+        grpc.aio.Server: Servidor iniciado (parar com await server.stop(grace))
+    """
+    server = grpc.aio.server()
+    replication_pb2_grpc.add_NodeServiceServicer_to_server(servicer, server)
+    server.add_insecure_port(f"[::]:{port}")
+    await server.start()
+    return server
+
+
+class ReplicationStream:
+    """
+    Stream Replicate persistente do líder para um follower
+
+    send() coloca o lote (já serializado uma vez em EncodedBatch) na fila do
+    stream e espera o ack correspondente. Os acks chegam na ordem dos lotes,
+    então cada um resolve o futuro mais antigo pendente. Se o stream cai,
+    todos os pendentes falham e o próximo send() abre um novo.
+    """
+
+    def __init__(self, server):
+        self.server = server
+        self._outbox = None
+        self._pending = collections.deque()
+        self._reader = None
+
+    def _open(self):
+        # Lotes já vêm serializados (EncodedBatch.binary), então o
+        # serializador do stream é a identidade
+        call = aio_channel(self.server).stream_stream(
+            _REPLICATE_METHOD,
+            request_serializer=lambda data: data,
+            response_deserializer=replication_pb2.ReplicateAck.FromString,
+        )
+        self._outbox = asyncio.Queue(maxsize=GRPC_MAX_IN_FLIGHT)
+        self._reader = asyncio.ensure_future(self._read_acks(call(self._requests(self._outbox))))
+
+    @staticmethod
+    async def _requests(outbox):
+        while True:
+            data = await outbox.get()
+            if data is None:
+                return
+            yield data
+
+    async def _read_acks(self, call):
+        try:
+            async for ack in call:
+                if self._pending:
+                    future = self._pending.popleft()
+                    if not future.done():
+                        result = {
+                            "contiguous_id": ack.contiguous_id,
+                            "local_lamport": ack.local_lamport,
+                            "received": ack.received,
+                            "conflict_id": ack.conflict_id,
+                        }
+                        if ack.HasField("origin_received"):
+                            result["origin_received"] = ack.origin_received
+                        future.set_result(result)
+            error = ConnectionError("Replicate stream closed")
+        except Exception as e:
+            error = e
+        while self._pending:
+            future = self._pending.popleft()
+            if not future.done():
+                future.set_exception(error)
+
+    async def send(self, batch: wire.EncodedBatch) -> dict:
+        """
+        Envia um lote pelo stream e espera o ack
+
+        Args:
+            batch: Lote a enviar
+
+        Returns:
+            dict: contiguous_id, local_lamport, received e conflict_id do
+                  follower (no modo leaderless, também origin_received)
+        """
+        if self._reader is None or self._reader.done():
+            self._open()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(future)
+        await self._outbox.put(batch.binary())
+        return await asyncio.wait_for(future, GRPC_ACK_TIMEOUT)
+
+    def close(self):
+        """Encerra o stream (os lotes pendentes falham)"""
+        if self._outbox is not None and not self._outbox.full():
+            self._outbox.put_nowait(None)
+
+
+_channels = {}
+_streams = {}
+_sync_stubs = {}
+_sync_lock = threading.Lock()
+
+
+def aio_channel(server):
+    """Canal gRPC assíncrono do peer (um por peer, compartilhado pelos streams)"""
+    channel = _channels.get(server.id)
+    if channel is None:
+        channel = _channels[server.id] = grpc.aio.insecure_channel(target(server))
+    return channel
+
+
+def replication_stream(server) -> ReplicationStream:
+    """Stream Replicate do líder para o follower (um por follower)"""
+    stream = _streams.get(server.id)
+    if stream is None:
+        stream = _streams[server.id] = ReplicationStream(server)
+    return stream
+
+
+def sync_stub(server):
+    """Stub síncrono (para as threads de eleição) com canal persistente"""
+    with _sync_lock:
+        stub = _sync_stubs.get(server.id)
+        if stub is None:
+            stub = _sync_stubs[server.id] = replication_pb2_grpc.NodeServiceStub(
+                grpc.insecure_channel(target(server))
+            )
+        return stub
+
+
+def send_election(server, candidate_id: int, term: int = 0, timeout: float = GRPC_TIMEOUT) -> bool:
+    """
+    Envia ELECTION via gRPC
+
+    Returns:
+        bool: True se o nó respondeu OK
+
+    Raises:
+        ConnectionError: Se o nó não respondeu
+    """
+    try:
+        reply = sync_stub(server).Election(
+            replication_pb2.ElectionRequest(candidate_id=candidate_id, term=term), timeout=timeout
+        )
+    except grpc.RpcError as e:
+        raise ConnectionError(f"gRPC {e.code().name}") from None
+    return reply.ok
+
+
+def send_coordinator(server, leader_id: int, term: int = 0, timeout: float = GRPC_TIMEOUT) -> int:
+    """
+    Envia COORDINATOR via gRPC
+
+    Returns:
+        int: Term do nó de destino (maior que term se ele ignorou o COORDINATOR)
+
+    Raises:
+        ConnectionError: Se o nó não respondeu
+    """
+    try:
+        reply = sync_stub(server).Coordinator(
+            replication_pb2.CoordinatorRequest(leader_id=leader_id, term=term), timeout=timeout
+        )
+    except grpc.RpcError as e:
+        raise ConnectionError(f"gRPC {e.code().name}") from None
+    return reply.term
+
+
+async def heartbeat(server, make_ping, interval: float):
+    """
+    Mantém um stream Heartbeat com o follower
+
+    Args:
+        server: Follower de destino
+        make_ping: make_ping() -> (leader_id, last_id, lamport, term), ou None
+                   para encerrar o stream (ex: este nó deixou de ser líder)
+        interval: Segundos entre batimentos
+
+    Yields:
+        HeartbeatPong: Resposta do follower a cada batimento
+    """
+    async def pings():
+        while True:
+            ping = make_ping()
+            if ping is None:
+                return
+            leader_id, last_id, lamport, term = ping
+            yield replication_pb2.HeartbeatPing(leader_id=leader_id, last_id=last_id, lamport=lamport, term=term)
+            await asyncio.sleep(interval)
+
+    stub = replication_pb2_grpc.NodeServiceStub(aio_channel(server))
+    async for pong in stub.Heartbeat(pings()):
+        yield pong
+
+
+async def close_all():
+    """Fecha streams e canais abertos"""
+    for stream in _streams.values():
+        stream.close()
+    _streams.clear()
+    for channel in _channels.values():
+        await channel.close()
+    _channels.clear()
+    with _sync_lock:
+        _sync_stubs.clear()
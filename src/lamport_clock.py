@@ -9,11 +9,30 @@ Propriedades:
 2. O relógio se incrementa antes de cada evento local
 3. Ao receber uma mensagem, o relógio se atualiza: max(local, remote) + 1
 
+Modo híbrido (CLOCK_MODE=hlc): o Hybrid Logical Clock mantém as mesmas
+propriedades, mas o valor acompanha o relógio físico. Cada timestamp é um
+int só, (milissegundos desde a época << 16) | contador lógico, então
+continua cabendo em lamport_timestamp, comparando-se como antes e servindo
+para consultas por intervalo de tempo (ver HybridLogicalClock.for_time).
+
+Leituras (get_time) não pegam o lock: o valor só cresce e a leitura de um
+atributo int é atômica. Só increment/update/reserve entram na seção crítica.
+
 Referências:
 - Lamport, L. (1978). "Time, Clocks, and the Ordering of Events in a Distributed System"
+- Kulkarni, S. et al. (2014). "Logical Physical Clocks and Consistent Snapshots in
+  Globally Distributed Databases"
 """
 
+import os
 import threading
+import time
+
+# "lamport" (padrão) ou "hlc" (Hybrid Logical Clock)
+CLOCK_MODE = os.getenv("CLOCK_MODE", "lamport").lower()
+
+# Bits do contador lógico no timestamp HLC
+HLC_LOGICAL_BITS = 16
 
 
 class LamportClock:
@@ -82,6 +101,28 @@ class LamportClock:
             self.time = max(self.time, remote_time) + 1
             return self.time
 
+    def reserve(self, n: int) -> int:
+        """
+        Reserva n timestamps consecutivos de uma vez (lotes de escrita)
+
+        Equivale a n chamadas de increment(), com uma única passagem pelo
+        lock. O lote usa first, first + 1, ..., first + n - 1.
+
+        Args:
+            n: Quantidade de timestamps (>= 1)
+
+        Returns:
+            int: Primeiro timestamp reservado
+
+        Example:
+            >>> clock = LamportClock()
+            >>> first = clock.reserve(3)  # Retorna 1; o relógio fica em 3
+        """
+        with self.lock:
+            first = self.time + 1
+            self.time += n
+            return first
+
     def get_time(self) -> int:
         """
         Obtém o valor atual do relógio sem modificá-lo
@@ -99,13 +140,93 @@ class LamportClock:
             >>> clock.increment()
             >>> current = clock.get_time()  # Retorna 1
         """
-        with self.lock:
-            return self.time
+        # Sem lock: ver docstring do módulo
+        return self.time
 
     def __str__(self) -> str:
         """Representação em string do relógio"""
-        return f"LamportClock(time={self.get_time()})"
+        return f"{type(self).__name__}(time={self.get_time()})"
 
     def __repr__(self) -> str:
         """Representação para debugging"""
         return self.__str__()
+
+
+class HybridLogicalClock(LamportClock):
+    """
+    Hybrid Logical Clock (HLC) com o timestamp empacotado num int
+
+    O valor é (ms << HLC_LOGICAL_BITS) | contador. Comparar os ints é
+    comparar (ms, contador) lexicograficamente, então as regras do HLC
+    viram um max(): o novo valor é maior que o atual, maior que o remoto
+    (ao receber) e pelo menos o relógio físico com contador zero. Se o
+    contador estourar, o valor avança para o milissegundo seguinte, o que
+    mantém a ordem.
+    """
+
+    @staticmethod
+    def physical_now() -> int:
+        """Relógio físico já deslocado para a posição dos milissegundos"""
+        return int(time.time() * 1000) << HLC_LOGICAL_BITS
+
+    @staticmethod
+    def for_time(seconds: float) -> int:
+        """
+        Menor timestamp HLC gerado no instante dado (ou depois)
+
+        Args:
+            seconds: Tempo físico em segundos desde a época (time.time())
+
+        Returns:
+            int: Timestamp com contador zero; serve de limite em consultas
+                 por intervalo de tempo
+        """
+        return int(seconds * 1000) << HLC_LOGICAL_BITS
+
+    @staticmethod
+    def to_time(timestamp: int) -> float:
+        """Parte física de um timestamp HLC, em segundos desde a época"""
+        return (timestamp >> HLC_LOGICAL_BITS) / 1000
+
+    def increment(self) -> int:
+        """Evento local: max(atual + 1, agora)"""
+        now = self.physical_now()
+        with self.lock:
+            self.time = max(self.time + 1, now)
+            return self.time
+
+    def update(self, remote_time: int) -> int:
+        """Recebimento: max(atual + 1, remoto + 1, agora)"""
+        now = self.physical_now()
+        with self.lock:
+            self.time = max(self.time, remote_time) + 1
+            if now > self.time:
+                self.time = now
+            return self.time
+
+    def reserve(self, n: int) -> int:
+        """Reserva n timestamps consecutivos (ver LamportClock.reserve)"""
+        now = self.physical_now()
+        with self.lock:
+            first = max(self.time + 1, now)
+            self.time = first + n - 1
+            return first
+
+
+def create_clock(initial_time: int = 0, mode: str = None) -> LamportClock:
+    """
+    Cria o relógio do nó conforme CLOCK_MODE
+
+    Args:
+        initial_time: Valor inicial (ex: o recuperado do WAL)
+        mode: "lamport" ou "hlc"; None usa CLOCK_MODE
+
+    Returns:
+        LamportClock: LamportClock ou HybridLogicalClock
+    """
+    mode = mode or CLOCK_MODE
+    if mode == "lamport":
+        return LamportClock(initial_time)
+    if mode == "hlc":
+        return HybridLogicalClock(initial_time)
+    raise ValueError(f"Unknown CLOCK_MODE: {mode!r} (use lamport or hlc)")
@@ -0,0 +1,228 @@
+"""
+Cliente Python do log distribuído com roteamento direto ao líder
+
+Em vez de mandar a escrita a um nó qualquer e pagar dois saltos (cliente →
+follower → líder), o cliente guarda quem é o líder e escreve direto nele:
+
+- o líder vem de GET /cluster (ID deste nó, líder, URL de cada nó)
+- as escritas levam X-No-Forward: 1; um follower responde 307 com
+  X-Leader-Id / X-Leader-Url em vez de reencaminhar, e o cliente atualiza
+  o líder e repete
+- com watch=True, uma thread acompanha o evento "leader" do feed SSE
+  (GET /events?types=leader), que muda a cada COORDINATOR
+- sem líder conhecido ou com o líder fora do ar, o cliente volta a
+  perguntar aos nós
+
+Uso:
+    from log_client import LogClient
+
+    client = LogClient(["http://127.0.0.1:9001", "http://127.0.0.1:9002"])
+    message_id = client.post("olá")
+    client.get(message_id, consistency="at-least")   # read-your-writes
+    client.close()
+"""
+
+import json
+import threading
+import time
+
+import httpx
+
+
+class NoLeaderError(Exception):
+    """Nenhum nó soube indicar um líder que aceitasse a escrita"""
+
+
+class LogClient:
+    """
+    Cliente síncrono que envia escritas direto ao líder
+
+    Args:
+        nodes: URLs base dos nós (ex: "http://10.0.0.1:8001")
+        timeout: Timeout de cada requisição em segundos
+        retries: Tentativas por operação antes de desistir
+        watch: Acompanhar mudanças de líder pelo feed SSE em background
+        forward_fallback: Se o líder não é alcançável, aceitar que um
+                          follower reencaminhe a escrita
+
+    Attributes:
+        leader_id: ID do líder em cache (None se desconhecido)
+        redirects (int): Escritas que chegaram num follower e foram redirecionadas
+    """
+
+    def __init__(self, nodes, timeout: float = 10, retries: int = 5, watch: bool = False,
+                 forward_fallback: bool = True):
+        self.nodes = [url.rstrip("/") for url in nodes]
+        self.retries = retries
+        self.forward_fallback = forward_fallback
+        self.http = httpx.Client(timeout=timeout)
+        self.leader_id = None
+        self.redirects = 0
+        # ID do nó -> URL, como o cliente o alcança (preferido às URLs
+        # anunciadas pelos nós, que podem ser endereços internos)
+        self._urls = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self._watcher = None
+        if watch:
+            self._watcher = threading.Thread(target=self._watch_leader, daemon=True)
+            self._watcher.start()
+
+    # --- líder ---
+
+    def leader_url(self):
+        """URL do líder em cache, descobrindo-o se necessário"""
+        with self._lock:
+            if self.leader_id is not None:
+                url = self._urls.get(self.leader_id)
+                if url is not None:
+                    return url
+        return self.refresh_leader()
+
+    def refresh_leader(self):
+        """
+        Pergunta o líder aos nós (GET /cluster) e atualiza o cache
+
+        Returns:
+            str: URL do líder, ou None se nenhum nó conhece um líder
+        """
+        for url in self.nodes:
+            try:
+                info = self.http.get(url + "/cluster").json()
+            except (httpx.HTTPError, ValueError):
+                continue
+            with self._lock:
+                if info.get("node_id") is not None:
+                    self._urls[int(info["node_id"])] = url
+                for node_id, node_url in (info.get("nodes") or {}).items():
+                    self._urls.setdefault(int(node_id), node_url.rstrip("/"))
+            if info.get("leader") is not None:
+                self._set_leader(int(info["leader"]))
+                with self._lock:
+                    return self._urls.get(self.leader_id)
+        return None
+
+    def _set_leader(self, leader_id, leader_url: str = None):
+        with self._lock:
+            self.leader_id = leader_id
+            if leader_id is not None and leader_url and leader_id not in self._urls:
+                self._urls[leader_id] = leader_url.rstrip("/")
+
+    def _learn_from(self, response: httpx.Response):
+        """Atualiza o cache com os cabeçalhos X-Leader-Id / X-Leader-Url"""
+        leader_id = response.headers.get("x-leader-id")
+        if leader_id is not None:
+            self._set_leader(int(leader_id), response.headers.get("x-leader-url"))
+
+    def _watch_leader(self):
+        # Segue o evento "leader" do feed SSE de algum nó; reconecta no próximo
+        index = 0
+        while not self._closed:
+            url = self.nodes[index % len(self.nodes)]
+            index += 1
+            try:
+                with self.http.stream("GET", url + "/events", params={"types": "leader"}, timeout=None) as response:
+                    event = None
+                    for line in response.iter_lines():
+                        if self._closed:
+                            return
+                        if line.startswith("event: "):
+                            event = line[7:]
+                        elif line.startswith("data: ") and event == "leader":
+                            leader_id = json.loads(line[6:]).get("leader")
+                            if leader_id != self.leader_id:
+                                self._set_leader(leader_id)
+            except (httpx.HTTPError, ValueError):
+                pass
+            time.sleep(0.5)
+
+    # --- operações ---
+
+    def post(self, message: str) -> int:
+        """
+        Escreve uma mensagem direto no líder
+
+        Returns:
+            int: ID da mensagem criada
+
+        Raises:
+            NoLeaderError: Se nenhuma tentativa chegou a um líder
+            httpx.HTTPStatusError: Se o líder recusou a escrita (ex: 503)
+        """
+        last_error = None
+        for attempt in range(self.retries):
+            url = self.leader_url()
+            if url is None:
+                time.sleep(min(0.1 * 2 ** attempt, 2))
+                continue
+            try:
+                response = self.http.post(url + "/", json={"message": message}, headers={"X-No-Forward": "1"})
+            except httpx.HTTPError as e:
+                # Líder fora do ar: esquecer e perguntar de novo
+                last_error = e
+                self._set_leader(None)
+                if self.forward_fallback:
+                    message_id = self._post_forwarded(message)
+                    if message_id is not None:
+                        return message_id
+                continue
+            self._learn_from(response)
+            if response.status_code == 307:
+                self.redirects += 1
+                continue
+            if response.status_code == 503 and "retry-after" in response.headers:
+                last_error = httpx.HTTPStatusError("Leader busy", request=response.request, response=response)
+                time.sleep(float(response.headers["retry-after"]))
+                continue
+            response.raise_for_status()
+            return response.json()
+        raise NoLeaderError(f"No leader accepted the write after {self.retries} attempts: {last_error!r}")
+
+    def _post_forwarded(self, message: str):
+        # Qualquer nó que responda reencaminha ao líder que ele conhece
+        for url in self.nodes:
+            try:
+                response = self.http.post(url + "/", json={"message": message})
+            except httpx.HTTPError:
+                continue
+            self._learn_from(response)
+            if response.status_code == 200:
+                return response.json()
+        return None
+
+    def get(self, id: int, consistency: str = "local", node: str = None, **params):
+        """
+        Lê uma mensagem
+
+        Args:
+            id: ID da mensagem
+            consistency: local, leader-lease (vai ao líder) ou at-least
+            node: URL do nó que responde (padrão: o primeiro; o líder em leader-lease)
+            **params: min_id, min_lamport, wait_ms
+        """
+        if consistency == "leader-lease":
+            node = self.leader_url()
+        response = self.http.get((node or self.nodes[0]) + "/", params={"id": id, "consistency": consistency, **params})
+        if response.status_code == 421:
+            self._learn_from(response)
+        response.raise_for_status()
+        return response.json()
+
+    def messages(self, node: str = None, **params):
+        """GET /messages (mesmos parâmetros da rota)"""
+        if params.get("consistency") == "leader-lease":
+            node = self.leader_url()
+        response = self.http.get((node or self.nodes[0]) + "/messages", params=params)
+        response.raise_for_status()
+        return response.json()
+
+    def close(self):
+        self._closed = True
+        self.http.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
@@ -1,19 +1,62 @@
 import random
-from fastapi import FastAPI
-from fastapi.responses import HTMLResponse
+from datetime import datetime
+from typing import List, Optional
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter, ValidationError
+import asyncio
+import json
 import threading
 import time
-import requests
 import os
 from server import Server
-from lamport_clock import LamportClock
+import lamport_clock as clocks
+from lamport_clock import create_clock
+import message_store
+from message_store import create_store
+from segments import SegmentedMessageStore
+from wal import WriteAheadLog
+import wal
 import server
+import replication
+import streaming
+import wire
+import grpc_transport
+import metrics
+from failure_detector import PhiAccrualDetector
+import read_consistency
+from read_consistency import AppliedWatermark, LeaderLease
+import structured_log
+from structured_log import get_logger
+from change_feed import ChangeFeed
+import change_feed
+from group_commit import GroupCommitter
+from election import BullyElection
+import raft
+import multi_writer as leaderless
+import partitions
 
 
 app = FastAPI()
 
+# Loggers por subsistema (níveis em LOG_LEVEL / LOG_LEVELS, ver structured_log.py)
+api_log = get_logger("api")
+replication_log = get_logger("replication")
+election_log = get_logger("election")
+clock_log = get_logger("clock")
+wal_log = get_logger("wal")
+
+# Latência de cada rota, medida até o último byte da resposta (GET /metrics).
+# /events é um stream que dura enquanto o cliente estiver conectado.
+request_seconds = metrics.Histogram(
+    "http_request_duration_seconds", "Latência das requisições HTTP por rota", ["method", "route", "status"]
+)
+app.add_middleware(metrics.MetricsMiddleware, histogram=request_seconds, exclude={"/events"})
+forward_seconds = metrics.Histogram(
+    "forward_to_leader_seconds", "Latência do reencaminhamento de escritas ao líder"
+)
+
 # Servir arquivos estáticos (dashboard HTML)
 # O path é relativo ao diretório de execução
 import pathlib
@@ -25,8 +68,8 @@ if static_path.exists():
 NODE_ID_ENV = os.getenv("NODE_ID")
 my_id = int(NODE_ID_ENV) if NODE_ID_ENV else None
 
-# Inicializar Relógio Lógico de Lamport
-lamport_clock = LamportClock()
+# Inicializar o relógio lógico (Lamport ou HLC, ver CLOCK_MODE)
+lamport_clock = create_clock()
 
 # Configurar lista de servidores baseado no ambiente
 # Prioridade: Variáveis de ambiente > Docker names (default)
@@ -36,14 +79,16 @@ OTHER_SERVERS_ENV = os.getenv("OTHER_SERVERS")
 
 if OTHER_SERVERS_ENV:
     # Parse formato: "ip1:port1:id1,ip2:port2:id2,ip3:port3:id3"
+    # (opcionalmente "ip:port:id:grpc_port" quando a porta gRPC não é a padrão)
     KNOWN_NODES = []
     for server_str in OTHER_SERVERS_ENV.split(","):
         parts = server_str.strip().split(":")
-        if len(parts) == 3:
+        if len(parts) in (3, 4):
             KNOWN_NODES.append({
                 "host": parts[0],
                 "port": int(parts[1]),
-                "id": int(parts[2])
+                "id": int(parts[2]),
+                "grpc_port": int(parts[3]) if len(parts) == 4 else None,
             })
 else:
     # Default para Docker local
@@ -54,9 +99,95 @@ else:
     ]
 
 servers = [
-    Server(host=node["host"], port=node["port"], id=node["id"])
+    Server(host=node["host"], port=node["port"], id=node["id"], grpc_port=node.get("grpc_port"))
     for node in KNOWN_NODES
 ]
+servers_by_id = {server.id: server for server in servers}
+
+# Escrita recebida por um follower: reencaminhar ao líder (1) ou responder
+# 307 apontando o líder (0). Com o cabeçalho X-No-Forward: 1 o cliente pede
+# o redirecionamento mesmo com FORWARD_WRITES=1 (ver log_client.py).
+FORWARD_WRITES = os.getenv("FORWARD_WRITES", "1") == "1"
+FORWARD_TIMEOUT = float(os.getenv("FORWARD_TIMEOUT", "10"))
+
+# Política de confirmação das escritas replicadas: leader | majority | all
+WRITE_ACK = replication.ack_policy_from_env()
+
+# Consenso: bully (eleição Bully + replicação com WRITE_ACK, padrão), raft
+# (log replicado com terms e commit por maioria, ver raft.py) ou leaderless
+# (todo nó aceita escritas, ordem total por Lamport, ver multi_writer.py)
+CONSENSUS_MODE = os.getenv("CONSENSUS_MODE", "bully").strip().lower()
+RAFT_MODE = CONSENSUS_MODE == "raft"
+MULTI_WRITER_MODE = CONSENSUS_MODE == "leaderless"
+# Só o modo Bully tem eleição, heartbeats do líder e catch-up a partir dele
+BULLY_MODE = not (RAFT_MODE or MULTI_WRITER_MODE)
+# Nó Raft deste processo (criado no startup, só com CONSENSUS_MODE=raft)
+raft_node = None
+
+
+# Feed de mudanças (SSE) compartilhado por todos os assinantes
+feed = ChangeFeed()
+
+
+# Event loop do FastAPI, para agendar corrotinas a partir das threads
+main_loop = None
+
+# Servidor gRPC (NodeService) rodando no mesmo event loop
+grpc_server = None
+
+
+@app.on_event("startup")
+async def bind_change_feed():
+    global main_loop, grpc_server, raft_node
+    main_loop = asyncio.get_running_loop()
+    feed.bind(main_loop)
+    if RAFT_MODE:
+        raft_node = raft.RaftNode(
+            my_id, [server for server in servers if server.id != my_id],
+            raft.RaftStorage(os.path.join(wal.DATA_DIR, "raft")), apply_raft_entries, set_leader,
+        )
+        # O relógio continua depois de tudo o que já está no log
+        lamport_clock.update(max((entry.get("lamport", 0) for entry in raft_node.log), default=0))
+        raft_node.start()
+    elif MULTI_WRITER_MODE:
+        multi_writer.start(servers)
+        asyncio.ensure_future(multi_writer_sync_loop())
+    else:
+        asyncio.ensure_future(replication_repair_loop())
+        asyncio.ensure_future(leader_lease_loop())
+        if partition_log is not None:
+            partition_log.start()
+    if grpc_transport.GRPC_ENABLED:
+        servicer = grpc_transport.NodeServicer(
+            Message, receive_batch, elector.on_election, elector.on_coordinator, on_leader_heartbeat, my_id,
+            lambda: elector.term,
+        )
+        grpc_server = await grpc_transport.start_server(servicer)
+        replication_log.info(
+            "gRPC NodeService listening", port=grpc_transport.GRPC_PORT,
+            transport="grpc" if grpc_transport.USE_GRPC else "http",
+        )
+    if BULLY_MODE:
+        asyncio.ensure_future(leader_heartbeat_loop())
+        # Eleito antes do event loop existir (ver schedule_leader_sync)
+        if leader == my_id and not leader_synced:
+            asyncio.ensure_future(leader_sync())
+
+
+@app.on_event("shutdown")
+async def close_peer_connections():
+    """Fecha os pools de conexões persistentes com os outros nós"""
+    for server in servers:
+        await server.aclose()
+    if grpc_server is not None:
+        await grpc_server.stop(1)
+        await grpc_transport.close_all()
+    if write_ahead_log is not None:
+        write_ahead_log.close()
+    if raft_node is not None:
+        raft_node.storage.close()
+    if partition_log is not None:
+        partition_log.close()
 
 
 class Message(BaseModel):
@@ -77,19 +208,164 @@ class Message(BaseModel):
     physical_timestamp: float
 
 
-messages = [
+# Validador de listas de Message (corpo JSON de /message_received/batch)
+message_list = TypeAdapter(List[Message])
+
+# Log de mensagens indexado por ID e ordenado por (Lamport, node_id)
+# (backend em MESSAGE_STORE, ver message_store.py). No backend segmented os
+# segmentos selados só são reaproveitados quando o WAL os recria.
+if message_store.MESSAGE_STORE == "segmented":
+    if MULTI_WRITER_MODE:
+        # Só se sela um prefixo sem lacunas (contiguous_id); no modo leaderless
+        # cada origem tem seus IDs e o log quase nunca fica sem lacunas, então
+        # a cauda cresceria sem limite
+        raise ValueError("MESSAGE_STORE=segmented is not supported with CONSENSUS_MODE=leaderless")
+    messages = SegmentedMessageStore(
+        Message, os.path.join(wal.DATA_DIR, "segments"), reuse=wal.WAL_ENABLED and not RAFT_MODE
+    )
+else:
+    messages = create_store(Message)
+
+# Write-ahead log em disco: recuperar o estado anterior ao reinício. No modo
+# Raft o log durável é o do Raft, e o store é refeito a partir dele.
+write_ahead_log = None
+if wal.WAL_ENABLED and not RAFT_MODE:
+    write_ahead_log = WriteAheadLog(os.path.join(wal.DATA_DIR, "wal"), Message)
+    recovered, recovered_lamport = write_ahead_log.recover()
+    messages.extend(recovered)
+    lamport_clock = create_clock(initial_time=recovered_lamport)
+    wal_log.info(
+        "Recovered messages from WAL", messages=write_ahead_log.recovered,
+        seconds=round(write_ahead_log.recovery_seconds, 3), lamport=recovered_lamport,
+    )
+
+# Modo leaderless: IDs, sequências por origem e watermark de estabilidade
+multi_writer = None
+if MULTI_WRITER_MODE:
+    multi_writer = leaderless.MultiWriter(my_id, [server.id for server in servers], lamport_clock, messages.get)
+    for chunk in messages.chunks():
+        multi_writer.observe(chunk)
+    # Com WAL a sequência própria sobrevive ao reinício (ver multi_writer.py)
+    multi_writer.ready = write_ahead_log is not None
+
+def publish_partition(index: int, batch):
+    """Publica no feed (/events) as mensagens que entram numa partição, com o campo partition"""
+    for message in batch:
+        feed.publish("message", partitions.tagged_json(index, message), change_feed.message_cursor(message))
+    feed.publish("clock", {"time": lamport_clock.get_time()})
+
+
+# Log particionado: N logs com um líder Bully cada (ver partitions.py)
+partition_log = None
+if partitions.PARTITIONS > 1:
+    if BULLY_MODE:
+        partition_log = partitions.PartitionedLog(
+            partitions.PARTITIONS, my_id, servers, Message, lamport_clock,
+            os.path.join(wal.DATA_DIR, "partitions"), WRITE_ACK, on_apply=publish_partition,
+        )
+    else:
+        api_log.warning("PARTITIONS ignored outside the bully consensus mode", consensus=CONSENSUS_MODE)
+
+
+def persist(new_messages):
+    """
+    Enfileira no WAL mensagens que acabaram de entrar no store
+
+    Chamado sempre DEPOIS de guardar no store (ver WriteAheadLog.start_snapshot).
+    Dispara um snapshot quando há registros suficientes desde o último. A
+    gravação e o fsync rodam na thread do WAL; quem confirma a escrita a
+    alguém espera wal_durable() antes.
+    """
+    if write_ahead_log is None or not new_messages:
+        return
+    write_ahead_log.append(new_messages)
+    if write_ahead_log.snapshot_due():
+        write_ahead_log.start_snapshot(messages)
+
+
+async def wal_durable():
+    """Espera o WAL gravar (conforme WAL_FSYNC) tudo o que já foi enfileirado"""
+    if write_ahead_log is not None:
+        await asyncio.wrap_future(write_ahead_log.durable())
+
+
+if len(messages) == 0:
     # Mensagem inicial com timestamp Lamport = 0
-    Message(
+    hello = Message(
         id=1,
         content="Hello",
         lamport_timestamp=0,
         node_id=my_id if my_id else 0,
         physical_timestamp=time.time()
-    ),
-]
+    )
+    messages.add(hello)
+    persist([hello])
+
+# Mensagens por bloco nos dumps em streaming e por página no modo since
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "500"))
+SINCE_PAGE_SIZE = int(os.getenv("SINCE_PAGE_SIZE", "1000"))
+# Intervalo entre comentários keep-alive no stream SSE (/events)
+FEED_KEEPALIVE_SECONDS = float(os.getenv("FEED_KEEPALIVE_SECONDS", "15"))
 
 leader = None 
-last_id = 1
+
+# Intervalo entre heartbeats enviados pelo líder
+HEARTBEAT_INTERVAL_SECONDS = float(os.getenv("HEARTBEAT_INTERVAL_SECONDS", "0.2"))
+# Detector de falhas do líder atual (recriado a cada troca de líder) e nós
+# que este nó considera fora do ar, pulados ao enviar ELECTION
+leader_detector = PhiAccrualDetector(HEARTBEAT_INTERVAL_SECONDS)
+suspected_nodes = set()
+
+# Lease do líder para leituras leader-lease (ver read_consistency.py)
+lease = LeaderLease()
+
+# Novo líder: só aceita escritas depois de buscar nos outros nós os IDs que
+# eles têm além do seu último (ver leader_sync). A época muda a cada troca
+# de líder, para um sync atrasado não liberar uma liderança mais nova.
+LEADER_SYNC_TIMEOUT = float(os.getenv("LEADER_SYNC_TIMEOUT", "2"))
+leader_synced = False
+_leader_epoch = 0
+
+
+def applied_progress():
+    """(contiguous_id, timestamp Lamport da mensagem contiguous_id)
+
+    O líder atribui IDs e timestamps Lamport crescentes juntos, então o
+    prefixo sem lacunas cobre todas as mensagens até esse timestamp.
+    """
+    last = messages.get(messages.contiguous_id) if messages.contiguous_id else None
+    return messages.contiguous_id, last.lamport_timestamp if last is not None else 0
+
+
+# Leituras at-least esperando o nó aplicar um ID / timestamp Lamport
+applied = AppliedWatermark(applied_progress)
+
+
+def set_leader(new_leader):
+    """
+    Atualiza o líder conhecido e avisa os assinantes do feed se ele mudou
+
+    Args:
+        new_leader: ID do novo líder (ou None)
+    """
+    global leader, leader_detector, leader_synced, _leader_epoch
+    if new_leader != leader:
+        leader_detector = PhiAccrualDetector(HEARTBEAT_INTERVAL_SECONDS)
+        if new_leader == my_id:
+            lease.became_leader()
+        elif leader == my_id:
+            lease.lost_leadership()
+        leader = new_leader
+        leader_synced = False
+        _leader_epoch += 1
+        feed.publish("leader", {"leader": leader})
+        # Novo líder: buscar dele o que este nó possa ter perdido
+        if leader is not None and leader != my_id:
+            schedule_catch_up()
+        elif leader == my_id:
+            schedule_leader_sync()
+
+
 def leader_server():
     """
     Obtém o objeto Server do líder atual
@@ -99,93 +375,486 @@ def leader_server():
     """
     global leader
     if leader is None:
-        print(f"[Node {my_id}] leader_server(): leader is None")
         return None
 
     # Se EU sou o líder, não preciso buscar na lista
     if leader == my_id:
-        print(f"[Node {my_id}] leader_server(): I am the leader")
         return None
 
-    for server in servers:
-        if server.id == leader:
-            print(f"[Node {my_id}] leader_server(): Found leader {leader} at {server.url()}")
-            return server
+    server = servers_by_id.get(leader)
+    if server is None:
+        election_log.warning(
+            "Leader not found in servers list", leader=leader, servers=[(s.id, s.host) for s in servers]
+        )
+    return server
+
+
+def leader_hint_headers() -> dict:
+    """Cabeçalhos X-Leader-Id / X-Leader-Url para o cliente guardar o líder"""
+    if leader is None:
+        return {}
+    headers = {"X-Leader-Id": str(leader)}
+    server = servers_by_id.get(leader)
+    if server is not None:
+        headers["X-Leader-Url"] = server.url()
+    return headers
+async def check_read_consistency(consistency: str, min_id: Optional[int], min_lamport: Optional[int],
+                                 wait_ms: Optional[float]):
+    """
+    Garante o nível de consistência pedido antes de uma leitura local
+
+    Args:
+        consistency: local | leader-lease | at-least
+        min_id: (at-least) ID que este nó precisa ter aplicado sem lacunas
+        min_lamport: (at-least) timestamp Lamport que precisa ter sido aplicado
+        wait_ms: (at-least) espera máxima; padrão READ_WAIT_MS
+
+    Returns:
+        JSONResponse: Erro se a leitura não pode ser servida, ou None se pode
+    """
+    if consistency == read_consistency.CONSISTENCY_LOCAL:
+        return None
+    if consistency == read_consistency.CONSISTENCY_LEADER_LEASE:
+        if leader != my_id:
+            return JSONResponse(
+                status_code=421, content={"error": "Not the leader", "leader": leader}, headers=leader_hint_headers()
+            )
+        if not (raft_node.lease_remaining() > 0 if RAFT_MODE else lease.valid()):
+            api_log.warning("Lease read without a valid lease", sample=True)
+            return JSONResponse(
+                status_code=503,
+                content={"error": "Leader lease not held", "leader": leader},
+                headers={"Retry-After": "1"},
+            )
+        return None
+    if consistency == read_consistency.CONSISTENCY_AT_LEAST:
+        if min_id is None and min_lamport is None:
+            return JSONResponse(status_code=400, content={"error": "at-least requires min_id or min_lamport"})
+        timeout = (wait_ms if wait_ms is not None else read_consistency.READ_WAIT_MS) / 1000
+        if not applied.reached(min_id, min_lamport):
+            # O que falta pode estar numa lacuna que a replicação normal não cobre
+            schedule_catch_up()
+        if not await applied.wait_for(min_id, min_lamport, timeout):
+            contiguous_id, applied_lamport = applied_progress()
+            return JSONResponse(
+                status_code=504,
+                content={
+                    "error": "Watermark not reached",
+                    "contiguous_id": contiguous_id,
+                    "applied_lamport": applied_lamport,
+                },
+            )
+        return None
+    return JSONResponse(status_code=400, content={"error": f"Unknown consistency: {consistency}"})
+
+
+def partitioned_read_error(reason: str) -> JSONResponse:
+    """Leitura do log global que não tem equivalente com PARTITIONS > 1"""
+    return JSONResponse(
+        status_code=400,
+        content={"error": f"{reason} with PARTITIONS > 1; use /partitions/messages or /partitions/<i>/log"},
+    )
+
 
-    print(f"[Node {my_id}] leader_server(): Leader {leader} not found in servers list!")
-    print(f"[Node {my_id}] Available servers: {[(s.id, s.host) for s in servers]}")
-    return None
 @app.get("/")
-async def get(id : int ):
-    return next((msg for msg in messages if msg.id == id), None)
+async def get(
+    id: int,
+    partition: Optional[int] = None,
+    consistency: str = read_consistency.CONSISTENCY_LOCAL,
+    min_id: Optional[int] = None,
+    min_lamport: Optional[int] = None,
+    wait_ms: Optional[float] = None,
+):
+    """
+    Retorna a mensagem com o ID informado
+
+    Args:
+        id: ID da mensagem
+        partition: Partição da mensagem (obrigatória com PARTITIONS > 1,
+                   em que o ID é o da partição)
+        consistency: local (padrão), leader-lease ou at-least
+        min_id: (at-least) ID que o nó precisa ter aplicado; padrão o próprio id
+        min_lamport: (at-least) timestamp Lamport que o nó precisa ter aplicado
+        wait_ms: (at-least) espera máxima em ms
+    """
+    if partition_log is not None:
+        if partition is None:
+            return partitioned_read_error("IDs are per partition: pass partition")
+        if consistency != read_consistency.CONSISTENCY_LOCAL:
+            return partitioned_read_error(f"consistency={consistency} is not supported")
+        if not 0 <= partition < len(partition_log):
+            return unknown_partition(partition)
+        message = partition_log.get(partition, id)
+        return None if message is None else {"partition": partition, **message.model_dump()}
+    if consistency == read_consistency.CONSISTENCY_AT_LEAST and min_id is None and min_lamport is None:
+        min_id = id
+    error = await check_read_consistency(consistency, min_id, min_lamport, wait_ms)
+    if error is not None:
+        return error
+    return messages.get(id)
+
+async def read_message_body(request: Request, field: str = "message") -> Optional[str]:
+    """
+    Campo do corpo: JSON {"message": ..., "key": ...} ou, para "message", texto puro
+    """
+    body = await request.body()
+    if not body:
+        return None
+    if request.headers.get("content-type", "").startswith("application/json"):
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return None
+        return payload.get(field) if isinstance(payload, dict) else None
+    if field != "message":
+        return None
+    return body.decode("utf-8", errors="replace")
+
 
 @app.post("/")
-async def post(message: str):
+async def post(request: Request, message: Optional[str] = None, key: Optional[str] = None):
     """
     Endpoint para criar uma nova mensagem
 
     Fluxo:
-    1. Se não sou líder → reencaminhar ao líder
-    2. Se sou líder → criar mensagem e replicar aos followers
+    1. Se não sou líder → reencaminhar ao líder, ou responder 307 com o
+       líder (FORWARD_WRITES=0 ou cabeçalho X-No-Forward: 1)
+    2. Se sou líder → criar mensagem e replicar aos followers, agrupada
+       com outras escritas concorrentes (group commit)
+
+    No modo leaderless todo nó faz o passo 2 (ver commit_multi_writer). Com
+    PARTITIONS > 1 os passos valem para o líder da partição (ver post_partitioned).
 
     Args:
-        message: Conteúdo da mensagem
+        message: Conteúdo da mensagem (na query; ou no corpo, como JSON
+                 {"message": ...} ou text/plain)
+        key: Chave de particionamento (na query ou no corpo JSON; só com
+             PARTITIONS > 1)
 
     Returns:
         int: ID da mensagem criada (somente líder)
-        dict: Resposta do líder (se forwarded)
+        dict: Com partições, {"partition", "id"} (ID dentro da partição)
+        dict: Resposta do líder (se forwarded), com X-Leader-Id/X-Leader-Url
         dict: Erro se não há líder disponível
     """
-    print(f"[Node {my_id}] Received POST request, message='{message}', leader={leader}")
+    api_log.debug("Received POST", leader=leader, sample=True)
+    if message is None:
+        message = await read_message_body(request)
+        if message is None:
+            return JSONResponse(status_code=422, content={"error": "Missing message"})
+
+    if partition_log is not None:
+        if key is None:
+            key = await read_message_body(request, "key")
+        return await post_partitioned(message, key)
 
     # PASSO 1: Verificar se sou o líder
-    if leader != my_id:
-        print(f"[Node {my_id}] I'm not the leader ({leader}), forwarding...")
+    if not MULTI_WRITER_MODE and leader != my_id:
         leader_srv = leader_server()
 
         if leader_srv is None:
-            print(f"[Node {my_id}] ERROR: No leader available!")
-            return {"error": "No leader available"}
-
-        # Forward ao líder
-        url = f"{leader_srv.url()}/?message={message}"
+            api_log.warning("No leader available for write", sample=True)
+            return JSONResponse(status_code=503, content={"error": "No leader available"}, headers={"Retry-After": "1"})
+
+        # O cliente (ou a configuração) prefere falar direto com o líder
+        if not FORWARD_WRITES or request.headers.get("x-no-forward") == "1":
+            location = leader_srv.url() + "/"
+            if request.url.query:
+                location += "?" + request.url.query
+            return JSONResponse(
+                status_code=307,
+                content={"error": "Not the leader", "leader": leader},
+                headers={"Location": location, **leader_hint_headers()},
+            )
+
+        # Forward ao líder (conexão persistente, conteúdo no corpo e não na URL)
         try:
-            response = requests.post(url, timeout=10)
-            print(f"[Node {my_id}] Forwarded to leader, response: {response.status_code}")
-            return response.json()
+            with forward_seconds.time():
+                response = await leader_srv.apost("/", json={"message": message}, timeout=FORWARD_TIMEOUT)
+            api_log.debug("Forwarded write to leader", leader=leader, status=response.status_code, sample=True)
+            headers = leader_hint_headers()
+            if "retry-after" in response.headers:
+                headers["Retry-After"] = response.headers["retry-after"]
+            return JSONResponse(status_code=response.status_code, content=response.json(), headers=headers)
         except Exception as e:
-            print(f"[Node {my_id}] ERROR: Leader not reachable: {e}")
-            return {"error": "Leader not reachable"}
+            api_log.warning("Leader not reachable", leader=leader, error=repr(e), sample=True)
+            return JSONResponse(status_code=502, content={"error": "Leader not reachable"}, headers=leader_hint_headers())
 
-    # PASSO 2: Sou o líder, criar mensagem
-    global messages
+    # PASSO 2: Sou o líder, entregar a escrita ao group commit
+    return await group_committer.submit(message)
 
-    # IMPORTANTE: Incrementar relógio Lamport ANTES de criar a mensagem
-    lamport_time = lamport_clock.increment()
 
-    id = max(msg.id for msg in messages) + 1
-    new_msg = Message(
-        id=id,
-        content=message,
-        lamport_timestamp=lamport_time,
-        node_id=my_id,
-        physical_timestamp=time.time()
+async def post_partitioned(message: str, key: Optional[str]):
+    """
+    Escrita no log particionado
+
+    A partição vem da chave; sem chave, é uma partição que este nó lidera
+    (sem reencaminhamento). Se o líder da partição é outro nó, a escrita é
+    reencaminhada a ele com a mesma chave; um nó que não lidera nenhuma
+    partição reencaminha a escrita sem chave ao líder da partição da
+    própria mensagem, que a grava numa partição local.
+
+    Returns:
+        dict: {"partition", "id"}, ou JSONResponse 503/502 como em post
+    """
+    index = partition_log.choose(key)
+    partition = partition_log.partitions[index]
+    if key is None and partition.leader != my_id:
+        index = partitions.partition_for(message, len(partition_log))
+        partition = partition_log.partitions[index]
+
+    if partition.leader == my_id:
+        try:
+            id = await partition.committer.submit(message)
+        except partitions.PartitionUnavailable as e:
+            api_log.warning("Partition write failed", partition=index, reason=e.reason, sample=True)
+            return JSONResponse(
+                status_code=503, content={"error": e.reason, "partition": index}, headers={"Retry-After": "1"}
+            )
+        return {"partition": index, "id": id}
+
+    leader_srv = servers_by_id.get(partition.leader)
+    if leader_srv is None:
+        api_log.warning("No leader available for partition", partition=index, sample=True)
+        return JSONResponse(
+            status_code=503, content={"error": "No partition leader available", "partition": index},
+            headers={"Retry-After": "1"},
+        )
+    body = {"message": message}
+    if key is not None:
+        body["key"] = key
+    try:
+        with forward_seconds.time():
+            response = await leader_srv.apost("/", json=body, timeout=FORWARD_TIMEOUT)
+        headers = {"X-Leader-Id": str(leader_srv.id), "X-Leader-Url": leader_srv.url()}
+        if "retry-after" in response.headers:
+            headers["Retry-After"] = response.headers["retry-after"]
+        return JSONResponse(status_code=response.status_code, content=response.json(), headers=headers)
+    except Exception as e:
+        api_log.warning("Partition leader not reachable", partition=index, leader=leader_srv.id,
+                        error=repr(e), sample=True)
+        return JSONResponse(status_code=502, content={"error": "Partition leader not reachable", "partition": index})
+
+
+async def commit_batch(contents):
+    """
+    Cria e replica um lote de mensagens (função de commit do GroupCommitter)
+
+    Cada mensagem do lote recebe ID e timestamp Lamport consecutivos, e o lote
+    inteiro é replicado aos followers numa única requisição.
+
+    Args:
+        contents: Lista com o conteúdo de cada mensagem do lote
+
+    Returns:
+        list: ID de cada mensagem criada, ou JSONResponse 503 se a política
+              de confirmação não foi atingida ou se a fila de replicação de
+              algum follower está cheia (REPLICATION_BACKPRESSURE=reject)
+    """
+    if RAFT_MODE:
+        return await commit_raft(contents)
+    if MULTI_WRITER_MODE:
+        return await commit_multi_writer(contents)
+
+    followers = [server for server in servers if server.id and server.id != my_id]
+    retry_after = replication.retry_after(followers)
+    if retry_after is not None:
+        replication_log.warning("Replication queue full, rejecting writes", writes=len(contents), sample=True)
+        return [
+            JSONResponse(
+                status_code=503,
+                content={"error": "Replication queue full"},
+                headers={"Retry-After": str(retry_after)},
+            )
+            for _ in contents
+        ]
+
+    # Novo líder: antes de gerar IDs, ter o maior ID dos outros nós
+    if not leader_synced:
+        return [
+            JSONResponse(
+                status_code=503,
+                content={"error": "Leader syncing with peers"},
+                headers={"Retry-After": "1"},
+            )
+            for _ in contents
+        ]
+
+    # Novo líder: esperar o lease de um líder anterior expirar
+    while lease.writes_fenced():
+        await asyncio.sleep(0.01)
+
+    # IMPORTANTE: Avançar o relógio ANTES de criar as mensagens; o lote
+    # reserva seus timestamps numa só passagem pelo lock
+    first_lamport = lamport_clock.reserve(len(contents))
+    now = time.time()
+    batch = []
+    for offset, content in enumerate(contents):
+        new_msg = Message(
+            id=messages.next_id(),
+            content=content,
+            lamport_timestamp=first_lamport + offset,
+            node_id=my_id,
+            physical_timestamp=now
+        )
+        batch.append(new_msg)
+    messages.extend(batch)
+    persist(batch)
+    applied.notify()
+    feed.publish_messages(batch)
+    feed.publish("clock", {"time": lamport_clock.get_time()})
+
+    ids = [msg.id for msg in batch]
+    replication_log.debug(
+        "Created batch", ids=f"{ids[0]}..{ids[-1]}",
+        lamport=f"{batch[0].lamport_timestamp}..{batch[-1].lamport_timestamp}", sample=True,
     )
-    messages.append(new_msg)
 
-    print(f"[Node {my_id}] Created message {id} with Lamport timestamp {lamport_time}, replicating to followers...")
+    # PASSO 3: Colocar o lote na fila de replicação de cada follower
+    acked = await replication.replicate(
+        followers, "/message_received/batch", wire.EncodedBatch(batch, prev_id=ids[0] - 1), WRITE_ACK,
+        on_ack=record_ack,
+    )
+    if not acked:
+        replication_log.warning("Batch did not reach acknowledgement", ids=f"{ids[0]}..{ids[-1]}", write_ack=WRITE_ACK)
+        return [
+            JSONResponse(
+                status_code=503,
+                content={"error": "Replication quorum not reached", "id": id, "write_ack": WRITE_ACK},
+            )
+            for id in ids
+        ]
+
+    # O fsync local corre junto com a replicação; a resposta espera os dois
+    await wal_durable()
+    return ids
+
+
+async def commit_raft(contents):
+    """
+    Grava um lote no log Raft e espera o commit por maioria (modo Raft)
 
-    # PASSO 3: Replicar a todos os followers
-    for server in servers:
-        if server.id and server.id != my_id:
-            url = f"{server.url()}/message_received"
-            try:
-                result = requests.post(url, json=new_msg.dict(), timeout=2)
-                print(f"[Node {my_id}] ✓ Replicated message {id} to node {server.id}")
-            except Exception as e:
-                print(f"[Node {my_id}] ✗ Failed to replicate to node {server.id}: {e}")
+    O timestamp Lamport é atribuído aqui; o ID, quando a entrada confirmada
+    é aplicada (apply_raft_entries). Tudo antes do primeiro await, então
+    lotes em commit ao mesmo tempo entram no log na ordem de chegada.
+
+    Returns:
+        list: ID de cada mensagem, ou JSONResponse 503 se este nó não é
+              mais o líder (a escrita pode ou não ter sido confirmada)
+    """
+    now = time.time()
+    first_lamport = lamport_clock.reserve(len(contents))
+    entries = [
+        {"content": content, "lamport": first_lamport + offset, "node_id": my_id, "ts": now}
+        for offset, content in enumerate(contents)
+    ]
+    try:
+        return await raft_node.propose(entries)
+    except raft.NotLeaderError as e:
+        replication_log.warning("Lost leadership before commit", writes=len(contents), leader=e.leader_id)
+        return [
+            JSONResponse(
+                status_code=503,
+                content={"error": "Not the leader, write outcome unknown", "leader": e.leader_id},
+                headers={"Retry-After": "1", **leader_hint_headers()},
+            )
+            for _ in contents
+        ]
+
+
+async def commit_multi_writer(contents):
+    """
+    Grava um lote localmente e o dissemina em background (modo leaderless)
+
+    IDs da sequência deste nó e timestamps reservados de uma vez; a resposta
+    não espera os outros nós (WRITE_ACK não se aplica).
+
+    Returns:
+        list: ID de cada mensagem, ou JSONResponse 503 enquanto o nó ainda
+              não sincronizou com um vizinho (sem WAL, depois de subir)
+    """
+    if not multi_writer.ready:
+        return [
+            JSONResponse(
+                status_code=503, content={"error": "Syncing with peers"}, headers={"Retry-After": "1"}
+            )
+            for _ in contents
+        ]
+    first_lamport = lamport_clock.reserve(len(contents))
+    now = time.time()
+    batch = [
+        Message(id=id, content=content, lamport_timestamp=first_lamport + offset, node_id=my_id, physical_timestamp=now)
+        for offset, (id, content) in enumerate(zip(multi_writer.allocate(len(contents)), contents))
+    ]
+    messages.extend(batch)
+    multi_writer.observe(batch)
+    persist(batch)
+    applied.notify()
+    feed.publish_messages(batch)
+    feed.publish("clock", {"time": lamport_clock.get_time()})
+    await multi_writer.replicate(batch)
+    await wal_durable()
+    return [msg.id for msg in batch]
+
+
+def apply_raft_entries(entries) -> list:
+    """
+    Aplica entradas confirmadas do log Raft: store, watermark e feed
+
+    Cada entrada vira uma Message com o próximo ID; como todos os nós
+    aplicam o mesmo log na mesma ordem, os IDs coincidem.
+
+    Returns:
+        list: ID de cada entrada (None para a entrada vazia de um novo líder)
+    """
+    batch = []
+    ids = []
+    for entry in entries:
+        if entry.get("noop"):
+            ids.append(None)
+            continue
+        message = Message(
+            id=messages.next_id(),
+            content=entry["content"],
+            lamport_timestamp=entry["lamport"],
+            node_id=entry["node_id"],
+            physical_timestamp=entry["ts"],
+        )
+        batch.append(message)
+        ids.append(message.id)
+    if batch:
+        messages.extend(batch)
+        applied.notify()
+        feed.publish_messages(batch)
+        feed.publish("clock", {"time": lamport_clock.get_time()})
+    return ids
+
+
+group_committer = GroupCommitter(commit_batch, max_in_flight=raft.RAFT_MAX_INFLIGHT if RAFT_MODE else 1)
+
+def apply_replicated(batch) -> int:
+    """
+    Aplica mensagens vindas de outro nó: relógio, store, WAL e feed
+
+    Args:
+        batch: Lista de Message (não vazia)
+
+    Returns:
+        int: Timestamp Lamport local depois da atualização
+    """
+    # Atualizar relógio Lamport com o maior timestamp recebido
+    local_lamport = lamport_clock.update(max(msg.lamport_timestamp for msg in batch))
+
+    # Guardar mensagens (o store mantém a ordem por Lamport e o índice por ID)
+    added = messages.extend(batch)
+    if multi_writer is not None:
+        multi_writer.observe(added)
+    persist(added)
+    applied.notify()
+    feed.publish_messages(added)
+    feed.publish("clock", {"time": local_lamport})
+    return local_lamport
 
-    return id  
 
 @app.post("/message_received")
 async def message_received(message: Message):
@@ -194,34 +863,890 @@ async def message_received(message: Message):
 
     Fluxo:
     1. Atualizar relógio Lamport com max(local, remote) + 1
-    2. Guardar mensagem
-    3. Ordenar mensagens por timestamp Lamport
+    2. Guardar mensagem na sua posição ordenada por timestamp Lamport
 
     Args:
         message: Mensagem replicada com todos os campos Lamport
 
     Returns:
-        dict: Status e timestamp Lamport local atualizado
+        dict: Status, timestamp Lamport local atualizado e cursor de replicação
+    """
+    local_lamport = apply_replicated([message])
+    await wal_durable()
+
+    replication_log.debug("Received message from leader", id=message.id, sample=True)
+    clock_log.debug("Clock updated", remote=message.lamport_timestamp, local=local_lamport, sample=True)
+
+    return {
+        "status": "ok",
+        "local_lamport": local_lamport,
+        "contiguous_id": messages.contiguous_id,
+    }
+
+
+@app.post("/message_received/batch")
+async def message_received_batch(request: Request, prev_id: Optional[int] = None):
     """
-    global messages, last_id
+    Endpoint para receber um lote de mensagens replicadas do líder
 
-    # PASSO 1: Atualizar relógio Lamport
-    local_lamport = lamport_clock.update(message.lamport_timestamp)
+    Equivalente a message_received para cada mensagem, mas com uma única
+    atualização do relógio por lote. O corpo é uma lista JSON de Message ou,
+    com Content-Type application/x-protobuf, um LogBatch binário (ver wire.py).
 
-    print(f"[Node {my_id}] Received message {message.id} from leader, "
-          f"Lamport: remote={message.lamport_timestamp}, local={local_lamport}")
+    Se prev_id é informado, o lote contém TODAS as mensagens do líder com
+    prev_id < id <= último ID do lote. Se este nó já tem tudo até prev_id,
+    o cursor de replicação avança até o fim do lote; senão há uma lacuna e
+    um catch-up é disparado. No modo leaderless o lote vem da origem das
+    mensagens, e a confirmação leva a seq dela que este nó tem sem lacunas.
 
-    # PASSO 2: Guardar mensagem
-    messages.append(message)
-    last_id = max(msg.id for msg in messages)
+    Args:
+        request: Requisição com o lote de mensagens, em ordem de ID no líder
+        prev_id: ID da mensagem do líder imediatamente anterior ao lote
 
-    # PASSO 3: Ordenar mensagens por Lamport (desempate por node_id)
-    messages.sort(key=lambda m: (m.lamport_timestamp, m.node_id))
+    Returns:
+        dict: Status, quantidade recebida, timestamp Lamport local e cursor
+              de replicação (contiguous_id)
+    """
+    decoded = await decode_batch_body(request, prev_id)
+    if isinstance(decoded, JSONResponse):
+        return decoded
+    ack = await receive_batch(*decoded)
+    if ack.get("conflict_id"):
+        return JSONResponse(status_code=409, content=ack)
+    return ack
+
+
+async def decode_batch_body(request: Request, prev_id: Optional[int] = None):
+    """
+    Lote replicado no corpo: lista JSON de Message ou LogBatch protobuf
+
+    Returns:
+        tuple: (lista de Message, prev_id), ou JSONResponse 415/422
+    """
+    body = await request.body()
+    if request.headers.get("content-type", "").startswith(wire.PROTOBUF_MEDIA_TYPE):
+        if not wire.BINARY_AVAILABLE:
+            return JSONResponse(status_code=415, content={"error": "protobuf not supported"})
+        batch, body_prev_id = wire.decode_batch(body, Message)
+        if prev_id is None:
+            prev_id = body_prev_id
+        return batch, prev_id
+    try:
+        return message_list.validate_json(body), prev_id
+    except ValidationError as e:
+        return JSONResponse(status_code=422, content={"detail": json.loads(e.json())})
+
+
+async def receive_batch(batch, prev_id: Optional[int] = None) -> dict:
+    """
+    Aplica um lote replicado pelo líder e monta a confirmação
+
+    Compartilhado por POST /message_received/batch e pelo stream gRPC
+    Replicate.
+
+    Args:
+        batch: Lista de Message, em ordem de ID no líder
+        prev_id: ID da mensagem do líder imediatamente anterior ao lote
+
+    Um lote com algum ID que este nó já tem com outro conteúdo (mensagens
+    de um líder superado) é recusado inteiro, com conflict_id; o líder então
+    manda este nó descartar o sufixo divergente (POST /resync).
+
+    Returns:
+        dict: Status, quantidade recebida, timestamp Lamport local e cursor
+              de replicação (contiguous_id); no modo leaderless, também
+              origin_received; num conflito, conflict_id
+    """
+    conflict = message_store.find_conflict(messages, batch)
+    if conflict is not None:
+        replication_log.warning(
+            "Replicated batch conflicts with stored message, rejecting", id=conflict.id,
+            stored_node=conflict.node_id, stored_lamport=conflict.lamport_timestamp, sample=True,
+        )
+        return {
+            "status": "conflict",
+            "received": 0,
+            "local_lamport": lamport_clock.get_time(),
+            "contiguous_id": messages.contiguous_id,
+            "conflict_id": conflict.id,
+        }
+
+    if not batch:
+        return {
+            "status": "ok",
+            "received": 0,
+            "local_lamport": lamport_clock.get_time(),
+            "contiguous_id": messages.contiguous_id,
+        }
+
+    local_lamport = apply_replicated(batch)
+    # A confirmação só sai com o lote no WAL (a gravação roda na thread dele)
+    await wal_durable()
+
+    replication_log.debug(
+        "Received batch from leader", size=len(batch), ids=f"{batch[0].id}..{batch[-1].id}", sample=True
+    )
+    clock_log.debug("Clock updated", remote=batch[-1].lamport_timestamp, local=local_lamport, sample=True)
+
+    if multi_writer is not None:
+        origin = multi_writer.origin_of(batch[0].id)
+        return {
+            "status": "ok",
+            "received": len(batch),
+            "local_lamport": local_lamport,
+            "contiguous_id": messages.contiguous_id,
+            "origin_received": multi_writer.received_through(origin[0]) if origin else -1,
+        }
+
+    if prev_id is not None:
+        if messages.contiguous_id >= prev_id:
+            messages.mark_contiguous(batch[-1].id)
+            applied.notify()
+        else:
+            replication_log.info(
+                "Gap detected, catching up", contiguous_id=messages.contiguous_id, prev_id=prev_id, sample=True
+            )
+            schedule_catch_up()
 
     return {
         "status": "ok",
-        "local_lamport": local_lamport
+        "received": len(batch),
+        "local_lamport": local_lamport,
+        "contiguous_id": messages.contiguous_id,
     }
+
+
+# ============================================================================
+# Catch-up: recuperação de followers atrasados ou reiniciados
+# ============================================================================
+
+# Cursor de replicação por follower (no líder): maior ID que o follower
+# confirmou ter sem lacunas
+replication_cursors = {}
+# Último cursor visto pelo loop de reparo, para detectar followers parados
+_repair_seen = {}
+
+CATCHUP_CHUNK = int(os.getenv("CATCHUP_CHUNK", "5000"))
+CATCHUP_SNAPSHOT_THRESHOLD = int(os.getenv("CATCHUP_SNAPSHOT_THRESHOLD", "100000"))
+REPAIR_INTERVAL_SECONDS = float(os.getenv("REPAIR_INTERVAL_SECONDS", "1"))
+
+_catch_up_running = False
+
+
+def record_ack(server, body):
+    """Atualiza o cursor de replicação do follower a partir da sua resposta"""
+    if isinstance(body, dict) and body.get("conflict_id"):
+        if leader == my_id and server.id not in _resyncing:
+            _resyncing.add(server.id)
+            asyncio.ensure_future(resync_follower(server, body["conflict_id"]))
+        return
+    contiguous = body.get("contiguous_id") if isinstance(body, dict) else None
+    if contiguous is not None:
+        replication_cursors[server.id] = max(replication_cursors.get(server.id, 0), contiguous)
+
+
+# Followers com um POST /resync em andamento
+_resyncing = set()
+
+
+async def resync_follower(server, conflict_id: int):
+    """
+    Manda um follower descartar o sufixo divergente a partir de conflict_id
+
+    O follower corta o log depois de conflict_id - 1 e busca o resto neste
+    líder (catch-up); o reparo reenvia a partir do cursor dele.
+    """
+    after_id = conflict_id - 1
+    try:
+        response = await server.apost(
+            "/resync", params={"leader_id": my_id, "term": elector.term, "after_id": after_id}
+        )
+        body = response.json()
+        if response.status_code == 200:
+            replication_cursors[server.id] = min(replication_cursors.get(server.id, 0), body["contiguous_id"])
+            replication_log.warning(
+                "Follower truncated divergent suffix", follower=server.id, after_id=after_id, removed=body["removed"]
+            )
+        else:
+            replication_log.warning("Follower refused resync", follower=server.id, status=response.status_code, body=body)
+    except Exception as e:
+        replication_log.warning("Resync failed", follower=server.id, error=repr(e))
+    finally:
+        _resyncing.discard(server.id)
+
+
+def truncate_log(after_id: int) -> list:
+    """
+    Descarta as mensagens com id > after_id (store e WAL)
+
+    Returns:
+        list: IDs removidos
+
+    Raises:
+        ValueError: Se o corte cai no histórico selado (backend segmented)
+    """
+    removed = messages.truncate_after(after_id)
+    if removed and write_ahead_log is not None:
+        write_ahead_log.truncate(after_id)
+    return removed
+
+
+@app.post("/resync")
+async def resync(leader_id: int, after_id: int, term: int = 0):
+    """
+    Pedido do líder para descartar um sufixo divergente do log
+
+    Só o líder reconhecido por este nó, num term não superado, pode pedir.
+    Depois do corte, o que falta vem do líder por catch-up.
+
+    Args:
+        leader_id: ID do líder que pede
+        after_id: Último ID mantido
+        term: Term do líder
+    """
+    if not BULLY_MODE or leader_id != leader or (term and term < elector.term):
+        return JSONResponse(status_code=409, content={"error": "Not the current leader", "leader": leader})
+    try:
+        removed = truncate_log(after_id)
+    except ValueError as e:
+        replication_log.error("Cannot truncate divergent suffix", after_id=after_id, error=str(e))
+        return JSONResponse(status_code=409, content={"error": str(e)})
+    await wal_durable()
+    replication_log.warning(
+        "Truncated divergent suffix", leader=leader_id, after_id=after_id, removed=len(removed),
+        ids=f"{removed[0]}..{removed[-1]}" if removed else None,
+    )
+    schedule_catch_up()
+    return {"status": "ok", "removed": len(removed), "contiguous_id": messages.contiguous_id}
+
+
+def schedule_catch_up():
+    """Agenda um catch-up no event loop (pode ser chamado de threads)"""
+    # No modo Raft o follower só recebe entradas pelo AppendEntries do líder;
+    # no leaderless cada origem repara os vizinhos (ver multi_writer.py)
+    if main_loop is not None and BULLY_MODE:
+        main_loop.call_soon_threadsafe(lambda: asyncio.ensure_future(catch_up()))
+
+
+def schedule_leader_sync():
+    """Agenda o leader_sync no event loop (chamado pela thread de eleição)"""
+    if main_loop is not None and BULLY_MODE:
+        main_loop.call_soon_threadsafe(lambda: asyncio.ensure_future(leader_sync()))
+
+
+async def leader_sync():
+    """
+    Novo líder: adotar o maior ID que os outros nós têm antes de aceitar escritas
+
+    Um nó que volta (do WAL, ou sem ele) pode ser eleito sem ter as últimas
+    mensagens confirmadas pelo líder anterior; gerando IDs a partir do seu
+    último, ele repetiria IDs que os outros nós já têm com outro conteúdo.
+    Por isso ele pergunta o último ID de cada nó (GET /log?limit=0), busca
+    as mensagens que faltam nos que estão à frente e avança o seu contador
+    até o maior deles. Nós que não respondem ficam de fora (estão fora do
+    ar); se eles voltarem com IDs conflitantes, o lote replicado é recusado
+    (ver receive_batch).
+    """
+    global leader_synced
+    epoch = _leader_epoch
+    peers = [server for server in servers if server.id and server.id != my_id]
+
+    async def peer_last_id(server):
+        try:
+            response = await server.aget(
+                "/log", params={"after_id": 0, "limit": 0}, timeout=LEADER_SYNC_TIMEOUT
+            )
+            return server, int(response.headers.get("x-last-id", "0"))
+        except Exception as e:
+            election_log.warning("Peer did not answer leader sync", peer=server.id, error=repr(e))
+            return server, None
+
+    results = await asyncio.gather(*(peer_last_id(server) for server in peers))
+    ahead = sorted(
+        ((server, last_id) for server, last_id in results if last_id is not None and last_id > messages.last_id),
+        key=lambda item: item[1], reverse=True,
+    )
+    for server, last_id in ahead:
+        if last_id <= messages.last_id:
+            continue
+        received = 0
+        try:
+            async for chunk in pull_log(server, messages.contiguous_id):
+                apply_replicated(chunk)
+                received += len(chunk)
+        except Exception as e:
+            election_log.warning("Leader sync pull failed", peer=server.id, error=repr(e))
+        messages.advance_last_id(last_id)
+        election_log.info("Leader synced from peer", peer=server.id, peer_last_id=last_id, messages=received)
+
+    if epoch == _leader_epoch and leader == my_id:
+        leader_synced = True
+        election_log.info("Leader ready for writes", last_id=messages.last_id, term=elector.term)
+
+
+async def catch_up():
+    """
+    Busca no líder as mensagens que faltam neste nó
+
+    Fluxo:
+    1. Se o atraso é grande, instalar o snapshot do líder (GET /snapshot)
+    2. Ler em streaming as mensagens depois do cursor (GET /log) e aplicá-las
+       em blocos grandes
+
+    Só um catch-up roda por vez; pedidos concorrentes são descartados.
+    """
+    global _catch_up_running
+    if _catch_up_running or leader is None or leader == my_id:
+        return
+    source = leader_server()
+    if source is None:
+        return
+
+    _catch_up_running = True
+    started = time.perf_counter()
+    received = 0
+    try:
+        # PASSO 1: Snapshot + cauda quando o atraso é grande
+        response = await source.aget("/log", params={"after_id": messages.contiguous_id, "limit": 0})
+        leader_last_id = int(response.headers.get("x-last-id", "0"))
+        if leader_last_id - messages.contiguous_id > CATCHUP_SNAPSHOT_THRESHOLD:
+            response = await source.aget("/snapshot", timeout=60)
+            if response.status_code == 200:
+                snapshot = wal.messages_from_snapshot(response.json(), Message)
+                for i in range(0, len(snapshot), CATCHUP_CHUNK):
+                    apply_replicated(snapshot[i:i + CATCHUP_CHUNK])
+                    received += len(snapshot[i:i + CATCHUP_CHUNK])
+                    await asyncio.sleep(0)
+
+        # PASSO 2: Streaming das mensagens depois do cursor (protobuf se possível)
+        async for chunk in pull_log(source, messages.contiguous_id):
+            apply_replicated(chunk)
+            messages.mark_contiguous(chunk[-1].id)
+            applied.notify()
+            received += len(chunk)
+
+        replication_log.info(
+            "Catch-up finished", leader=source.id, messages=received,
+            seconds=round(time.perf_counter() - started, 3), contiguous_id=messages.contiguous_id,
+        )
+    except Exception as e:
+        replication_log.warning("Catch-up failed", leader=source.id, error=repr(e))
+    finally:
+        _catch_up_running = False
+
+
+async def pull_log(source, after_id: int):
+    """
+    Lê em streaming o log de outro nó depois de um ID (GET /log)
+
+    Em protobuf se possível, senão NDJSON; produz blocos não vazios de
+    Message em ordem de ID.
+    """
+    accept = wire.PROTOBUF_MEDIA_TYPE if wire.SEND_BINARY else streaming.NDJSON_MEDIA_TYPE
+    async with source.astream(
+        "GET", "/log", params={"after_id": after_id}, headers={"Accept": accept}, timeout=60
+    ) as response:
+        if response.headers.get("content-type", "").startswith(wire.PROTOBUF_MEDIA_TYPE):
+            blocks = wire.iter_frames(response.aiter_bytes(), Message)
+        else:
+            blocks = ndjson_blocks(response.aiter_lines(), CATCHUP_CHUNK)
+        async for chunk in blocks:
+            if chunk:
+                yield chunk
+
+
+async def multi_writer_sync_loop():
+    """
+    Ao subir no modo leaderless, busca num vizinho o que este nó perdeu
+
+    Tenta os vizinhos em ordem até um responder; sem WAL, as escritas só
+    são aceitas depois disso (multi_writer.ready). O que chegar depois é
+    mantido pelo reparo de cada origem.
+    """
+    while True:
+        for server in servers:
+            if not server.id or server.id == my_id:
+                continue
+            received = 0
+            try:
+                async for chunk in pull_log(server, messages.contiguous_id):
+                    apply_replicated(chunk)
+                    received += len(chunk)
+            except Exception as e:
+                replication_log.warning("Peer sync failed", peer=server.id, error=repr(e), sample=True)
+                continue
+            multi_writer.ready = True
+            replication_log.info("Synced with peer", peer=server.id, messages=received, next_seq=multi_writer.next_seq)
+            return
+        await asyncio.sleep(1)
+
+
+async def ndjson_blocks(lines, block_size: int):
+    """Agrupa linhas NDJSON de Message em blocos de até block_size mensagens"""
+    block = []
+    async for line in lines:
+        if not line:
+            continue
+        block.append(Message.model_validate_json(line))
+        if len(block) >= block_size:
+            yield block
+            block = []
+    if block:
+        yield block
+
+
+async def replication_repair_loop():
+    """
+    Loop do líder que reenvia mensagens a followers atrasados
+
+    A cada REPAIR_INTERVAL_SECONDS, para cada follower cujo cursor ficou
+    parado abaixo do último ID, envia o próximo bloco do log a partir do
+    cursor (a replicação normal não reenvia lotes que falharam).
+    """
+    while True:
+        await asyncio.sleep(REPAIR_INTERVAL_SECONDS)
+        if leader != my_id:
+            continue
+        for server in servers:
+            if not server.id or server.id == my_id:
+                continue
+            cursor = replication_cursors.get(server.id, 0)
+            stalled = _repair_seen.get(server.id) == cursor
+            _repair_seen[server.id] = cursor
+            # Um follower com lotes na fila ainda está recebendo a replicação normal
+            if cursor >= messages.last_id or not stalled or replication.follower_queue(server).busy():
+                continue
+            chunk = messages.range_by_id(cursor + 1, limit=CATCHUP_CHUNK)
+            if not chunk:
+                continue
+            try:
+                ack = await replication.deliver(
+                    server, "/message_received/batch", wire.EncodedBatch(chunk, prev_id=cursor)
+                )
+                if ack is not None:
+                    record_ack(server, ack)
+                if ack is not None and not ack.get("conflict_id"):
+                    replication_log.info("Repaired follower", follower=server.id, ids=f"{chunk[0].id}..{chunk[-1].id}")
+            except Exception as e:
+                replication_log.warning("Repair failed", follower=server.id, error=repr(e), sample=True)
+
+
+@app.get("/log")
+async def get_log(request: Request, after_id: int = 0, limit: Optional[int] = None):
+    """
+    Stream do log em ordem de ID, para catch-up de outros nós
+
+    Em NDJSON por padrão; com Accept: application/x-protobuf, em frames
+    LogBatch (um por bloco). O cabeçalho X-Last-Id informa o maior ID deste
+    nó (com limit=0 serve para medir o atraso sem transferir mensagens).
+
+    Args:
+        after_id: Cursor de ID (exclusivo)
+        limit: Quantidade máxima de mensagens
+
+    Returns:
+        StreamingResponse: Uma mensagem JSON por linha, ou frames protobuf
+    """
+    if wire.BINARY_AVAILABLE and wire.PROTOBUF_MEDIA_TYPE in request.headers.get("accept", ""):
+        chunks = messages.id_chunks(after_id, limit=limit, chunk_size=STREAM_CHUNK_SIZE)
+        return StreamingResponse(
+            wire.frame_chunks(chunks),
+            media_type=wire.PROTOBUF_MEDIA_TYPE,
+            headers={"X-Last-Id": str(messages.last_id)},
+        )
+    # NDJSON: no backend segmented, o histórico sai em fatias dos segmentos
+    return StreamingResponse(
+        messages.id_ndjson(after_id, limit=limit, chunk_size=STREAM_CHUNK_SIZE),
+        media_type=streaming.NDJSON_MEDIA_TYPE,
+        headers={"X-Last-Id": str(messages.last_id)},
+    )
+
+
+@app.get("/snapshot")
+async def get_snapshot():
+    """
+    Retorna o snapshot mais recente do WAL (formato colunar JSON)
+
+    Usado por nós que reingressam muito atrasados: instalam o snapshot e
+    depois buscam só a cauda via GET /log.
+    """
+    path = write_ahead_log.latest_snapshot() if write_ahead_log is not None else None
+    if path is None:
+        return JSONResponse(status_code=404, content={"error": "No snapshot available"})
+    return FileResponse(path, media_type="application/json")
+
+
+# ============================================================================
+# Heartbeats do líder (push) e eleição via gRPC
+# ============================================================================
+
+# O líder envia heartbeats a cada HEARTBEAT_INTERVAL_SECONDS (stream gRPC ou
+# POST /heartbeat); o follower alimenta leader_detector com eles e
+# check_leader inicia uma eleição quando suspeita do líder.
+# Heartbeats HTTP sem resposta por follower antes de pular batimentos
+HEARTBEAT_MAX_IN_FLIGHT = int(os.getenv("HEARTBEAT_MAX_IN_FLIGHT", "4"))
+
+_heartbeat_tasks = {}
+
+
+def on_leader_heartbeat(leader_id: int, last_id: int, lamport: int, term: int = 0) -> tuple:
+    """
+    Heartbeat recebido do líder (gRPC ou POST /heartbeat)
+
+    O term é o da eleição do líder. Batimentos de um term menor que o deste
+    nó vêm de um líder superado (ex: um nó que voltou e se elegeu com um term
+    antigo) e são ignorados, como o COORDINATOR dele; o term devolvido faz
+    esse nó repetir a eleição com um term maior. Um term maior instala o
+    líder; no mesmo term, como no Bully, o líder de ID maior prevalece (dois
+    nós que se declararam líderes ao mesmo tempo).
+
+    Returns:
+        tuple: (cursor de replicação deste nó, term deste nó), no pong
+    """
+    current = elector.term
+    if term and term < current:
+        election_log.debug("Ignoring heartbeat from stale term", leader=leader_id, term=term,
+                           current_term=current, sample=True)
+        return messages.contiguous_id, current
+    if term > current or leader is None or leader_id >= leader:
+        elector.on_leader_heartbeat(leader_id, term)
+        set_leader(leader_id)
+        suspected_nodes.discard(leader_id)
+        leader_detector.heartbeat()
+    return messages.contiguous_id, elector.term
+
+
+@app.post("/heartbeat")
+async def heartbeat(leader_id: int, last_id: int = 0, lamport: int = 0, term: int = 0):
+    """
+    Heartbeat HTTP do líder (equivalente ao stream gRPC Heartbeat)
+
+    Returns:
+        dict: Cursor de replicação e term deste nó
+    """
+    contiguous_id, current_term = on_leader_heartbeat(leader_id, last_id, lamport, term)
+    return {"contiguous_id": contiguous_id, "term": current_term}
+
+
+def make_ping():
+    """(leader_id, last_id, lamport, term) do próximo heartbeat, ou None se não sou líder"""
+    if leader != my_id:
+        return None
+    return (my_id, messages.last_id, lamport_clock.get_time(), elector.term)
+
+
+def record_pong(server, body):
+    """Resposta a um heartbeat: cursor do follower e, se maior, o term dele"""
+    record_ack(server, body)
+    term = body.get("term") if isinstance(body, dict) else None
+    if term and term > elector.term:
+        elector.observe_term(term, "heartbeat rejected as stale")
+
+
+async def heartbeat_follower(server):
+    """Mantém o stream Heartbeat com um follower enquanto este nó é líder"""
+    try:
+        async for pong in grpc_transport.heartbeat(server, make_ping, HEARTBEAT_INTERVAL_SECONDS):
+            record_pong(server, {"contiguous_id": pong.contiguous_id, "term": pong.term})
+    except Exception as e:
+        election_log.warning("Heartbeat stream closed", follower=server.id, error=repr(e), sample=True)
+
+
+async def heartbeat_follower_http(server):
+    """
+    Envia POST /heartbeat a um follower em ritmo fixo enquanto este nó é líder
+
+    Os envios não esperam a resposta do anterior (num enlace lento o ritmo
+    de chegada continua o mesmo); com HEARTBEAT_MAX_IN_FLIGHT sem resposta,
+    o follower provavelmente caiu e os batimentos são pulados.
+    """
+    in_flight = set()
+
+    async def send(ping):
+        leader_id, last_id, lamport, term = ping
+        try:
+            response = await server.apost(
+                "/heartbeat", params={"leader_id": leader_id, "last_id": last_id, "lamport": lamport, "term": term}
+            )
+            record_pong(server, response.json())
+        except Exception as e:
+            election_log.debug("Heartbeat failed", follower=server.id, error=repr(e), sample=True)
+
+    while True:
+        ping = make_ping()
+        if ping is None:
+            return
+        if len(in_flight) < HEARTBEAT_MAX_IN_FLIGHT:
+            task = asyncio.ensure_future(send(ping))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        await asyncio.sleep(HEARTBEAT_INTERVAL_SECONDS)
+
+
+async def leader_heartbeat_loop():
+    """Loop do líder que (re)inicia os heartbeats para cada follower"""
+    while True:
+        await asyncio.sleep(HEARTBEAT_INTERVAL_SECONDS)
+        if leader != my_id:
+            continue
+        for server in servers:
+            if not server.id or server.id == my_id:
+                continue
+            task = _heartbeat_tasks.get(server.id)
+            if task is None or task.done():
+                sender = heartbeat_follower if grpc_transport.USE_GRPC else heartbeat_follower_http
+                _heartbeat_tasks[server.id] = asyncio.ensure_future(sender(server))
+
+
+# ============================================================================
+# Lease do líder (leituras leader-lease)
+# ============================================================================
+
+async def request_lease(server) -> bool:
+    """Pede o lease a um follower; True se ele concedeu"""
+    try:
+        response = await server.apost(
+            "/lease", params={"leader_id": my_id}, timeout=read_consistency.LEASE_SECONDS / 2
+        )
+        return response.status_code == 200 and response.json().get("granted", False)
+    except Exception as e:
+        election_log.debug("Lease request failed", follower=server.id, error=repr(e), sample=True)
+        return False
+
+
+async def leader_lease_loop():
+    """
+    Loop do líder que renova o lease a cada LEASE_RENEW_SECONDS
+
+    O lease é renovado quando uma maioria do cluster (líder incluído)
+    concede; vale a partir do INÍCIO da rodada, nunca do fim.
+    """
+    while True:
+        await asyncio.sleep(read_consistency.LEASE_RENEW_SECONDS)
+        if leader != my_id:
+            continue
+        followers = [server for server in servers if server.id and server.id != my_id]
+        round_start = time.monotonic()
+        granted = await asyncio.gather(*(request_lease(server) for server in followers))
+        if leader == my_id and sum(granted) >= replication.required_acks(replication.ACK_MAJORITY, len(followers)):
+            lease.renewed(round_start)
+
+
+@app.post("/lease")
+def grant_lease(leader_id: int):
+    """
+    Pedido de lease do líder
+
+    Concedido só ao líder que este nó reconhece; ao conceder, este nó
+    promete não conceder lease a outro nó por LEASE_SECONDS.
+
+    Returns:
+        dict: granted e o líder reconhecido por este nó
+    """
+    return {"granted": lease.grant(leader_id, leader), "leader": leader}
+
+
+@app.post("/raft/append_entries")
+async def raft_append_entries(request: Request):
+    """AppendEntries do líder Raft (ver raft.py)"""
+    if raft_node is None:
+        return JSONResponse(status_code=409, content={"error": "Raft mode disabled"})
+    body = await request.json()
+    lamports = [entry["lamport"] for entry in body["entries"] if "lamport" in entry]
+    if lamports:
+        lamport_clock.update(max(lamports))
+    return await raft_node.handle_append_entries(body)
+
+
+@app.post("/raft/request_vote")
+async def raft_request_vote(request: Request):
+    """RequestVote de um candidato Raft (ver raft.py)"""
+    if raft_node is None:
+        return JSONResponse(status_code=409, content={"error": "Raft mode disabled"})
+    return await raft_node.handle_request_vote(await request.json())
+
+
+@app.get("/raft/status")
+async def raft_status():
+    """
+    Estado Raft deste nó
+
+    Returns:
+        dict: papel, term, índices do log (último, confirmado, aplicado),
+              lease e, no líder, next/match_index de cada follower
+    """
+    if raft_node is None:
+        return {"consensus": CONSENSUS_MODE}
+    return {"consensus": CONSENSUS_MODE, **raft_node.status()}
+
+
+@app.post("/multi_writer/gossip")
+async def multi_writer_gossip(request: Request):
+    """Gossip (seq, relógio) de uma origem no modo leaderless (ver multi_writer.py)"""
+    if multi_writer is None:
+        return JSONResponse(status_code=409, content={"error": "Leaderless mode disabled"})
+    body = await request.json()
+    return {"origin_received": multi_writer.on_gossip(body["origin"], body["seq"], body["lamport"])}
+
+
+@app.get("/multi_writer/status")
+async def multi_writer_status():
+    """
+    Estado do modo leaderless deste nó
+
+    Returns:
+        dict: seq própria, watermark de estabilidade, por origem a seq
+              recebida sem lacunas e, por vizinho, o cursor da nossa origem
+    """
+    if multi_writer is None:
+        return {"consensus": CONSENSUS_MODE}
+    return {"consensus": CONSENSUS_MODE, **multi_writer.status()}
+
+
+def get_partition(index: int):
+    """Partition de índice index, ou None (sem partições ou índice inválido)"""
+    if partition_log is None or not 0 <= index < len(partition_log):
+        return None
+    return partition_log.partitions[index]
+
+
+def unknown_partition(index: int) -> JSONResponse:
+    return JSONResponse(status_code=404, content={"error": f"Unknown partition {index}"})
+
+
+@app.post("/partitions/{index}/replicate")
+async def partition_replicate(index: int, request: Request, prev_id: Optional[int] = None):
+    """Lote de uma partição replicado pelo líder dela (como /message_received/batch)"""
+    partition = get_partition(index)
+    if partition is None:
+        return unknown_partition(index)
+    decoded = await decode_batch_body(request, prev_id)
+    if isinstance(decoded, JSONResponse):
+        return decoded
+    ack = partition.receive(*decoded)
+    if ack.get("conflict_id"):
+        return JSONResponse(status_code=409, content=ack)
+    await partition.durable()
+    return ack
+
+
+@app.post("/partitions/{index}/resync")
+async def partition_resync(index: int, leader_id: int, after_id: int):
+    """Pedido do líder da partição para descartar um sufixo divergente (como /resync)"""
+    partition = get_partition(index)
+    if partition is None:
+        return unknown_partition(index)
+    try:
+        removed = partition.truncate(leader_id, after_id)
+    except partitions.PartitionUnavailable as e:
+        return JSONResponse(status_code=409, content={"error": e.reason, "leader": e.leader})
+    await partition.durable()
+    return {"status": "ok", "removed": len(removed), "contiguous_id": partition.store.contiguous_id}
+
+
+@app.get("/partitions/{index}/log")
+async def partition_log_stream(index: int, after_id: int = 0, limit: Optional[int] = None):
+    """Stream NDJSON da partição em ordem de ID, para catch-up (como /log)"""
+    partition = get_partition(index)
+    if partition is None:
+        return unknown_partition(index)
+    return StreamingResponse(
+        partition.store.id_ndjson(after_id, limit=limit, chunk_size=STREAM_CHUNK_SIZE),
+        media_type=streaming.NDJSON_MEDIA_TYPE,
+        headers={"X-Last-Id": str(partition.store.last_id)},
+    )
+
+
+@app.get("/partitions/{index}/messages")
+async def partition_messages(index: int, limit: Optional[int] = None):
+    """Mensagens da partição em ordem Lamport, em NDJSON (parte do scatter-gather)"""
+    partition = get_partition(index)
+    if partition is None:
+        return unknown_partition(index)
+    return StreamingResponse(
+        partition.store.ndjson(limit=limit, chunk_size=STREAM_CHUNK_SIZE), media_type=streaming.NDJSON_MEDIA_TYPE
+    )
+
+
+@app.get("/partitions")
+async def partitions_status():
+    """
+    Partições vistas por este nó
+
+    Returns:
+        dict: Por partição, o líder, o último ID e o cursor contiguous_id
+    """
+    if partition_log is None:
+        return {"node_id": my_id, "partitions": []}
+    return partition_log.status()
+
+
+@app.get("/partitions/messages")
+async def partitions_merged_messages(
+    limit: Optional[int] = None,
+    source: str = "local",
+    fmt: str = Query("json", alias="format"),
+):
+    """
+    Leitura scatter-gather: todas as partições em uma ordem Lamport
+
+    Cada mensagem leva o campo partition (o id é o da partição).
+
+    Args:
+        limit: Quantidade máxima de mensagens
+        source: "local" (réplicas deste nó) ou "leaders" (cada partição lida
+                no seu líder, em paralelo)
+        format: "json" (array) ou "ndjson"
+    """
+    if partition_log is None:
+        return JSONResponse(status_code=400, content={"error": "Partitioning disabled (PARTITIONS=1)"})
+    if fmt not in ("json", "ndjson"):
+        return JSONResponse(status_code=400, content={"error": f"Unknown format: {fmt}"})
+    if source == "local":
+        items = partition_log.merged(limit, chunk_size=STREAM_CHUNK_SIZE)
+    elif source == "leaders":
+        try:
+            items = await partition_log.gather_from_leaders(limit)
+        except Exception as e:
+            api_log.warning("Scatter-gather read failed", error=repr(e), sample=True)
+            return JSONResponse(status_code=502, content={"error": "Partition leader not reachable"})
+    else:
+        return JSONResponse(status_code=400, content={"error": f"Unknown source: {source}"})
+    pieces = partitions.tagged_ndjson(items, STREAM_CHUNK_SIZE)
+    if fmt == "ndjson":
+        return StreamingResponse(pieces, media_type=streaming.NDJSON_MEDIA_TYPE)
+    return StreamingResponse(streaming.json_array_from_ndjson(pieces), media_type="application/json")
+
+
+@app.get("/replication_status")
+async def get_replication_status():
+    """
+    Retorna o cursor de replicação de cada follower (no líder) e deste nó
+
+    Returns:
+        dict: last_id, contiguous_id, política de backpressure, lease
+              restante e sync de novo líder (no líder), detector de falhas (no follower) e, por
+              follower, cursor, atraso (mensagens) e métricas da fila de saída
+    """
+    queues = replication.queue_stats()
+    return {
+        "last_id": messages.last_id,
+        "contiguous_id": messages.contiguous_id,
+        "backpressure": replication.REPLICATION_BACKPRESSURE,
+        "lease_remaining_s": round(lease.remaining(), 3),
+        "leader_synced": leader_synced if leader == my_id else None,
+        "leader_detector": leader_detector.stats() if leader != my_id else None,
+        "followers": {
+            server.id: {
+                "cursor": replication_cursors.get(server.id),
+                "lag": messages.last_id - replication_cursors.get(server.id, 0),
+                **queues.get(server.id, {}),
+            }
+            for server in servers if server.id != my_id
+        },
+    }
+
+
 @app.get("/dashboard", response_class=HTMLResponse)
 async def dashboard():
     """
@@ -253,52 +1778,429 @@ async def get_lamport_time():
 
 
 @app.get("/messages")
-async def get_all_messages():
+async def get_all_messages(
+    limit: Optional[int] = None,
+    after_lamport: Optional[int] = None,
+    after_node: Optional[int] = None,
+    after_id: Optional[int] = None,
+    since: Optional[int] = None,
+    fmt: str = Query("json", alias="format"),
+    consistency: str = read_consistency.CONSISTENCY_LOCAL,
+    min_id: Optional[int] = None,
+    min_lamport: Optional[int] = None,
+    wait_ms: Optional[float] = None,
+):
     """
-    Retorna todas as mensagens ordenadas por timestamp Lamport
+    Retorna as mensagens ordenadas por timestamp Lamport
+
+    Sem parâmetros devolve o log inteiro (como antes). Os parâmetros de
+    cursor permitem paginar e buscar só o que é novo. Com PARTITIONS > 1, é
+    o merge das partições (ver get_partitioned_messages).
+
+    Args:
+        limit: Quantidade máxima de mensagens
+        after_lamport: Cursor; só mensagens depois de (after_lamport, after_node)
+        after_node: Desempate do cursor after_lamport (opcional)
+        after_id: Cursor; só mensagens depois da mensagem com este ID
+        since: Modo incremental; mensagens com timestamp Lamport > since,
+               junto com o cursor para a próxima consulta
+        format: "json" (array) ou "ndjson" (uma mensagem por linha, em streaming)
+        consistency: local (padrão), leader-lease ou at-least (ver read_consistency.py)
+        min_id: (at-least) ID que o nó precisa ter aplicado antes de responder
+        min_lamport: (at-least) timestamp Lamport que o nó precisa ter aplicado
+        wait_ms: (at-least) espera máxima em ms
 
     Returns:
-        list: Lista de mensagens ordenadas causalmente
+        list: Lista de mensagens ordenadas causalmente (em streaming)
+        dict: No modo since, {"messages", "next_since", "more", "total", "lamport_time"};
+              next_since é uma string
+    """
+    if fmt not in ("json", "ndjson"):
+        return JSONResponse(status_code=400, content={"error": f"Unknown format: {fmt}"})
+    if partition_log is not None:
+        return get_partitioned_messages(limit, after_lamport, after_node, after_id, since, fmt, consistency)
+    error = await check_read_consistency(consistency, min_id, min_lamport, wait_ms)
+    if error is not None:
+        return error
+
+    # Cursor de início (exclusivo)
+    after = None
+    if after_id is not None:
+        after = messages.cursor_after_id(after_id)
+        if after is None:
+            return JSONResponse(status_code=404, content={"error": f"Unknown cursor id {after_id}"})
+    elif after_lamport is not None:
+        after = messages.cursor_after(after_lamport, after_node)
+
+    if since is not None:
+        # Modo incremental: resposta pequena, proporcional às mensagens novas
+        page_size = limit if limit is not None else SINCE_PAGE_SIZE
+        new_messages = [
+            msg
+            for chunk in messages.chunks(after=messages.cursor_after(since), limit=page_size + 1)
+            for msg in chunk
+        ]
+        more = len(new_messages) > page_size
+        new_messages = new_messages[:page_size]
+        return {
+            "messages": new_messages,
+            # Em string: um timestamp HLC passa de 2^53 e perderia precisão num Number JS
+            "next_since": str(new_messages[-1].lamport_timestamp if new_messages else since),
+            "more": more,
+            "total": len(messages),
+            "lamport_time": lamport_clock.get_time(),
+        }
+
+    # No modo leaderless, até onde a ordem devolvida já é final
+    headers = {"X-Stable-Lamport": str(multi_writer.stable_lamport())} if multi_writer is not None else None
+    pieces = messages.ndjson(after=after, limit=limit, chunk_size=STREAM_CHUNK_SIZE)
+    if fmt == "ndjson":
+        return StreamingResponse(pieces, media_type=streaming.NDJSON_MEDIA_TYPE, headers=headers)
+    return StreamingResponse(
+        streaming.json_array_from_ndjson(pieces), media_type="application/json", headers=headers
+    )
+
+
+def get_partitioned_messages(limit, after_lamport, after_node, after_id, since, fmt, consistency):
     """
-    # Ordenar por Lamport (já deveriam estar ordenadas, mas por segurança)
-    sorted_messages = sorted(messages, key=lambda m: (m.lamport_timestamp, m.node_id))
-    return sorted_messages
-            
+    GET /messages com PARTITIONS > 1: o merge das partições locais
+
+    Mesmos modos (cursor after_lamport, since, json/ndjson), com o campo
+    partition em cada mensagem. after_id e as consistências além de local
+    dependem de IDs globais, que não existem nesse modo.
+    """
+    if after_id is not None:
+        return partitioned_read_error("after_id is per partition")
+    if consistency != read_consistency.CONSISTENCY_LOCAL:
+        return partitioned_read_error(f"consistency={consistency} is not supported")
+    after = messages.cursor_after(after_lamport, after_node) if after_lamport is not None else None
+    if since is not None:
+        page_size = limit if limit is not None else SINCE_PAGE_SIZE
+        page = list(partition_log.merged(page_size + 1, after=messages.cursor_after(since)))
+        more = len(page) > page_size
+        page = page[:page_size]
+        return {
+            "messages": [{"partition": index, **msg.model_dump()} for index, msg in page],
+            "next_since": str(page[-1][1].lamport_timestamp if page else since),
+            "more": more,
+            "total": partition_log.size(),
+            "lamport_time": lamport_clock.get_time(),
+        }
+    pieces = partitions.tagged_ndjson(
+        partition_log.merged(limit, chunk_size=STREAM_CHUNK_SIZE, after=after), STREAM_CHUNK_SIZE
+    )
+    if fmt == "ndjson":
+        return StreamingResponse(pieces, media_type=streaming.NDJSON_MEDIA_TYPE)
+    return StreamingResponse(streaming.json_array_from_ndjson(pieces), media_type="application/json")
+
+
+@app.get("/pool_stats")
+async def get_pool_stats():
+    """
+    Retorna os contadores de reutilização do pool de conexões por peer
+
+    Returns:
+        dict: {peer_id: {"requests", "hits", "misses"}}
+    """
+    return {server.id: server.pool_stats() for server in servers if server.id != my_id}
+
+
+@app.get("/messages/range")
+async def get_messages_range(start_id: int, end_id: Optional[int] = None, limit: Optional[int] = None):
+    """
+    Retorna as mensagens com start_id <= id <= end_id, em ordem de ID
+
+    Args:
+        start_id: Primeiro ID (inclusivo)
+        end_id: Último ID (inclusivo), opcional
+        limit: Quantidade máxima de mensagens, opcional
+
+    Returns:
+        list: Mensagens do intervalo
+    """
+    return messages.range_by_id(start_id, end_id, limit)
+
+
+@app.get("/messages/time_range")
+async def get_messages_time_range(start: datetime, end: datetime, limit: Optional[int] = None):
+    """
+    Retorna as mensagens geradas com start <= tempo < end (CLOCK_MODE=hlc)
+
+    Com o HLC o timestamp carrega o relógio físico, então o intervalo vira
+    um intervalo de timestamps e a busca usa a mesma ordem do log, sem
+    varrer tudo. Com o relógio de Lamport o timestamp não diz nada sobre
+    o tempo, e a consulta é recusada.
+
+    Args:
+        start: Início (ISO 8601 ou segundos desde a época), inclusivo
+        end: Fim, exclusivo
+        limit: Quantidade máxima de mensagens, opcional
+
+    Returns:
+        list: Mensagens do intervalo, ordenadas por timestamp
+    """
+    if not isinstance(lamport_clock, clocks.HybridLogicalClock):
+        return JSONResponse(status_code=400, content={"error": "Time range queries require CLOCK_MODE=hlc"})
+    lower = clocks.HybridLogicalClock.for_time(start.timestamp())
+    upper = clocks.HybridLogicalClock.for_time(end.timestamp())
+    found = []
+    for chunk in messages.chunks(after=messages.cursor_after(lower - 1), limit=limit, chunk_size=STREAM_CHUNK_SIZE):
+        for msg in chunk:
+            if msg.lamport_timestamp >= upper:
+                return found
+            found.append(msg)
+    return found
+
+
+@app.get("/events")
+async def events(
+    request: Request,
+    after_lamport: Optional[int] = None,
+    after_id: Optional[int] = None,
+    types: Optional[str] = None,
+):
+    """
+    Stream Server-Sent Events com as mudanças do nó
+
+    Eventos:
+    - message: mensagem confirmada (id SSE = cursor "lamport:node_id:id")
+    - clock:   novo valor do relógio Lamport
+    - leader:  mudança de líder
+
+    Ao conectar, o cliente recebe o estado atual (clock, leader) e as
+    mensagens depois do cursor; depois, só o que muda. O cursor vem de
+    after_lamport/after_id ou do cabeçalho Last-Event-ID (reconexão
+    automática do EventSource). Sem cursor, o log inteiro é enviado.
+
+    Com types (ex: "leader"), só os eventos desses tipos são enviados; sem
+    "message", não há replay do log (ver log_client.py).
+
+    Com PARTITIONS > 1, as mensagens são as de todas as partições, com o
+    campo partition (after_id não vale: o ID é o da partição).
+    """
+    wanted = None
+    if types:
+        wanted = {t.strip().encode() for t in types.split(",") if t.strip()}
+    after = None
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id:
+        after = change_feed.parse_cursor(last_event_id)
+    elif after_id is not None:
+        if partition_log is not None:
+            return partitioned_read_error("after_id is per partition")
+        after = messages.cursor_after_id(after_id)
+    elif after_lamport is not None:
+        after = messages.cursor_after(after_lamport)
+
+    # Assinar ANTES de ler o log, para não perder mensagens no meio
+    subscription = feed.subscribe()
+
+    async def stream():
+        try:
+            if wanted is None or b"leader" in wanted:
+                yield change_feed.encode_event("leader", json.dumps({"leader": leader}))
+            if wanted is None or b"clock" in wanted:
+                yield change_feed.encode_event("clock", json.dumps({"time": lamport_clock.get_time()}))
+
+            # Replay do log a partir do cursor
+            last_key = after
+            replay = wanted is None or b"message" in wanted
+            for chunk in (replay_chunks(after) if replay else ()):
+                yield b"".join(
+                    change_feed.encode_event("message", data, change_feed.message_cursor(msg)) for data, msg in chunk
+                )
+                last_key = messages.order_key(chunk[-1][1])
+
+            # Eventos ao vivo (descartando mensagens já enviadas no replay)
+            while True:
+                frame = await subscription.next_frame(FEED_KEEPALIVE_SECONDS)
+                if frame is None:
+                    if await request.is_disconnected():
+                        return
+                    yield b": keep-alive\n\n"
+                    continue
+                if wanted is not None and frame[7:frame.index(b"\n")] not in wanted:
+                    continue
+                if last_key is not None and frame.startswith(b"event: message\n"):
+                    key = change_feed.parse_cursor(frame.split(b"\n", 2)[1][4:].decode())
+                    if key is not None and key <= last_key:
+                        continue
+                yield frame
+        except StopAsyncIteration:
+            return
+        finally:
+            feed.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def replay_chunks(after):
+    """
+    Blocos de (JSON, Message) do log depois do cursor, para o replay de /events
+
+    Com PARTITIONS > 1, o merge das partições, com o campo partition.
+    """
+    if partition_log is None:
+        for chunk in messages.chunks(after=after, chunk_size=STREAM_CHUNK_SIZE):
+            yield [(msg.model_dump_json(), msg) for msg in chunk]
+        return
+    chunk = []
+    for index, msg in partition_log.merged(chunk_size=STREAM_CHUNK_SIZE, after=after):
+        chunk.append((partitions.tagged_json(index, msg), msg))
+        if len(chunk) >= STREAM_CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+@app.get("/wal_stats")
+async def get_wal_stats():
+    """
+    Retorna o estado do write-ahead log (segmentos, registros, recuperação)
+
+    Returns:
+        dict: Estatísticas do WAL, ou {"enabled": False}
+    """
+    store = messages.stats() if isinstance(messages, SegmentedMessageStore) else None
+    if write_ahead_log is None:
+        return {"enabled": False, "store": store}
+    return {"enabled": True, **write_ahead_log.stats(), "store": store}
+
+
+metrics.Gauge("message_store_size", "Mensagens no log deste nó", lambda: len(messages))
+metrics.Gauge("message_store_last_id", "Maior ID de mensagem conhecido", lambda: messages.last_id)
+metrics.Gauge("message_store_contiguous_id", "Maior ID sem lacunas no log", lambda: messages.contiguous_id)
+metrics.Gauge("lamport_clock", "Valor atual do relógio de Lamport", lambda: lamport_clock.get_time())
+metrics.Gauge(
+    "multi_writer_stable_lamport", "Watermark de estabilidade da ordem (modo leaderless)",
+    lambda: multi_writer.stable_lamport() if multi_writer is not None else 0,
+)
+metrics.Gauge("is_leader", "1 se este nó é o líder", lambda: int(leader is not None and leader == my_id))
+metrics.Gauge("leader_lease_remaining_seconds", "Tempo restante do lease do líder", lease.remaining)
+metrics.Gauge("leader_failure_phi", "Suspeita phi-accrual sobre o líder (0 no líder)", lambda: leader_detector.phi())
+metrics.Gauge("change_feed_subscribers", "Assinantes conectados em /events", lambda: len(feed))
+metrics.Gauge("log_queue_depth", "Eventos de log esperando a thread de escrita", lambda: structured_log.stats()["queued"])
+metrics.Gauge(
+    "log_dropped_events", "Eventos de log descartados com a fila cheia", lambda: structured_log.stats()["dropped"]
+)
+metrics.Gauge(
+    "replication_lag_messages", "Mensagens do líder que o follower ainda não confirmou",
+    lambda: {
+        server_id: messages.last_id - cursor for server_id, cursor in replication_cursors.items()
+    } if leader == my_id else {},
+    labels=["follower"],
+)
+metrics.Gauge(
+    "partition_store_size", "Mensagens no store de cada partição (PARTITIONS > 1)",
+    lambda: {p.index: len(p.store) for p in partition_log.partitions} if partition_log is not None else {},
+    labels=["partition"],
+)
+metrics.Gauge(
+    "partition_store_last_id", "Maior ID conhecido em cada partição",
+    lambda: {p.index: p.store.last_id for p in partition_log.partitions} if partition_log is not None else {},
+    labels=["partition"],
+)
+metrics.Gauge(
+    "partition_store_contiguous_id", "Maior ID sem lacunas em cada partição",
+    lambda: {p.index: p.store.contiguous_id for p in partition_log.partitions} if partition_log is not None else {},
+    labels=["partition"],
+)
+metrics.Gauge(
+    "partition_is_leader", "1 se este nó lidera a partição",
+    lambda: {p.index: int(p.leader == my_id) for p in partition_log.partitions} if partition_log is not None else {},
+    labels=["partition"],
+)
+metrics.Gauge(
+    "replication_queue_depth", "Lotes na fila de saída do follower",
+    lambda: {server_id: stats["queue_depth"] for server_id, stats in replication.queue_stats().items()},
+    labels=["follower"],
+)
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Métricas do nó no formato de texto do Prometheus
+
+    Returns:
+        PlainTextResponse: Histogramas de latência por rota, de replicação
+                           por follower, de reencaminhamento e de eleição,
+                           e contadores/gauges do nó
+    """
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
 
 @app.get("/leader")
 def get_leader():
     return leader 
 
+
+@app.get("/cluster")
+def get_cluster():
+    """
+    Topologia vista por este nó, para clientes que falam direto com o líder
+
+    Returns:
+        dict: ID deste nó, líder atual e URL de cada nó conhecido
+    """
+    return {
+        "node_id": my_id,
+        "leader": leader,
+        "nodes": {server.id: server.url() for server in servers},
+    }
+
 @app.get("/leader_selected")
 def leader_selected(sleader: int):
-    global leader
-    print(f"[Node {my_id}] Leader selected: {sleader}")
-    leader = sleader
+    election_log.info("Leader selected", leader=sleader)
+    set_leader(sleader)
     return {"status": "ok", "leader": leader}
 
+def partition_elector(partition: Optional[int]):
+    """BullyElection do líder global (partition None) ou de uma partição"""
+    if partition is None:
+        return elector
+    if partition_log is None or not 0 <= partition < len(partition_log):
+        return None
+    return partition_log.partitions[partition].elector
+
 @app.post("/election")
-def election_message():
+def election_message(candidate_id: Optional[int] = None, term: Optional[int] = None,
+                     partition: Optional[int] = None):
     """
     Endpoint para receber mensagem ELECTION do algoritmo Bully
 
-    Responde com OK e inicia própria eleição se receber ELECTION
+    Responde com OK e pede uma eleição deste nó (ver election.py); com
+    partition, a eleição é a do líder dessa partição
     """
-    print(f"[Node {my_id}] Received ELECTION message, responding OK and starting own election")
-    # Iniciar própria eleição em background
-    threading.Thread(target=start_election, daemon=True).start()
-    return {"status": "ok"}
+    target = partition_elector(partition)
+    if target is None:
+        return JSONResponse(status_code=404, content={"error": f"Unknown partition {partition}"})
+    return {"status": "ok", "term": target.on_election(candidate_id, term)}
 
 @app.post("/coordinator")
-def coordinator_message(new_leader: int):
+def coordinator_message(new_leader: int, term: Optional[int] = None, partition: Optional[int] = None):
     """
     Endpoint para receber mensagem COORDINATOR do algoritmo Bully
 
-    Aceita o novo líder anunciado
+    Aceita o novo líder anunciado (da partição, com partition), a menos que
+    seja de um term antigo
     """
-    global leader
-    print(f"[Node {my_id}] Received COORDINATOR message, new leader is {new_leader}")
-    leader = new_leader
-    return {"status": "ok"}
+    target = partition_elector(partition)
+    if target is None:
+        return JSONResponse(status_code=404, content={"error": f"Unknown partition {partition}"})
+    accepted = target.on_coordinator(new_leader, term)
+    return {"status": "ok" if accepted else "ignored", "term": target.term}
+
+
+# Intervalo entre avaliações do detector de falhas
+FAILURE_CHECK_SECONDS = float(os.getenv("FAILURE_CHECK_SECONDS", "0.05"))
+# Consulta a GET /leader quando o líder ainda não enviou heartbeats
+LEADER_POLL_SECONDS = float(os.getenv("LEADER_POLL_SECONDS", "5"))
 
 
 def check_leader():
@@ -306,95 +2208,72 @@ def check_leader():
     Thread que verifica continuamente o estado do líder
 
     Responsabilidades:
-    1. Verificar a cada 5 segundos se o líder está vivo
-    2. Iniciar eleição se o líder cai
+    1. Enquanto o líder envia heartbeats, avaliar o detector phi-accrual a
+       cada FAILURE_CHECK_SECONDS e iniciar eleição se ele suspeita do líder
+    2. Sem heartbeats, consultar o líder a cada LEADER_POLL_SECONDS (como
+       antes) e iniciar eleição se ele não responde
     3. Atualizar variável global 'leader' se detecta mudança
     """
     global leader
-    print(f"[Node {my_id}] Starting leader health check (current leader: {leader})")
+    election_log.info("Starting leader health check", leader=leader)
+    next_poll = 0.0
 
     while True:
+        time.sleep(FAILURE_CHECK_SECONDS)
+
         # Se EU sou o líder, não preciso fazer health check
         if leader == my_id:
-            time.sleep(5)
             continue
 
+        # Líder enviando heartbeats: decide o detector de falhas
+        detector = leader_detector
+        if leader is not None and detector.active:
+            if detector.suspect():
+                election_log.warning(
+                    "Leader suspected, starting election", leader=leader, phi=round(detector.phi(), 1)
+                )
+                suspected_nodes.add(leader)
+                set_leader(None)
+                elector.trigger("leader suspected")
+            continue
+
+        now = time.monotonic()
+        if now < next_poll:
+            continue
+        next_poll = now + LEADER_POLL_SECONDS
+
         lserver = leader_server()
 
         # Caso 1: Não temos líder registrado
         if lserver is None and leader is None:
-            print(f"[Node {my_id}] No leader, starting election")
-            start_election()
+            elector.trigger("no leader")
         elif lserver is not None:
             # Caso 2: Temos líder, verificar se está vivo
             cleader = lserver.current_leader()
 
             if cleader is None:
                 # O líder não responde, iniciar eleição
-                print(f"[Node {my_id}] Leader {leader} not responding, starting election")
-                start_election()
+                election_log.warning("Leader not responding, starting election", leader=leader)
+                elector.trigger("leader not responding")
             elif cleader != leader:
                 # O líder mudou (raro, mas possível em race conditions)
-                print(f"[Node {my_id}] Leader changed from {leader} to {cleader}")
-                leader = cleader
+                election_log.info("Leader changed", old=leader, new=cleader)
+                set_leader(cleader)
 
-        time.sleep(5)
-def start_election():
-    """
-    Implementação do Algoritmo Bully para eleição de líder
 
-    Passos:
-    1. Enviar mensagem ELECTION para todos os nodos com ID maior
-    2. Esperar respostas OK
-    3. Se alguém responder OK → esperar mensagem COORDINATOR
-    4. Se ninguém responder OK → me declarar líder e enviar COORDINATOR para todos
-    """
-    global leader
-    print(f"[Node {my_id}] Starting Bully election...")
+# Eleições Bully deste nó, conduzidas por uma única thread (ver election.py)
+elector = BullyElection(my_id, servers, lambda: leader, set_leader, suspected_nodes)
 
-    # PASSO 1: Enviar ELECTION para nodos com ID maior
-    received_ok = False
-    for server in servers:
-        if server.id and server.id > my_id:
-            url = f"{server.url()}/election"
-            try:
-                response = requests.post(url, timeout=2)
-                if response.status_code == 200:
-                    print(f"[Node {my_id}] Received OK from node {server.id}")
-                    received_ok = True
-            except Exception as e:
-                print(f"[Node {my_id}] Node {server.id} did not respond to ELECTION: {e}")
-
-    # PASSO 2: Decidir se sou o líder
-    if received_ok:
-        # Alguém com ID maior respondeu, vou esperar COORDINATOR
-        print(f"[Node {my_id}] Waiting for COORDINATOR message from higher node...")
-        # O líder será definido quando receber POST /coordinator
-        time.sleep(3)  # Timeout para esperar COORDINATOR
-        if leader is None or leader < my_id:
-            # Não recebi COORDINATOR, reiniciar eleição
-            print(f"[Node {my_id}] Did not receive COORDINATOR, restarting election...")
-            start_election()
-    else:
-        # Ninguém respondeu, EU sou o líder
-        leader = my_id
-        print(f"[Node {my_id}] I am the new leader! Broadcasting COORDINATOR...")
 
-        # PASSO 3: Enviar COORDINATOR para todos os nodos
-        for server in servers:
-            if server.id and server.id != my_id:
-                url = f"{server.url()}/coordinator?new_leader={my_id}"
-                try:
-                    requests.post(url, timeout=2)
-                    print(f"[Node {my_id}] Sent COORDINATOR to node {server.id}")
-                except Exception as e:
-                    print(f"[Node {my_id}] Failed to send COORDINATOR to node {server.id}: {e}")
 @app.get("/kill")
 def kill():
     import os
     os._exit(1)
     
-# Iniciar thread de verificação de líder
-print(f"[Node {my_id}] Starting up...")
-threading.Thread(target=check_leader, daemon=True).start()
+# Iniciar threads de eleição e de verificação de líder (no modo Raft a
+# eleição é a do RaftNode, iniciada no startup; o leaderless não tem líder)
+api_log.info("Starting up", consensus=CONSENSUS_MODE)
+if BULLY_MODE:
+    elector.start()
+    threading.Thread(target=check_leader, daemon=True).start()
 
@@ -0,0 +1,692 @@
+"""
+Armazenamento indexado das mensagens do log
+
+Mantém o log ordenado por (lamport_timestamp, node_id) e, ao lado dele,
+um índice hash por ID e a lista ordenada de IDs. Com isso:
+- inserir é O(log n) de busca binária (append O(1) no caso comum em que a
+  mensagem chega em ordem), sem reordenar o log inteiro
+- leituras percorrem o log já ordenado, sem copiar nem ordenar
+- busca por ID é O(1)
+- leituras paginadas partem de um cursor (chave de ordenação) e são
+  entregues em blocos, sem materializar o log inteiro
+- o próximo ID do líder vem de um contador monotônico, sem varrer o log
+- consultas por intervalo de IDs usam busca binária
+
+Backends com a mesma interface (MESSAGE_STORE):
+- objects (padrão): MessageStore, uma lista de objetos Message
+- compact: CompactMessageStore, colunas em arrays tipados e conteúdos num
+  único buffer; os objetos Message só existem enquanto uma requisição os
+  usa. Bem menos memória por mensagem, em troca de leituras por objeto
+  (get, range_by_id) mais caras; o NDJSON sai direto das colunas
+- segmented: CompactMessageStore só para a cauda recente; o histórico vai
+  para segmentos selados em disco, mapeados em memória (ver segments.py)
+"""
+
+import bisect
+import os
+import threading
+from array import array
+
+import pydantic_core
+
+import streaming
+
+
+MESSAGE_STORE = os.getenv("MESSAGE_STORE", "objects").strip().lower()
+
+
+# Maior valor possível de um componente da chave (para cursores "depois de")
+_MAX = float("inf")
+
+
+def same_message(a, b) -> bool:
+    """True se a e b são a mesma mensagem (mesmo autor, timestamp e conteúdo)"""
+    return (a.node_id == b.node_id and a.lamport_timestamp == b.lamport_timestamp
+            and a.content == b.content)
+
+
+def find_conflict(store, messages):
+    """
+    Primeira mensagem recebida cujo ID o store já tem com outro conteúdo
+
+    Mensagens repetidas iguais (replicação reenviada) não são conflito. Um
+    conflito indica que o nó recebeu, de um líder superado, mensagens com
+    IDs que o líder atual usou para outras.
+
+    Returns:
+        Message: A mensagem guardada que conflita, ou None
+    """
+    for message in messages:
+        stored = store.get(message.id)
+        if stored is not None and not same_message(stored, message):
+            return stored
+    return None
+
+
+class MessageStore:
+    """
+    Log de mensagens com índice por ID
+
+    Attributes:
+        last_id (int): Maior ID já guardado (ou reservado pelo líder)
+        contiguous_id (int): Maior ID k tal que o log não tem lacunas até k
+            (usado como cursor de replicação / catch-up)
+    """
+
+    def __init__(self):
+        self._log = []        # Mensagens em ordem (lamport_timestamp, node_id)
+        self._keys = []       # Chave de ordenação de cada posição de _log
+        self._by_id = {}      # id -> Message
+        self._ids = []        # IDs em ordem crescente
+        self.last_id = 0
+        self.contiguous_id = 0
+
+    def __len__(self) -> int:
+        return len(self._log)
+
+    def __iter__(self):
+        """Percorre o log em ordem (lamport_timestamp, node_id)"""
+        yield from self._log
+
+    @staticmethod
+    def order_key(message):
+        """Chave da ordem total do log; o ID desempata mensagens idênticas"""
+        return (message.lamport_timestamp, message.node_id, message.id)
+
+    def _insert(self, message):
+        key = self.order_key(message)
+        if not self._keys or key >= self._keys[-1]:
+            # Caso comum: a mensagem chega em ordem
+            self._keys.append(key)
+            self._log.append(message)
+        else:
+            pos = bisect.bisect_right(self._keys, key)
+            self._keys.insert(pos, key)
+            self._log.insert(pos, message)
+
+    def _index(self, message):
+        self._by_id[message.id] = message
+        if not self._ids or message.id > self._ids[-1]:
+            self._ids.append(message.id)
+        else:
+            bisect.insort(self._ids, message.id)
+        if message.id > self.last_id:
+            self.last_id = message.id
+        if message.id == self.contiguous_id + 1:
+            self._advance_contiguous()
+
+    def _advance_contiguous(self):
+        while self.contiguous_id + 1 in self._by_id:
+            self.contiguous_id += 1
+
+    def mark_contiguous(self, upto: int):
+        """
+        Declara que não há lacunas até o ID upto
+
+        Usado quando o líder confirma que os IDs que faltam até upto não
+        existem no log dele (não há o que buscar).
+        """
+        if upto > self.contiguous_id:
+            self.contiguous_id = upto
+            self._advance_contiguous()
+
+    def add(self, message) -> bool:
+        """
+        Guarda uma mensagem no log
+
+        Args:
+            message: Message a guardar
+
+        Returns:
+            bool: False se já existia uma mensagem com o mesmo ID
+        """
+        return bool(self.extend([message]))
+
+    def extend(self, messages):
+        """
+        Guarda várias mensagens, cada uma na sua posição ordenada
+
+        Mensagens com um ID já guardado são ignoradas (replicação repetida).
+
+        Args:
+            messages: Lista de Message
+
+        Returns:
+            list: Mensagens efetivamente adicionadas
+        """
+        added = []
+        for message in messages:
+            if message.id in self._by_id:
+                continue
+            self._index(message)
+            self._insert(message)
+            added.append(message)
+        return added
+
+    def snapshot(self):
+        """Cópia do log em ordem, para ser percorrida fora do event loop"""
+        return list(self._log)
+
+    def ndjson(self, after: tuple = None, limit: int = None, chunk_size: int = 500):
+        """Mesmo percurso de chunks(), já codificado em NDJSON (bytes por bloco)"""
+        return streaming.ndjson_chunks(self.chunks(after, limit, chunk_size))
+
+    def id_ndjson(self, after_id: int, limit: int = None, chunk_size: int = 500):
+        """Mesmo percurso de id_chunks(), já codificado em NDJSON (bytes por bloco)"""
+        return streaming.ndjson_chunks(self.id_chunks(after_id, limit, chunk_size))
+
+    def next_id(self) -> int:
+        """
+        Reserva o próximo ID de mensagem (usado pelo líder)
+
+        Returns:
+            int: Novo ID, sempre maior que todos os anteriores
+        """
+        self.last_id += 1
+        return self.last_id
+
+    def advance_last_id(self, upto: int):
+        """
+        Garante que next_id() devolva IDs maiores que upto
+
+        Usado por um novo líder com o maior ID que os outros nós têm, mesmo
+        que ele não tenha conseguido buscar essas mensagens.
+        """
+        if upto > self.last_id:
+            self.last_id = upto
+
+    def truncate_after(self, after_id: int) -> list:
+        """
+        Remove as mensagens com id > after_id
+
+        Usado quando o líder encontra aqui um sufixo que diverge do log dele
+        (mensagens de um líder superado); o nó depois busca o sufixo certo.
+
+        Returns:
+            list: IDs removidos
+        """
+        pos = bisect.bisect_right(self._ids, after_id)
+        removed = self._ids[pos:]
+        if not removed:
+            return []
+        self._log = [message for message in self._log if message.id <= after_id]
+        self._keys = [self.order_key(message) for message in self._log]
+        for id in removed:
+            del self._by_id[id]
+        del self._ids[pos:]
+        self.last_id = min(self.last_id, after_id)
+        self.contiguous_id = min(self.contiguous_id, after_id)
+        return removed
+
+    def get(self, id: int):
+        """
+        Busca uma mensagem pelo ID
+
+        Returns:
+            Message: A mensagem, ou None se não existe
+        """
+        return self._by_id.get(id)
+
+    def range_by_id(self, start_id: int, end_id: int = None, limit: int = None):
+        """
+        Retorna as mensagens com start_id <= id <= end_id, em ordem de ID
+
+        Args:
+            start_id: Primeiro ID (inclusivo)
+            end_id: Último ID (inclusivo); None para ir até o fim
+            limit: Quantidade máxima de mensagens
+
+        Returns:
+            list: Mensagens do intervalo
+        """
+        lo = bisect.bisect_left(self._ids, start_id)
+        hi = len(self._ids) if end_id is None else bisect.bisect_right(self._ids, end_id)
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        return [self._by_id[id] for id in self._ids[lo:hi]]
+
+    def cursor_after(self, lamport_timestamp: int, node_id: int = None, id: int = None) -> tuple:
+        """
+        Monta a chave de um cursor "depois de (lamport, node_id, id)"
+
+        Componentes omitidos valem infinito, então after_lamport=5 pula todas
+        as mensagens com timestamp 5.
+        """
+        return (
+            lamport_timestamp,
+            _MAX if node_id is None else node_id,
+            _MAX if id is None else id,
+        )
+
+    def cursor_after_id(self, id: int):
+        """
+        Cursor logo depois da mensagem com o ID dado
+
+        Returns:
+            tuple: Chave da mensagem, ou None se o ID não existe
+        """
+        message = self._by_id.get(id)
+        return None if message is None else self.order_key(message)
+
+    def chunks(self, after: tuple = None, limit: int = None, chunk_size: int = 500):
+        """
+        Percorre o log em ordem, em blocos, a partir de um cursor
+
+        Cada bloco é localizado de novo por busca binária a partir da chave
+        da última mensagem entregue, então inserções concorrentes entre um
+        bloco e outro não causam duplicatas nem saltos.
+
+        Args:
+            after: Chave de cursor (exclusiva); None para começar do início
+            limit: Total máximo de mensagens
+            chunk_size: Mensagens por bloco
+
+        Yields:
+            list: Bloco de mensagens
+        """
+        pos = 0 if after is None else bisect.bisect_right(self._keys, after)
+        remaining = limit
+        while remaining is None or remaining > 0:
+            n = chunk_size if remaining is None else min(chunk_size, remaining)
+            chunk = self._log[pos:pos + n]
+            if not chunk:
+                return
+            yield chunk
+            if remaining is not None:
+                remaining -= len(chunk)
+            pos = bisect.bisect_right(self._keys, self.order_key(chunk[-1]))
+
+    def id_chunks(self, after_id: int, limit: int = None, chunk_size: int = 500):
+        """
+        Percorre as mensagens com id > after_id em ordem de ID, em blocos
+
+        Args:
+            after_id: Cursor de ID (exclusivo)
+            limit: Total máximo de mensagens
+            chunk_size: Mensagens por bloco
+
+        Yields:
+            list: Bloco de mensagens
+        """
+        remaining = limit
+        while remaining is None or remaining > 0:
+            n = chunk_size if remaining is None else min(chunk_size, remaining)
+            chunk = self.range_by_id(after_id + 1, limit=n)
+            if not chunk:
+                return
+            yield chunk
+            if remaining is not None:
+                remaining -= len(chunk)
+            after_id = chunk[-1].id
+
+
+class CompactMessageStore:
+    """
+    Log de mensagens em colunas, com a mesma interface do MessageStore
+
+    Cada mensagem é uma linha (na ordem de chegada) em arrays tipados: ID,
+    timestamp Lamport, node_id, timestamp físico e o offset do conteúdo
+    (UTF-8) num bytearray compartilhado. A ordem (lamport, node_id, id) é
+    um array de números de linha, e o índice por ID é um array indexado
+    pelo próprio ID (-1 onde não há mensagem), já que os IDs são densos.
+    São cerca de 60 bytes por mensagem mais o conteúdo, contra algumas
+    centenas de um objeto Message com seu dict, ints e floats.
+
+    get(), range_by_id(), chunks() e a iteração montam objetos Message
+    só para as linhas pedidas; ndjson() e id_ndjson()
+    codificam as linhas direto das colunas, sem objetos Message.
+
+    Os percursos em blocos (chunks, ndjson...) rodam numa thread do
+    StreamingResponse enquanto o event loop mexe no store. Acrescentar
+    linhas não muda as existentes, mas truncate_after() e drop_through()
+    refazem as colunas (os números de linha mudam): cada bloco é lido, e as
+    colunas refeitas são trocadas, sob o mesmo lock. Um bloco nunca mistura
+    colunas velhas e novas, e o seguinte recomeça da chave do último.
+
+    Args:
+        message_cls: Classe Message usada nas leituras
+
+    Attributes:
+        last_id (int): Maior ID já guardado (ou reservado pelo líder)
+        contiguous_id (int): Maior ID k tal que o log não tem lacunas até k
+    """
+
+    # Atributos trocados juntos quando as colunas são refeitas
+    _COLUMNS = ("_id", "_lamport", "_node", "_physical", "_offset", "_content", "_order", "_row_of", "_id_base")
+
+    def __init__(self, message_cls):
+        self.message_cls = message_cls
+        self._lock = threading.Lock()
+        self._id = array("q")
+        self._lamport = array("q")
+        self._node = array("q")
+        self._physical = array("d")
+        self._offset = array("Q", [0])   # Conteúdo da linha r: _content[_offset[r]:_offset[r + 1]]
+        self._content = bytearray()
+        self._order = array("q")         # Linhas em ordem (lamport_timestamp, node_id, id)
+        self._row_of = array("q", [-1])  # id - _id_base -> linha, ou -1
+        self._id_base = 0                # IDs <= _id_base não estão aqui (ver drop_through)
+        self.last_id = 0
+        self.contiguous_id = 0
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __iter__(self):
+        """Percorre o log em ordem (lamport_timestamp, node_id)"""
+        for row in self._order:
+            yield self._view(row)
+
+    order_key = staticmethod(MessageStore.order_key)
+
+    def _key(self, row: int) -> tuple:
+        return (self._lamport[row], self._node[row], self._id[row])
+
+    def _view(self, row: int):
+        # A validação do pydantic 2 (em Rust) sai mais barata que model_construct
+        return self.message_cls(
+            id=self._id[row],
+            content=self._content[self._offset[row]:self._offset[row + 1]].decode("utf-8", "surrogatepass"),
+            lamport_timestamp=self._lamport[row],
+            node_id=self._node[row],
+            physical_timestamp=self._physical[row],
+        )
+
+    def _bisect_right(self, key: tuple) -> int:
+        """Posição em _order depois de todas as chaves <= key"""
+        lamport, node, id = key
+        order, lamports, nodes, ids = self._order, self._lamport, self._node, self._id
+        lo, hi = 0, len(order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            row = order[mid]
+            # key < chave da linha, componente a componente, sem montar tuplas
+            row_lamport = lamports[row]
+            if lamport != row_lamport:
+                below = lamport < row_lamport
+            elif node != nodes[row]:
+                below = node < nodes[row]
+            else:
+                below = id < ids[row]
+            if below:
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    def _encode(self, rows) -> bytes:
+        """
+        Linhas como NDJSON, no mesmo formato de Message.model_dump_json()
+
+        Um único to_json por bloco: o array JSON vira NDJSON trocando os
+        separadores entre objetos, que não aparecem dentro das strings (as
+        aspas delas são escapadas).
+        """
+        ids, lamports, nodes, physical = self._id, self._lamport, self._node, self._physical
+        offset, content = self._offset, self._content
+        data = pydantic_core.to_json([
+            {
+                "id": ids[row],
+                "content": content[offset[row]:offset[row + 1]].decode("utf-8", "surrogatepass"),
+                "lamport_timestamp": lamports[row],
+                "node_id": nodes[row],
+                "physical_timestamp": physical[row],
+            }
+            for row in rows
+        ])
+        return data[1:-1].replace(b'},{"id":', b'}\n{"id":') + b"\n"
+
+    def _row(self, id: int) -> int:
+        i = id - self._id_base
+        return self._row_of[i] if 0 < i < len(self._row_of) else -1
+
+    def _advance_contiguous(self):
+        while self._row(self.contiguous_id + 1) >= 0:
+            self.contiguous_id += 1
+
+    def mark_contiguous(self, upto: int):
+        """Declara que não há lacunas até o ID upto (ver MessageStore)"""
+        if upto > self.contiguous_id:
+            self.contiguous_id = upto
+            self._advance_contiguous()
+
+    def add(self, message) -> bool:
+        """Guarda uma mensagem; False se o ID já existia"""
+        return bool(self.extend([message]))
+
+    def extend(self, messages):
+        """
+        Guarda várias mensagens, cada uma na sua posição ordenada
+
+        Mensagens com um ID já guardado são ignoradas (replicação repetida).
+
+        Args:
+            messages: Lista de Message
+
+        Returns:
+            list: Mensagens efetivamente adicionadas
+        """
+        added = []
+        for message in messages:
+            id = message.id
+            i = id - self._id_base
+            if i <= 0 or self._row(id) >= 0:
+                continue
+            row = len(self._id)
+            self._id.append(id)
+            self._lamport.append(message.lamport_timestamp)
+            self._node.append(message.node_id)
+            self._physical.append(message.physical_timestamp)
+            self._content += message.content.encode("utf-8", "surrogatepass")
+            self._offset.append(len(self._content))
+
+            if i >= len(self._row_of):
+                self._row_of.extend(array("q", [-1]) * (i + 1 - len(self._row_of)))
+            self._row_of[i] = row
+            if id > self.last_id:
+                self.last_id = id
+            if id == self.contiguous_id + 1:
+                self._advance_contiguous()
+
+            key = self.order_key(message)
+            if not self._order or key >= self._key(self._order[-1]):
+                # Caso comum: a mensagem chega em ordem
+                self._order.append(row)
+            else:
+                self._order.insert(self._bisect_right(key), row)
+            added.append(message)
+        return added
+
+    def snapshot(self):
+        """Cópia das colunas e índices, lida fora do event loop com a mesma interface"""
+        frozen = CompactMessageStore(self.message_cls)
+        frozen._id = array("q", self._id)
+        frozen._lamport = array("q", self._lamport)
+        frozen._node = array("q", self._node)
+        frozen._physical = array("d", self._physical)
+        frozen._offset = array("Q", self._offset)
+        frozen._content = bytes(self._content)
+        frozen._order = array("q", self._order)
+        frozen._row_of = array("q", self._row_of)
+        frozen._id_base = self._id_base
+        frozen.last_id = self.last_id
+        frozen.contiguous_id = self.contiguous_id
+        return frozen
+
+    def next_id(self) -> int:
+        """Reserva o próximo ID de mensagem (usado pelo líder)"""
+        self.last_id += 1
+        return self.last_id
+
+    def advance_last_id(self, upto: int):
+        """Garante que next_id() devolva IDs maiores que upto (ver MessageStore)"""
+        if upto > self.last_id:
+            self.last_id = upto
+
+    def _replace_columns(self, other):
+        """Troca as colunas pelas de other, de uma vez para os leitores em thread"""
+        with self._lock:
+            for name in self._COLUMNS:
+                setattr(self, name, getattr(other, name))
+
+    def truncate_after(self, after_id: int) -> list:
+        """Remove as mensagens com id > after_id (ver MessageStore); refaz as colunas"""
+        removed = [id for id in self._id if id > after_id]
+        if not removed:
+            return []
+        fresh = CompactMessageStore(self.message_cls)
+        fresh._id_base = fresh.contiguous_id = self._id_base
+        fresh.extend([self._view(row) for row in range(len(self._id)) if self._id[row] <= after_id])
+        self._replace_columns(fresh)
+        self.last_id = max(fresh.last_id, min(self.last_id, after_id))
+        self.contiguous_id = min(self.contiguous_id, after_id)
+        return sorted(removed)
+
+    def get(self, id: int):
+        """
+        Busca uma mensagem pelo ID
+
+        Returns:
+            Message: A mensagem, ou None se não existe
+        """
+        row = self._row(id)
+        return self._view(row) if row >= 0 else None
+
+    def _rows_by_id(self, start_id: int, end_id: int = None, limit: int = None) -> list:
+        """Linhas com start_id <= id <= end_id, em ordem de ID"""
+        base, row_of = self._id_base, self._row_of
+        last = base + len(row_of) - 1 if end_id is None else min(end_id, base + len(row_of) - 1)
+        rows = []
+        for i in range(max(start_id, base + 1) - base, last - base + 1):
+            if limit is not None and len(rows) >= limit:
+                break
+            row = row_of[i]
+            if row >= 0:
+                rows.append(row)
+        return rows
+
+    def range_by_id(self, start_id: int, end_id: int = None, limit: int = None):
+        """Mensagens com start_id <= id <= end_id, em ordem de ID (ver MessageStore)"""
+        return [self._view(row) for row in self._rows_by_id(start_id, end_id, limit)]
+
+    cursor_after = MessageStore.cursor_after
+
+    def cursor_after_id(self, id: int):
+        """Chave da mensagem com o ID dado, ou None se o ID não existe"""
+        row = self._row(id)
+        return None if row < 0 else self._key(row)
+
+    def _row_chunks(self, after: tuple, limit: int, chunk_size: int, encode):
+        """
+        Percurso de chunks() sobre números de linha; cada bloco passa por encode
+
+        Cada bloco é localizado, lido e codificado sob o lock (ver o
+        docstring da classe), a partir da chave do último bloco entregue.
+        """
+        remaining = limit
+        while remaining is None or remaining > 0:
+            n = chunk_size if remaining is None else min(chunk_size, remaining)
+            with self._lock:
+                pos = 0 if after is None else self._bisect_right(after)
+                rows = self._order[pos:pos + n]
+                if not rows:
+                    return
+                after = self._key(rows[-1])
+                chunk = encode(rows)
+            yield chunk
+            if remaining is not None:
+                remaining -= len(rows)
+
+    def _id_row_chunks(self, after_id: int, limit: int, chunk_size: int, encode):
+        """Percurso de id_chunks() sobre números de linha (ver _row_chunks)"""
+        remaining = limit
+        while remaining is None or remaining > 0:
+            n = chunk_size if remaining is None else min(chunk_size, remaining)
+            with self._lock:
+                rows = self._rows_by_id(after_id + 1, limit=n)
+                if not rows:
+                    return
+                after_id = self._id[rows[-1]]
+                chunk = encode(rows)
+            yield chunk
+            if remaining is not None:
+                remaining -= len(rows)
+
+    def _views(self, rows) -> list:
+        return [self._view(row) for row in rows]
+
+    def chunks(self, after: tuple = None, limit: int = None, chunk_size: int = 500):
+        """Percorre o log em ordem, em blocos, a partir de um cursor (ver MessageStore)"""
+        return self._row_chunks(after, limit, chunk_size, self._views)
+
+    def id_chunks(self, after_id: int, limit: int = None, chunk_size: int = 500):
+        """Mensagens com id > after_id em ordem de ID, em blocos (ver MessageStore)"""
+        return self._id_row_chunks(after_id, limit, chunk_size, self._views)
+
+    def ndjson(self, after: tuple = None, limit: int = None, chunk_size: int = 500):
+        """Mesmo percurso de chunks(), codificado direto das colunas"""
+        return self._row_chunks(after, limit, chunk_size, self._encode)
+
+    def id_ndjson(self, after_id: int, limit: int = None, chunk_size: int = 500):
+        """Mesmo percurso de id_chunks(), codificado direto das colunas"""
+        return self._id_row_chunks(after_id, limit, chunk_size, self._encode)
+
+    def key_range(self):
+        """(menor chave, maior chave) do log, ou None se está vazio"""
+        if not self._order:
+            return None
+        return self._key(self._order[0]), self._key(self._order[-1])
+
+    def export_rows(self, max_id: int) -> list:
+        """
+        Linhas com id <= max_id, em ordem (lamport_timestamp, node_id, id)
+
+        Returns:
+            list: Tuplas (id, lamport, node_id, physical, conteúdo UTF-8)
+        """
+        return [
+            (self._id[row], self._lamport[row], self._node[row], self._physical[row],
+             bytes(self._content[self._offset[row]:self._offset[row + 1]]))
+            for row in self._order if self._id[row] <= max_id
+        ]
+
+    def drop_through(self, max_id: int):
+        """
+        Remove as mensagens com id <= max_id (já seladas em disco)
+
+        As colunas são refeitas só com as linhas restantes; last_id e
+        contiguous_id não mudam.
+        """
+        keep = [row for row in range(len(self._id)) if self._id[row] > max_id]
+        new_row = array("q", [-1]) * len(self._id)
+        for new, row in enumerate(keep):
+            new_row[row] = new
+        fresh = CompactMessageStore(self.message_cls)
+        for row in keep:
+            fresh._content += self._content[self._offset[row]:self._offset[row + 1]]
+            fresh._offset.append(len(fresh._content))
+        fresh._id = array("q", (self._id[row] for row in keep))
+        fresh._lamport = array("q", (self._lamport[row] for row in keep))
+        fresh._node = array("q", (self._node[row] for row in keep))
+        fresh._physical = array("d", (self._physical[row] for row in keep))
+        fresh._order = array("q", (new_row[row] for row in self._order if new_row[row] >= 0))
+        fresh._row_of = array("q", [-1]) * max(self.last_id - max_id + 1, 1)
+        for new, id in enumerate(fresh._id):
+            fresh._row_of[id - max_id] = new
+        fresh._id_base = max_id
+        self._replace_columns(fresh)
+
+
+def create_store(message_cls, backend: str = MESSAGE_STORE):
+    """
+    Cria o store de mensagens do backend configurado
+
+    Args:
+        message_cls: Classe Message (usada pelo backend compact)
+        backend: objects | compact
+    """
+    if backend == "objects":
+        return MessageStore()
+    if backend == "compact":
+        return CompactMessageStore(message_cls)
+    raise ValueError(f"Unknown MESSAGE_STORE backend: {backend!r} (use objects or compact)")
@@ -0,0 +1,280 @@
+"""
+Métricas do nó no formato de texto do Prometheus (GET /metrics)
+
+Implementação mínima, sem dependências, pensada para ficar ligada sob carga:
+- Counter e Histogram guardam contadores em memória; observe() é uma busca
+  binária nos limites dos buckets e alguns incrementos sob um lock
+- Gauges são funções avaliadas só quando /metrics é lido, então valores como
+  tamanho do store e relógio Lamport não custam nada no caminho quente
+- MetricsMiddleware mede a latência de cada rota (até o último byte da
+  resposta, inclusive em streaming) no nível ASGI, sem o custo do
+  BaseHTTPMiddleware do Starlette
+
+Os buckets dos histogramas são cumulativos, como o Prometheus espera, e
+cada série com labels é criada no primeiro uso.
+"""
+
+import abc
+import bisect
+import threading
+import time
+
+
+# Limites (em segundos) dos buckets de latência
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    """Conjunto de métricas exportadas por /metrics"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Texto no formato de exposição do Prometheus"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric(abc.ABC):
+    """Métrica registrada; samples() produz as linhas de /metrics"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels=(), registry: Registry = REGISTRY):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        if registry is not None:
+            registry.register(self)
+
+    @abc.abstractmethod
+    def samples(self):
+        """Linhas de exposição da métrica (uma por série)"""
+
+
+class _ChildMetric(_Metric):
+    """Métrica com estado em memória, uma série (filho) por valor de labels"""
+
+    def __init__(self, name: str, help: str, labels=(), registry: Registry = REGISTRY):
+        self._lock = threading.Lock()
+        self._children = {}
+        super().__init__(name, help, labels, registry)
+
+    @abc.abstractmethod
+    def _new_child(self):
+        """Estado de uma série nova"""
+
+    def labels(self, *values):
+        """Série com os valores de label dados (criada no primeiro uso)"""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._children[key] = self._new_child()
+        return child
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_ChildMetric):
+    """Contador monotônico (ex: eleições, falhas de replicação)"""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def samples(self):
+        for key, child in list(self._children.items()):
+            yield f"{self.name}{_format_labels(self.label_names, key)} {_format_value(child.value)}"
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count", "_lock")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        """Context manager que observa a duração do bloco"""
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ("child", "start")
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Histogram(_ChildMetric):
+    """Histograma de latências (ou tamanhos), com buckets fixos"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS, registry: Registry = REGISTRY):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, help, labels, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def samples(self):
+        for key, child in list(self._children.items()):
+            with child._lock:
+                counts = list(child.counts)
+                total, count = child.sum, child.count
+            cumulative = 0
+            for bound, n in zip(self.bounds + (float("inf"),), counts):
+                cumulative += n
+                le = 'le="' + _format_value(float(bound)) + '"'
+                yield f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}"
+            labels = _format_labels(self.label_names, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class Gauge(_Metric):
+    """
+    Valor instantâneo calculado na leitura de /metrics
+
+    Args:
+        fn: Função sem argumentos que retorna o valor ou, para gauges com
+            labels, um dict {tupla de valores de label: valor}
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, fn, labels=(), registry: Registry = REGISTRY):
+        self.fn = fn
+        super().__init__(name, help, labels, registry)
+
+    def samples(self):
+        value = self.fn()
+        if not self.label_names:
+            if value is not None:
+                yield f"{self.name} {_format_value(value)}"
+            return
+        for key, v in value.items():
+            if v is None:
+                continue
+            key = key if isinstance(key, tuple) else (key,)
+            yield f"{self.name}{_format_labels(self.label_names, key)} {_format_value(v)}"
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mede a latência de cada rota conhecida
+
+    A duração vai do início da requisição até o envio do último bloco da
+    resposta. O label route é o template da rota que atendeu a requisição
+    (ex: /partitions/{index}/log), que o FastAPI deixa em scope["route"] ao
+    rotear; caminhos que não casam com nenhuma rota não são medidos (evita
+    séries sem limite com URLs arbitrárias).
+
+    Args:
+        app: Aplicação ASGI
+        histogram: Histogram com labels (method, route, status)
+        exclude: Rotas não medidas (ex: streams de longa duração)
+    """
+
+    def __init__(self, app, histogram: Histogram, exclude=()):
+        self.app = app
+        self.histogram = histogram
+        self.exclude = set(exclude)
+
+    def _template(self, scope):
+        """Template da rota roteada, ou None (sem rota, ou rota excluída)"""
+        path = getattr(scope.get("route"), "path", None)
+        return None if path in self.exclude else path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                route = self._template(scope)
+                if route is not None:
+                    self.histogram.labels(scope["method"], route, status[0]).observe(time.perf_counter() - start)
+
+        await self.app(scope, receive, send_wrapper)
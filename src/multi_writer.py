@@ -0,0 +1,308 @@
+"""
+Modo multi-writer sem líder (CONSENSUS_MODE=leaderless)
+
+Todo nó aceita escritas: carimba o timestamp (Lamport ou HLC) localmente,
+guarda no próprio store e responde ao cliente; a disseminação aos outros
+nós segue em background pelas filas de replicação (replication.py). A
+latência de uma escrita é a do nó local, sem ida e volta até um líder.
+
+A ordem total não precisa de líder: é a mesma chave de ordenação do store,
+(lamport_timestamp, node_id, id), que todos os nós calculam igual para as
+mesmas mensagens.
+
+IDs: cada nó gera IDs só seus, intercalados pela posição do nó na lista
+ordenada de nós (K nós): id = FIRST_ID + seq * K + posição. A sequência
+seq de cada origem não tem lacunas, então quem recebe sabe exatamente o que
+falta de cada origem (o ID 1 é a mensagem inicial "Hello" de cada nó). Os
+IDs ficam próximos no store, mas origens que escrevem em ritmos diferentes
+deixam lacunas permanentes: neste modo contiguous_id para na primeira
+delas, e o progresso por origem está em GET /multi_writer/status.
+
+Watermark de estabilidade: a ordem mesclada só é final até um ponto. Os
+timestamps de cada origem são crescentes, então depois de receber sem
+lacunas as mensagens de uma origem até a de timestamp L, nenhuma mensagem
+futura dessa origem tem timestamp <= L. Cada nó também anuncia aos outros,
+a cada MULTI_WRITER_GOSSIP_SECONDS, (última seq, relógio atual): depois de
+ter tudo até essa seq, o relógio anunciado vale como limite, o que faz o
+watermark avançar mesmo com uma origem parada. O watermark é o mínimo
+desses limites entre todas as origens (o deste nó é o próprio relógio);
+mensagens com timestamp <= watermark não mudam mais de posição. Um nó fora
+do ar congela o watermark até voltar: sem ouvir uma origem não há como
+saber o que ela ainda vai enviar.
+
+Reparo: quem responde o gossip informa até que seq tem as mensagens da
+origem; se esse cursor fica parado abaixo da última seq (a fila descartou
+um lote, ou o nó estava fora), a origem reenvia o bloco seguinte, como o
+loop de reparo do líder no modo Bully. Ao subir, o nó ainda busca em um
+vizinho (GET /log) o que perdeu; sem WAL, só aceita escritas depois disso,
+para não reutilizar sequências que os outros nós já têm.
+
+Configuração (variáveis de ambiente):
+- MULTI_WRITER_GOSSIP_SECONDS: intervalo do gossip de seq/relógio (padrão 0.2)
+- MULTI_WRITER_REPAIR_CHUNK:   mensagens por reenvio no reparo (padrão 5000)
+- MULTI_WRITER_RPC_TIMEOUT:    timeout do gossip em segundos (padrão 2)
+"""
+
+import asyncio
+import os
+
+import metrics
+import replication
+import wire
+from structured_log import get_logger
+
+
+MULTI_WRITER_GOSSIP_SECONDS = float(os.getenv("MULTI_WRITER_GOSSIP_SECONDS", "0.2"))
+MULTI_WRITER_REPAIR_CHUNK = int(os.getenv("MULTI_WRITER_REPAIR_CHUNK", "5000"))
+MULTI_WRITER_RPC_TIMEOUT = float(os.getenv("MULTI_WRITER_RPC_TIMEOUT", "2"))
+
+# Primeiro ID gerado; o ID 1 é a mensagem inicial local de cada nó
+FIRST_ID = 2
+
+log = get_logger("multi_writer")
+
+repairs_total = metrics.Counter(
+    "multi_writer_repairs_total", "Blocos reenviados pela origem a nós atrasados", labels=("peer",)
+)
+
+
+class _Origin:
+    """O que este nó já recebeu de uma origem"""
+
+    __slots__ = ("received", "lamport", "pending", "frontier")
+
+    def __init__(self):
+        # Maior seq recebida sem lacunas e o timestamp dessa mensagem
+        self.received = -1
+        self.lamport = 0
+        # seq -> timestamp das mensagens recebidas depois de uma lacuna
+        self.pending = {}
+        # Relógio anunciado no gossip (vale depois de ter tudo até a seq anunciada)
+        self.frontier = 0
+
+
+class _Peer:
+    """Cursor de um vizinho sobre as mensagens originadas neste nó"""
+
+    __slots__ = ("server", "acked", "seen", "in_flight")
+
+    def __init__(self, server):
+        self.server = server
+        self.acked = -1
+        self.seen = None
+        self.in_flight = False
+
+
+class MultiWriter:
+    """
+    Estado do modo multi-writer: IDs, sequências por origem e watermark
+
+    Todos os métodos rodam no event loop (exceto lookup, que só lê o store).
+    """
+
+    def __init__(self, my_id: int, node_ids, clock, lookup, path: str = "/message_received/batch"):
+        """
+        Args:
+            my_id: ID deste nó
+            node_ids: IDs de todos os nós do cluster (este incluído)
+            clock: Relógio do nó (LamportClock ou HybridLogicalClock)
+            lookup: lookup(id) -> Message ou None (lê do store, para o reparo)
+            path: Endpoint que recebe os lotes nos vizinhos
+        """
+        self.my_id = my_id
+        self.node_ids = sorted(set(node_ids) | {my_id})
+        self.position = {node_id: i for i, node_id in enumerate(self.node_ids)}
+        self.stride = len(self.node_ids)
+        self.clock = clock
+        self.lookup = lookup
+        self.path = path
+        self.origins = {node_id: _Origin() for node_id in self.node_ids}
+        self.next_seq = 0
+        self.peers = {}
+        # Mesmo objeto em todos os lotes: a fila só junta lotes com o mesmo on_ack
+        self._on_ack = self.record_ack
+        # Sem WAL o nó só aceita escritas depois de sincronizar com um vizinho
+        self.ready = False
+
+    # ------------------------------------------------------------------
+    # IDs e sequências
+    # ------------------------------------------------------------------
+
+    def message_id(self, node_id: int, seq: int) -> int:
+        """ID da mensagem seq da origem node_id"""
+        return FIRST_ID + seq * self.stride + self.position[node_id]
+
+    def origin_of(self, id: int):
+        """(origem, seq) de um ID, ou None para IDs fora do esquema (ex: o "Hello")"""
+        if id < FIRST_ID:
+            return None
+        seq, position = divmod(id - FIRST_ID, self.stride)
+        return self.node_ids[position], seq
+
+    def allocate(self, n: int) -> list:
+        """
+        Reserva os IDs das próximas n mensagens originadas neste nó
+
+        Returns:
+            list: IDs consecutivos na sequência deste nó
+        """
+        first = self.next_seq
+        self.next_seq += n
+        return [self.message_id(self.my_id, seq) for seq in range(first, first + n)]
+
+    def observe(self, batch):
+        """
+        Registra mensagens guardadas no store (locais, replicadas ou do WAL)
+
+        Avança, por origem, a seq contígua e o timestamp correspondente.
+        """
+        for message in batch:
+            origin = self.origin_of(message.id)
+            if origin is None:
+                continue
+            node_id, seq = origin
+            state = self.origins.get(node_id)
+            if state is None or seq <= state.received:
+                continue
+            if node_id == self.my_id and seq >= self.next_seq:
+                self.next_seq = seq + 1
+            state.pending[seq] = message.lamport_timestamp
+            while state.received + 1 in state.pending:
+                state.received += 1
+                state.lamport = state.pending.pop(state.received)
+
+    def received_through(self, node_id: int) -> int:
+        """Maior seq da origem recebida sem lacunas (-1 se nenhuma)"""
+        state = self.origins.get(node_id)
+        return -1 if state is None else state.received
+
+    # ------------------------------------------------------------------
+    # Watermark de estabilidade
+    # ------------------------------------------------------------------
+
+    def stable_lamport(self) -> int:
+        """
+        Maior timestamp até o qual a ordem mesclada é final
+
+        Returns:
+            int: Toda mensagem com lamport_timestamp <= este valor já está
+                 neste nó, e nenhuma outra vai ser ordenada antes dela
+        """
+        bound = self.clock.get_time()
+        for node_id, state in self.origins.items():
+            if node_id != self.my_id:
+                bound = min(bound, max(state.lamport, state.frontier))
+        return bound
+
+    def on_gossip(self, origin: int, seq: int, lamport: int) -> int:
+        """
+        Gossip de uma origem: já enviou tudo até seq e o relógio dela é lamport
+
+        Returns:
+            int: Seq da origem que este nó tem sem lacunas (volta como ack)
+        """
+        state = self.origins.get(origin)
+        if state is None:
+            return -1
+        if state.received >= seq and lamport > state.frontier:
+            state.frontier = lamport
+        return state.received
+
+    # ------------------------------------------------------------------
+    # Disseminação e reparo
+    # ------------------------------------------------------------------
+
+    def start(self, servers):
+        """Inicia o gossip/reparo com os outros nós (no event loop)"""
+        for server in servers:
+            if server.id and server.id != self.my_id:
+                self.peers[server.id] = _Peer(server)
+        asyncio.ensure_future(self._gossip_loop())
+
+    def record_ack(self, server, body):
+        """Ack de um vizinho (lote replicado ou gossip) com o cursor da nossa origem"""
+        received = body.get("origin_received") if isinstance(body, dict) else None
+        peer = self.peers.get(server.id)
+        if peer is None or received is None:
+            return
+        peer.acked = max(peer.acked, received)
+        if received >= self.next_seq:
+            # O vizinho tem mensagens nossas que este nó perdeu (ex: reinício
+            # sem WAL): pular essas seqs para não gerar IDs repetidos
+            log.warning("Peer is ahead of our own sequence", peer=server.id, peer_seq=received, next_seq=self.next_seq)
+            self.next_seq = received + 1
+
+    async def replicate(self, batch):
+        """Coloca um lote originado aqui na fila de cada vizinho, sem esperar"""
+        await replication.replicate(
+            [peer.server for peer in self.peers.values()], self.path,
+            wire.EncodedBatch(batch, prev_id=batch[0].id - self.stride), replication.ACK_LEADER,
+            on_ack=self._on_ack,
+        )
+
+    async def _gossip_loop(self):
+        while True:
+            await asyncio.sleep(MULTI_WRITER_GOSSIP_SECONDS)
+            # seq e relógio lidos juntos, sem await entre a reserva e o store
+            seq = self.next_seq - 1
+            lamport = self.clock.get_time()
+            for peer in self.peers.values():
+                if not peer.in_flight:
+                    peer.in_flight = True
+                    asyncio.ensure_future(self._gossip(peer, seq, lamport))
+
+    async def _gossip(self, peer: _Peer, seq: int, lamport: int):
+        try:
+            response = await peer.server.apost(
+                "/multi_writer/gossip", json={"origin": self.my_id, "seq": seq, "lamport": lamport},
+                timeout=MULTI_WRITER_RPC_TIMEOUT,
+            )
+            if response.status_code == 200:
+                self.record_ack(peer.server, response.json())
+                await self._repair(peer)
+        except Exception as e:
+            log.debug("Gossip failed", peer=peer.server.id, error=repr(e), sample=True)
+        finally:
+            peer.in_flight = False
+
+    async def _repair(self, peer: _Peer):
+        """Reenvia o próximo bloco a um vizinho cujo cursor ficou parado"""
+        cursor = peer.acked
+        stalled = peer.seen == cursor
+        peer.seen = cursor
+        last = self.next_seq - 1
+        if cursor >= last or not stalled or replication.follower_queue(peer.server).busy():
+            return
+        chunk = []
+        for seq in range(cursor + 1, min(last, cursor + MULTI_WRITER_REPAIR_CHUNK) + 1):
+            message = self.lookup(self.message_id(self.my_id, seq))
+            if message is None:
+                break
+            chunk.append(message)
+        if not chunk:
+            return
+        ack = await replication.deliver(
+            peer.server, self.path, wire.EncodedBatch(chunk, prev_id=chunk[0].id - self.stride)
+        )
+        if ack is not None:
+            self.record_ack(peer.server, ack)
+            repairs_total.labels(peer.server.id).inc()
+            log.info("Repaired peer", peer=peer.server.id, seqs=f"{cursor + 1}..{cursor + len(chunk)}")
+
+    def status(self) -> dict:
+        """Sequências por origem, cursores dos vizinhos e watermark"""
+        return {
+            "ready": self.ready,
+            "next_seq": self.next_seq,
+            "stable_lamport": self.stable_lamport(),
+            "origins": {
+                node_id: {
+                    "received": state.received,
+                    "lamport": state.lamport,
+                    "frontier": state.frontier,
+                    "pending": len(state.pending),
+                }
+                for node_id, state in self.origins.items()
+            },
+            "peers": {peer_id: peer.acked for peer_id, peer in self.peers.items()},
+        }
@@ -0,0 +1,560 @@
+"""
+Log particionado com um líder Bully por partição (PARTITIONS=N)
+
+O log global passa a ser N logs independentes. A partição de cada escrita
+vem de uma chave do cliente (crc32(chave) % N, estável entre processos);
+escritas da mesma chave ficam na mesma partição, em ordem. Sem chave, a
+escrita vai para uma partição liderada pelo nó que a recebeu, sem
+reencaminhamento.
+
+Cada partição tem:
+- o seu store (IDs próprios, a partir de 1) e o seu WAL
+  (DATA_DIR/partitions/<i>/wal)
+- o seu líder, eleito com a mesma BullyElection do líder global, mas com a
+  prioridade dos nós rotacionada pelo índice da partição: a partição i fica
+  com o nó de posição (K - 1 - i) mod K na lista ordenada de K nós. Com
+  N = K cada nó lidera uma partição: o trabalho de líder (carimbar,
+  ordenar, replicar e responder) fica dividido entre os nós. A replicação,
+  o store e o WAL de toda partição continuam em todos os nós, então o
+  particionamento não aumenta a capacidade de escrita de um nó
+- o seu group commit e a sua replicação, com a política WRITE_ACK e as
+  mesmas filas por follower (em POST /partitions/<i>/replicate)
+
+Toda partição é replicada em todos os nós; o particionamento distribui a
+liderança (quem carimba, ordena e responde), não os dados. O timestamp
+Lamport (ou HLC) vem do relógio do nó, compartilhado pelas partições, então
+(lamport_timestamp, node_id) é único no cluster inteiro e define a ordem da
+leitura scatter-gather: o merge das partições (heapq.merge), seja das
+réplicas locais, seja pedindo a cada líder a sua partição. As leituras do
+log global (GET /, GET /messages, /events) usam esse merge; cada mensagem
+leva o campo partition, porque o id é o da partição.
+
+Detecção de falhas: a cada PARTITION_CHECK_SECONDS este nó consulta
+GET /partitions nos outros nós; um líder sem resposta deixa as suas
+partições sem líder e a eleição delas começa. Um nó que se anuncia líder
+de uma partição com rank maior que o líder conhecido é adotado (um nó que
+volta vence a eleição com um term menor que o dos outros, e o COORDINATOR
+dele é ignorado até ele repetir a eleição com um term maior). A mesma
+consulta informa o último ID de cada partição em cada nó: um follower
+parado abaixo do líder busca o que falta (GET /partitions/<i>/log), e um
+novo líder só aceita escritas depois de uma verificação completa e de ter
+tudo o que os outros nós têm da partição (ex: reinício sem WAL), para não
+reutilizar IDs. Uma réplica que ainda assim tem um ID com outro conteúdo
+recusa o lote (conflict_id), e o líder manda ela descartar o sufixo
+divergente (POST /partitions/<i>/resync) e buscar o resto de novo.
+
+Configuração (variáveis de ambiente):
+- PARTITIONS:               número de partições (padrão 1 = sem particionamento)
+- PARTITION_CHECK_SECONDS:  intervalo da verificação dos líderes (padrão 1)
+- PARTITION_CHECK_TIMEOUT:  timeout dessa consulta em segundos (padrão 1)
+"""
+
+import asyncio
+import heapq
+import os
+import time
+import zlib
+
+import message_store
+import replication
+import wal
+import wire
+from election import BullyElection
+from group_commit import GroupCommitter
+from message_store import create_store
+from structured_log import get_logger
+
+
+PARTITIONS = int(os.getenv("PARTITIONS", "1"))
+PARTITION_CHECK_SECONDS = float(os.getenv("PARTITION_CHECK_SECONDS", "1"))
+PARTITION_CHECK_TIMEOUT = float(os.getenv("PARTITION_CHECK_TIMEOUT", "1"))
+
+# Mensagens por bloco ao aplicar um catch-up
+CATCHUP_CHUNK = 5000
+
+log = get_logger("partitions")
+
+
+class PartitionUnavailable(Exception):
+    """Escrita que a partição não pôde confirmar (sem líder aqui ou sem quorum)"""
+
+    def __init__(self, partition: int, reason: str, leader=None):
+        super().__init__(reason)
+        self.partition = partition
+        self.reason = reason
+        self.leader = leader
+
+
+def partition_for(key: str, n: int) -> int:
+    """Partição de uma chave (crc32, igual em todos os nós e reinícios)"""
+    return zlib.crc32(key.encode("utf-8")) % n
+
+
+def partition_rank(node_ids, index: int):
+    """
+    Prioridade dos nós na eleição da partição index
+
+    Returns:
+        function: rank(node_id); o maior rank vence a eleição Bully
+    """
+    ordered = sorted(node_ids)
+    position = {node_id: i for i, node_id in enumerate(ordered)}
+    return lambda node_id: (position.get(node_id, -1) + index) % len(ordered)
+
+
+def merge_partitions(streams, limit: int = None):
+    """
+    Merge das mensagens de cada partição numa única ordem Lamport
+
+    Args:
+        streams: Um iterável de Message por partição (na ordem dos índices),
+                 cada um já em ordem (lamport, node_id)
+        limit: Quantidade máxima de mensagens
+
+    Yields:
+        tuple: (índice da partição, Message), por (lamport, node_id, partição, id)
+    """
+    def keyed(index, stream):
+        for message in stream:
+            yield (message.lamport_timestamp, message.node_id, index, message.id), message
+
+    merged = heapq.merge(*(keyed(index, stream) for index, stream in enumerate(streams)), key=lambda item: item[0])
+    for count, (key, message) in enumerate(merged):
+        if limit is not None and count >= limit:
+            return
+        yield key[2], message
+
+
+def tagged_json(index: int, message) -> str:
+    """JSON da mensagem com o campo partition"""
+    return '{"partition":%d,' % index + message.model_dump_json()[1:]
+
+
+def tagged_ndjson(items, chunk_size: int = 500):
+    """
+    Codifica (partição, Message) como NDJSON, com o campo partition em cada linha
+
+    Yields:
+        bytes: Um pedaço de até chunk_size linhas
+    """
+    lines = []
+    for index, message in items:
+        lines.append(tagged_json(index, message) + "\n")
+        if len(lines) >= chunk_size:
+            yield "".join(lines).encode()
+            lines = []
+    if lines:
+        yield "".join(lines).encode()
+
+
+class Partition:
+    """
+    Store, WAL, líder e replicação de uma partição
+
+    on_apply(índice, mensagens) é chamada com as mensagens que entram no
+    store da partição (criadas aqui ou replicadas), como o feed do log global.
+    """
+
+    def __init__(self, index: int, my_id: int, servers, message_cls, clock, data_dir: str, write_ack: str,
+                 on_apply=None):
+        self.index = index
+        self.my_id = my_id
+        self.servers = servers
+        self.message_cls = message_cls
+        self.clock = clock
+        self.write_ack = write_ack
+        self.on_apply = on_apply
+        self.path = f"/partitions/{index}/replicate"
+        # O backend segmented é só do log global
+        backend = "objects" if message_store.MESSAGE_STORE == "objects" else "compact"
+        self.store = create_store(message_cls, backend)
+        self.wal = None
+        if wal.WAL_ENABLED:
+            self.wal = wal.WriteAheadLog(os.path.join(data_dir, str(index), "wal"), message_cls)
+            recovered, recovered_lamport = self.wal.recover()
+            self.store.extend(recovered)
+            if recovered_lamport:
+                clock.update(recovered_lamport)
+
+        self.leader = None
+        self.suspected = set()
+        self.elector = BullyElection(
+            my_id, servers, lambda: self.leader, self.set_leader, self.suspected,
+            rank=partition_rank([server.id for server in servers], index), partition=index,
+        )
+        self.committer = GroupCommitter(self.commit)
+        self._catch_up_running = False
+        # contiguous_id na verificação anterior, para detectar follower parado
+        self._seen = None
+        # Último ID da partição em cada outro nó (da última verificação)
+        self.peer_last = {}
+        # Como líder: já passou por uma verificação completa dos outros nós
+        self.checked = False
+        # Como líder: réplicas com um POST /resync em andamento
+        self._resyncing = set()
+
+    def set_leader(self, leader):
+        """Atualiza o líder da partição (chamado pela thread de eleição)"""
+        if leader != self.leader:
+            log.info("Partition leader changed", partition=self.index, old=self.leader, new=leader)
+            self.checked = False
+            self.leader = leader
+
+    def _persist(self, new_messages):
+        """WAL e on_apply das mensagens que acabaram de entrar no store"""
+        if new_messages and self.on_apply is not None:
+            self.on_apply(self.index, new_messages)
+        if self.wal is None or not new_messages:
+            return
+        self.wal.append(new_messages)
+        if self.wal.snapshot_due():
+            self.wal.start_snapshot(self.store)
+
+    async def durable(self):
+        """Espera o WAL da partição gravar tudo o que já foi enfileirado"""
+        if self.wal is not None:
+            await asyncio.wrap_future(self.wal.durable())
+
+    # --- líder ---
+
+    async def commit(self, contents):
+        """
+        Cria e replica um lote na partição (função do GroupCommitter)
+
+        Returns:
+            list: ID (na partição) de cada mensagem
+
+        Raises:
+            PartitionUnavailable: Este nó não lidera a partição, ou a
+                                  política WRITE_ACK não foi atingida
+        """
+        if self.leader != self.my_id:
+            raise PartitionUnavailable(self.index, "Not the partition leader", self.leader)
+        if not self.checked or self.store.last_id < max(self.peer_last.values(), default=0):
+            raise PartitionUnavailable(self.index, "Partition leader catching up", self.leader)
+        first_lamport = self.clock.reserve(len(contents))
+        now = time.time()
+        batch = [
+            self.message_cls(
+                id=self.store.next_id(), content=content, lamport_timestamp=first_lamport + offset,
+                node_id=self.my_id, physical_timestamp=now,
+            )
+            for offset, content in enumerate(contents)
+        ]
+        self.store.extend(batch)
+        self._persist(batch)
+
+        followers = [server for server in self.servers if server.id and server.id != self.my_id]
+        acked = await replication.replicate(
+            followers, self.path, wire.EncodedBatch(batch, prev_id=batch[0].id - 1), self.write_ack,
+            on_ack=self.record_ack,
+        )
+        if not acked:
+            raise PartitionUnavailable(self.index, "Replication quorum not reached", self.leader)
+        await self.durable()
+        return [message.id for message in batch]
+
+    def record_ack(self, server, ack):
+        """Num ack com conflict_id, agenda a ressincronização da réplica"""
+        if ack.get("conflict_id") and self.leader == self.my_id and server.id not in self._resyncing:
+            self._resyncing.add(server.id)
+            asyncio.ensure_future(self.resync(server, ack["conflict_id"]))
+
+    async def resync(self, server, conflict_id: int):
+        """Manda a réplica descartar a partição a partir de conflict_id (ela busca o resto por catch-up)"""
+        try:
+            response = await server.apost(
+                f"/partitions/{self.index}/resync",
+                params={"leader_id": self.my_id, "after_id": conflict_id - 1},
+            )
+            log.warning(
+                "Partition replica resync", partition=self.index, follower=server.id,
+                after_id=conflict_id - 1, status=response.status_code, body=response.json(),
+            )
+        except Exception as e:
+            log.warning("Partition resync failed", partition=self.index, follower=server.id, error=repr(e))
+        finally:
+            self._resyncing.discard(server.id)
+
+    # --- follower ---
+
+    def apply(self, batch) -> list:
+        """Guarda mensagens vindas do líder da partição (relógio, store e WAL)"""
+        self.clock.update(max(message.lamport_timestamp for message in batch))
+        added = self.store.extend(batch)
+        self._persist(added)
+        return added
+
+    def receive(self, batch, prev_id=None) -> dict:
+        """
+        Lote replicado pelo líder da partição
+
+        Como receive_batch do log global: com prev_id, o cursor avança até o
+        fim do lote se não há lacuna; senão um catch-up é agendado.
+
+        Um lote com algum ID já guardado com outro conteúdo é recusado
+        inteiro (conflict_id).
+
+        Returns:
+            dict: Quantidade recebida e cursor da partição (contiguous_id);
+                  num conflito, conflict_id
+        """
+        conflict = message_store.find_conflict(self.store, batch)
+        if conflict is not None:
+            log.warning("Replicated batch conflicts with stored message", partition=self.index, id=conflict.id)
+            return {
+                "status": "conflict", "received": 0,
+                "contiguous_id": self.store.contiguous_id, "conflict_id": conflict.id,
+            }
+        if batch:
+            self.apply(batch)
+            if prev_id is not None:
+                if self.store.contiguous_id >= prev_id:
+                    self.store.mark_contiguous(batch[-1].id)
+                else:
+                    source = next((s for s in self.servers if s.id == self.leader), None)
+                    if source is not None and self.leader != self.my_id:
+                        asyncio.ensure_future(self.catch_up(source))
+        return {"status": "ok", "received": len(batch), "contiguous_id": self.store.contiguous_id}
+
+    async def catch_up(self, source):
+        """Busca no líder (GET /partitions/<i>/log) o que falta nesta réplica"""
+        if self._catch_up_running:
+            return
+        self._catch_up_running = True
+        received = 0
+        try:
+            async with source.astream(
+                "GET", f"/partitions/{self.index}/log", params={"after_id": self.store.contiguous_id}, timeout=60
+            ) as response:
+                block = []
+                async for line in response.aiter_lines():
+                    if line:
+                        block.append(self.message_cls.model_validate_json(line))
+                    if len(block) >= CATCHUP_CHUNK:
+                        received += self._apply_block(block)
+                        block = []
+                if block:
+                    received += self._apply_block(block)
+            log.info("Partition catch-up finished", partition=self.index, leader=source.id, messages=received)
+        except Exception as e:
+            log.warning("Partition catch-up failed", partition=self.index, leader=source.id, error=repr(e))
+        finally:
+            self._catch_up_running = False
+
+    def truncate(self, leader_id: int, after_id: int) -> list:
+        """
+        Descarta as mensagens da partição com id > after_id (store e WAL)
+
+        Args:
+            leader_id: Nó que pede; tem que ser o líder conhecido da partição
+            after_id: Último ID mantido
+
+        Returns:
+            list: IDs removidos
+
+        Raises:
+            PartitionUnavailable: leader_id não é o líder da partição
+        """
+        if leader_id != self.leader or self.leader == self.my_id:
+            raise PartitionUnavailable(self.index, "Not the partition leader", self.leader)
+        removed = self.store.truncate_after(after_id)
+        if removed and self.wal is not None:
+            self.wal.truncate(after_id)
+        log.warning("Truncated divergent suffix", partition=self.index, after_id=after_id, removed=len(removed))
+        source = next((s for s in self.servers if s.id == self.leader), None)
+        if source is not None:
+            asyncio.ensure_future(self.catch_up(source))
+        return removed
+
+    def _apply_block(self, block) -> int:
+        self.apply(block)
+        self.store.mark_contiguous(block[-1].id)
+        return len(block)
+
+    def stats(self) -> dict:
+        return {
+            "leader": self.leader,
+            "last_id": self.store.last_id,
+            "contiguous_id": self.store.contiguous_id,
+            "size": len(self.store),
+        }
+
+    def close(self):
+        if self.wal is not None:
+            self.wal.close()
+
+
+class PartitionedLog:
+    """
+    As N partições deste nó, a escolha de partição e a leitura merge
+
+    Args:
+        n: Número de partições
+        my_id: ID deste nó
+        servers: Lista de Server do cluster (este nó incluído)
+        message_cls: Classe Message
+        clock: Relógio do nó (compartilhado pelas partições)
+        data_dir: Diretório base (DATA_DIR/partitions)
+        write_ack: Política de confirmação das escritas replicadas
+        on_apply: on_apply(índice, mensagens) para as mensagens que entram
+                  em qualquer partição (ver Partition)
+    """
+
+    def __init__(self, n: int, my_id: int, servers, message_cls, clock, data_dir: str, write_ack: str,
+                 on_apply=None):
+        self.my_id = my_id
+        self.servers = servers
+        self.servers_by_id = {server.id: server for server in servers}
+        self.message_cls = message_cls
+        self.partitions = [
+            Partition(i, my_id, servers, message_cls, clock, data_dir, write_ack, on_apply) for i in range(n)
+        ]
+        self._next_local = 0
+
+    def __len__(self):
+        return len(self.partitions)
+
+    def start(self):
+        """Inicia as eleições e a verificação dos líderes (no event loop)"""
+        for partition in self.partitions:
+            partition.elector.start()
+        asyncio.ensure_future(self._monitor_loop())
+
+    def choose(self, key: str = None) -> int:
+        """
+        Partição de uma escrita
+
+        Com chave, crc32(chave) % N. Sem chave, uma partição liderada por
+        este nó (alternando entre elas), ou a 0 se não lidera nenhuma.
+        """
+        if key is not None:
+            return partition_for(key, len(self.partitions))
+        local = [partition.index for partition in self.partitions if partition.leader == self.my_id]
+        if not local:
+            return 0
+        self._next_local = (self._next_local + 1) % len(local)
+        return local[self._next_local]
+
+    # --- leitura scatter-gather ---
+
+    def size(self) -> int:
+        """Mensagens em todas as partições locais"""
+        return sum(len(partition.store) for partition in self.partitions)
+
+    def get(self, index: int, id: int):
+        """Mensagem id da partição index, ou None"""
+        if not 0 <= index < len(self.partitions):
+            return None
+        return self.partitions[index].store.get(id)
+
+    def merged(self, limit: int = None, chunk_size: int = 500, after: tuple = None):
+        """
+        Mensagens de todas as partições locais em ordem Lamport
+
+        Args:
+            limit: Quantidade máxima de mensagens
+            chunk_size: Mensagens lidas por vez de cada partição
+            after: Cursor (lamport, node_id, id) exclusivo; como
+                   (lamport_timestamp, node_id) é único no cluster, o mesmo
+                   cursor vale em todas as partições
+
+        Returns:
+            iterator: (índice da partição, Message), por (lamport, node_id)
+        """
+        def ordered(partition):
+            for chunk in partition.store.chunks(after=after, chunk_size=chunk_size):
+                yield from chunk
+
+        return merge_partitions([ordered(partition) for partition in self.partitions], limit)
+
+    async def gather_from_leaders(self, limit: int = None) -> list:
+        """
+        Scatter-gather pelos líderes: cada partição lida no seu líder atual
+
+        As partições que este nó lidera (ou sem líder conhecido) são lidas
+        localmente; as outras, em paralelo, via GET /partitions/<i>/messages.
+
+        Returns:
+            list: (índice da partição, Message) em ordem Lamport
+        """
+        async def fetch(partition):
+            server = self.servers_by_id.get(partition.leader)
+            if partition.leader == self.my_id or server is None:
+                return [
+                    message for chunk in partition.store.chunks(limit=limit) for message in chunk
+                ]
+            params = {"limit": limit} if limit is not None else {}
+            response = await server.aget(f"/partitions/{partition.index}/messages", params=params, timeout=30)
+            response.raise_for_status()
+            return [self.message_cls.model_validate_json(line) for line in response.text.splitlines() if line]
+
+        results = await asyncio.gather(*(fetch(partition) for partition in self.partitions))
+        return list(merge_partitions(results, limit))
+
+    # --- detecção de falhas dos líderes ---
+
+    async def _monitor_loop(self):
+        while True:
+            await asyncio.sleep(PARTITION_CHECK_SECONDS)
+            for partition in self.partitions:
+                if partition.leader is None:
+                    partition.elector.trigger("no partition leader")
+            await asyncio.gather(*(
+                self._check(server) for server in self.servers if server.id and server.id != self.my_id
+            ))
+            for partition in self.partitions:
+                if partition.leader == self.my_id:
+                    partition.checked = True
+
+    async def _check(self, server):
+        """Consulta um nó; sem resposta, as partições que ele lidera vão a eleição"""
+        try:
+            response = await server.aget("/partitions", timeout=PARTITION_CHECK_TIMEOUT)
+            status = response.json()["partitions"]
+        except Exception as e:
+            for partition in self.partitions:
+                partition.peer_last.pop(server.id, None)
+                if partition.leader == server.id:
+                    log.warning("Partition leader not responding", partition=partition.index, leader=server.id,
+                                error=repr(e), sample=True)
+                    partition.suspected.add(server.id)
+                    partition.set_leader(None)
+                    partition.elector.trigger("partition leader not responding")
+            return
+
+        for partition, remote in zip(self.partitions, status):
+            partition.peer_last[server.id] = remote["last_id"]
+            rank = partition.elector.rank
+            if remote["leader"] == server.id != partition.leader and (
+                partition.leader is None or rank(server.id) > rank(partition.leader)
+            ):
+                log.info("Higher-ranked partition leader found", partition=partition.index, leader=server.id)
+                partition.suspected.discard(server.id)
+                partition.set_leader(server.id)
+            if partition.leader == self.my_id:
+                # Líder sem parte da partição: buscar antes de aceitar escritas
+                if remote["last_id"] > partition.store.last_id:
+                    asyncio.ensure_future(partition.catch_up(server))
+                continue
+            if partition.leader != server.id:
+                continue
+            if remote["leader"] is not None and remote["leader"] != server.id:
+                # O nó não lidera mais a partição (como em check_leader)
+                partition.set_leader(remote["leader"])
+                continue
+            cursor = partition.store.contiguous_id
+            stalled = partition._seen == cursor
+            partition._seen = cursor
+            if cursor < remote["last_id"] and stalled:
+                asyncio.ensure_future(partition.catch_up(server))
+
+    def status(self) -> dict:
+        return {
+            "node_id": self.my_id,
+            "partitions": [partition.stats() for partition in self.partitions],
+        }
+
+    def close(self):
+        for partition in self.partitions:
+            partition.close()
@@ -0,0 +1,743 @@
+"""
+Modo de consenso Raft (CONSENSUS_MODE=raft)
+
+Alternativa ao líder Bully + replicação com ack (election.py,
+replication.py). O modelo de dados não muda: cada entrada do log Raft é uma
+mensagem (conteúdo, timestamp Lamport, nó de origem), e as entradas
+confirmadas viram Message no MessageStore, na ordem do log. O ID da
+mensagem é atribuído na aplicação, então é o mesmo em todos os nós.
+
+O que o modo garante e o esquema Bully não:
+- terms e votos persistidos: no máximo um líder por term
+- eleição só de candidato com log atualizado (último term e último índice
+  pelo menos iguais aos de quem vota); o líder nunca perde entradas
+  confirmadas
+- commit por maioria: uma entrada só é confirmada (e só então aplicada e
+  respondida ao cliente) quando está no log da maioria; um líder só conta
+  réplicas de entradas do próprio term (as anteriores são confirmadas
+  junto, via a entrada vazia que todo novo líder grava)
+- um follower com entradas de um líder deposto as descarta (truncamento)
+  ao receber as do líder atual
+
+AppendEntries com batching e pipelining: por follower, até
+RAFT_MAX_INFLIGHT requisições em voo, cada uma com até RAFT_MAX_BATCH
+entradas, sem esperar a resposta da anterior. Num enlace com RTT alto o
+follower recebe um lote novo a cada lote enviado, não a cada RTT. Como as
+requisições podem chegar fora de ordem (conexões diferentes do pool), o
+follower espera até RAFT_REORDER_WAIT_SECONDS pela entrada anterior antes de
+rejeitar. Numa rejeição, o líder volta o next_index do follower e descarta
+as respostas das requisições que já estavam em voo (gerações).
+
+Lease de leitura: um follower não vota em ninguém enquanto ouve o líder
+(RAFT_ELECTION_TIMEOUT_MIN desde a última AppendEntries). Então o líder
+mantém o lease até envio_confirmado_pela_maioria + RAFT_ELECTION_TIMEOUT_MIN
+* (1 - LEASE_DRIFT), contado só depois de confirmar a entrada do seu term.
+
+Persistência em DATA_DIR/raft: meta.json (term e voto) e log.jsonl (uma
+entrada JSON por linha, reescrito quando há truncamento), gravados por uma
+thread própria (RaftStorage). Nenhuma resposta (voto, AppendEntries) sai
+antes do que ela afirma estar em disco, e o líder só se conta na maioria
+até o índice que já gravou. Sem snapshots do
+log Raft: depois de um reinício o nó reaplica o log a partir da entrada 1,
+conforme o líder informa o commit.
+
+Configuração (variáveis de ambiente):
+- RAFT_ELECTION_TIMEOUT_MIN / _MAX: timeout de eleição sorteado (padrão 1 / 2 s)
+- RAFT_HEARTBEAT_SECONDS:  AppendEntries vazia sem tráfego (padrão 0.15)
+- RAFT_MAX_BATCH:          entradas por AppendEntries (padrão 500)
+- RAFT_MAX_INFLIGHT:       AppendEntries em voo por follower (padrão 4)
+- RAFT_RPC_TIMEOUT:        timeout de cada RPC em segundos (padrão 2)
+- RAFT_REORDER_WAIT_SECONDS: espera por AppendEntries fora de ordem (padrão 0.5)
+- RAFT_FSYNC:              fsync do log e do term antes de responder (padrão 1)
+"""
+
+import asyncio
+import concurrent.futures
+import json
+import os
+import queue
+import random
+import threading
+import time
+
+import metrics
+from read_consistency import LEASE_DRIFT
+from structured_log import get_logger
+
+
+RAFT_ELECTION_TIMEOUT_MIN = float(os.getenv("RAFT_ELECTION_TIMEOUT_MIN", "1"))
+RAFT_ELECTION_TIMEOUT_MAX = float(os.getenv("RAFT_ELECTION_TIMEOUT_MAX", "2"))
+RAFT_HEARTBEAT_SECONDS = float(os.getenv("RAFT_HEARTBEAT_SECONDS", "0.15"))
+RAFT_MAX_BATCH = int(os.getenv("RAFT_MAX_BATCH", "500"))
+RAFT_MAX_INFLIGHT = int(os.getenv("RAFT_MAX_INFLIGHT", "4"))
+RAFT_RPC_TIMEOUT = float(os.getenv("RAFT_RPC_TIMEOUT", "2"))
+RAFT_REORDER_WAIT_SECONDS = float(os.getenv("RAFT_REORDER_WAIT_SECONDS", "0.5"))
+RAFT_FSYNC = os.getenv("RAFT_FSYNC", "1") == "1"
+
+FOLLOWER = "follower"
+CANDIDATE = "candidate"
+LEADER = "leader"
+
+log = get_logger("raft")
+
+raft_elections_total = metrics.Counter("raft_elections_total", "Candidaturas Raft iniciadas por este nó")
+append_entries_total = metrics.Counter(
+    "raft_append_entries_total", "AppendEntries enviadas pelo líder, por resultado", labels=("result",)
+)
+
+
+class NotLeaderError(Exception):
+    """Este nó não é (ou deixou de ser) o líder; a escrita pode não ter sido confirmada"""
+
+    def __init__(self, leader_id=None):
+        super().__init__(f"Not the leader (leader: {leader_id})")
+        self.leader_id = leader_id
+
+
+class RaftStorage:
+    """
+    Estado persistente do Raft: term atual, voto e log
+
+    As gravações e os fsyncs rodam numa thread própria (raft-storage), fora
+    do event loop: save_meta(), append() e rewrite() enfileiram, na ordem
+    das chamadas, e devolvem um Future resolvido com a operação em disco.
+    Os appends de uma mesma passada da thread dividem um fsync.
+
+    Args:
+        directory: Diretório dos arquivos (criado se não existe)
+        fsync: fsync depois de cada escrita
+    """
+
+    def __init__(self, directory: str, fsync: bool = RAFT_FSYNC):
+        os.makedirs(directory, exist_ok=True)
+        self.meta_path = os.path.join(directory, "meta.json")
+        self.log_path = os.path.join(directory, "log.jsonl")
+        self.fsync = fsync
+        self._log = None
+        self._queue = queue.SimpleQueue()
+        self._writer = None
+        self._last_future = None
+
+    def load(self):
+        """
+        Lê o estado gravado (na inicialização, antes de qualquer escrita)
+
+        Returns:
+            tuple: (term, voted_for, entradas); uma última linha incompleta
+                   (escrita interrompida) é descartada
+        """
+        term, voted_for = 0, None
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+            term, voted_for = meta.get("term", 0), meta.get("voted_for")
+        entries = []
+        if os.path.exists(self.log_path):
+            with open(self.log_path, "rb") as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        break
+            # Reescrever sem a linha incompleta, se houver
+            self._write_log(entries)
+        return term, voted_for, entries
+
+    # --- fila da thread de escrita ---
+
+    def _submit(self, operation, *args) -> concurrent.futures.Future:
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, name="raft-storage", daemon=True)
+            self._writer.start()
+        future = concurrent.futures.Future()
+        self._last_future = future
+        self._queue.put((operation, args, future))
+        return future
+
+    def save_meta(self, term: int, voted_for) -> concurrent.futures.Future:
+        return self._submit(self._write_meta, term, voted_for)
+
+    def append(self, entries) -> concurrent.futures.Future:
+        return self._submit(self._write_entries, list(entries))
+
+    def rewrite(self, entries) -> concurrent.futures.Future:
+        """Substitui o log inteiro (truncamento de entradas em conflito)"""
+        return self._submit(self._write_log, list(entries))
+
+    def durable(self) -> concurrent.futures.Future:
+        """Future resolvido quando tudo o que já foi enfileirado está em disco"""
+        future = self._last_future
+        if future is None:
+            future = concurrent.futures.Future()
+            future.set_result(None)
+        return future
+
+    def _write_loop(self):
+        while True:
+            requests = [self._queue.get()]
+            while True:
+                try:
+                    requests.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in requests
+            requests = [request for request in requests if request is not None]
+            try:
+                for operation, args, _ in requests:
+                    operation(*args)
+                if self._log is not None:
+                    self._log.flush()
+                    if self.fsync:
+                        os.fsync(self._log.fileno())
+            except Exception as e:
+                for _, _, future in requests:
+                    future.set_exception(e)
+            else:
+                for _, _, future in requests:
+                    future.set_result(None)
+            if stop:
+                return
+
+    # --- gravações (na thread raft-storage) ---
+
+    def _write_meta(self, term: int, voted_for):
+        tmp = self.meta_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"term": term, "voted_for": voted_for}, f)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp, self.meta_path)
+
+    def _write_entries(self, entries):
+        # flush e fsync no fim da passada (_write_loop)
+        if self._log is None:
+            self._log = open(self.log_path, "ab")
+        self._log.write(b"".join(json.dumps(entry, separators=(",", ":")).encode() + b"\n" for entry in entries))
+
+    def _write_log(self, entries):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        tmp = self.log_path + ".tmp"
+        with open(tmp, "wb") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, separators=(",", ":")).encode() + b"\n")
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp, self.log_path)
+
+    def close(self):
+        """Grava o que ainda está na fila e para a thread de escrita"""
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+
+class _Peer:
+    """Estado de replicação de um follower durante um term deste líder"""
+
+    def __init__(self, server, next_index: int):
+        self.server = server
+        self.next_index = next_index
+        self.match_index = 0
+        self.in_flight = 0
+        # Incrementada quando o next_index volta: respostas de requisições
+        # enviadas antes disso não mexem mais no next_index
+        self.generation = 0
+        self.last_sent = 0.0
+        self.last_ack = 0.0
+        self.retry_at = 0.0
+        self.wake = asyncio.Event()
+
+
+class RaftNode:
+    """
+    Um nó Raft, rodando no event loop do FastAPI
+
+    As entradas são dicts opacos para o Raft (o campo "term" é dele). Criar
+    dentro do event loop (usa asyncio.Event).
+
+    Args:
+        my_id: ID deste nó
+        peers: Lista de Server dos outros nós
+        storage: RaftStorage deste nó
+        apply: apply(entradas) -> lista de resultados, chamada em ordem com
+               as entradas confirmadas; o resultado de cada entrada vai para
+               quem a propôs
+        on_leader_change: on_leader_change(id) quando o líder conhecido muda
+
+    Attributes:
+        current_term (int): Term atual
+        state (str): follower | candidate | leader
+        leader_id: Líder do term atual, se conhecido
+        commit_index (int): Maior índice confirmado conhecido
+        last_applied (int): Maior índice aplicado
+    """
+
+    def __init__(self, my_id: int, peers, storage: RaftStorage, apply, on_leader_change):
+        self.my_id = my_id
+        self.peers = list(peers)
+        self.storage = storage
+        self.apply = apply
+        self.on_leader_change = on_leader_change
+        self.current_term, self.voted_for, self.log = storage.load()
+        self.state = FOLLOWER
+        self.leader_id = None
+        self.commit_index = 0
+        self.last_applied = 0
+        self.majority = (len(self.peers) + 1) // 2 + 1
+        self._peers = {}
+        # Índice da entrada vazia gravada ao assumir; leituras com lease só
+        # depois que ela é aplicada
+        self._term_start = 0
+        self._leader_since = 0.0
+        self._waiters = {}
+        self._appended = asyncio.Event()
+        self._last_contact = time.monotonic()
+        self._timer = None
+        self._loop = asyncio.get_running_loop()
+        # Maior índice já gravado em disco; gravações anteriores a um
+        # truncamento (outra época) não contam mais
+        self._durable_index = self.last_index
+        self._storage_epoch = 0
+
+    # --- log ---
+
+    @property
+    def last_index(self) -> int:
+        return len(self.log)
+
+    def term_at(self, index: int) -> int:
+        return self.log[index - 1]["term"] if 0 < index <= len(self.log) else 0
+
+    def _append(self, entries):
+        self.log.extend(entries)
+        self._track(self.storage.append(entries), self.last_index)
+        self._appended.set()
+        self._appended = asyncio.Event()
+
+    def _truncate(self, index: int):
+        """Descarta as entradas a partir de index (nunca confirmadas)"""
+        if index <= self.commit_index:
+            raise RuntimeError(f"Refusing to truncate committed entry {index} (commit {self.commit_index})")
+        log.warning("Truncating conflicting entries", first=index, last=self.last_index, term=self.current_term)
+        del self.log[index - 1:]
+        self._storage_epoch += 1
+        self._durable_index = min(self._durable_index, self.last_index)
+        self._track(self.storage.rewrite(self.log), self.last_index)
+
+    def _track(self, future, index: int):
+        """Avança _durable_index até index quando a gravação terminar"""
+        epoch = self._storage_epoch
+        future.add_done_callback(
+            lambda done: self._loop.call_soon_threadsafe(self._persisted, epoch, index, done)
+        )
+
+    def _persisted(self, epoch: int, index: int, future):
+        if future.exception() is not None:
+            log.error("Raft storage write failed", index=index, error=repr(future.exception()))
+            return
+        if epoch == self._storage_epoch and index > self._durable_index:
+            self._durable_index = index
+            if self.state == LEADER:
+                self._advance_commit()
+
+    async def _durable(self):
+        """Espera a thread de gravação terminar tudo o que já foi enfileirado"""
+        await asyncio.wrap_future(self.storage.durable())
+
+    def _apply_committed(self):
+        if self.last_applied >= self.commit_index:
+            return
+        first = self.last_applied + 1
+        results = self.apply(self.log[self.last_applied:self.commit_index])
+        self.last_applied = self.commit_index
+        for offset, result in enumerate(results):
+            future = self._waiters.pop(first + offset, None)
+            if future is not None and not future.done():
+                future.set_result(result)
+
+    # --- papéis ---
+
+    def start(self):
+        """Inicia o timer de eleição"""
+        if self._timer is None:
+            log.info(
+                "Raft node starting", term=self.current_term, entries=self.last_index,
+                peers=[peer.id for peer in self.peers],
+            )
+            self._timer = asyncio.ensure_future(self._election_timer())
+
+    def _set_leader(self, leader_id):
+        if leader_id != self.leader_id:
+            self.leader_id = leader_id
+            self.on_leader_change(leader_id)
+
+    def _save_meta(self):
+        self.storage.save_meta(self.current_term, self.voted_for)
+
+    def _become_follower(self, term: int, leader_id=None):
+        if term > self.current_term:
+            self.current_term = term
+            self.voted_for = None
+            self._save_meta()
+        was_leader = self.state == LEADER
+        self.state = FOLLOWER
+        if was_leader:
+            log.warning("Stepping down", term=self.current_term)
+            self._peers = {}
+            waiters, self._waiters = self._waiters, {}
+            for future in waiters.values():
+                if not future.done():
+                    future.set_exception(NotLeaderError(leader_id))
+        self._set_leader(leader_id)
+
+    def _become_leader(self):
+        self.state = LEADER
+        self._leader_since = time.monotonic()
+        term = self.current_term
+        log.info("Became Raft leader", term=term, last_index=self.last_index)
+        self._peers = {server.id: _Peer(server, self.last_index + 1) for server in self.peers}
+        # Entrada vazia do term: confirma junto as entradas de terms anteriores
+        self._append([{"term": term, "noop": True}])
+        self._term_start = self.last_index
+        self._set_leader(self.my_id)
+        for peer in self._peers.values():
+            asyncio.ensure_future(self._replicate(peer, term))
+        self._advance_commit()
+
+    # --- eleição ---
+
+    async def _election_timer(self):
+        while True:
+            timeout = random.uniform(RAFT_ELECTION_TIMEOUT_MIN, RAFT_ELECTION_TIMEOUT_MAX)
+            await asyncio.sleep(max(0.0, self._last_contact + timeout - time.monotonic()))
+            if self.state == LEADER:
+                self._last_contact = time.monotonic()
+                if self._quorum_age() > RAFT_ELECTION_TIMEOUT_MAX:
+                    # Isolado da maioria: os followers já podem ter outro líder
+                    log.warning("Lost contact with the majority", term=self.current_term)
+                    self._become_follower(self.current_term)
+                continue
+            if time.monotonic() - self._last_contact < timeout:
+                continue
+            self._last_contact = time.monotonic()
+            asyncio.ensure_future(self._run_election())
+
+    async def _run_election(self):
+        self.current_term += 1
+        self.state = CANDIDATE
+        self.voted_for = self.my_id
+        self._save_meta()
+        self._set_leader(None)
+        term = self.current_term
+        raft_elections_total.inc()
+        log.info("Starting Raft election", term=term, last_index=self.last_index, last_term=self.term_at(self.last_index))
+
+        # Term e voto em disco antes de pedir votos
+        await self._durable()
+        if self.state != CANDIDATE or self.current_term != term:
+            return
+        votes = 1
+        if votes >= self.majority:
+            self._become_leader()
+            return
+        request = {
+            "term": term,
+            "candidate_id": self.my_id,
+            "last_log_index": self.last_index,
+            "last_log_term": self.term_at(self.last_index),
+        }
+        for reply in asyncio.as_completed([self._call(peer, "/raft/request_vote", request) for peer in self.peers]):
+            reply = await reply
+            if self.state != CANDIDATE or self.current_term != term:
+                return
+            if reply is None:
+                continue
+            if reply["term"] > self.current_term:
+                self._become_follower(reply["term"])
+                return
+            if reply.get("vote_granted"):
+                votes += 1
+                if votes >= self.majority:
+                    self._become_leader()
+                    return
+        log.info("Raft election without majority", term=term, votes=votes)
+
+    async def _call(self, server, path: str, body: dict):
+        try:
+            response = await server.apost(path, json=body, timeout=RAFT_RPC_TIMEOUT)
+            return response.json() if response.status_code == 200 else None
+        except Exception as e:
+            log.debug("Raft RPC failed", node=server.id, path=path, error=repr(e), sample=True)
+            return None
+
+    async def handle_request_vote(self, request: dict) -> dict:
+        """
+        RequestVote recebido
+
+        Nega o voto a candidato de term antigo, a candidato com log menos
+        atualizado que o deste nó, se já votou em outro neste term, ou se
+        ouviu o líder há menos de RAFT_ELECTION_TIMEOUT_MIN (o term do
+        candidato não é adotado nesse caso). A resposta só sai com o term e
+        o voto em disco.
+        """
+        term = request["term"]
+        candidate = request["candidate_id"]
+        if term < self.current_term:
+            return {"term": self.current_term, "vote_granted": False}
+        if self.leader_id not in (None, candidate) and (
+            self.state == LEADER or time.monotonic() - self._last_contact < RAFT_ELECTION_TIMEOUT_MIN
+        ):
+            return {"term": self.current_term, "vote_granted": False}
+        if term > self.current_term:
+            self._become_follower(term)
+        last_term = self.term_at(self.last_index)
+        up_to_date = (request["last_log_term"], request["last_log_index"]) >= (last_term, self.last_index)
+        granted = up_to_date and self.voted_for in (None, candidate)
+        if granted:
+            self.voted_for = candidate
+            self._save_meta()
+            self._last_contact = time.monotonic()
+        log.info(
+            "Vote requested", candidate=candidate, term=term, granted=granted, up_to_date=up_to_date,
+            sample=not granted,
+        )
+        reply = {"term": self.current_term, "vote_granted": granted}
+        await self._durable()
+        return reply
+
+    # --- replicação (líder) ---
+
+    async def propose(self, items) -> list:
+        """
+        Grava entradas no log do líder e espera o commit por maioria
+
+        Args:
+            items: Lista de dicts (o Raft acrescenta o campo "term")
+
+        Returns:
+            list: Resultado de apply() para cada entrada, na mesma ordem
+
+        Raises:
+            NotLeaderError: Se este nó não é o líder, ou deixou de ser antes
+                            do commit (a entrada pode ou não ser confirmada
+                            pelo próximo líder)
+        """
+        if self.state != LEADER:
+            raise NotLeaderError(self.leader_id)
+        loop = asyncio.get_running_loop()
+        first = self.last_index + 1
+        self._append([dict(item, term=self.current_term) for item in items])
+        futures = []
+        for index in range(first, self.last_index + 1):
+            future = loop.create_future()
+            self._waiters[index] = future
+            futures.append(future)
+        for peer in self._peers.values():
+            peer.wake.set()
+        self._advance_commit()
+        return await asyncio.gather(*futures)
+
+    async def _replicate(self, peer: _Peer, term: int):
+        """Envia AppendEntries a um follower enquanto este nó lidera o term"""
+        while self.state == LEADER and self.current_term == term:
+            peer.wake.clear()
+            now = time.monotonic()
+            if now >= peer.retry_at:
+                sent = False
+                while peer.in_flight < RAFT_MAX_INFLIGHT and peer.next_index <= self.last_index:
+                    self._send(peer, term, min(self.last_index, peer.next_index + RAFT_MAX_BATCH - 1))
+                    sent = True
+                if not sent and peer.in_flight < RAFT_MAX_INFLIGHT and now - peer.last_sent >= RAFT_HEARTBEAT_SECONDS:
+                    # Heartbeat: AppendEntries vazia
+                    self._send(peer, term, peer.next_index - 1)
+            try:
+                await asyncio.wait_for(peer.wake.wait(), RAFT_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    def _send(self, peer: _Peer, term: int, last: int):
+        first = peer.next_index
+        prev = first - 1
+        request = {
+            "term": term,
+            "leader_id": self.my_id,
+            "prev_log_index": prev,
+            "prev_log_term": self.term_at(prev),
+            "entries": self.log[prev:last],
+            "leader_commit": self.commit_index,
+        }
+        peer.next_index = last + 1
+        peer.in_flight += 1
+        peer.last_sent = time.monotonic()
+        asyncio.ensure_future(self._append_entries(peer, term, request, peer.generation, peer.last_sent))
+
+    async def _append_entries(self, peer: _Peer, term: int, request: dict, generation: int, sent_at: float):
+        try:
+            reply = await self._call(peer.server, "/raft/append_entries", request)
+        finally:
+            peer.in_flight -= 1
+        if self.state != LEADER or self.current_term != term:
+            return
+        if reply is None:
+            append_entries_total.labels("error").inc()
+            if generation == peer.generation:
+                # Reenviar a partir do que o follower confirmou, depois de uma pausa
+                peer.generation += 1
+                peer.next_index = peer.match_index + 1
+                peer.retry_at = time.monotonic() + RAFT_HEARTBEAT_SECONDS
+        elif reply["term"] > self.current_term:
+            append_entries_total.labels("stale_term").inc()
+            self._become_follower(reply["term"])
+            return
+        else:
+            # Qualquer resposta do term mostra que o follower reconhece este líder
+            peer.last_ack = max(peer.last_ack, sent_at)
+            if reply["success"]:
+                append_entries_total.labels("success").inc()
+                if reply["match_index"] > peer.match_index:
+                    peer.match_index = reply["match_index"]
+                    self._advance_commit()
+            else:
+                append_entries_total.labels("rejected").inc()
+                if generation == peer.generation:
+                    peer.generation += 1
+                    peer.next_index = max(peer.match_index + 1, min(reply.get("conflict_index", 1), peer.next_index))
+                    log.debug(
+                        "AppendEntries rejected, backing off", node=peer.server.id,
+                        next_index=peer.next_index, sample=True,
+                    )
+        peer.wake.set()
+
+    def _advance_commit(self):
+        """Confirma o maior índice do term atual replicado na maioria (este nó conta o que já gravou)"""
+        own = min(self._durable_index, self.last_index)
+        matches = sorted([own] + [peer.match_index for peer in self._peers.values()], reverse=True)
+        index = matches[self.majority - 1]
+        if index > self.commit_index and self.term_at(index) == self.current_term:
+            self.commit_index = index
+            self._apply_committed()
+
+    # --- replicação (follower) ---
+
+    async def handle_append_entries(self, request: dict) -> dict:
+        """
+        AppendEntries recebido
+
+        A resposta só sai com o que ela afirma (term, entradas até
+        match_index) em disco.
+
+        Returns:
+            dict: term, success e, se success, match_index (último índice
+                  que com certeza coincide com o do líder); se não,
+                  conflict_index (onde o líder deve recomeçar)
+        """
+        reply = await self._append_entries_reply(request)
+        await self._durable()
+        if reply["success"] and self.current_term != reply["term"]:
+            # Outro líder (term maior) chegou durante a gravação
+            return {"term": self.current_term, "success": False}
+        return reply
+
+    async def _append_entries_reply(self, request: dict) -> dict:
+        term = request["term"]
+        if term < self.current_term:
+            return {"term": self.current_term, "success": False}
+        self._become_follower(term, request["leader_id"])
+        self._last_contact = time.monotonic()
+
+        prev = request["prev_log_index"]
+        # Requisição pipelinada que chegou antes da anterior: esperar por ela
+        deadline = time.monotonic() + RAFT_REORDER_WAIT_SECONDS
+        while prev > self.last_index and self.current_term == term:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(self._appended.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+        if self.current_term != term:
+            return {"term": self.current_term, "success": False}
+
+        if prev > self.last_index:
+            return {"term": term, "success": False, "conflict_index": self.last_index + 1}
+        if self.term_at(prev) != request["prev_log_term"]:
+            # Recomeçar do início do term em conflito
+            conflict_term = self.term_at(prev)
+            index = prev
+            while index > 1 and self.term_at(index - 1) == conflict_term:
+                index -= 1
+            return {"term": term, "success": False, "conflict_index": max(index, self.commit_index + 1)}
+
+        entries = request["entries"]
+        index = prev
+        new = []
+        for entry in entries:
+            index += 1
+            if new:
+                new.append(entry)
+            elif index > self.last_index:
+                new.append(entry)
+            elif self.term_at(index) != entry["term"]:
+                self._truncate(index)
+                new.append(entry)
+        if new:
+            self._append(new)
+
+        match_index = prev + len(entries)
+        leader_commit = request["leader_commit"]
+        if leader_commit > self.commit_index:
+            # Um AppendEntries atrasado (match_index menor) não pode recuar o commit
+            self.commit_index = max(self.commit_index, min(leader_commit, match_index))
+            self._apply_committed()
+        return {"term": term, "success": True, "match_index": match_index}
+
+    # --- leituras e estado ---
+
+    def _quorum_age(self) -> float:
+        """Segundos desde o envio mais recente confirmado pela maioria"""
+        needed = self.majority - 1
+        if needed == 0:
+            return 0.0
+        acks = sorted((peer.last_ack for peer in self._peers.values()), reverse=True)
+        return time.monotonic() - max(acks[needed - 1], self._leader_since)
+
+    def lease_remaining(self) -> float:
+        """Segundos de lease de leitura restantes (0 se não é líder)"""
+        if self.state != LEADER or self.last_applied < self._term_start:
+            return 0.0
+        if self.majority == 1:
+            return RAFT_ELECTION_TIMEOUT_MIN
+        acks = sorted((peer.last_ack for peer in self._peers.values()), reverse=True)
+        start = acks[self.majority - 2]
+        return max(0.0, start + RAFT_ELECTION_TIMEOUT_MIN * (1 - LEASE_DRIFT) - time.monotonic())
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "term": self.current_term,
+            "leader": self.leader_id,
+            "voted_for": self.voted_for,
+            "last_index": self.last_index,
+            "durable_index": self._durable_index,
+            "last_term": self.term_at(self.last_index),
+            "commit_index": self.commit_index,
+            "last_applied": self.last_applied,
+            "lease_remaining_s": round(self.lease_remaining(), 3),
+            "followers": {
+                peer_id: {
+                    "next_index": peer.next_index,
+                    "match_index": peer.match_index,
+                    "in_flight": peer.in_flight,
+                }
+                for peer_id, peer in self._peers.items()
+            },
+        }
@@ -0,0 +1,177 @@
+"""
+Consistência de leitura: lease do líder e espera por watermark
+
+Três níveis para GET / e GET /messages (parâmetro consistency):
+
+- local:        lê o store deste nó, sem garantia de frescor (padrão)
+- leader-lease: só o líder responde, e só enquanto tem um lease válido;
+                como toda escrita confirmada passou pelo líder, a leitura
+                vê todas elas (linearizável) sem round-trip na leitura
+- at-least:     o nó espera até ter aplicado, sem lacunas, o ID (min_id) ou
+                o timestamp Lamport (min_lamport) informado pelo cliente;
+                com o ID devolvido pelo POST isso dá read-your-writes em
+                qualquer follower
+
+O lease:
+- O líder pede POST /lease a todos os followers a cada LEASE_RENEW_SECONDS.
+  Com a maioria do cluster (ele incluso) concedendo, o lease vale até
+  início_da_rodada + LEASE_SECONDS * (1 - LEASE_DRIFT). A margem cobre
+  diferenças de velocidade entre os relógios.
+- Um follower só concede o lease ao líder que ele reconhece. Ao conceder,
+  promete não conceder lease a nenhum outro nó por LEASE_SECONDS.
+- Pela interseção de maiorias, dois nós nunca têm leases válidos ao mesmo
+  tempo.
+- Um novo líder só aceita escritas depois de obter o próprio lease (ou
+  depois de LEASE_SECONDS, se não há maioria). Assim o lease de um líder
+  anterior já expirou quando a primeira escrita nova é confirmada.
+
+Os tempos usam time.monotonic() de cada nó.
+"""
+
+import asyncio
+import os
+import time
+
+
+CONSISTENCY_LOCAL = "local"
+CONSISTENCY_LEADER_LEASE = "leader-lease"
+CONSISTENCY_AT_LEAST = "at-least"
+CONSISTENCY_LEVELS = (CONSISTENCY_LOCAL, CONSISTENCY_LEADER_LEASE, CONSISTENCY_AT_LEAST)
+
+LEASE_SECONDS = float(os.getenv("LEASE_SECONDS", "1"))
+LEASE_RENEW_SECONDS = float(os.getenv("LEASE_RENEW_SECONDS", str(LEASE_SECONDS / 4)))
+LEASE_DRIFT = float(os.getenv("LEASE_DRIFT", "0.1"))
+# Espera máxima de uma leitura at-least (ms), se o cliente não informar
+READ_WAIT_MS = float(os.getenv("READ_WAIT_MS", "5000"))
+
+
+class LeaderLease:
+    """
+    Estado do lease, tanto do lado do líder quanto do follower
+
+    Attributes:
+        valid_until (float): Fim do lease deste nó como líder (monotonic)
+        promised_to: ID do líder a quem este nó prometeu o lease
+        promised_until (float): Fim da promessa (monotonic)
+    """
+
+    def __init__(self, duration: float = LEASE_SECONDS, drift: float = LEASE_DRIFT):
+        self.duration = duration
+        self.drift = drift
+        self.valid_until = 0.0
+        self.promised_to = None
+        self.promised_until = 0.0
+        self.leader_since = None
+        self.acquired = False
+
+    # --- lado do líder ---
+
+    def became_leader(self):
+        """Este nó acabou de assumir a liderança: o lease começa vazio"""
+        self.leader_since = time.monotonic()
+        self.valid_until = 0.0
+        self.acquired = False
+
+    def lost_leadership(self):
+        self.leader_since = None
+        self.valid_until = 0.0
+        self.acquired = False
+
+    def renewed(self, round_start: float):
+        """A maioria concedeu o lease pedido em round_start"""
+        self.valid_until = max(self.valid_until, round_start + self.duration * (1 - self.drift))
+        self.acquired = True
+
+    def valid(self) -> bool:
+        """True se este nó (líder) pode servir leituras leader-lease"""
+        return self.leader_since is not None and time.monotonic() < self.valid_until
+
+    def remaining(self) -> float:
+        """Segundos de lease restantes (0 se não há lease)"""
+        if self.leader_since is None:
+            return 0.0
+        return max(0.0, self.valid_until - time.monotonic())
+
+    def writes_fenced(self) -> bool:
+        """
+        True enquanto um novo líder ainda não pode confirmar escritas
+
+        Termina quando o primeiro lease é obtido ou, sem maioria, depois de
+        LEASE_SECONDS desde que assumiu (qualquer lease anterior já expirou).
+        """
+        if self.leader_since is None or self.acquired:
+            return False
+        return time.monotonic() < self.leader_since + self.duration
+
+    # --- lado do follower ---
+
+    def grant(self, leader_id: int, current_leader) -> bool:
+        """
+        Decide se concede o lease a leader_id
+
+        Args:
+            leader_id: Nó que pede o lease
+            current_leader: Líder reconhecido por este nó
+
+        Returns:
+            bool: True se concedeu (e prometeu não conceder a outro nó)
+        """
+        now = time.monotonic()
+        if leader_id != current_leader:
+            return False
+        if self.promised_to not in (None, leader_id) and now < self.promised_until:
+            return False
+        self.promised_to = leader_id
+        self.promised_until = now + self.duration
+        return True
+
+
+class AppliedWatermark:
+    """
+    Espera até o nó aplicar, sem lacunas, um ID ou timestamp Lamport
+
+    notify() é chamado sempre que o store avança; as leituras at-least
+    esperam em wait_for().
+
+    Args:
+        progress: Função sem argumentos que retorna (contiguous_id,
+                  lamport aplicado)
+    """
+
+    def __init__(self, progress):
+        self.progress = progress
+        self._waiters = []
+
+    def reached(self, min_id: int = None, min_lamport: int = None) -> bool:
+        contiguous_id, lamport = self.progress()
+        return (min_id is None or contiguous_id >= min_id) and (min_lamport is None or lamport >= min_lamport)
+
+    async def wait_for(self, min_id: int = None, min_lamport: int = None, timeout: float = READ_WAIT_MS / 1000) -> bool:
+        """
+        Espera o watermark
+
+        Returns:
+            bool: True se foi atingido, False se passou o timeout
+        """
+        if self.reached(min_id, min_lamport):
+            return True
+        future = asyncio.get_running_loop().create_future()
+        waiter = (min_id, min_lamport, future)
+        self._waiters.append(waiter)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def notify(self):
+        """Acorda as leituras cujo watermark já foi atingido"""
+        if not self._waiters:
+            return
+        for waiter in list(self._waiters):
+            min_id, min_lamport, future = waiter
+            if not future.done() and self.reached(min_id, min_lamport):
+                future.set_result(True)
+                self._waiters.remove(waiter)
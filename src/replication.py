@@ -0,0 +1,412 @@
+"""
+Replicação assíncrona do líder para os followers
+
+O líder envia cada escrita a todos os followers ao mesmo tempo (fan-out),
+usando clientes HTTP assíncronos, em vez de chamar cada
+follower em sequência. Assim a latência de uma escrita passa a ser a do
+follower mais lento necessário para a política de confirmação, e não a soma
+de todos os round-trips. Cada follower é contactado pelo pool de conexões
+persistentes do seu próprio objeto Server.
+
+Cada follower tem uma fila de saída limitada (FollowerQueue), esvaziada por
+uma tarefa em background que envia, em ordem, um lote por vez (juntando os
+lotes que se acumularam enquanto o anterior estava em trânsito). Um follower
+lento só atrasa a sua própria fila. Quando um envio falha, a fila é
+descartada: o loop de reparo do líder reenvia tudo a partir do cursor do
+follower quando ele voltar.
+
+Quando a fila de um follower está cheia (REPLICATION_QUEUE_SIZE lotes), a
+política REPLICATION_BACKPRESSURE decide:
+- block:  a escrita espera haver espaço na fila
+- shed:   o lote não entra na fila desse follower, que o recebe depois pelo
+          catch-up / reparo (padrão)
+- reject: a escrita é recusada com 503 e Retry-After (REPLICATION_RETRY_AFTER)
+
+Políticas de confirmação (WRITE_ACK):
+- leader:   a escrita retorna assim que o líder guarda a mensagem
+- majority: espera a confirmação de uma maioria do cluster (líder incluído)
+- all:      espera a confirmação de todos os followers
+
+Em todas as políticas a replicação continua em background para os
+followers que ainda não responderam.
+
+Com REPLICATION_TRANSPORT=grpc os lotes vão pelo stream Replicate de cada
+follower (ver grpc_transport.py) em vez de um POST por lote. O stream só
+carrega o log global (GRPC_PATH); lotes das partições (partitions.py)
+seguem por HTTP.
+"""
+
+import asyncio
+import os
+import time
+
+import grpc_transport
+import metrics
+import wire
+from structured_log import get_logger
+
+
+ACK_LEADER = "leader"
+ACK_MAJORITY = "majority"
+ACK_ALL = "all"
+ACK_POLICIES = (ACK_LEADER, ACK_MAJORITY, ACK_ALL)
+
+log = get_logger("replication")
+
+# Followers que não aceitaram protobuf (resposta 415); recebem JSON
+_json_only = set()
+
+BACKPRESSURE_BLOCK = "block"
+BACKPRESSURE_SHED = "shed"
+BACKPRESSURE_REJECT = "reject"
+BACKPRESSURE_POLICIES = (BACKPRESSURE_BLOCK, BACKPRESSURE_SHED, BACKPRESSURE_REJECT)
+
+REPLICATION_QUEUE_SIZE = int(os.getenv("REPLICATION_QUEUE_SIZE", "64"))
+REPLICATION_BACKPRESSURE = os.getenv("REPLICATION_BACKPRESSURE", BACKPRESSURE_SHED).strip().lower()
+if REPLICATION_BACKPRESSURE not in BACKPRESSURE_POLICIES:
+    raise ValueError(
+        f"REPLICATION_BACKPRESSURE inválido: {REPLICATION_BACKPRESSURE!r} "
+        f"(use {', '.join(BACKPRESSURE_POLICIES)})"
+    )
+REPLICATION_RETRY_AFTER = int(os.getenv("REPLICATION_RETRY_AFTER", "1"))
+# Máximo de mensagens num envio que junta vários lotes da fila
+REPLICATION_MAX_MESSAGES = int(os.getenv("REPLICATION_MAX_MESSAGES", "5000"))
+
+replication_seconds = metrics.Histogram(
+    "replication_send_seconds", "Duração de cada envio de lote a um follower (até o ack)", ["follower"]
+)
+replication_failures = metrics.Counter(
+    "replication_failures_total", "Envios de lote a um follower que falharam ou foram recusados", ["follower"]
+)
+replication_shed = metrics.Counter(
+    "replication_shed_total", "Lotes descartados da fila de um follower cheia (REPLICATION_BACKPRESSURE=shed)",
+    ["follower"],
+)
+
+
+def ack_policy_from_env() -> str:
+    """
+    Lê a política de confirmação de escrita da variável WRITE_ACK
+
+    Returns:
+        str: Uma de ACK_POLICIES (por padrão "leader")
+    """
+    policy = os.getenv("WRITE_ACK", ACK_LEADER).strip().lower()
+    if policy not in ACK_POLICIES:
+        raise ValueError(f"WRITE_ACK inválido: {policy!r} (use {', '.join(ACK_POLICIES)})")
+    return policy
+
+
+def required_acks(policy: str, n_followers: int) -> int:
+    """
+    Calcula quantos followers precisam confirmar uma escrita
+
+    Args:
+        policy: Política de confirmação
+        n_followers: Número de followers do líder
+
+    Returns:
+        int: Número de confirmações de followers necessárias
+    """
+    if policy == ACK_LEADER:
+        return 0
+    if policy == ACK_ALL:
+        return n_followers
+    # Maioria do cluster (followers + líder); o líder já conta como um voto
+    cluster_size = n_followers + 1
+    return cluster_size // 2
+
+
+async def send_batch(server, path: str, batch: wire.EncodedBatch):
+    """
+    Envia um lote a um nó no formato que ele aceita
+
+    Tenta protobuf (se habilitado) e volta para JSON, de vez, com nós que
+    respondem 415/422 ao corpo binário.
+
+    Args:
+        server: Server de destino
+        path: Endpoint de destino
+        batch: Lote já preparado para codificação
+
+    Returns:
+        httpx.Response: Resposta do nó
+    """
+    binary = wire.SEND_BINARY and server.id not in _json_only
+    response = await server.apost(path, **batch.request_kwargs(binary))
+    if binary and response.status_code in (415, 422):
+        log.info("Follower does not accept protobuf, falling back to JSON", follower=server.id)
+        _json_only.add(server.id)
+        response = await server.apost(path, **batch.request_kwargs(False))
+    return response
+
+
+# Endpoint cujos lotes o stream gRPC Replicate entrega (receive_batch do log global)
+GRPC_PATH = "/message_received/batch"
+
+
+async def deliver(server, path: str, batch: wire.EncodedBatch):
+    """
+    Envia um lote a um follower pelo transporte configurado
+
+    Args:
+        server: Server de destino
+        path: Endpoint de destino (no transporte gRPC, só GRPC_PATH usa o stream)
+        batch: Lote a enviar
+
+    Returns:
+        dict: Confirmação do follower (contiguous_id, local_lamport...), ou
+              None se ele rejeitou o lote. Um lote recusado por conflito de
+              IDs (HTTP 409) também devolve a resposta, com conflict_id.
+    """
+    if grpc_transport.USE_GRPC and path == GRPC_PATH:
+        return await grpc_transport.replication_stream(server).send(batch)
+    response = await send_batch(server, path, batch)
+    if response.status_code == 409:
+        body = response.json()
+        if body.get("conflict_id"):
+            return body
+    if response.status_code != 200:
+        log.warning("Follower rejected replication", follower=server.id, status=response.status_code, sample=True)
+        return None
+    return response.json()
+
+
+class _Entry:
+    """Um lote na fila de um follower, com o futuro de quem espera o ack"""
+
+    __slots__ = ("path", "batch", "on_ack", "future", "enqueued_at")
+
+    def __init__(self, path, batch, on_ack, future):
+        self.path = path
+        self.batch = batch
+        self.on_ack = on_ack
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class FollowerQueue:
+    """
+    Fila de saída limitada de um follower, esvaziada em background
+
+    Attributes:
+        server: Follower de destino
+        capacity (int): Máximo de lotes na fila
+    """
+
+    def __init__(self, server, capacity: int = REPLICATION_QUEUE_SIZE):
+        self.server = server
+        self.capacity = capacity
+        self._queue = asyncio.Queue(maxsize=capacity)
+        self._sender = None
+        self._in_flight = 0
+        self.queued_messages = 0
+        self.sent = 0
+        self.failures = 0
+        self.shed = 0
+        self.last_latency_ms = None
+
+    def full(self) -> bool:
+        return self._queue.full()
+
+    def busy(self) -> bool:
+        """True se há lotes na fila ou em trânsito"""
+        return self._in_flight > 0 or not self._queue.empty()
+
+    async def put(self, path: str, batch: wire.EncodedBatch, on_ack=None):
+        """
+        Coloca um lote na fila, aplicando a política de backpressure
+
+        Args:
+            path: Endpoint de destino
+            batch: Lote a enviar
+            on_ack: Callback on_ack(server, ack) quando o follower confirmar
+
+        Returns:
+            asyncio.Future: Resolvido com True quando o follower confirma o
+                            lote, ou False se o envio falhou / foi descartado
+        """
+        future = asyncio.get_running_loop().create_future()
+        entry = _Entry(path, batch, on_ack, future)
+        if self._sender is None or self._sender.done():
+            self._sender = asyncio.ensure_future(self._run())
+        if REPLICATION_BACKPRESSURE == BACKPRESSURE_BLOCK:
+            await self._queue.put(entry)
+        else:
+            try:
+                self._queue.put_nowait(entry)
+            except asyncio.QueueFull:
+                self.shed += 1
+                replication_shed.labels(self.server.id).inc()
+                future.set_result(False)
+                return future
+        self.queued_messages += len(batch.messages)
+        return future
+
+    def _take(self, first: _Entry) -> list:
+        """Junta ao primeiro lote os seguintes da fila, se forem contíguos"""
+        entries = [first]
+        size = len(first.batch.messages)
+        while not self._queue.empty():
+            nxt = self._queue._queue[0]
+            last = entries[-1]
+            if (nxt.path != last.path or nxt.on_ack is not last.on_ack
+                    or not last.batch.messages or nxt.batch.prev_id != last.batch.messages[-1].id
+                    or size + len(nxt.batch.messages) > REPLICATION_MAX_MESSAGES):
+                break
+            entries.append(self._queue.get_nowait())
+            size += len(nxt.batch.messages)
+        return entries
+
+    def _finish(self, entries, ok: bool):
+        for entry in entries:
+            self.queued_messages -= len(entry.batch.messages)
+            if not entry.future.done():
+                entry.future.set_result(ok)
+
+    async def _run(self):
+        while True:
+            entries = self._take(await self._queue.get())
+            if len(entries) == 1:
+                batch = entries[0].batch
+            else:
+                batch = wire.EncodedBatch(
+                    [msg for entry in entries for msg in entry.batch.messages],
+                    prev_id=entries[0].batch.prev_id,
+                )
+            self._in_flight = len(entries)
+            try:
+                ok = await _send(self.server, entries[0].path, batch, entries[0].on_ack)
+            finally:
+                self._in_flight = 0
+            if ok:
+                self.sent += len(entries)
+                self.last_latency_ms = (time.monotonic() - entries[0].enqueued_at) * 1000
+                self._finish(entries, True)
+                continue
+            # Follower fora do ar ou recusando: descartar a fila (o reparo
+            # reenvia a partir do cursor dele)
+            self.failures += 1
+            while not self._queue.empty():
+                entries.append(self._queue.get_nowait())
+            self._finish(entries, False)
+
+    def stats(self) -> dict:
+        """
+        Métricas da fila
+
+        Returns:
+            dict: Lotes e mensagens na fila, idade do lote mais antigo (ms),
+                  lotes enviados, falhas, lotes descartados e latência do
+                  último ack (ms, da entrada na fila até a confirmação)
+        """
+        oldest = self._queue._queue[0].enqueued_at if not self._queue.empty() else None
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self.capacity,
+            "queued_messages": self.queued_messages,
+            "oldest_queued_ms": None if oldest is None else round((time.monotonic() - oldest) * 1000, 1),
+            "in_flight": self._in_flight,
+            "sent": self.sent,
+            "failures": self.failures,
+            "shed": self.shed,
+            "last_ack_latency_ms": None if self.last_latency_ms is None else round(self.last_latency_ms, 1),
+        }
+
+
+_queues = {}
+
+
+def follower_queue(server) -> FollowerQueue:
+    """Fila de saída do follower (criada no primeiro uso)"""
+    queue = _queues.get(server.id)
+    if queue is None:
+        queue = _queues[server.id] = FollowerQueue(server)
+    return queue
+
+
+def queue_stats() -> dict:
+    """Métricas da fila de cada follower, por ID"""
+    return {server_id: queue.stats() for server_id, queue in _queues.items()}
+
+
+def retry_after(followers):
+    """
+    Verifica se uma nova escrita deve ser recusada (política reject)
+
+    Args:
+        followers: Followers que receberiam a escrita
+
+    Returns:
+        int: Segundos para o cabeçalho Retry-After se a fila de algum
+             follower está cheia, ou None se a escrita pode seguir
+    """
+    if REPLICATION_BACKPRESSURE != BACKPRESSURE_REJECT:
+        return None
+    if any(follower_queue(server).full() for server in followers):
+        return REPLICATION_RETRY_AFTER
+    return None
+
+
+async def _send(server, path: str, batch, on_ack) -> bool:
+    """
+    Envia o lote a um follower; retorna True se ele confirmou
+
+    Um lote recusado por conflito (o follower tem algum desses IDs com outro
+    conteúdo) não conta como confirmação; o on_ack recebe a resposta com
+    conflict_id para o dono do log ressincronizar o follower.
+    """
+    start = time.perf_counter()
+    try:
+        ack = await deliver(server, path, batch)
+        if ack is not None and ack.get("conflict_id"):
+            log.warning("Follower has conflicting messages", follower=server.id, conflict_id=ack["conflict_id"])
+            if on_ack is not None:
+                on_ack(server, ack)
+        elif ack is not None:
+            replication_seconds.labels(server.id).observe(time.perf_counter() - start)
+            log.debug("Replicated batch", follower=server.id, size=len(batch.messages), sample=True)
+            if on_ack is not None:
+                on_ack(server, ack)
+            return True
+    except Exception as e:
+        log.warning("Failed to replicate", follower=server.id, error=repr(e), sample=True)
+    replication_failures.labels(server.id).inc()
+    return False
+
+
+async def replicate(followers, path: str, batch: wire.EncodedBatch, policy: str, on_ack=None) -> bool:
+    """
+    Coloca o lote na fila de cada follower
+
+    Retorna assim que a política de confirmação for satisfeita (ou quando
+    ficar impossível satisfazê-la); os envios restantes seguem em background.
+
+    Args:
+        followers: Lista de Server que devem receber a escrita
+        path: Endpoint de destino (ex: "/message_received")
+        batch: Lote a enviar (codificado uma vez por formato)
+        policy: Política de confirmação (ACK_POLICIES)
+        on_ack: Callback on_ack(server, resposta_json) para cada confirmação
+
+    Returns:
+        bool: True se a quantidade de confirmações exigida foi atingida
+    """
+    needed = required_acks(policy, len(followers))
+    futures = [await follower_queue(server).put(path, batch, on_ack) for server in followers]
+
+    if needed == 0:
+        return True
+
+    acks = 0
+    pending = len(futures)
+    for next_done in asyncio.as_completed(futures):
+        ok = await next_done
+        pending -= 1
+        if ok:
+            acks += 1
+        if acks >= needed:
+            return True
+        if acks + pending < needed:
+            return False
+    return acks >= needed
@@ -0,0 +1,559 @@
+"""
+Histórico em segmentos selados, mapeados em memória (MESSAGE_STORE=segmented)
+
+O store fica dividido em duas camadas:
+- cauda quente: CompactMessageStore com as mensagens recentes (onde as
+  escritas e a replicação mexem)
+- segmentos selados: arquivos imutáveis em DATA_DIR/segments, cada um com
+  um intervalo contínuo de IDs, lidos por mmap
+
+Quando a cauda passa de HOT_MESSAGES + SEGMENT_MESSAGES mensagens, as
+SEGMENT_MESSAGES de menor ID (todas já sem lacunas, contiguous_id) são
+gravadas num segmento por uma thread; enquanto isso continuam sendo
+servidas pela cauda, que só as descarta quando o segmento está pronto. A
+memória residente fica perto do tamanho da cauda, e o cache de páginas do
+SO cuida das leituras frias.
+
+Layout de um segmento (little-endian):
+- cabeçalho: magic, quantidade, primeiro e último ID, flags, início do blob
+- registros de tamanho fixo, em ordem (lamport_timestamp, node_id, id):
+  id, lamport, node_id, timestamp físico, offset e tamanho da linha no blob
+- posição de cada ID no registro (uint32, indexado por id - primeiro_id)
+- blob: a linha NDJSON de cada mensagem (o mesmo JSON de Message), na
+  ordem dos registros
+
+Como o blob está na ordem das leituras, uma leitura em ordem Lamport (ou
+por ID, se o segmento também está em ordem de ID, o caso comum com um
+líder) é uma fatia contínua do mmap entregue direto à resposta HTTP
+(ndjson() / id_ndjson()), sem montar objetos Message. get(), chunks() etc.
+continuam devolvendo Message, montados só para as linhas pedidas.
+
+O StreamingResponse consome ndjson(), id_ndjson() e id_chunks() numa
+thread, enquanto o event loop continua mudando o store (escritas, e a
+instalação de um segmento, que descarta da cauda as linhas seladas). Esses
+três localizam cada bloco de novo a partir do cursor do anterior, sob um
+lock que a instalação também segura: um bloco nunca vê o segmento novo e a
+cauda antiga (ou o contrário), e nada é copiado além do próprio bloco.
+
+Se uma mensagem atrasada tem chave menor que a de um segmento já selado,
+as camadas deixam de ser disjuntas e as leituras em ordem fazem um merge
+entre elas (correto, mas sem o atalho das fatias).
+
+Os segmentos são derivados do WAL: com reuse=True (WAL ligado) os
+existentes são reaproveitados no reinício e a recuperação do WAL pula os
+IDs já selados; sem WAL (ou no modo Raft, que refaz o store a partir do
+log Raft) o diretório é limpo ao iniciar.
+
+Só um prefixo sem lacunas é selado, então o backend não é aceito com
+CONSENSUS_MODE=leaderless (main.py recusa na inicialização): lá os IDs são
+intercalados por origem e uma origem parada deixa lacunas para sempre.
+
+Configuração (variáveis de ambiente):
+- HOT_MESSAGES:     mensagens mantidas na cauda quente (padrão 100000)
+- SEGMENT_MESSAGES: mensagens por segmento selado (padrão 50000)
+"""
+
+import asyncio
+import bisect
+import copy
+import heapq
+import json
+import mmap
+import os
+import struct
+import threading
+from array import array
+
+from message_store import CompactMessageStore
+from structured_log import get_logger
+import streaming
+
+
+HOT_MESSAGES = int(os.getenv("HOT_MESSAGES", "100000"))
+SEGMENT_MESSAGES = int(os.getenv("SEGMENT_MESSAGES", "50000"))
+
+MAGIC = b"MSGSEG01"
+# magic, quantidade, primeiro ID, último ID, flags, offset do blob
+HEADER = struct.Struct("<8sQqqQQ")
+# id, lamport, node_id, timestamp físico, offset no blob, tamanho da linha
+RECORD = struct.Struct("<qqqdQQ")
+POSITION = struct.Struct("<I")
+# Flag: registros também em ordem crescente de ID
+FLAG_ID_ORDERED = 1
+
+log = get_logger("segments")
+
+
+class SealedSegment:
+    """
+    Segmento selado, somente leitura, mapeado em memória
+
+    Attributes:
+        count (int): Mensagens no segmento
+        first_id (int): Primeiro ID (os IDs são first_id..last_id, sem lacunas)
+        last_id (int): Último ID
+        id_ordered (bool): True se a ordem Lamport coincide com a de ID
+        min_key / max_key (tuple): Primeira e última chave (lamport, node_id, id)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self.first_id, self.last_id, flags, self._blob = HEADER.unpack_from(self._mm, 0)
+        self._positions = HEADER.size + self.count * RECORD.size
+        if (magic != MAGIC or self.count == 0 or self.last_id - self.first_id + 1 != self.count
+                or self._blob != self._positions + self.count * POSITION.size or self._blob > len(self._mm)):
+            self._mm.close()
+            raise ValueError(f"Invalid segment file: {path}")
+        _, _, _, _, offset, length = self.record(self.count - 1)
+        if self._blob + offset + length != len(self._mm):
+            self._mm.close()
+            raise ValueError(f"Truncated segment file: {path}")
+        self.id_ordered = bool(flags & FLAG_ID_ORDERED)
+        self._view = memoryview(self._mm)
+        self.min_key = self.key(0)
+        self.max_key = self.key(self.count - 1)
+
+    @staticmethod
+    def write(path: str, rows, message_cls):
+        """
+        Grava um segmento (arquivo temporário + rename)
+
+        Args:
+            path: Caminho final
+            rows: Tuplas (id, lamport, node_id, physical, conteúdo UTF-8) em
+                  ordem de chave, com IDs contínuos
+            message_cls: Classe Message (gera a linha JSON de cada mensagem)
+        """
+        first_id = min(row[0] for row in rows)
+        last_id = max(row[0] for row in rows)
+        positions = array("I", [0]) * len(rows)
+        records = bytearray()
+        blob = bytearray()
+        id_ordered = True
+        for pos, (id, lamport, node_id, physical, content) in enumerate(rows):
+            line = message_cls.model_construct(
+                id=id, content=content.decode("utf-8", "surrogatepass"), lamport_timestamp=lamport,
+                node_id=node_id, physical_timestamp=physical,
+            ).model_dump_json().encode() + b"\n"
+            records += RECORD.pack(id, lamport, node_id, physical, len(blob), len(line))
+            blob += line
+            positions[id - first_id] = pos
+            id_ordered = id_ordered and id == first_id + pos
+        header = HEADER.pack(
+            MAGIC, len(rows), first_id, last_id, FLAG_ID_ORDERED if id_ordered else 0,
+            HEADER.size + len(records) + len(positions) * POSITION.size,
+        )
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(header)
+            f.write(records)
+            f.write(struct.pack(f"<{len(positions)}I", *positions))
+            f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def close(self):
+        try:
+            self._view.release()
+            self._mm.close()
+        except BufferError:
+            # Alguma resposta ainda usa uma fatia; o mmap fecha com o processo
+            pass
+
+    # --- registros ---
+
+    def record(self, pos: int) -> tuple:
+        return RECORD.unpack_from(self._mm, HEADER.size + pos * RECORD.size)
+
+    def key(self, pos: int) -> tuple:
+        id, lamport, node_id, _, _, _ = self.record(pos)
+        return (lamport, node_id, id)
+
+    def position(self, id: int) -> int:
+        """Posição do ID no segmento (o ID precisa estar no intervalo)"""
+        return POSITION.unpack_from(self._mm, self._positions + (id - self.first_id) * POSITION.size)[0]
+
+    def bisect_right(self, key: tuple) -> int:
+        """Primeira posição com chave > key"""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if key < self.key(mid):
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    def lines(self, start: int, end: int) -> memoryview:
+        """Linhas NDJSON das posições [start, end): uma fatia do mmap, sem cópia"""
+        first = self.record(start)
+        last = self.record(end - 1)
+        return self._view[self._blob + first[4]:self._blob + last[4] + last[5]]
+
+    def message(self, pos: int, message_cls):
+        """Monta a Message da posição pos"""
+        id, lamport, node_id, physical, offset, length = self.record(pos)
+        line = self._view[self._blob + offset:self._blob + offset + length]
+        return message_cls.model_construct(
+            id=id, content=json.loads(bytes(line))["content"], lamport_timestamp=lamport,
+            node_id=node_id, physical_timestamp=physical,
+        )
+
+
+class SegmentedMessageStore:
+    """
+    Log de mensagens com a cauda em memória e o histórico em segmentos
+    mapeados, com a mesma interface do MessageStore
+
+    Args:
+        message_cls: Classe Message
+        directory: Diretório dos segmentos
+        reuse: Reaproveitar segmentos existentes (True só com o WAL ligado)
+        hot_messages: Mensagens mantidas na cauda
+        segment_messages: Mensagens por segmento
+    """
+
+    def __init__(self, message_cls, directory: str, reuse: bool = False,
+                 hot_messages: int = HOT_MESSAGES, segment_messages: int = SEGMENT_MESSAGES):
+        self.message_cls = message_cls
+        self.directory = directory
+        self.hot_messages = hot_messages
+        self.segment_messages = max(1, segment_messages)
+        self.hot = CompactMessageStore(message_cls)
+        self.segments = []
+        self._first_ids = []
+        self._disjoint = True
+        self._sealing = False
+        # Segura a instalação de um segmento e a leitura de cada bloco em stream
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        names = sorted(name for name in os.listdir(directory) if name.endswith((".seg", ".tmp")))
+        for name in names:
+            path = os.path.join(directory, name)
+            if reuse and name.endswith(".seg"):
+                try:
+                    segment = SealedSegment(path)
+                except (OSError, ValueError) as e:
+                    log.warning("Discarding unreadable segment", path=path, error=str(e))
+                else:
+                    if segment.first_id == self.sealed_through + 1:
+                        self._add_segment(segment)
+                        continue
+                    segment.close()
+            os.remove(path)
+        if self.segments:
+            self.hot._id_base = self.hot.last_id = self.hot.contiguous_id = self.sealed_through
+            log.info("Reusing sealed segments", segments=len(self.segments), sealed_through=self.sealed_through)
+
+    # --- estado ---
+
+    @property
+    def sealed_through(self) -> int:
+        """Maior ID já selado (0 se não há segmentos)"""
+        return self.segments[-1].last_id if self.segments else 0
+
+    @property
+    def last_id(self) -> int:
+        return self.hot.last_id
+
+    @property
+    def contiguous_id(self) -> int:
+        return self.hot.contiguous_id
+
+    def __len__(self) -> int:
+        return sum(segment.count for segment in self.segments) + len(self.hot)
+
+    def __iter__(self):
+        """Percorre o log em ordem (lamport_timestamp, node_id)"""
+        for chunk in self.chunks():
+            yield from chunk
+
+    def stats(self) -> dict:
+        return {
+            "hot_messages": len(self.hot),
+            "segments": len(self.segments),
+            "sealed_messages": sum(segment.count for segment in self.segments),
+            "sealed_bytes": sum(len(segment._mm) for segment in self.segments),
+            "sealed_through": self.sealed_through,
+            "disjoint": self._layers_disjoint(),
+        }
+
+    order_key = staticmethod(CompactMessageStore.order_key)
+    cursor_after = CompactMessageStore.cursor_after
+
+    def _add_segment(self, segment: SealedSegment):
+        if self.segments and segment.min_key <= self.segments[-1].max_key:
+            self._disjoint = False
+        self.segments.append(segment)
+        self._first_ids.append(segment.first_id)
+
+    def _segment_of(self, id: int):
+        i = bisect.bisect_right(self._first_ids, id) - 1
+        if i < 0 or id > self.segments[i].last_id:
+            return None
+        return self.segments[i]
+
+    def _layers_disjoint(self) -> bool:
+        """True se segmentos e cauda estão em faixas de chave sem sobreposição"""
+        if not self._disjoint:
+            return False
+        hot_range = self.hot.key_range()
+        return not self.segments or hot_range is None or hot_range[0] > self.segments[-1].max_key
+
+    # --- escrita ---
+
+    def add(self, message) -> bool:
+        return bool(self.extend([message]))
+
+    def extend(self, messages):
+        """Guarda mensagens na cauda (IDs já selados são repetições)"""
+        sealed = self.sealed_through
+        added = self.hot.extend([message for message in messages if message.id > sealed])
+        self._maybe_seal()
+        return added
+
+    def mark_contiguous(self, upto: int):
+        self.hot.mark_contiguous(upto)
+        self._maybe_seal()
+
+    def next_id(self) -> int:
+        return self.hot.next_id()
+
+    def advance_last_id(self, upto: int):
+        self.hot.advance_last_id(upto)
+
+    def truncate_after(self, after_id: int) -> list:
+        """
+        Remove as mensagens com id > after_id (só da cauda em memória)
+
+        Raises:
+            ValueError: Se o corte cai no histórico já selado (imutável)
+        """
+        if after_id < self.sealed_through:
+            raise ValueError(f"Cannot truncate sealed history (sealed through {self.sealed_through})")
+        return self.hot.truncate_after(after_id)
+
+    def _maybe_seal(self):
+        if self._sealing or len(self.hot) < self.hot_messages + self.segment_messages:
+            return
+        first = self.sealed_through + 1
+        last = first + self.segment_messages - 1
+        if self.hot.contiguous_id < last:
+            return
+        rows = self.hot.export_rows(last)
+        path = os.path.join(self.directory, f"{first:020d}.seg")
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is None:
+            # Fora do event loop (recuperação do WAL na importação): selar já
+            SealedSegment.write(path, rows, self.message_cls)
+            self._install(path, last)
+            return
+
+        self._sealing = True
+
+        def seal():
+            try:
+                SealedSegment.write(path, rows, self.message_cls)
+            except Exception as e:
+                log.error("Failed to seal segment", path=path, error=repr(e))
+                loop.call_soon_threadsafe(setattr, self, "_sealing", False)
+                return
+            loop.call_soon_threadsafe(self._install, path, last)
+
+        threading.Thread(target=seal, name="seal-segment", daemon=True).start()
+
+    def _install(self, path: str, last: int):
+        segment = SealedSegment(path)
+        with self._lock:
+            self._add_segment(segment)
+            self.hot.drop_through(last)
+        self._sealing = False
+        log.info(
+            "Sealed segment", first_id=segment.first_id, last_id=segment.last_id,
+            bytes=len(segment._mm), id_ordered=segment.id_ordered, disjoint=self._layers_disjoint(),
+        )
+        self._maybe_seal()
+
+    def snapshot(self):
+        """
+        Cópia só de leitura, para percorrer fora do event loop
+
+        Os segmentos (imutáveis) são compartilhados; a cauda é copiada. A
+        cópia não sela nada. Usada pelo snapshot do WAL; as leituras em
+        stream não copiam (ver o docstring do módulo).
+        """
+        frozen = copy.copy(self)
+        frozen.segments = list(self.segments)
+        frozen._first_ids = list(self._first_ids)
+        frozen.hot = self.hot.snapshot()
+        frozen._sealing = True
+        frozen._lock = threading.Lock()
+        return frozen
+
+    # --- leitura por ID ---
+
+    def get(self, id: int):
+        segment = self._segment_of(id)
+        if segment is None:
+            return self.hot.get(id)
+        return segment.message(segment.position(id), self.message_cls)
+
+    def range_by_id(self, start_id: int, end_id: int = None, limit: int = None):
+        result = []
+        id = max(start_id, 1)
+        while id <= self.sealed_through and (end_id is None or id <= end_id):
+            if limit is not None and len(result) >= limit:
+                return result
+            segment = self._segment_of(id)
+            result.append(segment.message(segment.position(id), self.message_cls))
+            id += 1
+        remaining = None if limit is None else limit - len(result)
+        return result + self.hot.range_by_id(id, end_id, remaining)
+
+    def cursor_after_id(self, id: int):
+        segment = self._segment_of(id)
+        if segment is None:
+            return self.hot.cursor_after_id(id)
+        return segment.key(segment.position(id))
+
+    def id_chunks(self, after_id: int, limit: int = None, chunk_size: int = 500):
+        """Blocos de Message com id > after_id (ver MessageStore), cada um lido sob o lock"""
+        remaining = limit
+        while remaining is None or remaining > 0:
+            n = chunk_size if remaining is None else min(chunk_size, remaining)
+            with self._lock:
+                chunk = self.range_by_id(after_id + 1, limit=n)
+            if not chunk:
+                return
+            yield chunk
+            if remaining is not None:
+                remaining -= len(chunk)
+            after_id = chunk[-1].id
+
+    def id_ndjson(self, after_id: int, limit: int = None, chunk_size: int = 500):
+        """
+        Mensagens com id > after_id em ordem de ID, como pedaços NDJSON
+
+        A parte selada sai como fatias do mmap (uma por bloco, se o segmento
+        está em ordem de ID; senão uma linha por vez, ainda sem decodificar).
+        Cada bloco é lido sob o lock (ver o docstring do módulo).
+        """
+        remaining = limit
+        while remaining is None or remaining > 0:
+            n = chunk_size if remaining is None else min(chunk_size, remaining)
+            with self._lock:
+                piece, last, count = self._id_piece(after_id, n)
+            if not count:
+                return
+            yield piece
+            after_id = last
+            if remaining is not None:
+                remaining -= count
+
+    def _id_piece(self, after_id: int, n: int):
+        """Próximo bloco de id_ndjson(): (bytes, último ID, quantidade)"""
+        segment = self._segment_of(after_id + 1)
+        if segment is None:
+            # Chegou na cauda: um bloco, codificado direto das colunas
+            hot = self.hot
+
+            def encode(rows):
+                return hot._encode(rows), hot._id[rows[-1]], len(rows)
+
+            return next(hot._id_row_chunks(after_id, n, n, encode), (b"", after_id, 0))
+        start = segment.position(after_id + 1)
+        count = min(n, segment.last_id - after_id)
+        if segment.id_ordered:
+            piece = segment.lines(start, start + count)
+        else:
+            piece = b"".join(
+                segment.lines(segment.position(id), segment.position(id) + 1)
+                for id in range(after_id + 1, after_id + 1 + count)
+            )
+        return piece, after_id + count, count
+
+    # --- leitura em ordem (lamport_timestamp, node_id) ---
+
+    def _segments_after(self, after):
+        return [
+            segment for segment in self.segments if after is None or segment.max_key > after
+        ]
+
+    def _chunk_after(self, after, n: int):
+        """
+        Próximo bloco de até n mensagens depois do cursor
+
+        Returns:
+            tuple: (segmento, início, fim) se o bloco é uma fatia de um
+                   segmento; senão (None, lista de Message, None)
+        """
+        segments = self._segments_after(after)
+        if self._layers_disjoint():
+            if segments:
+                segment = segments[0]
+                start = 0 if after is None else segment.bisect_right(after)
+                return segment, start, min(segment.count, start + n)
+            chunk = next(self.hot.chunks(after, n, n), [])
+            return None, chunk, None
+        # Camadas sobrepostas: merge dos primeiros n de cada uma
+        sources = []
+        for segment in segments:
+            start = 0 if after is None else segment.bisect_right(after)
+            sources.append([segment.message(pos, self.message_cls) for pos in range(start, min(segment.count, start + n))])
+        sources.append(next(self.hot.chunks(after, n, n), []))
+        return None, list(heapq.merge(*sources, key=self.order_key))[:n], None
+
+    def chunks(self, after: tuple = None, limit: int = None, chunk_size: int = 500):
+        """Percorre o log em ordem, em blocos de Message (ver MessageStore.chunks)"""
+        remaining = limit
+        while remaining is None or remaining > 0:
+            n = chunk_size if remaining is None else min(chunk_size, remaining)
+            with self._lock:
+                segment, start, end = self._chunk_after(after, n)
+            if segment is None:
+                chunk = start
+            else:
+                chunk = [segment.message(pos, self.message_cls) for pos in range(start, end)]
+            if not chunk:
+                return
+            yield chunk
+            if remaining is not None:
+                remaining -= len(chunk)
+            after = self.order_key(chunk[-1])
+
+    def ndjson(self, after: tuple = None, limit: int = None, chunk_size: int = 500):
+        """
+        Percorre o log em ordem como pedaços NDJSON
+
+        Blocos de um segmento saem como fatias do mmap; os da cauda (ou de
+        camadas sobrepostas) são codificados a partir das Message. Cada bloco
+        é localizado sob o lock (ver o docstring do módulo).
+        """
+        remaining = limit
+        while remaining is None or remaining > 0:
+            n = chunk_size if remaining is None else min(chunk_size, remaining)
+            with self._lock:
+                segment, start, end = self._chunk_after(after, n)
+            if segment is None:
+                chunk = start
+                if not chunk:
+                    return
+                yield from streaming.ndjson_chunks([chunk])
+                count = len(chunk)
+                after = self.order_key(chunk[-1])
+            else:
+                yield segment.lines(start, end)
+                count = end - start
+                after = segment.key(end - 1)
+            if remaining is not None:
+                remaining -= count
+
+    def close(self):
+        for segment in self.segments:
+            segment.close()
@@ -1,20 +1,150 @@
-from typing import Union
+from typing import Optional, Union
 from fastapi import FastAPI
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 import threading
 import time
-import requests
+import os
+import httpx
+
+
+# Configuração do pool de conexões entre nós (variáveis de ambiente)
+#   PEER_POOL_SIZE:      conexões máximas por peer (padrão 10)
+#   PEER_IDLE_TIMEOUT:   segundos que uma conexão ociosa fica aberta (padrão 4,
+#                        abaixo do keep-alive de 5s do uvicorn do outro lado)
+#   PEER_TIMEOUT:        timeout padrão de cada requisição em segundos (padrão 2)
+#   PEER_HTTP2:          "1" para negociar HTTP/2 quando o peer suportar
+PEER_POOL_SIZE = int(os.getenv("PEER_POOL_SIZE", "10"))
+PEER_IDLE_TIMEOUT = float(os.getenv("PEER_IDLE_TIMEOUT", "4"))
+PEER_TIMEOUT = float(os.getenv("PEER_TIMEOUT", "2"))
+PEER_HTTP2 = os.getenv("PEER_HTTP2", "0") == "1"
 
 
 class Server(BaseModel):
     host: str
     port: int
     id: int
+    # Porta do NodeService gRPC deste peer (None = GRPC_PORT padrão)
+    grpc_port: Optional[int] = None
+
+    # Clientes HTTP persistentes (keep-alive) deste peer, criados sob demanda:
+    # um síncrono para as threads (eleição, health check) e um assíncrono
+    # para os handlers do FastAPI.
+    _client: httpx.Client = PrivateAttr(default=None)
+    _async_client: httpx.AsyncClient = PrivateAttr(default=None)
+    _client_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _requests: int = PrivateAttr(default=0)
+    _connections: int = PrivateAttr(default=0)
 
     def url(self):
         """Retorna a URL completa do servidor"""
         return f"http://{self.host}:{self.port}"
 
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=PEER_POOL_SIZE,
+            max_keepalive_connections=PEER_POOL_SIZE,
+            keepalive_expiry=PEER_IDLE_TIMEOUT,
+        )
+
+    def _trace(self, event_name, info):
+        # Cada conexão TCP nova é um "miss" do pool
+        if event_name == "connection.connect_tcp.started":
+            self._connections += 1
+
+    async def _atrace(self, event_name, info):
+        self._trace(event_name, info)
+
+    def client(self) -> httpx.Client:
+        """Cliente síncrono com pool de conexões deste peer"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = httpx.Client(
+                        base_url=self.url(),
+                        limits=self._limits(),
+                        timeout=PEER_TIMEOUT,
+                        http2=PEER_HTTP2,
+                    )
+        return self._client
+
+    def async_client(self) -> httpx.AsyncClient:
+        """Cliente assíncrono com pool de conexões deste peer"""
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                base_url=self.url(),
+                limits=self._limits(),
+                timeout=PEER_TIMEOUT,
+                http2=PEER_HTTP2,
+            )
+        return self._async_client
+
+    def request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """
+        Faz uma requisição síncrona a este peer reutilizando o pool
+
+        Args:
+            method: Método HTTP
+            path: Caminho relativo (ex: "/leader")
+            **kwargs: Repassados ao httpx (json, params, timeout...)
+        """
+        self._requests += 1
+        return self.client().request(method, path, extensions={"trace": self._trace}, **kwargs)
+
+    async def arequest(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """Versão assíncrona de request(), para uso dentro do event loop"""
+        self._requests += 1
+        return await self.async_client().request(
+            method, path, extensions={"trace": self._atrace}, **kwargs
+        )
+
+    def astream(self, method: str, path: str, **kwargs):
+        """
+        Requisição assíncrona com resposta em streaming, reutilizando o pool
+
+        Uso:
+            async with server.astream("GET", "/log") as response:
+                async for line in response.aiter_lines(): ...
+        """
+        self._requests += 1
+        return self.async_client().stream(
+            method, path, extensions={"trace": self._atrace}, **kwargs
+        )
+
+    def get(self, path: str, **kwargs) -> httpx.Response:
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> httpx.Response:
+        return self.request("POST", path, **kwargs)
+
+    async def aget(self, path: str, **kwargs) -> httpx.Response:
+        return await self.arequest("GET", path, **kwargs)
+
+    async def apost(self, path: str, **kwargs) -> httpx.Response:
+        return await self.arequest("POST", path, **kwargs)
+
+    def pool_stats(self) -> dict:
+        """
+        Contadores de reutilização do pool
+
+        Returns:
+            dict: requisições, hits (reutilizaram conexão) e misses (abriram conexão)
+        """
+        misses = self._connections
+        return {
+            "requests": self._requests,
+            "hits": max(self._requests - misses, 0),
+            "misses": misses,
+        }
+
+    async def aclose(self):
+        """Fecha os clientes e suas conexões abertas"""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
     def current_leader(self):
         """
         Consulta quem é o líder atual segundo este servidor
@@ -23,11 +153,11 @@ class Server(BaseModel):
             int: ID do líder, ou None se não responde
         """
         try:
-            response = requests.get(self.url() + "/leader", timeout=2)
+            response = self.get("/leader")
             if response.status_code == 200:
                 # O líder retorna seu ID como int
                 leader_id = response.text.strip('"')
                 return int(leader_id) if leader_id != 'null' else None
             return None
         except:
-            return None
\ No newline at end of file
+            return None
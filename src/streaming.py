@@ -0,0 +1,50 @@
+"""
+Codificação incremental de listas de mensagens para respostas HTTP
+
+As mensagens são serializadas bloco a bloco (um bloco vindo de
+MessageStore.chunks por vez), então um dump completo do log nunca vira uma
+única lista gigante de modelos pydantic nem uma única string JSON. O array
+JSON de GET /messages é montado a partir desses mesmos pedaços NDJSON.
+"""
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def ndjson_chunks(chunks):
+    """
+    Codifica blocos de mensagens como NDJSON (uma mensagem JSON por linha)
+
+    Args:
+        chunks: Iterável de listas de Message
+
+    Yields:
+        bytes: Um pedaço de linhas NDJSON por bloco
+    """
+    for chunk in chunks:
+        yield "".join(msg.model_dump_json() + "\n" for msg in chunk).encode()
+
+
+def json_array_from_ndjson(pieces):
+    """
+    Converte pedaços NDJSON num único array JSON
+
+    Cada pedaço termina em "\n" e só contém "\n" entre mensagens (dentro
+    das strings JSON a quebra de linha é escapada), então a conversão é
+    uma troca de bytes, sem decodificar as mensagens. Serve para pedaços
+    que vêm direto de segmentos mapeados em memória (ver segments.py).
+
+    Args:
+        pieces: Iterável de bytes / memoryview com linhas NDJSON
+
+    Yields:
+        bytes: Pedaços do array JSON
+    """
+    first = True
+    yield b"["
+    for piece in pieces:
+        body = bytes(piece[:-1]).replace(b"\n", b",")
+        if not body:
+            continue
+        yield body if first else b"," + body
+        first = False
+    yield b"]"
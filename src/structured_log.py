@@ -0,0 +1,215 @@
+"""
+Logging estruturado e assíncrono do nó
+
+Substitui os print() espalhados pelo código. Cada subsistema (api,
+replication, election, clock, wal...) tem seu logger com nível próprio, e
+cada evento leva campos estruturados (follower=8002, ids="5..9") em vez de
+texto montado com f-string.
+
+Nada de I/O no caminho da requisição:
+- um evento abaixo do nível do subsistema custa só uma comparação
+- um evento habilitado vai para uma fila em memória; uma thread em
+  background (QueueListener) formata e escreve no stdout
+- se a fila enche (stdout lento), eventos são descartados e contados,
+  em vez de bloquear o event loop
+
+Eventos de alta frequência (um por mensagem ou por lote) são amostrados:
+chamados com sample=True, só 1 a cada N ocorrências é escrito, com o campo
+sampled=N.
+
+Configuração (variáveis de ambiente):
+- LOG_LEVEL:   nível padrão (DEBUG, INFO, WARNING, ERROR; padrão INFO)
+- LOG_LEVELS:  níveis por subsistema, ex: "replication=DEBUG,clock=WARNING"
+- LOG_SAMPLE:  amostragem por subsistema, ex: "replication=10" (padrão
+               LOG_SAMPLE_EVERY=100; 1 desliga a amostragem)
+- LOG_FORMAT:  "text" (padrão) ou "json" (um objeto por linha)
+- LOG_QUEUE_SIZE: eventos pendentes antes de descartar (padrão 10000)
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").strip().upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").strip().lower()
+LOG_SAMPLE_EVERY = int(os.getenv("LOG_SAMPLE_EVERY", "100"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+_NODE_ID = os.getenv("NODE_ID")
+
+
+def _parse_pairs(spec: str) -> dict:
+    """Converte "a=X,b=Y" em {"a": "X", "b": "Y"}"""
+    pairs = {}
+    for item in (spec or "").split(","):
+        if "=" in item:
+            key, value = item.split("=", 1)
+            pairs[key.strip()] = value.strip()
+    return pairs
+
+
+LOG_LEVELS = {name: value.upper() for name, value in _parse_pairs(os.getenv("LOG_LEVELS")).items()}
+LOG_SAMPLE = {name: int(value) for name, value in _parse_pairs(os.getenv("LOG_SAMPLE")).items()}
+
+
+class TextFormatter(logging.Formatter):
+    """[Node 8001] INFO  replication: Replicated batch follower=8002 ids=5..9"""
+
+    def format(self, record):
+        fields = getattr(record, "fields", None)
+        line = f"[Node {_NODE_ID}] {record.levelname:<5} {record.subsystem}: {record.msg}"
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """Um objeto JSON por linha, com os campos do evento no primeiro nível"""
+
+    def format(self, record):
+        event = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "node": _NODE_ID,
+            "subsystem": record.subsystem,
+            "msg": record.msg,
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            event.update(fields)
+        if record.exc_info:
+            event["exc"] = self.formatException(record.exc_info)
+        return json.dumps(event, default=str)
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler que não formata na thread de quem loga
+
+    O QueueHandler padrão monta a mensagem em prepare(), ainda no event
+    loop; aqui o registro vai como está e a formatação fica para a thread
+    do QueueListener. Com a fila cheia o evento é descartado.
+    """
+
+    dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _DeferredQueueHandler.dropped += 1
+
+
+_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+_handler = _DeferredQueueHandler(_queue)
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def _start_listener():
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            return
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+        _listener = logging.handlers.QueueListener(_queue, output)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+
+class SubsystemLogger:
+    """
+    Logger de um subsistema, com campos estruturados e amostragem
+
+    Uso:
+        log = get_logger("replication")
+        log.info("Replicated batch", follower=8002, ids="5..9")
+        log.debug("Received batch", size=10, sample=True)
+
+    Args:
+        subsystem: Nome do subsistema (ex: "replication")
+    """
+
+    def __init__(self, subsystem: str):
+        self.subsystem = subsystem
+        self.logger = logging.getLogger(f"node.{subsystem}")
+        self.logger.setLevel(LOG_LEVELS.get(subsystem, LOG_LEVEL))
+        self.logger.propagate = False
+        if _handler not in self.logger.handlers:
+            self.logger.addHandler(_handler)
+        self.sample_every = max(1, LOG_SAMPLE.get(subsystem, LOG_SAMPLE_EVERY))
+        self._counts = {}
+
+    def enabled(self, level: int) -> bool:
+        """True se eventos deste nível são escritos (para evitar montar campos caros)"""
+        return self.logger.isEnabledFor(level)
+
+    def _log(self, level: int, msg: str, sample: bool, exc_info, fields: dict):
+        if not self.logger.isEnabledFor(level):
+            return
+        if sample and self.sample_every > 1:
+            # Só a 1ª, a (N+1)ª, ... ocorrência deste evento é escrita
+            count = self._counts.get(msg, 0)
+            self._counts[msg] = count + 1
+            if count % self.sample_every:
+                return
+            fields["sampled"] = self.sample_every
+        self.logger.log(level, msg, exc_info=exc_info, extra={"subsystem": self.subsystem, "fields": fields})
+
+    def debug(self, msg: str, sample: bool = False, **fields):
+        self._log(logging.DEBUG, msg, sample, None, fields)
+
+    def info(self, msg: str, sample: bool = False, **fields):
+        self._log(logging.INFO, msg, sample, None, fields)
+
+    def warning(self, msg: str, sample: bool = False, **fields):
+        self._log(logging.WARNING, msg, sample, None, fields)
+
+    def error(self, msg: str, sample: bool = False, **fields):
+        self._log(logging.ERROR, msg, sample, None, fields)
+
+    def exception(self, msg: str, **fields):
+        """Loga em ERROR com o traceback da exceção em tratamento"""
+        self._log(logging.ERROR, msg, False, True, fields)
+
+
+_loggers = {}
+
+
+def get_logger(subsystem: str) -> SubsystemLogger:
+    """
+    Logger do subsistema (um por nome, criado no primeiro uso)
+
+    Args:
+        subsystem: Nome do subsistema (api, replication, election, clock, wal...)
+    """
+    logger = _loggers.get(subsystem)
+    if logger is None:
+        _start_listener()
+        logger = _loggers[subsystem] = SubsystemLogger(subsystem)
+    return logger
+
+
+def stats() -> dict:
+    """Eventos pendentes na fila e descartados por fila cheia"""
+    return {"queued": _queue.qsize(), "dropped": _DeferredQueueHandler.dropped}
+
+
+def flush(timeout: float = 1.0):
+    """Espera a fila esvaziar (ex: antes de encerrar o processo)"""
+    deadline = time.monotonic() + timeout
+    while not _queue.empty() and time.monotonic() < deadline:
+        time.sleep(0.01)
@@ -0,0 +1,507 @@
+"""
+Write-ahead log em disco para o log de mensagens
+
+Toda mensagem guardada no MessageStore também é gravada, em modo
+append-only, num log segmentado em disco. Ao reiniciar, o nó reconstrói o
+store e o relógio de Lamport a partir do último snapshot mais a cauda do log.
+
+Layout em DATA_DIR/wal:
+- <seq>.log   registros de dados: uma mensagem JSON por linha, ou um
+              marcador {"truncate_after": id} (as mensagens com ID maior
+              gravadas antes dele foram descartadas, ver truncate)
+- <seq>.idx   índice de offsets com um registro de tamanho fixo por mensagem
+              (id, lamport, node_id, offset, length, crc32)
+- snapshot-<seq>.json   estado completo do log até o registro <seq> (exclusivo)
+
+<seq> é o número sequencial do primeiro registro do segmento.
+
+As gravações e os fsyncs rodam numa thread própria (wal-writer), fora do
+event loop: append() e truncate() só enfileiram e devolvem um Future,
+resolvido quando o registro está gravado conforme a política de fsync.
+Quem confirma uma escrita (ack ao líder, resposta ao cliente) espera esse
+Future; durable() devolve o Future de tudo o que já foi enfileirado.
+
+Política de fsync (WAL_FSYNC):
+- write:    fsync depois de cada mensagem
+- batch:    fsync uma vez por passada da thread de escrita (todos os
+            lotes enfileirados desde a anterior: group commit, lotes
+            replicados) — padrão
+- interval: fsync periódico a cada WAL_FSYNC_INTERVAL_MS; o Future é
+            resolvido já depois do write
+
+Um segmento selado cujos registros estão todos cobertos pelo snapshot mais
+antigo mantido é apagado depois que esse snapshot está em disco, então a
+recuperação a partir de qualquer snapshot mantido continua possível.
+"""
+
+import collections
+import concurrent.futures
+import json
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+
+
+WAL_ENABLED = os.getenv("WAL_ENABLED", "1") == "1"
+DATA_DIR = os.getenv("DATA_DIR", "data")
+WAL_FSYNC = os.getenv("WAL_FSYNC", "batch").strip().lower()
+WAL_FSYNC_INTERVAL_MS = float(os.getenv("WAL_FSYNC_INTERVAL_MS", "100"))
+WAL_SEGMENT_BYTES = int(os.getenv("WAL_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+SNAPSHOT_EVERY = int(os.getenv("SNAPSHOT_EVERY", "100000"))
+
+FSYNC_POLICIES = ("write", "batch", "interval")
+
+# Registro do índice: id, lamport, node_id, offset, length, crc32
+INDEX_RECORD = struct.Struct("<qqqQII")
+
+# Snapshots antigos mantidos além do mais recente
+_SNAPSHOTS_KEPT = 2
+
+# Campos do índice para um registro que não é mensagem (marcador de truncate)
+_Marker = collections.namedtuple("_Marker", "id lamport_timestamp node_id")
+
+
+def _fsync_directory(directory: str):
+    """fsync do diretório, para o rename de um arquivo novo sobreviver a um crash"""
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def messages_from_snapshot(snap: dict, message_cls):
+    """
+    Converte um snapshot (formato colunar) em lista de Message
+
+    Args:
+        snap: Snapshot já decodificado de JSON
+        message_cls: Classe Message
+
+    Returns:
+        list: Mensagens do snapshot, em ordem
+    """
+    return [
+        message_cls.model_construct(
+            id=id, content=content, lamport_timestamp=lamport,
+            node_id=node_id, physical_timestamp=physical,
+        )
+        for id, content, lamport, node_id, physical in zip(
+            snap["ids"], snap["contents"], snap["lamports"], snap["node_ids"], snap["physical"]
+        )
+    ]
+
+
+class Segment:
+    """
+    Um segmento do log: arquivo de dados + índice de offsets
+
+    Attributes:
+        base_seq (int): Número sequencial do primeiro registro
+        count (int): Quantidade de registros
+        size (int): Tamanho do arquivo de dados em bytes
+    """
+
+    def __init__(self, directory: str, base_seq: int):
+        self.base_seq = base_seq
+        self.data_path = os.path.join(directory, f"{base_seq:020d}.log")
+        self.index_path = os.path.join(directory, f"{base_seq:020d}.idx")
+        self.count = 0
+        self.size = 0
+        self._data = None
+        self._index = None
+
+    def open_for_append(self):
+        self._data = open(self.data_path, "ab")
+        self._index = open(self.index_path, "ab")
+
+    def append(self, message, line: bytes):
+        offset = self.size
+        self._data.write(line)
+        self._index.write(INDEX_RECORD.pack(
+            message.id, message.lamport_timestamp, message.node_id,
+            offset, len(line), zlib.crc32(line),
+        ))
+        self.size += len(line)
+        self.count += 1
+
+    def flush(self, fsync: bool):
+        if self._data is None:
+            return
+        self._data.flush()
+        self._index.flush()
+        if fsync:
+            os.fsync(self._data.fileno())
+            os.fsync(self._index.fileno())
+
+    def close(self):
+        if self._data is not None:
+            self.flush(fsync=True)
+            self._data.close()
+            self._index.close()
+            self._data = self._index = None
+
+    def read_records(self):
+        """
+        Lê e valida os registros do segmento, truncando uma cauda corrompida
+
+        Uma escrita interrompida (crash no meio do append) deixa um registro
+        incompleto no fim; tudo a partir do primeiro registro inválido é
+        descartado.
+
+        Returns:
+            list: Linhas JSON (bytes) válidas, em ordem
+        """
+        with open(self.data_path, "rb") as f:
+            data = f.read()
+        with open(self.index_path, "rb") as f:
+            index = f.read()
+
+        lines = []
+        end = 0
+        n_records = len(index) // INDEX_RECORD.size
+        for i in range(n_records):
+            _, _, _, offset, length, crc = INDEX_RECORD.unpack_from(index, i * INDEX_RECORD.size)
+            line = data[offset:offset + length]
+            if offset != end or len(line) != length or zlib.crc32(line) != crc:
+                break
+            lines.append(line)
+            end = offset + length
+
+        valid = len(lines)
+        if valid * INDEX_RECORD.size != len(index) or end != len(data):
+            with open(self.data_path, "r+b") as f:
+                f.truncate(end)
+            with open(self.index_path, "r+b") as f:
+                f.truncate(valid * INDEX_RECORD.size)
+
+        self.count = valid
+        self.size = end
+        return lines
+
+
+class WriteAheadLog:
+    """
+    Log append-only segmentado com snapshots periódicos
+
+    Attributes:
+        directory (str): Diretório dos segmentos e snapshots
+        next_seq (int): Número sequencial do próximo registro
+        recovery_seconds (float): Tempo gasto na última recuperação
+        recovered (int): Mensagens restauradas na última recuperação
+    """
+
+    def __init__(self, directory: str, message_cls, fsync_policy: str = WAL_FSYNC,
+                 segment_bytes: int = WAL_SEGMENT_BYTES, snapshot_every: int = SNAPSHOT_EVERY):
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"WAL_FSYNC inválido: {fsync_policy!r} (use {', '.join(FSYNC_POLICIES)})")
+        self.directory = directory
+        self.message_cls = message_cls
+        self.fsync_policy = fsync_policy
+        self.segment_bytes = segment_bytes
+        self.snapshot_every = snapshot_every
+        self.segments = []
+        self.next_seq = 0
+        self.snapshot_seq = 0
+        self.recovery_seconds = 0.0
+        self.recovered = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._snapshot_running = False
+        # Pedidos para a thread de escrita: (mensagens ou None, linha de marcador, Future)
+        self._queue = queue.SimpleQueue()
+        self._writer = None
+        self._last_future = None
+        os.makedirs(directory, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # Recuperação
+    # ------------------------------------------------------------------
+
+    def _message(self, fields: dict):
+        # Os registros foram validados antes de serem gravados
+        return self.message_cls.model_construct(**fields)
+
+    def _load_snapshot(self):
+        snapshots = sorted(
+            f for f in os.listdir(self.directory) if f.startswith("snapshot-") and f.endswith(".json")
+        )
+        for name in reversed(snapshots):
+            try:
+                with open(os.path.join(self.directory, name), "rb") as f:
+                    snap = json.loads(f.read())
+            except (OSError, ValueError):
+                continue  # Snapshot incompleto; tenta o anterior
+            return snap["seq"], messages_from_snapshot(snap, self.message_cls)
+        return 0, []
+
+    def recover(self):
+        """
+        Reconstrói o log a partir do último snapshot e da cauda dos segmentos
+
+        Returns:
+            tuple: (lista de Message em ordem de gravação, maior timestamp Lamport)
+        """
+        started = time.perf_counter()
+
+        self.snapshot_seq, messages = self._load_snapshot()
+
+        bases = sorted(
+            int(name[:-4]) for name in os.listdir(self.directory) if name.endswith(".log")
+        )
+        seq = 0
+        for i, base in enumerate(bases):
+            segment = Segment(self.directory, base)
+            if not os.path.exists(segment.index_path):
+                open(segment.index_path, "wb").close()
+            self.segments.append(segment)
+            next_base = bases[i + 1] if i + 1 < len(bases) else None
+            if next_base is not None and next_base <= self.snapshot_seq:
+                # Segmento selado e coberto pelo snapshot: não precisa ser lido
+                segment.count = next_base - base
+                segment.size = os.path.getsize(segment.data_path)
+                seq = next_base
+                continue
+            lines = segment.read_records()
+            # Só a parte do segmento posterior ao snapshot precisa ser aplicada
+            skip = max(self.snapshot_seq - base, 0)
+            for line in lines[skip:]:
+                fields = json.loads(line)
+                if "truncate_after" in fields:
+                    messages = [m for m in messages if m.id <= fields["truncate_after"]]
+                else:
+                    messages.append(self._message(fields))
+            seq = base + segment.count
+
+        self.next_seq = max(seq, self.snapshot_seq)
+        if self.segments and seq >= self.snapshot_seq and self.segments[-1].size < self.segment_bytes:
+            self.segments[-1].open_for_append()
+        else:
+            self._roll()
+
+        self.recovered = len(messages)
+        self.recovery_seconds = time.perf_counter() - started
+        max_lamport = max((m.lamport_timestamp for m in messages), default=0)
+
+        self._writer = threading.Thread(target=self._write_loop, name="wal-writer", daemon=True)
+        self._writer.start()
+        if self.fsync_policy == "interval":
+            threading.Thread(target=self._fsync_loop, daemon=True).start()
+        return messages, max_lamport
+
+    # ------------------------------------------------------------------
+    # Escrita
+    # ------------------------------------------------------------------
+
+    def _roll(self):
+        if self.segments:
+            self.segments[-1].close()
+        segment = Segment(self.directory, self.next_seq)
+        segment.open_for_append()
+        self.segments.append(segment)
+
+    def _enqueue(self, messages, marker) -> concurrent.futures.Future:
+        future = concurrent.futures.Future()
+        self._last_future = future
+        self._queue.put((messages, marker, future))
+        return future
+
+    def append(self, messages) -> concurrent.futures.Future:
+        """
+        Enfileira mensagens para o fim do log (a thread wal-writer grava)
+
+        A ordem dos registros é a ordem das chamadas.
+
+        Args:
+            messages: Lista de Message (já guardadas no store)
+
+        Returns:
+            concurrent.futures.Future: Resolvido quando as mensagens estão
+            gravadas conforme a política de fsync (com a exceção, se a
+            gravação falhou)
+        """
+        if not messages:
+            return self.durable()
+        return self._enqueue(list(messages), None)
+
+    def truncate(self, after_id: int) -> concurrent.futures.Future:
+        """
+        Registra que as mensagens com id > after_id saíram do store
+
+        O log continua append-only: um marcador é gravado (sempre com
+        fsync), e a recuperação descarta as mensagens anteriores a ele com
+        ID maior.
+
+        Returns:
+            concurrent.futures.Future: Resolvido quando o marcador está em disco
+        """
+        line = json.dumps({"truncate_after": after_id}).encode() + b"\n"
+        return self._enqueue(None, (_Marker(after_id, 0, 0), line))
+
+    def durable(self) -> concurrent.futures.Future:
+        """Future resolvido quando tudo o que já foi enfileirado está gravado"""
+        future = self._last_future
+        if future is None:
+            future = concurrent.futures.Future()
+            future.set_result(None)
+        return future
+
+    def _write_loop(self):
+        """Thread wal-writer: grava o que está na fila, com um fsync por passada"""
+        while True:
+            requests = [self._queue.get()]
+            while True:
+                try:
+                    requests.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in requests
+            requests = [request for request in requests if request is not None]
+            try:
+                with self._lock:
+                    self._write(requests)
+            except Exception as e:
+                for _, _, future in requests:
+                    future.set_exception(e)
+            else:
+                for _, _, future in requests:
+                    future.set_result(None)
+            if stop:
+                return
+
+    def _write(self, requests):
+        """Grava os pedidos e faz o flush da passada (chamado com self._lock)"""
+        if not requests:
+            return
+        fsync = self.fsync_policy == "batch"
+        for messages, marker, _ in requests:
+            if marker is not None:
+                self._append_record(*marker)
+                fsync = True
+                continue
+            for message in messages:
+                self._append_record(message, message.model_dump_json().encode() + b"\n")
+        self.segments[-1].flush(fsync=fsync)
+        if not fsync and self.fsync_policy == "interval":
+            self._dirty = True
+
+    def _append_record(self, record, line: bytes):
+        if self.segments[-1].size >= self.segment_bytes:
+            self._roll()
+        segment = self.segments[-1]
+        segment.append(record, line)
+        self.next_seq += 1
+        if self.fsync_policy == "write":
+            segment.flush(fsync=True)
+
+    def _fsync_loop(self):
+        while True:
+            time.sleep(WAL_FSYNC_INTERVAL_MS / 1000.0)
+            with self._lock:
+                if self._dirty:
+                    self.segments[-1].flush(fsync=True)
+                    self._dirty = False
+
+    def close(self):
+        """Grava o que ainda está na fila, para a thread wal-writer e fecha o segmento"""
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+        with self._lock:
+            if self.segments:
+                self.segments[-1].close()
+
+    # ------------------------------------------------------------------
+    # Snapshots
+    # ------------------------------------------------------------------
+
+    def snapshot_due(self) -> bool:
+        """True se já há registros suficientes desde o último snapshot"""
+        return (not self._snapshot_running
+                and self.next_seq - self.snapshot_seq >= self.snapshot_every)
+
+    def start_snapshot(self, store):
+        """
+        Grava um snapshot do store em background
+
+        Deve ser chamado no event loop. Todo registro com número sequencial
+        menor que o atual já está no store, porque as mensagens entram no
+        store antes de entrar no WAL. O snapshot pode ter também mensagens
+        ainda na fila da thread de escrita; esses registros repetidos entre
+        snapshot e cauda são descartados pelo store na recuperação (mesmo
+        ID).
+
+        Args:
+            store: MessageStore ou CompactMessageStore (store.snapshot() é a
+                   cópia, feita aqui antes de ir para a thread)
+        """
+        self._snapshot_running = True
+        seq = self.next_seq
+        messages = store.snapshot()
+        threading.Thread(target=self._write_snapshot, args=(seq, messages), daemon=True).start()
+
+    def _write_snapshot(self, seq: int, messages):
+        try:
+            snap = {"seq": seq, "ids": [], "contents": [], "lamports": [], "node_ids": [], "physical": []}
+            # Uma só passada: no store compacto cada mensagem é montada na iteração
+            for m in messages:
+                snap["ids"].append(m.id)
+                snap["contents"].append(m.content)
+                snap["lamports"].append(m.lamport_timestamp)
+                snap["node_ids"].append(m.node_id)
+                snap["physical"].append(m.physical_timestamp)
+            path = os.path.join(self.directory, f"snapshot-{seq:020d}.json")
+            tmp = path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(snap, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+            _fsync_directory(self.directory)
+            self.snapshot_seq = seq
+
+            snapshots = sorted(f for f in os.listdir(self.directory) if f.startswith("snapshot-") and f.endswith(".json"))
+            for old in snapshots[:-_SNAPSHOTS_KEPT]:
+                os.remove(os.path.join(self.directory, old))
+            kept = snapshots[-_SNAPSHOTS_KEPT:]
+            self._drop_segments(int(kept[0][len("snapshot-"):-len(".json")]))
+        finally:
+            self._snapshot_running = False
+
+    def _drop_segments(self, covered_seq: int):
+        """Apaga os segmentos selados com todos os registros antes de covered_seq"""
+        with self._lock:
+            dropped = []
+            while len(self.segments) > 1 and self.segments[1].base_seq <= covered_seq:
+                dropped.append(self.segments.pop(0))
+        for segment in dropped:
+            os.remove(segment.data_path)
+            os.remove(segment.index_path)
+
+    def latest_snapshot(self):
+        """
+        Caminho do snapshot mais recente
+
+        Returns:
+            str: Caminho do arquivo, ou None se ainda não há snapshot
+        """
+        snapshots = sorted(
+            f for f in os.listdir(self.directory) if f.startswith("snapshot-") and f.endswith(".json")
+        )
+        return os.path.join(self.directory, snapshots[-1]) if snapshots else None
+
+    def stats(self) -> dict:
+        """Estado do WAL para diagnóstico"""
+        return {
+            "directory": self.directory,
+            "fsync_policy": self.fsync_policy,
+            "segments": len(self.segments),
+            "records": self.next_seq,
+            "snapshot_seq": self.snapshot_seq,
+            "recovered": self.recovered,
+            "recovery_seconds": round(self.recovery_seconds, 4),
+        }
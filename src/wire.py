@@ -0,0 +1,218 @@
+"""
+Formato de transmissão da replicação (JSON ou protobuf binário)
+
+O tráfego líder → follower pode ir em JSON (legível, o formato original) ou
+em protobuf (vgrpc/replication_pb2.LogBatch, gerado de protos/replication.proto),
+escolhido por content negotiation:
+
+- POST /message_received/batch: o corpo vai com Content-Type
+  application/x-protobuf; um nó que não entende responde 415 e o líder
+  volta a usar JSON com ele.
+- GET /log: com Accept: application/x-protobuf a resposta é uma sequência de
+  frames (4 bytes de tamanho big-endian + um LogBatch).
+
+Mensagens decodificadas do protobuf já têm os tipos certos, então são
+construídas sem passar de novo pela validação do pydantic.
+
+WIRE_FORMAT=json força JSON nas requisições enviadas por este nó.
+"""
+
+import os
+import pathlib
+import struct
+import sys
+
+# vgrpc/ fica na raiz do repositório (no container é copiado para junto de main.py)
+_ROOT = pathlib.Path(__file__).resolve().parent.parent
+if (_ROOT / "vgrpc").is_dir() and str(_ROOT) not in sys.path:
+    sys.path.append(str(_ROOT))
+
+try:
+    from vgrpc import replication_pb2
+except ImportError:
+    replication_pb2 = None
+
+
+PROTOBUF_MEDIA_TYPE = "application/x-protobuf"
+JSON_MEDIA_TYPE = "application/json"
+
+WIRE_FORMAT = os.getenv("WIRE_FORMAT", "protobuf").strip().lower()
+BINARY_AVAILABLE = replication_pb2 is not None
+# Este nó envia protobuf quando pode e quando não foi configurado para JSON
+SEND_BINARY = BINARY_AVAILABLE and WIRE_FORMAT != "json"
+
+_FRAME_HEADER = struct.Struct(">I")
+
+
+def batch_to_pb(messages, prev_id: int = None):
+    """
+    Monta um LogBatch protobuf com as mensagens
+
+    Args:
+        messages: Lista de Message
+        prev_id: ID do líder imediatamente anterior ao lote (opcional)
+
+    Returns:
+        replication_pb2.LogBatch: Lote em formato colunar
+    """
+    batch = replication_pb2.LogBatch()
+    if prev_id is not None:
+        batch.prev_id = prev_id
+    last_id = 0
+    last_lamport = 0
+    id_deltas = []
+    lamport_deltas = []
+    for msg in messages:
+        id_deltas.append(msg.id - last_id)
+        lamport_deltas.append(msg.lamport_timestamp - last_lamport)
+        last_id = msg.id
+        last_lamport = msg.lamport_timestamp
+    batch.id_deltas.extend(id_deltas)
+    batch.lamport_deltas.extend(lamport_deltas)
+    batch.node_ids.extend([msg.node_id for msg in messages])
+    batch.physical_timestamps.extend([msg.physical_timestamp for msg in messages])
+    batch.contents.extend([msg.content for msg in messages])
+    return batch
+
+
+def messages_from_pb(batch, message_cls):
+    """
+    Converte um LogBatch protobuf em mensagens
+
+    Args:
+        batch: replication_pb2.LogBatch
+        message_cls: Classe Message
+
+    Returns:
+        tuple: (lista de Message, prev_id ou None)
+    """
+    messages = []
+    id = 0
+    lamport = 0
+    for id_delta, lamport_delta, node_id, physical, content in zip(
+        batch.id_deltas, batch.lamport_deltas, batch.node_ids,
+        batch.physical_timestamps, batch.contents,
+    ):
+        id += id_delta
+        lamport += lamport_delta
+        messages.append(message_cls.model_construct(
+            id=id, content=content, lamport_timestamp=lamport,
+            node_id=node_id, physical_timestamp=physical,
+        ))
+    prev_id = batch.prev_id if batch.HasField("prev_id") else None
+    return messages, prev_id
+
+
+def encode_batch(messages, prev_id: int = None) -> bytes:
+    """
+    Codifica mensagens como um LogBatch protobuf serializado
+
+    Args:
+        messages: Lista de Message
+        prev_id: ID do líder imediatamente anterior ao lote (opcional)
+
+    Returns:
+        bytes: LogBatch serializado
+    """
+    return batch_to_pb(messages, prev_id).SerializeToString()
+
+
+def decode_batch(data: bytes, message_cls):
+    """
+    Decodifica um LogBatch protobuf serializado
+
+    Args:
+        data: LogBatch serializado
+        message_cls: Classe Message
+
+    Returns:
+        tuple: (lista de Message, prev_id ou None)
+    """
+    return messages_from_pb(replication_pb2.LogBatch.FromString(data), message_cls)
+
+
+def encode_frame(messages) -> bytes:
+    """Codifica um bloco de mensagens como frame (tamanho + LogBatch)"""
+    data = encode_batch(messages)
+    return _FRAME_HEADER.pack(len(data)) + data
+
+
+def frame_chunks(chunks):
+    """
+    Codifica blocos de mensagens como frames protobuf, um por bloco
+
+    Args:
+        chunks: Iterável de listas de Message
+
+    Yields:
+        bytes: Um frame por bloco
+    """
+    for chunk in chunks:
+        yield encode_frame(chunk)
+
+
+async def iter_frames(byte_stream, message_cls):
+    """
+    Decodifica uma sequência de frames vinda de um stream de bytes
+
+    Args:
+        byte_stream: Iterável assíncrono de bytes (ex: response.aiter_bytes())
+        message_cls: Classe Message
+
+    Yields:
+        list: Mensagens de cada frame
+    """
+    buffer = bytearray()
+    async for data in byte_stream:
+        buffer.extend(data)
+        while len(buffer) >= _FRAME_HEADER.size:
+            (size,) = _FRAME_HEADER.unpack_from(buffer)
+            end = _FRAME_HEADER.size + size
+            if len(buffer) < end:
+                break
+            messages, _ = decode_batch(bytes(buffer[_FRAME_HEADER.size:end]), message_cls)
+            del buffer[:end]
+            yield messages
+
+
+class EncodedBatch:
+    """
+    Um lote a replicar, codificado no máximo uma vez por formato
+
+    O mesmo lote vai para todos os followers; cada formato é serializado só
+    na primeira vez que um follower precisa dele.
+    """
+
+    def __init__(self, messages, prev_id: int = None):
+        self.messages = messages
+        self.prev_id = prev_id
+        self._json = None
+        self._binary = None
+
+    def binary(self) -> bytes:
+        """LogBatch serializado (codificado na primeira chamada)"""
+        if self._binary is None:
+            self._binary = encode_batch(self.messages, self.prev_id)
+        return self._binary
+
+    def request_kwargs(self, binary: bool) -> dict:
+        """
+        Argumentos da requisição httpx para enviar este lote
+
+        Args:
+            binary: True para protobuf, False para JSON
+        """
+        params = {} if self.prev_id is None else {"prev_id": self.prev_id}
+        if binary:
+            return {
+                "content": self.binary(),
+                "headers": {"Content-Type": PROTOBUF_MEDIA_TYPE},
+                "params": params,
+            }
+        if self._json is None:
+            self._json = ("[" + ",".join(msg.model_dump_json() for msg in self.messages) + "]").encode()
+        return {
+            "content": self._json,
+            "headers": {"Content-Type": JSON_MEDIA_TYPE},
+            "params": params,
+        }
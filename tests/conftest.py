@@ -0,0 +1,20 @@
+"""
+Configuração comum dos testes: os módulos de src/ são importados como no nó
+(import message_store, import raft...), sem subir o FastAPI de main.py
+"""
+
+import os
+import sys
+
+from pydantic import BaseModel
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+
+class Message(BaseModel):
+    """Mesmos campos de main.Message"""
+    id: int
+    content: str
+    lamport_timestamp: int
+    node_id: int
+    physical_timestamp: float
@@ -0,0 +1,97 @@
+"""
+Catch-up de followers pelo log do líder: cursor contiguous_id, leitura por
+ID a partir dele e corte de um sufixo divergente (conflict_id + /resync)
+
+O follower é só o store, como em main.py: os lotes chegam fora de ordem e
+com lacunas, e o catch-up aplica o que GET /log (id_ndjson) devolve.
+"""
+
+import pytest
+
+from conftest import Message
+from message_store import find_conflict
+from test_message_store import BACKENDS, make_messages, make_store, ndjson
+
+ALL_BACKENDS = ["objects"] + BACKENDS
+
+
+def pull_log(leader, after_id, chunk_size=7):
+    """Mesmo formato de GET /log: NDJSON em ordem de ID depois de after_id"""
+    return [Message.model_validate_json(line) for line in ndjson(leader.id_ndjson(after_id, None, chunk_size)).splitlines()]
+
+
+def catch_up(follower, leader):
+    received = pull_log(leader, follower.contiguous_id)
+    follower.extend(received)
+    # O líder mandou tudo o que tem até o último ID dele
+    follower.mark_contiguous(leader.last_id)
+    return received
+
+
+@pytest.fixture
+def leader(tmp_path):
+    store = make_store("objects", tmp_path)
+    store.extend(make_messages(120))
+    store.mark_contiguous(120)
+    return store
+
+
+@pytest.fixture(params=ALL_BACKENDS)
+def follower(request, tmp_path):
+    store = make_store(request.param, tmp_path)
+    yield store
+    if hasattr(store, "close"):
+        store.close()
+
+
+def test_contiguous_id_stops_at_the_first_gap(follower):
+    messages = make_messages(30)
+    follower.extend(messages[10:20])
+    assert follower.contiguous_id == 0 and follower.last_id == 20
+    follower.extend(messages[:9])
+    assert follower.contiguous_id == 9
+    follower.extend(messages[9:10])
+    assert follower.contiguous_id == 20
+    # IDs que o líder confirma não existir (ex: reservados e não usados)
+    follower.mark_contiguous(25)
+    assert follower.contiguous_id == 25
+    follower.extend(messages[25:])
+    assert follower.contiguous_id == 30
+
+
+def test_restarted_follower_catches_up_from_its_cursor(follower, leader):
+    messages = list(leader)
+    by_id = sorted(messages, key=lambda m: m.id)
+    # Antes do reinício: um prefixo e lotes soltos mais à frente
+    follower.extend(by_id[:40])
+    follower.extend(by_id[70:80])
+    assert follower.contiguous_id == 40
+
+    received = catch_up(follower, leader)
+    # O cursor evita reenviar o prefixo; os lotes soltos chegam de novo e são ignorados
+    assert [m.id for m in received] == list(range(41, 121))
+    assert follower.contiguous_id == 120 and len(follower) == 120
+    assert ndjson(follower.ndjson(None, None, 9)) == ndjson(leader.ndjson(None, None, 9))
+    # Sem nada novo, o catch-up não traz nada
+    assert catch_up(follower, leader) == []
+
+
+def test_divergent_suffix_is_cut_and_refetched(follower, leader):
+    by_id = sorted(leader, key=lambda m: m.id)
+    # Um líder superado usou os IDs 101..110 para outras mensagens
+    stale = [m.model_copy(update={"content": f"old {m.id}", "node_id": 8009}) for m in by_id[100:110]]
+    follower.extend(by_id[:100] + stale)
+    assert follower.contiguous_id == 110
+
+    # O próximo lote do líder atual é recusado inteiro (conflict_id)
+    batch = by_id[95:115]
+    conflict = find_conflict(follower, batch)
+    assert conflict is not None and conflict.id == 101
+    # /resync: o líder manda cortar a partir do primeiro ID divergente
+    assert follower.truncate_after(conflict.id - 1) == list(range(101, 111))
+    assert follower.contiguous_id == 100 and follower.get(105) is None
+    assert find_conflict(follower, batch) is None
+
+    catch_up(follower, leader)
+    assert follower.contiguous_id == 120
+    assert [m.model_dump() for m in follower] == [m.model_dump() for m in leader]
@@ -0,0 +1,60 @@
+"""
+BullyElection: aceitação de COORDINATOR (term, prioridade e concorrência)
+"""
+
+import threading
+from types import SimpleNamespace
+
+from election import BullyElection
+
+NODES = [8001, 8002, 8003, 8004]
+
+
+def make_elector(my_id=8001):
+    state = {"leader": None}
+    elector = BullyElection(
+        my_id, [SimpleNamespace(id=node_id) for node_id in NODES],
+        lambda: state["leader"], lambda leader: state.update(leader=leader), set(),
+    )
+    return elector, state
+
+
+def test_coordinator_term_and_rank_rules():
+    elector, state = make_elector()
+    assert elector.on_coordinator(8003, 5)
+    assert state["leader"] == 8003 and elector.term == 5
+    # Mesmo term, prioridade menor que a do líder atual
+    assert not elector.on_coordinator(8002, 5)
+    assert state["leader"] == 8003
+    # Mesmo term, prioridade maior
+    assert elector.on_coordinator(8004, 5)
+    assert state["leader"] == 8004
+    # Term superado
+    assert not elector.on_coordinator(8003, 4)
+    # Term novo: o líder da nova eleição vale, mesmo com prioridade menor
+    assert elector.on_coordinator(8002, 6)
+    assert state["leader"] == 8002 and elector.term == 6
+
+
+def test_coordinator_from_lower_node_is_contested():
+    elector, state = make_elector(my_id=8003)
+    assert not elector.on_coordinator(8002, 1)
+    assert state["leader"] is None
+    assert elector._wake.is_set()
+
+
+def test_concurrent_coordinators_keep_the_highest_rank():
+    for _ in range(50):
+        elector, state = make_elector()
+        barrier = threading.Barrier(3)
+
+        def send(leader_id):
+            barrier.wait()
+            elector.on_coordinator(leader_id, 7)
+
+        threads = [threading.Thread(target=send, args=(node_id,)) for node_id in (8002, 8003, 8004)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert state["leader"] == 8004
@@ -0,0 +1,85 @@
+"""
+Detector phi-accrual: valores de phi, janela de intervalos e limiar
+"""
+
+import math
+
+import pytest
+
+from failure_detector import PhiAccrualDetector
+
+
+def exact_phi(elapsed, mean, std):
+    """-log10 da cauda da normal, sem a aproximação logística"""
+    return -math.log10(0.5 * math.erfc((elapsed - mean) / (std * math.sqrt(2))))
+
+
+def feed(detector, intervals, start=0.0):
+    now = start
+    detector.heartbeat(now)
+    for interval in intervals:
+        now += interval
+        detector.heartbeat(now)
+    return now
+
+
+def test_no_suspicion_before_the_first_heartbeat():
+    detector = PhiAccrualDetector(1.0)
+    assert not detector.active
+    assert detector.phi(now=1e9) == 0.0 and not detector.suspect(now=1e9)
+    assert detector.stats() == {"samples": 0, "mean_s": None, "std_s": None, "phi": 0.0}
+
+
+def test_first_heartbeat_uses_the_expected_interval():
+    detector = PhiAccrualDetector(1.0, min_std=0.05, acceptable_pause=0.0)
+    detector.heartbeat(now=10.0)
+    stats = detector.stats()
+    assert stats["samples"] == 2
+    assert stats["mean_s"] == pytest.approx(1.0) and stats["std_s"] == pytest.approx(0.25)
+    # Na média, metade de chance de o próximo ainda chegar
+    assert detector.phi(now=11.0) == pytest.approx(math.log10(2), abs=1e-6)
+
+
+@pytest.mark.parametrize("sigmas", [0.5, 1, 2, 3, 4])
+def test_phi_follows_the_normal_tail(sigmas):
+    detector = PhiAccrualDetector(1.0, min_std=0.01, acceptable_pause=0.0)
+    detector.heartbeat(now=0.0)
+    # Média 1, desvio 0.25 (amostras iniciais); a aproximação logística erra
+    # alguns por cento até 4 desvios
+    elapsed = 1.0 + sigmas * 0.25
+    assert detector.phi(now=elapsed) == pytest.approx(exact_phi(elapsed, 1.0, 0.25), rel=0.06)
+
+
+def test_phi_grows_with_silence_and_crosses_the_threshold():
+    detector = PhiAccrualDetector(1.0, threshold=8, window=10, min_std=0.05, acceptable_pause=0.25)
+    last = feed(detector, [1.0] * 30)
+    # A janela já descartou as amostras iniciais: desvio 0, vale o mínimo
+    assert detector.stats()["std_s"] == pytest.approx(0.0, abs=1e-6)
+    values = [detector.phi(now=last + t / 10) for t in range(30)]
+    assert values == sorted(values) and values[0] == 0.0
+    assert not detector.suspect(now=last + 1.25 + 5 * 0.05)
+    assert detector.suspect(now=last + 1.25 + 6 * 0.05)
+    assert detector.phi(now=last + 1000) == float("inf")
+
+
+def test_jittery_link_tolerates_longer_gaps():
+    stable = PhiAccrualDetector(1.0, window=50, acceptable_pause=0.0)
+    jittery = PhiAccrualDetector(1.0, window=50, acceptable_pause=0.0)
+    last = feed(stable, [1.0] * 60)
+    feed(jittery, [0.4, 1.6] * 30, start=last - 60)
+    assert jittery.stats()["std_s"] == pytest.approx(0.6, rel=1e-3)
+    assert stable.suspect(now=last + 2.0)
+    assert not jittery.suspect(now=last + 2.0)
+    assert jittery.suspect(now=last + 5.0)
+
+
+def test_window_keeps_running_sums_in_step():
+    detector = PhiAccrualDetector(1.0, window=5)
+    intervals = [0.5, 2.0, 1.0, 3.0, 0.25, 1.5, 0.75, 2.5]
+    feed(detector, intervals)
+    kept = intervals[-5:]
+    mean = sum(kept) / 5
+    stats = detector.stats()
+    assert stats["samples"] == 5
+    assert stats["mean_s"] == pytest.approx(mean)
+    assert stats["std_s"] == pytest.approx(math.sqrt(sum((x - mean) ** 2 for x in kept) / 5))
@@ -0,0 +1,50 @@
+"""
+GroupCommitter: lotes, resultados por item e falhas do commit
+"""
+
+import asyncio
+
+from group_commit import GroupCommitter
+
+
+def test_concurrent_writes_share_a_batch_and_get_their_own_result():
+    batches = []
+
+    async def commit(items):
+        batches.append(items)
+        return [item * 10 for item in items]
+
+    async def run():
+        committer = GroupCommitter(commit, window_ms=5, max_batch=4)
+        return await asyncio.gather(*(committer.submit(i) for i in range(10)))
+
+    assert asyncio.run(run()) == [i * 10 for i in range(10)]
+    assert batches == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+
+
+def test_commit_exception_fails_the_whole_batch():
+    async def commit(items):
+        raise ValueError("disk full")
+
+    async def run():
+        committer = GroupCommitter(commit, window_ms=1)
+        return await asyncio.gather(*(committer.submit(i) for i in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_missing_results_fail_the_remaining_items():
+    async def commit(items):
+        return items[:2]
+
+    async def run():
+        committer = GroupCommitter(commit, window_ms=1)
+        return await asyncio.wait_for(
+            asyncio.gather(*(committer.submit(i) for i in range(4)), return_exceptions=True), 1
+        )
+
+    results = asyncio.run(run())
+    assert results[:2] == [0, 1]
+    for result in results[2:]:
+        assert isinstance(result, RuntimeError) and "2 results for a batch of 4" in str(result)
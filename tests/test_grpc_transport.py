@@ -0,0 +1,62 @@
+"""
+Stream Replicate por gRPC: os campos do ack chegam ao líder
+"""
+
+import asyncio
+import socket
+from types import SimpleNamespace
+
+import pytest
+
+import grpc_transport
+import wire
+from conftest import Message
+
+pytestmark = pytest.mark.skipif(grpc_transport.grpc is None, reason="grpc não instalado")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def message(id, lamport):
+    return Message(id=id, content=f"m{id}", lamport_timestamp=lamport, node_id=8002, physical_timestamp=0.0)
+
+
+def test_replicate_ack_round_trip():
+    acks = [
+        {"contiguous_id": 2, "local_lamport": 7, "received": 2},
+        {"contiguous_id": 2, "local_lamport": 7, "received": 2, "origin_received": 4},
+        {"contiguous_id": 2, "local_lamport": 7, "received": 0, "origin_received": -1},
+        {"contiguous_id": 2, "local_lamport": 7, "received": 0, "conflict_id": 3},
+    ]
+    batches = []
+
+    async def on_batch(messages, prev_id):
+        batches.append(([m.model_dump() for m in messages], prev_id))
+        return acks[len(batches) - 1]
+
+    async def run():
+        port = free_port()
+        servicer = grpc_transport.NodeServicer(Message, on_batch, None, None, None, 8002, lambda: 0)
+        server = await grpc_transport.start_server(servicer, port)
+        peer = SimpleNamespace(id=-port, host="127.0.0.1", grpc_port=port)
+        stream = grpc_transport.ReplicationStream(peer)
+        try:
+            sent = [[message(1, 5), message(2, 7)], [message(4, 8)], [], [message(3, 9)]]
+            results = [await stream.send(wire.EncodedBatch(batch, prev_id=i)) for i, batch in enumerate(sent)]
+        finally:
+            stream.close()
+            await server.stop(None)
+            await grpc_transport._channels.pop(peer.id).close()
+        return sent, results
+
+    sent, results = asyncio.run(run())
+    assert [batch for batch, _ in batches] == [[m.model_dump() for m in batch] for batch in sent]
+    assert [prev_id for _, prev_id in batches] == [0, 1, 2, 3]
+    for ack, result in zip(acks, results):
+        assert result == {"conflict_id": 0, **ack}
+    # Fora do modo leaderless o campo fica ausente (record_ack ignora)
+    assert "origin_received" not in results[0]
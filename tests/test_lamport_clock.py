@@ -0,0 +1,118 @@
+"""
+Relógios lógicos: regras de Lamport, empacotamento do HLC e reserve()
+
+O relógio físico do HLC é trocado por um relógio controlado pelo teste.
+"""
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import lamport_clock
+from lamport_clock import HLC_LOGICAL_BITS, HybridLogicalClock, LamportClock, create_clock
+
+
+@pytest.fixture
+def wall(monkeypatch):
+    """Relógio físico do HLC, em segundos; o teste muda wall.now"""
+    wall = SimpleNamespace(now=1700000000.0)
+    monkeypatch.setattr(lamport_clock, "time", SimpleNamespace(time=lambda: wall.now))
+    return wall
+
+
+def parts(timestamp):
+    return timestamp >> HLC_LOGICAL_BITS, timestamp & ((1 << HLC_LOGICAL_BITS) - 1)
+
+
+def test_lamport_rules():
+    clock = LamportClock()
+    assert clock.increment() == 1
+    assert clock.update(10) == 11
+    assert clock.update(5) == 12
+    assert clock.reserve(3) == 13
+    assert clock.get_time() == 15
+    assert clock.increment() == 16
+
+
+def test_concurrent_reserves_never_overlap():
+    clock = LamportClock()
+    ranges = []
+
+    def reserve():
+        for n in range(1, 50):
+            first = clock.reserve(n)
+            ranges.append(range(first, first + n))
+
+    threads = [threading.Thread(target=reserve) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    used = [t for r in ranges for t in r]
+    assert len(used) == len(set(used)) == clock.get_time() == 4 * sum(range(1, 50))
+
+
+def test_hlc_packing_round_trips_and_orders_like_tuples():
+    t = 1700000000.123
+    ts = HybridLogicalClock.for_time(t)
+    assert parts(ts) == (1700000000123, 0)
+    assert HybridLogicalClock.to_time(ts) == pytest.approx(t)
+    assert HybridLogicalClock.to_time(ts | 0xFFFF) == HybridLogicalClock.to_time(ts)
+    pairs = [(ms, c) for ms in (5, 6) for c in (0, 1, 0xFFFF)]
+    packed = [(ms << HLC_LOGICAL_BITS) | c for ms, c in pairs]
+    assert sorted(packed) == packed and sorted(pairs) == pairs
+
+
+def test_hlc_follows_the_wall_clock(wall):
+    clock = HybridLogicalClock()
+    first = clock.increment()
+    assert parts(first) == (1700000000000, 0)
+    assert first >= HybridLogicalClock.for_time(wall.now)
+    # Mesmo milissegundo: só o contador anda
+    assert parts(clock.increment()) == (1700000000000, 1)
+    wall.now += 0.005
+    assert parts(clock.increment()) == (1700000000005, 0)
+    # Relógio físico voltando (ex: NTP) não faz o HLC voltar
+    wall.now -= 1
+    assert parts(clock.increment()) == (1700000000005, 1)
+
+
+def test_hlc_update_from_a_node_ahead(wall):
+    clock = HybridLogicalClock()
+    clock.increment()
+    remote = HybridLogicalClock.for_time(wall.now + 2) | 7
+    assert parts(clock.update(remote)) == (1700000002000, 8)
+    # Remoto atrás do relógio físico: vale o físico
+    wall.now += 3
+    assert parts(clock.update(remote)) == (1700000003000, 0)
+
+
+def test_hlc_counter_overflow_moves_to_the_next_millisecond(wall):
+    clock = HybridLogicalClock()
+    last = clock.increment()
+    for _ in range(1 << HLC_LOGICAL_BITS):
+        ts = clock.increment()
+        assert ts > last
+        last = ts
+    assert parts(last) == (1700000000001, 0)
+
+
+def test_hlc_reserve(wall):
+    clock = HybridLogicalClock()
+    first = clock.reserve(5)
+    assert parts(first) == (1700000000000, 0)
+    assert clock.get_time() == first + 4
+    # O próximo evento vem depois do lote reservado
+    assert clock.increment() == first + 5
+    wall.now += 1
+    later = clock.reserve(3)
+    assert parts(later) == (1700000001000, 0) and clock.get_time() == later + 2
+
+
+def test_create_clock():
+    assert type(create_clock(5, mode="lamport")) is LamportClock
+    clock = create_clock(5, mode="hlc")
+    assert isinstance(clock, HybridLogicalClock) and clock.get_time() == 5
+    with pytest.raises(ValueError):
+        create_clock(mode="vector")
@@ -0,0 +1,200 @@
+"""
+Teste diferencial dos backends de MessageStore (objects, compact, segmented)
+
+O backend objects é a referência: os outros têm que devolver as mesmas
+mensagens, na mesma ordem, e os mesmos bytes NDJSON.
+"""
+
+import json
+import random
+import threading
+
+import pytest
+
+from conftest import Message
+from message_store import CompactMessageStore, MessageStore, find_conflict
+from segments import SegmentedMessageStore
+
+BACKENDS = ["compact", "segmented"]
+
+
+def make_store(backend, tmp_path):
+    if backend == "objects":
+        return MessageStore()
+    if backend == "compact":
+        return CompactMessageStore(Message)
+    # Cauda pequena para selar vários segmentos com poucas mensagens
+    return SegmentedMessageStore(Message, str(tmp_path / "segments"), hot_messages=20, segment_messages=25)
+
+
+def make_messages(count, seed=7):
+    """Mensagens de 3 nós com timestamps empatados e fora da ordem de ID"""
+    rng = random.Random(seed)
+    messages = []
+    lamport = 0
+    for id in range(1, count + 1):
+        lamport += rng.choice([0, 1, 1, 2])
+        messages.append(Message(
+            id=id,
+            content=f"msg {id} " + "x" * rng.randrange(5) + ("\n\"ç\"" if id % 17 == 0 else ""),
+            lamport_timestamp=lamport + rng.randrange(3),
+            node_id=rng.choice([8001, 8002, 8003]),
+            physical_timestamp=1700000000.0 + id / 8,
+        ))
+    return messages
+
+
+def fill(store, messages, batch=13):
+    """Entrega em lotes embaralhados, como a replicação faz"""
+    rng = random.Random(3)
+    for start in range(0, len(messages), batch):
+        block = messages[start:start + batch]
+        rng.shuffle(block)
+        store.extend(block)
+    store.mark_contiguous(len(messages))
+
+
+def dump(messages):
+    return [m.model_dump() for m in messages]
+
+
+def ndjson(pieces):
+    return b"".join(bytes(piece) for piece in pieces)
+
+
+@pytest.fixture
+def messages():
+    return make_messages(200)
+
+
+@pytest.fixture
+def reference(messages, tmp_path):
+    store = make_store("objects", tmp_path)
+    fill(store, messages)
+    return store
+
+
+@pytest.fixture(params=BACKENDS)
+def store(request, messages, tmp_path):
+    store = make_store(request.param, tmp_path)
+    fill(store, messages)
+    yield store
+    if hasattr(store, "close"):
+        store.close()
+
+
+def test_segmented_actually_seals(messages, tmp_path):
+    store = make_store("segmented", tmp_path)
+    fill(store, messages)
+    assert store.stats()["segments"] >= 2
+    store.close()
+
+
+def test_order_matches_reference(store, reference):
+    expected = dump(reference)
+    assert dump(store) == expected
+    assert expected == dump(sorted(reference, key=lambda m: (m.lamport_timestamp, m.node_id, m.id)))
+    assert len(store) == len(reference)
+
+
+@pytest.mark.parametrize("chunk_size,limit", [(500, None), (7, None), (7, 30), (1, 5)])
+def test_chunks_and_ndjson_match_reference(store, reference, chunk_size, limit):
+    for cursor in [None, (0, 0, 0), reference.cursor_after(40), reference.cursor_after(40, 8002),
+                   reference.cursor_after(40, 8002, 90), reference.cursor_after(10 ** 9)]:
+        expected = [m for chunk in reference.chunks(cursor, limit, chunk_size) for m in chunk]
+        got = [m for chunk in store.chunks(cursor, limit, chunk_size) for m in chunk]
+        assert dump(got) == dump(expected)
+        assert ndjson(store.ndjson(cursor, limit, chunk_size)) == ndjson(reference.ndjson(cursor, limit, chunk_size))
+
+
+@pytest.mark.parametrize("after_id", [0, 1, 24, 25, 26, 60, 199, 200, 500])
+def test_cursor_after_id_matches_reference(store, reference, after_id):
+    cursor = reference.cursor_after_id(after_id)
+    assert store.cursor_after_id(after_id) == cursor
+    if cursor is not None:
+        expected = ndjson(reference.ndjson(cursor, 50, 9))
+        assert ndjson(store.ndjson(cursor, 50, 9)) == expected
+
+
+@pytest.mark.parametrize("after_id,limit,chunk_size", [(0, None, 500), (1, None, 7), (24, 40, 9), (199, None, 3), (200, None, 5)])
+def test_id_chunks_and_id_ndjson_match_reference(store, reference, after_id, limit, chunk_size):
+    expected = [m for chunk in reference.id_chunks(after_id, limit, chunk_size) for m in chunk]
+    got = [m for chunk in store.id_chunks(after_id, limit, chunk_size) for m in chunk]
+    assert dump(got) == dump(expected)
+    assert [m.id for m in got] == sorted(m.id for m in got)
+    assert ndjson(store.id_ndjson(after_id, limit, chunk_size)) == ndjson(reference.id_ndjson(after_id, limit, chunk_size))
+
+
+@pytest.mark.parametrize("start_id,end_id,limit", [(1, None, None), (0, 10, None), (20, 60, None), (20, 60, 7), (190, 400, None), (300, None, None)])
+def test_range_by_id_and_get_match_reference(store, reference, start_id, end_id, limit):
+    assert dump(store.range_by_id(start_id, end_id, limit)) == dump(reference.range_by_id(start_id, end_id, limit))
+    for id in [0, 1, 25, 26, 50, 137, 200, 201]:
+        expected = reference.get(id)
+        got = store.get(id)
+        assert (got is None) == (expected is None)
+        if expected is not None:
+            assert got.model_dump() == expected.model_dump()
+
+
+def test_duplicates_are_ignored(store, reference, messages):
+    changed = [m.model_copy(update={"content": "outra"}) for m in messages[::10]]
+    assert store.extend(messages[::10]) == []
+    assert store.add(messages[-1]) is False
+    assert dump(store) == dump(reference)
+    assert len(store) == len(messages)
+    # Mesmo ID com outro conteúdo: extend ignora, find_conflict acusa
+    store.extend(changed)
+    assert dump(store) == dump(reference)
+    conflict = find_conflict(store, changed[-3:])
+    assert conflict is not None and conflict.model_dump() == reference.get(changed[-3].id).model_dump()
+    assert find_conflict(store, messages[-3:]) is None
+
+
+def test_next_id_and_truncate_after(store, reference):
+    assert store.last_id == reference.last_id == 200
+    removed = store.truncate_after(195)
+    assert removed == reference.truncate_after(195) == [196, 197, 198, 199, 200]
+    assert dump(store) == dump(reference)
+    assert store.next_id() == reference.next_id() == 196
+
+
+def test_segmented_refuses_truncating_sealed_history(messages, tmp_path):
+    store = make_store("segmented", tmp_path)
+    fill(store, messages)
+    with pytest.raises(ValueError):
+        store.truncate_after(store.sealed_through - 1)
+    store.close()
+
+
+def test_compact_stream_survives_column_rebuilds():
+    """Stream numa thread enquanto o event loop refaz as colunas (truncate_after)"""
+    messages = make_messages(3000)
+    store = CompactMessageStore(Message)
+    fill(store, messages)
+    results = {}
+
+    def read(name, pieces):
+        try:
+            results[name] = [json.loads(line) for piece in pieces for line in bytes(piece).splitlines()]
+        except Exception as e:
+            results[name] = e
+
+    readers = [
+        threading.Thread(target=read, args=("ndjson", store.ndjson(None, None, 7))),
+        threading.Thread(target=read, args=("id_ndjson", store.id_ndjson(0, None, 7))),
+    ]
+    for reader in readers:
+        reader.start()
+    while any(reader.is_alive() for reader in readers):
+        store.truncate_after(2500)
+        store.extend(messages[2500:])
+    for reader in readers:
+        reader.join()
+
+    for name, lines in results.items():
+        assert not isinstance(lines, Exception), (name, lines)
+        keys = [(m["lamport_timestamp"], m["node_id"], m["id"]) if name == "ndjson" else m["id"] for m in lines]
+        assert keys == sorted(set(keys))
+        assert set(m["id"] for m in lines) >= set(range(1, 2501))
+        by_id = {m.id: m.model_dump() for m in messages}
+        assert all(m == by_id[m["id"]] for m in lines)
@@ -0,0 +1,80 @@
+"""
+MetricsMiddleware: latência por template de rota; formato das métricas
+"""
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+import metrics
+
+
+def make_client():
+    registry = metrics.Registry()
+    histogram = metrics.Histogram("request_seconds", "test", ["method", "route", "status"], registry=registry)
+    app = FastAPI()
+    app.add_middleware(metrics.MetricsMiddleware, histogram=histogram, exclude={"/events"})
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.get("/partitions/{index}/log")
+    async def partition_log(index: int):
+        if index > 1:
+            raise HTTPException(status_code=404)
+        return []
+
+    @app.get("/events")
+    async def events():
+        return []
+
+    return TestClient(app), registry
+
+
+def counts(registry):
+    return {
+        line.split("{", 1)[1].rsplit("}", 1)[0]: float(line.rsplit(" ", 1)[1])
+        for line in registry.render().splitlines()
+        if line.startswith("request_seconds_count")
+    }
+
+
+def test_parameterized_routes_are_labelled_by_template():
+    client, registry = make_client()
+    client.get("/ping")
+    for index in range(4):
+        client.get(f"/partitions/{index}/log")
+    client.get("/partitions/x/log")
+    client.get("/no/such/path")
+    client.get("/events")
+    assert counts(registry) == {
+        'method="GET",route="/ping",status="200"': 1,
+        'method="GET",route="/partitions/{index}/log",status="200"': 2,
+        'method="GET",route="/partitions/{index}/log",status="404"': 2,
+        'method="GET",route="/partitions/{index}/log",status="422"': 1,
+    }
+
+
+def test_metric_kinds_render_and_subclasses_must_be_complete():
+    registry = metrics.Registry()
+    counter = metrics.Counter("writes_total", "test", ["node"], registry=registry)
+    counter.labels(8001).inc()
+    counter.labels("8001").inc(2)
+    histogram = metrics.Histogram("size", "test", buckets=(1, 10), registry=registry)
+    histogram.observe(5)
+    metrics.Gauge("store", "test", lambda: {(0,): 3, (1,): None}, ["partition"], registry=registry)
+    lines = [line for line in registry.render().splitlines() if not line.startswith("#")]
+    assert lines == [
+        'writes_total{node="8001"} 3',
+        'size_bucket{le="1"} 0', 'size_bucket{le="10"} 1', 'size_bucket{le="+Inf"} 1',
+        "size_sum 5", "size_count 1",
+        'store{partition="0"} 3',
+    ]
+
+    class Incomplete(metrics._ChildMetric):
+        def samples(self):
+            return []
+
+    with pytest.raises(TypeError):
+        Incomplete("x", "test", registry=None)
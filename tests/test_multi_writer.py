@@ -0,0 +1,156 @@
+"""
+Modo multi-writer: IDs intercalados por origem e watermark de estabilidade
+
+A simulação troca lotes e gossip entre três MultiWriter, fora de ordem, e
+confere que nada abaixo do watermark muda de posição depois.
+"""
+
+import random
+from types import SimpleNamespace
+
+from conftest import Message
+from lamport_clock import create_clock
+from message_store import MessageStore
+from multi_writer import FIRST_ID, MultiWriter, _Peer
+
+NODES = [8003, 8001, 8002]
+
+
+def message(writer, id, lamport, content="x"):
+    return Message(id=id, content=content, lamport_timestamp=lamport, node_id=writer.my_id, physical_timestamp=0.0)
+
+
+def test_ids_are_interleaved_by_node_position():
+    writers = {node_id: MultiWriter(node_id, NODES, create_clock(mode="lamport"), lambda id: None) for node_id in NODES}
+    ids = {node_id: writer.allocate(4) for node_id, writer in writers.items()}
+    assert ids[8001] == [2, 5, 8, 11]
+    assert ids[8002] == [3, 6, 9, 12]
+    assert ids[8003] == [4, 7, 10, 13]
+    assert writers[8002].allocate(1) == [15]
+    every = sorted(id for node_ids in ids.values() for id in node_ids)
+    assert every == list(range(FIRST_ID, FIRST_ID + 12))
+    for node_id, node_ids in ids.items():
+        assert [writers[8001].origin_of(id) for id in node_ids] == [(node_id, seq) for seq in range(4)]
+    # O "Hello" (ID 1) não pertence a nenhuma origem
+    assert writers[8001].origin_of(1) is None
+
+
+def test_observe_tracks_contiguous_seq_per_origin():
+    writer = MultiWriter(8001, NODES, create_clock(mode="lamport"), lambda id: None)
+    other = MultiWriter(8002, NODES, create_clock(mode="lamport"), lambda id: None)
+    ids = other.allocate(5)
+    batch = [message(other, id, lamport) for id, lamport in zip(ids, [3, 4, 8, 9, 12])]
+
+    writer.observe([batch[0], batch[2], batch[3]])
+    assert writer.received_through(8002) == 0
+    assert writer.origins[8002].lamport == 3
+    writer.observe([batch[1], batch[0]])
+    assert writer.received_through(8002) == 3
+    assert writer.origins[8002].lamport == 9
+    assert writer.received_through(8003) == -1
+
+    # Mensagens próprias (ex: do WAL) avançam a sequência local
+    own = [message(writer, writer.message_id(8001, seq), seq + 1) for seq in range(3)]
+    writer.observe(own)
+    assert writer.next_seq == 3
+    assert writer.allocate(1) == [writer.message_id(8001, 3)]
+
+
+def test_record_ack_skips_sequences_a_peer_already_has():
+    writer = MultiWriter(8001, NODES, create_clock(mode="lamport"), lambda id: None)
+    server = SimpleNamespace(id=8002)
+    writer.peers[8002] = _Peer(server)
+    writer.allocate(2)
+    writer.record_ack(server, {"origin_received": 1})
+    assert writer.peers[8002].acked == 1 and writer.next_seq == 2
+    writer.record_ack(server, {"origin_received": 6})
+    assert writer.next_seq == 7
+    writer.record_ack(server, {"origin_received": 3})
+    assert writer.peers[8002].acked == 6
+
+
+def test_watermark_waits_for_every_origin_and_gossip_frontier():
+    clock = create_clock(mode="lamport")
+    writer = MultiWriter(8001, NODES, clock, lambda id: None)
+    clock.update(20)
+    assert writer.stable_lamport() == 0
+
+    b = MultiWriter(8002, NODES, create_clock(mode="lamport"), lambda id: None)
+    c = MultiWriter(8003, NODES, create_clock(mode="lamport"), lambda id: None)
+    writer.observe([message(b, id, lamport) for id, lamport in zip(b.allocate(2), [5, 7])])
+    writer.observe([message(c, id, lamport) for id, lamport in zip(c.allocate(1), [4])])
+    assert writer.stable_lamport() == 4
+
+    # Gossip de uma seq que ainda não chegou não vale como limite
+    assert writer.on_gossip(8003, 1, 15) == 0
+    assert writer.stable_lamport() == 4
+    assert writer.on_gossip(8003, 0, 15) == 0
+    assert writer.stable_lamport() == 7
+    assert writer.on_gossip(8002, 1, 30) == 1
+    assert writer.stable_lamport() == 15
+    # Nunca passa do relógio local
+    assert writer.on_gossip(8003, 0, 50) == 0
+    assert writer.stable_lamport() == clock.get_time() == 21
+    assert writer.on_gossip(9999, 0, 50) == -1
+
+
+def test_order_below_watermark_is_final():
+    rng = random.Random(11)
+    nodes = {}
+    for node_id in NODES:
+        store, clock = MessageStore(), create_clock(mode="lamport")
+        nodes[node_id] = SimpleNamespace(
+            store=store, clock=clock, writer=MultiWriter(node_id, NODES, clock, store.get), inbox=[], seen=[],
+        )
+
+    def write(node):
+        n = rng.randint(1, 3)
+        first = node.clock.reserve(n)
+        batch = [message(node.writer, id, first + i, f"{node.writer.my_id}-{id}") for i, id in enumerate(node.writer.allocate(n))]
+        node.store.extend(batch)
+        node.writer.observe(batch)
+        for other in nodes.values():
+            if other is not node:
+                other.inbox.append(("batch", batch))
+
+    def gossip(node):
+        seq, lamport = node.writer.next_seq - 1, node.clock.get_time()
+        for other in nodes.values():
+            if other is not node:
+                other.inbox.append(("gossip", (node.writer.my_id, seq, lamport)))
+
+    def deliver(node):
+        # Fora de ordem: a fila de um vizinho e o reparo podem se cruzar
+        kind, body = node.inbox.pop(rng.randrange(len(node.inbox)))
+        if kind == "gossip":
+            node.writer.on_gossip(*body)
+        else:
+            node.clock.update(max(m.lamport_timestamp for m in body))
+            node.writer.observe(node.store.extend(body))
+
+    for _ in range(3000):
+        node = nodes[rng.choice(NODES)]
+        action = rng.random()
+        if action < 0.25:
+            write(node)
+        elif action < 0.35:
+            gossip(node)
+        elif node.inbox:
+            deliver(node)
+        watermark = node.writer.stable_lamport()
+        assert not node.seen or watermark >= node.seen[-1][0]
+        node.seen.append((watermark, [m.id for m in node.store if m.lamport_timestamp <= watermark]))
+
+    for node in nodes.values():
+        while node.inbox:
+            deliver(node)
+    final = [m.id for m in nodes[NODES[0]].store]
+    for node in nodes.values():
+        assert [m.id for m in node.store] == final
+    lamport = {m.id: m.lamport_timestamp for m in nodes[NODES[0]].store}
+    checked = 0
+    for node in nodes.values():
+        for watermark, prefix in node.seen:
+            assert prefix == [id for id in final if lamport[id] <= watermark]
+            checked += bool(prefix)
+    assert checked > 1000
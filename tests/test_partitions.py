@@ -0,0 +1,83 @@
+"""
+Log particionado: escolha de partição, rank da eleição e leitura merge
+"""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import partitions
+from conftest import Message
+from partitions import PartitionedLog, merge_partitions, partition_for, partition_rank, tagged_ndjson
+
+NODES = [8003, 8001, 8002]
+
+
+def message(id, lamport, node_id, content="x"):
+    return Message(id=id, content=content, lamport_timestamp=lamport, node_id=node_id, physical_timestamp=0.0)
+
+
+def test_partition_for_is_crc32_of_the_key():
+    # Valores fixos: a partição de uma chave não pode mudar entre processos
+    assert [partition_for(key, 3) for key in ["user-1", "user-2", "alice", "bob", ""]] == [2, 1, 2, 2, 0]
+    assert [partition_for(key, 8) for key in ["user-1", "user-2", "alice", "bob", ""]] == [4, 6, 7, 0, 0]
+    assert {partition_for(f"key-{i}", 4) for i in range(200)} == {0, 1, 2, 3}
+
+
+@pytest.mark.parametrize("n", [1, 3, 5])
+def test_partition_rank_gives_each_node_one_partition(n):
+    leaders = []
+    for index in range(n):
+        rank = partition_rank(NODES, index)
+        assert sorted(rank(node_id) for node_id in NODES) == [0, 1, 2]
+        leaders.append(max(NODES, key=rank))
+    # Partição i: nó de posição (K - 1 - i) mod K na lista ordenada
+    assert leaders == [sorted(NODES)[(len(NODES) - 1 - index) % len(NODES)] for index in range(n)]
+    if n == len(NODES):
+        assert sorted(leaders) == sorted(NODES)
+
+
+def test_merge_orders_by_lamport_then_node():
+    p0 = [message(1, 1, 8001), message(2, 4, 8002), message(3, 9, 8001)]
+    p1 = [message(1, 2, 8003), message(2, 4, 8001), message(3, 5, 8003)]
+    p2 = [message(1, 3, 8002)]
+    merged = list(merge_partitions([p0, p1, p2]))
+    assert [(index, m.id) for index, m in merged] == [(0, 1), (1, 1), (2, 1), (1, 2), (0, 2), (1, 3), (0, 3)]
+    assert [(index, m.id) for index, m in merge_partitions([p0, p1, p2], limit=3)] == [(0, 1), (1, 1), (2, 1)]
+    assert list(merge_partitions([[], []])) == []
+
+    lines = b"".join(tagged_ndjson(merged, chunk_size=2)).splitlines()
+    assert [json.loads(line)["partition"] for line in lines] == [0, 1, 2, 1, 0, 1, 0]
+    assert json.loads(lines[0]) == {"partition": 0, **p0[0].model_dump()}
+
+
+def test_partitioned_log_merged_reads_and_on_apply(tmp_path, monkeypatch):
+    monkeypatch.setattr(partitions.wal, "WAL_ENABLED", False)
+    applied = []
+    servers = [SimpleNamespace(id=node_id) for node_id in NODES]
+    log = PartitionedLog(3, 8001, servers, Message, SimpleNamespace(update=lambda t: t), str(tmp_path),
+                         "all", on_apply=lambda index, batch: applied.append((index, [m.id for m in batch])))
+    try:
+        batches = {
+            0: [message(1, 1, 8001), message(2, 6, 8001)],
+            1: [message(1, 2, 8002), message(2, 4, 8002)],
+            2: [message(1, 3, 8003), message(2, 5, 8003)],
+        }
+        for index, batch in batches.items():
+            assert log.partitions[index].receive(batch, prev_id=0)["received"] == 2
+        # Lote repetido: nada novo para on_apply
+        log.partitions[0].receive(batches[0], prev_id=0)
+        assert applied == [(0, [1, 2]), (1, [1, 2]), (2, [1, 2])]
+
+        assert [(index, m.lamport_timestamp) for index, m in log.merged()] == [
+            (0, 1), (1, 2), (2, 3), (1, 4), (2, 5), (0, 6),
+        ]
+        after = (3, 8003, 1)
+        assert [m.lamport_timestamp for _, m in log.merged(after=after)] == [4, 5, 6]
+        assert [m.lamport_timestamp for _, m in log.merged(2, chunk_size=1, after=after)] == [4, 5]
+        assert log.size() == 6
+        assert log.get(1, 2).lamport_timestamp == 4
+        assert log.get(1, 3) is None and log.get(7, 1) is None
+    finally:
+        log.close()
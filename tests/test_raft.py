@@ -0,0 +1,238 @@
+"""
+Raft em memória: três RaftNode no mesmo event loop, com os RPCs entregues
+direto aos handlers (sem HTTP) e nós que podem ser isolados da rede
+"""
+
+import asyncio
+
+import pytest
+
+import raft
+
+
+class _Response:
+    status_code = 200
+
+    def __init__(self, body):
+        self._body = body
+
+    def json(self):
+        return self._body
+
+
+class FakeServer:
+    """Server visto de um nó: apost() chama o handler do nó de destino"""
+
+    def __init__(self, cluster, source: int, id: int):
+        self.cluster = cluster
+        self.source = source
+        self.id = id
+
+    async def apost(self, path, json=None, timeout=None):
+        if self.source in self.cluster.down or self.id in self.cluster.down:
+            raise ConnectionError(f"{self.source} -> {self.id} down")
+        node = self.cluster.nodes[self.id]
+        if path == "/raft/request_vote":
+            body = await node.handle_request_vote(json)
+        else:
+            body = await node.handle_append_entries(json)
+        if self.source in self.cluster.down or self.id in self.cluster.down:
+            raise ConnectionError(f"{self.source} -> {self.id} down")
+        return _Response(body)
+
+
+class Cluster:
+    def __init__(self, tmp_path, ids=(1, 2, 3)):
+        self.tmp_path = tmp_path
+        self.ids = list(ids)
+        self.down = set()
+        self.nodes = {}
+        self.applied = {id: [] for id in self.ids}
+        for id in self.ids:
+            self.start(id)
+
+    def start(self, id):
+        def apply(entries, applied=self.applied[id]):
+            results = []
+            for entry in entries:
+                if not entry.get("noop"):
+                    applied.append(entry["value"])
+                results.append(len(applied))
+            return results
+
+        peers = [FakeServer(self, id, other) for other in self.ids if other != id]
+        storage = raft.RaftStorage(str(self.tmp_path / f"raft-{id}"), fsync=False)
+        node = raft.RaftNode(id, peers, storage, apply, lambda leader: None)
+        self.nodes[id] = node
+        node.start()
+        return node
+
+    def leaders(self):
+        return [node for id, node in self.nodes.items() if node.state == raft.LEADER and id not in self.down]
+
+    async def wait_leader(self, timeout=5.0):
+        deadline = asyncio.get_running_loop().time() + timeout
+        while asyncio.get_running_loop().time() < deadline:
+            leaders = self.leaders()
+            if len(leaders) == 1 and leaders[0].commit_index >= leaders[0]._term_start:
+                return leaders[0]
+            await asyncio.sleep(0.01)
+        raise AssertionError(f"no leader: {[node.status() for node in self.nodes.values()]}")
+
+    async def wait_applied(self, ids, count, timeout=5.0):
+        deadline = asyncio.get_running_loop().time() + timeout
+        while any(len(self.applied[id]) < count for id in ids):
+            assert asyncio.get_running_loop().time() < deadline, {id: self.applied[id] for id in ids}
+            await asyncio.sleep(0.01)
+
+    def stop(self):
+        for node in self.nodes.values():
+            if node._timer is not None:
+                node._timer.cancel()
+            node.storage.close()
+
+
+@pytest.fixture(autouse=True)
+def fast_timers(monkeypatch):
+    monkeypatch.setattr(raft, "RAFT_ELECTION_TIMEOUT_MIN", 0.15)
+    monkeypatch.setattr(raft, "RAFT_ELECTION_TIMEOUT_MAX", 0.3)
+    monkeypatch.setattr(raft, "RAFT_HEARTBEAT_SECONDS", 0.02)
+    monkeypatch.setattr(raft, "RAFT_REORDER_WAIT_SECONDS", 0.05)
+
+
+def test_elects_one_leader_and_commits_by_majority(tmp_path):
+    async def run():
+        cluster = Cluster(tmp_path)
+        try:
+            leader = await cluster.wait_leader()
+            results = await leader.propose([{"value": f"m{i}"} for i in range(5)])
+            assert results == [1, 2, 3, 4, 5]
+            await cluster.wait_applied(cluster.ids, 5)
+            for id in cluster.ids:
+                assert cluster.applied[id] == ["m0", "m1", "m2", "m3", "m4"]
+                assert cluster.nodes[id].log == leader.log
+            assert len(cluster.leaders()) == 1
+        finally:
+            cluster.stop()
+        # O log em disco é o mesmo da memória
+        for id in cluster.ids:
+            term, _, entries = raft.RaftStorage(str(tmp_path / f"raft-{id}"), fsync=False).load()
+            assert entries == cluster.nodes[id].log
+            assert term == cluster.nodes[id].current_term
+
+    asyncio.run(run())
+
+
+def test_isolated_leader_entries_are_replaced_by_new_leader(tmp_path):
+    async def run():
+        cluster = Cluster(tmp_path)
+        try:
+            old = await cluster.wait_leader()
+            await old.propose([{"value": "committed"}])
+            await cluster.wait_applied(cluster.ids, 1)
+
+            # Líder isolado: aceita a proposta mas não confirma (ela só pode
+            # falhar, se uma eleição espúria chegou antes do isolamento)
+            cluster.down.add(old.my_id)
+            stale = asyncio.ensure_future(old.propose([{"value": "lost"}]))
+            await asyncio.sleep(0.05)
+            assert not stale.done() or isinstance(stale.exception(), raft.NotLeaderError)
+            assert all("lost" not in applied for applied in cluster.applied.values())
+            new = await cluster.wait_leader()
+            assert new is not old and new.current_term > old.current_term
+            others = [id for id in cluster.ids if id != old.my_id]
+            await new.propose([{"value": "after"}])
+            await cluster.wait_applied(others, 2)
+
+            # Volta à rede: vira follower, descarta a entrada nunca confirmada
+            cluster.down.discard(old.my_id)
+            with pytest.raises(raft.NotLeaderError):
+                await asyncio.wait_for(stale, 5)
+            await cluster.wait_applied(cluster.ids, 2)
+            await asyncio.sleep(0.1)
+            for id in cluster.ids:
+                assert cluster.applied[id] == ["committed", "after"]
+                assert cluster.nodes[id].log == new.log
+            assert all(entry.get("value") != "lost" for entry in old.log)
+        finally:
+            cluster.stop()
+
+    asyncio.run(run())
+
+
+def test_follower_log_matching_and_commit(tmp_path):
+    async def run():
+        applied = []
+        storage = raft.RaftStorage(str(tmp_path / "raft"), fsync=False)
+        node = raft.RaftNode(1, [], storage, lambda entries: [applied.extend(entries)] * len(entries), lambda leader: None)
+
+        def request(term, prev, prev_term, entries, commit):
+            return {
+                "term": term, "leader_id": 2, "prev_log_index": prev, "prev_log_term": prev_term,
+                "entries": entries, "leader_commit": commit,
+            }
+
+        a = [{"term": 1, "value": v} for v in "abc"]
+        reply = await node.handle_append_entries(request(1, 0, 0, a, 1))
+        assert reply == {"term": 1, "success": True, "match_index": 3}
+        assert node.commit_index == 1 and applied == a[:1]
+
+        # prev_log_index além do log: rejeita e indica onde recomeçar
+        reply = await node.handle_append_entries(request(1, 5, 1, [], 1))
+        assert reply["success"] is False and reply["conflict_index"] == 4
+
+        # Líder do term 2 só tem "a": entradas 2 e 3 (term 1) divergem
+        b = [{"term": 2, "value": v} for v in "xy"]
+        reply = await node.handle_append_entries(request(2, 2, 2, [], 1))
+        assert reply["success"] is False and reply["conflict_index"] == 2
+        reply = await node.handle_append_entries(request(2, 1, 1, b, 2))
+        assert reply == {"term": 2, "success": True, "match_index": 3}
+        assert node.log == a[:1] + b
+        assert node.commit_index == 2 and applied == [a[0], b[0]]
+
+        # AppendEntries repetida e atrasada (match_index menor): não trunca nem recua o commit
+        reply = await node.handle_append_entries(request(2, 3, 2, [], 3))
+        assert node.commit_index == 3
+        reply = await node.handle_append_entries(request(2, 1, 1, b[:1], 3))
+        assert reply == {"term": 2, "success": True, "match_index": 2}
+        assert node.log == a[:1] + b and node.commit_index == 3
+
+        # Term antigo: rejeitado sem mudar nada
+        reply = await node.handle_append_entries(request(1, 3, 2, [{"term": 1, "value": "z"}], 3))
+        assert reply == {"term": 2, "success": False}
+        assert node.log == a[:1] + b
+
+        # Nunca trunca uma entrada confirmada
+        with pytest.raises(RuntimeError):
+            node._truncate(3)
+
+        await node._durable()
+        assert node.status()["durable_index"] == 3
+        storage.close()
+        assert raft.RaftStorage(str(tmp_path / "raft"), fsync=False).load() == (2, None, a[:1] + b)
+
+    asyncio.run(run())
+
+
+def test_vote_requires_up_to_date_log(tmp_path):
+    async def run():
+        storage = raft.RaftStorage(str(tmp_path / "raft"), fsync=False)
+        node = raft.RaftNode(1, [], storage, lambda entries: [None] * len(entries), lambda leader: None)
+        node._append([{"term": 2, "value": "a"}, {"term": 3, "value": "b"}])
+        node.current_term = 3
+
+        def vote(term, candidate, last_index, last_term):
+            return node.handle_request_vote({
+                "term": term, "candidate_id": candidate, "last_log_index": last_index, "last_log_term": last_term,
+            })
+
+        assert (await vote(4, 2, 5, 2))["vote_granted"] is False
+        assert (await vote(4, 2, 1, 3))["vote_granted"] is False
+        assert (await vote(4, 2, 2, 3))["vote_granted"] is True
+        # Um voto por term
+        assert (await vote(4, 3, 9, 4))["vote_granted"] is False
+        assert (await vote(3, 3, 9, 4)) == {"term": 4, "vote_granted": False}
+        storage.close()
+        assert raft.RaftStorage(str(tmp_path / "raft"), fsync=False).load()[:2] == (4, 2)
+
+    asyncio.run(run())
@@ -0,0 +1,159 @@
+"""
+Fila de saída por follower: políticas de backpressure (block, shed,
+reject), junção de lotes contíguos e descarte da fila numa falha
+
+O envio (replication.deliver) é trocado por um follower falso que só
+confirma quando o teste deixa.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import replication
+import wire
+from conftest import Message
+from replication import FollowerQueue
+
+
+def batch(first, count):
+    messages = [
+        Message(id=id, content=f"m{id}", lamport_timestamp=id, node_id=8001, physical_timestamp=0.0)
+        for id in range(first, first + count)
+    ]
+    return wire.EncodedBatch(messages, prev_id=first - 1)
+
+
+class FakeFollower:
+    """deliver() falso: cada envio espera release(); fail=True recusa"""
+
+    def __init__(self, monkeypatch):
+        self.sent = []
+        self.gate = asyncio.Event()
+        self.fail = False
+        monkeypatch.setattr(replication, "deliver", self.deliver)
+        monkeypatch.setattr(replication, "_queues", {})
+
+    async def deliver(self, server, path, batch):
+        await self.gate.wait()
+        self.sent.append(([m.id for m in batch.messages], batch.prev_id))
+        return None if self.fail else {"contiguous_id": batch.messages[-1].id}
+
+    def release(self):
+        self.gate.set()
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_shed_drops_batches_when_full_and_merges_the_rest(monkeypatch):
+    monkeypatch.setattr(replication, "REPLICATION_BACKPRESSURE", replication.BACKPRESSURE_SHED)
+
+    async def run():
+        follower = FakeFollower(monkeypatch)
+        queue = FollowerQueue(SimpleNamespace(id=1), capacity=2)
+        acks = []
+        first = await queue.put("/p", batch(1, 2), on_ack=lambda server, ack: acks.append(ack))
+        await settle()
+        assert queue.busy() and queue.stats()["in_flight"] == 1
+        futures = [await queue.put("/p", batch(3, 2)), await queue.put("/p", batch(5, 1))]
+        assert queue.full()
+        shed = await queue.put("/p", batch(6, 1))
+        assert shed.done() and shed.result() is False
+        assert queue.stats()["shed"] == 1 and queue.stats()["queued_messages"] == 5
+
+        follower.release()
+        assert await first is True
+        assert [await future for future in futures] == [True, True]
+        # Os dois lotes da fila foram num envio só, com o prev_id do primeiro
+        assert follower.sent == [([1, 2], 0), ([3, 4, 5], 2)]
+        assert acks == [{"contiguous_id": 2}]
+        stats = queue.stats()
+        assert stats["sent"] == 3 and stats["queue_depth"] == 0 and stats["queued_messages"] == 0
+        assert not queue.busy()
+
+    asyncio.run(run())
+
+
+def test_block_waits_for_room(monkeypatch):
+    monkeypatch.setattr(replication, "REPLICATION_BACKPRESSURE", replication.BACKPRESSURE_BLOCK)
+
+    async def run():
+        follower = FakeFollower(monkeypatch)
+        queue = FollowerQueue(SimpleNamespace(id=1), capacity=1)
+        await queue.put("/p", batch(1, 1))
+        await settle()
+        await queue.put("/p", batch(2, 1))
+        blocked = asyncio.ensure_future(queue.put("/p", batch(3, 1)))
+        await settle()
+        assert not blocked.done() and queue.stats()["shed"] == 0
+
+        follower.release()
+        assert await (await blocked) is True
+        assert [ids for ids, _ in follower.sent][0] == [1]
+        assert sorted(id for ids, _ in follower.sent for id in ids) == [1, 2, 3]
+
+    asyncio.run(run())
+
+
+def test_reject_reports_retry_after_only_when_a_queue_is_full(monkeypatch):
+    monkeypatch.setattr(replication, "REPLICATION_BACKPRESSURE", replication.BACKPRESSURE_REJECT)
+
+    async def run():
+        FakeFollower(monkeypatch)
+        followers = [SimpleNamespace(id=1), SimpleNamespace(id=2)]
+        queue = replication._queues[2] = FollowerQueue(followers[1], capacity=1)
+        assert replication.retry_after(followers) is None
+        await queue.put("/p", batch(1, 1))
+        await settle()
+        assert replication.retry_after(followers) is None
+        await queue.put("/p", batch(2, 1))
+        assert replication.retry_after(followers) == replication.REPLICATION_RETRY_AFTER
+
+        monkeypatch.setattr(replication, "REPLICATION_BACKPRESSURE", replication.BACKPRESSURE_SHED)
+        assert replication.retry_after(followers) is None
+
+    asyncio.run(run())
+
+
+def test_failure_drops_the_queue(monkeypatch):
+    monkeypatch.setattr(replication, "REPLICATION_BACKPRESSURE", replication.BACKPRESSURE_SHED)
+
+    async def run():
+        follower = FakeFollower(monkeypatch)
+        follower.fail = True
+        queue = FollowerQueue(SimpleNamespace(id=1), capacity=4)
+        futures = [await queue.put("/p", batch(1, 1))]
+        await settle()
+        # Não contíguo com o anterior (prev_id 9): não junta
+        futures += [await queue.put("/p", batch(10, 1)), await queue.put("/p", batch(11, 1))]
+        follower.release()
+        assert [await future for future in futures] == [False, False, False]
+        # Só o primeiro envio foi tentado; o resto fica para o reparo
+        assert follower.sent == [([1], 0)]
+        assert queue.stats()["failures"] == 1 and queue.stats()["queued_messages"] == 0
+
+        follower.fail = False
+        assert await (await queue.put("/p", batch(12, 1))) is True
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("policy, needed_ok", [("leader", True), ("majority", True), ("all", False)])
+def test_replicate_returns_per_ack_policy(monkeypatch, policy, needed_ok):
+    monkeypatch.setattr(replication, "REPLICATION_BACKPRESSURE", replication.BACKPRESSURE_SHED)
+    monkeypatch.setattr(replication, "_queues", {})
+
+    async def run():
+        async def deliver(server, path, batch):
+            # Follower 3 fora do ar
+            return None if server.id == 3 else {"contiguous_id": batch.messages[-1].id}
+
+        monkeypatch.setattr(replication, "deliver", deliver)
+        followers = [SimpleNamespace(id=2), SimpleNamespace(id=3)]
+        return await replication.replicate(followers, "/p", batch(1, 1), policy)
+
+    assert asyncio.run(run()) is needed_ok
@@ -0,0 +1,87 @@
+"""
+Leituras em stream do SegmentedMessageStore enquanto segmentos são selados
+
+Cada bloco é localizado de novo a partir do cursor do anterior: um stream
+que atravessa um selamento continua do ponto onde estava, sem duplicatas
+nem buracos, e vê o que entrou depois do cursor.
+"""
+
+import asyncio
+import json
+
+from conftest import Message
+from message_store import MessageStore
+from segments import SegmentedMessageStore
+from test_message_store import fill, make_messages, ndjson
+
+
+def make_pair(tmp_path, messages):
+    store = SegmentedMessageStore(Message, str(tmp_path / "segments"), hot_messages=20, segment_messages=25)
+    reference = MessageStore()
+    fill(store, messages)
+    fill(reference, messages)
+    return store, reference
+
+
+def last_line(piece):
+    return json.loads(bytes(piece).splitlines()[-1])
+
+
+def test_stream_started_before_seal_continues_from_its_cursor(tmp_path):
+    messages = make_messages(300)
+    store, reference = make_pair(tmp_path, messages[:100])
+    segments = len(store.segments)
+
+    stream = store.ndjson(None, None, 10)
+    id_stream = store.id_ndjson(0, None, 10)
+    id_chunks = store.id_chunks(0, None, 10)
+    head, id_head, chunk_head = next(stream), next(id_stream), next(id_chunks)
+
+    # Fora de um event loop o selamento é síncrono: cauda cortada no meio do stream
+    store.extend(messages[100:])
+    store.mark_contiguous(300)
+    assert len(store.segments) > segments
+    fill(reference, messages[100:])
+
+    cursor = last_line(head)
+    after = (cursor["lamport_timestamp"], cursor["node_id"], cursor["id"])
+    assert bytes(head) + ndjson(stream) == bytes(head) + ndjson(reference.ndjson(after, None, 10))
+    assert bytes(id_head) + ndjson(id_stream) == ndjson(reference.id_ndjson(0, None, 10))
+    got = chunk_head + [m for chunk in id_chunks for m in chunk]
+    assert [m.id for m in got] == list(range(1, 301))
+
+    assert ndjson(store.ndjson(None, None, 10)) == ndjson(reference.ndjson(None, None, 10))
+    store.close()
+
+
+def test_stream_in_thread_while_seal_runs_in_background(tmp_path):
+    messages = make_messages(400)
+    store, reference = make_pair(tmp_path, messages[:100])
+
+    def read(pieces):
+        return [json.loads(line) for line in ndjson(pieces).splitlines()]
+
+    async def run():
+        streams = [store.ndjson(None, None, 5), store.id_ndjson(0, None, 5)]
+        reading = [asyncio.create_task(asyncio.to_thread(read, stream)) for stream in streams]
+        for start in range(100, 400, 25):
+            store.extend(messages[start:start + 25])
+            store.mark_contiguous(start + 25)
+            await asyncio.sleep(0.01)
+        while store._sealing:
+            await asyncio.sleep(0.01)
+        return [await task for task in reading]
+
+    by_key, by_id = asyncio.run(run())
+    keys = [(m["lamport_timestamp"], m["node_id"], m["id"]) for m in by_key]
+    assert keys == sorted(set(keys))
+    assert [m["id"] for m in by_id] == list(range(1, len(by_id) + 1))
+    original = {m.id: m.model_dump() for m in messages}
+    for lines in (by_key, by_id):
+        assert {m["id"] for m in lines} >= set(range(1, 101))
+        assert all(m == original[m["id"]] for m in lines)
+
+    fill(reference, messages[100:])
+    assert ndjson(store.ndjson(None, None, 7)) == ndjson(reference.ndjson(None, None, 7))
+    assert store.stats()["segments"] >= 10
+    store.close()
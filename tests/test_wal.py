@@ -0,0 +1,114 @@
+"""
+WriteAheadLog: recuperação depois de reinícios, marcadores de truncate,
+cauda corrompida e snapshots
+"""
+
+import os
+import time
+
+import pytest
+
+from conftest import Message
+from message_store import MessageStore
+from wal import INDEX_RECORD, WriteAheadLog
+
+
+def message(id, lamport=None, content=None):
+    return Message(
+        id=id, content=content or f"msg {id}", lamport_timestamp=id if lamport is None else lamport,
+        node_id=8001, physical_timestamp=1700000000.0 + id,
+    )
+
+
+def reopen(directory, **kwargs):
+    log = WriteAheadLog(str(directory), Message, **kwargs)
+    recovered, lamport = log.recover()
+    return log, recovered, lamport
+
+
+@pytest.mark.parametrize("policy", ["write", "batch", "interval"])
+def test_recover_replays_appends_in_order(tmp_path, policy):
+    log, recovered, lamport = reopen(tmp_path, fsync_policy=policy)
+    assert (recovered, lamport) == ([], 0)
+    log.append([message(1), message(2)])
+    log.append([message(3, lamport=9)]).result(timeout=5)
+    log.close()
+
+    log, recovered, lamport = reopen(tmp_path, fsync_policy=policy)
+    assert [m.model_dump() for m in recovered] == [message(i, 9 if i == 3 else None).model_dump() for i in (1, 2, 3)]
+    assert lamport == 9 and log.next_seq == 3 and log.recovered == 3
+    # O próximo registro continua no mesmo segmento
+    log.append([message(4)]).result(timeout=5)
+    log.close()
+    assert [m.id for m in reopen(tmp_path)[1]] == [1, 2, 3, 4]
+
+
+def test_truncate_marker_drops_earlier_higher_ids(tmp_path):
+    log, _, _ = reopen(tmp_path)
+    log.append([message(i) for i in range(1, 6)])
+    log.truncate(2).result(timeout=5)
+    # Depois do marcador, IDs acima do corte voltam a valer (novo líder)
+    log.append([message(3, content="novo 3"), message(4, content="novo 4")])
+    log.close()
+
+    log, recovered, lamport = reopen(tmp_path)
+    assert [(m.id, m.content) for m in recovered] == [(1, "msg 1"), (2, "msg 2"), (3, "novo 3"), (4, "novo 4")]
+    assert lamport == 4
+    # O marcador também é um registro
+    assert log.next_seq == 8
+    log.close()
+
+    # O store descarta o que veio repetido e fica igual ao log
+    store = MessageStore()
+    store.extend(recovered)
+    assert [m.content for m in store] == ["msg 1", "msg 2", "novo 3", "novo 4"]
+
+
+def test_torn_tail_is_discarded(tmp_path):
+    log, _, _ = reopen(tmp_path)
+    log.append([message(i) for i in range(1, 4)]).result(timeout=5)
+    log.close()
+    segment = log.segments[-1]
+
+    # Crash no meio do último append: linha pela metade e índice incompleto
+    with open(segment.data_path, "r+b") as f:
+        f.truncate(os.path.getsize(segment.data_path) - 5)
+    with open(segment.index_path, "ab") as f:
+        f.write(b"\x00" * (INDEX_RECORD.size // 2))
+
+    log, recovered, _ = reopen(tmp_path)
+    assert [m.id for m in recovered] == [1, 2]
+    assert log.next_seq == 2
+    assert os.path.getsize(segment.index_path) == 2 * INDEX_RECORD.size
+    # Novos registros entram logo depois da parte válida
+    log.append([message(3, content="de novo")]).result(timeout=5)
+    log.close()
+    assert [(m.id, m.content) for m in reopen(tmp_path)[1]][-1] == (3, "de novo")
+
+
+def test_snapshot_and_segment_roll(tmp_path):
+    log, _, _ = reopen(tmp_path, segment_bytes=200, snapshot_every=10)
+    store = MessageStore()
+    for start in range(1, 41, 4):
+        batch = [message(i) for i in range(start, start + 4)]
+        store.extend(batch)
+        log.append(batch).result(timeout=5)
+        if log.snapshot_due():
+            log.start_snapshot(store)
+            while log._snapshot_running:
+                time.sleep(0.001)
+    log.truncate(35).result(timeout=5)
+    log.close()
+    assert len([name for name in os.listdir(tmp_path) if name.startswith("snapshot-")]) == 2
+    # Segmentos cobertos pelo snapshot mais antigo mantido foram apagados
+    assert log.segments[0].base_seq > 0
+
+    log, recovered, lamport = reopen(tmp_path, segment_bytes=200, snapshot_every=10)
+    assert [m.id for m in recovered] == list(range(1, 36))
+    assert lamport == 35 and log.next_seq == 41
+    log.close()
+
+
+def test_invalid_fsync_policy(tmp_path):
+    with pytest.raises(ValueError):
+        WriteAheadLog(str(tmp_path), Message, fsync_policy="never")
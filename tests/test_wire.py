@@ -0,0 +1,79 @@
+"""
+Formato de transmissão da replicação: ida e volta do LogBatch protobuf,
+frames de GET /log e o corpo JSON equivalente
+"""
+
+import asyncio
+import json
+
+import pytest
+
+import wire
+from conftest import Message
+from test_message_store import make_messages
+
+pytestmark = pytest.mark.skipif(not wire.BINARY_AVAILABLE, reason="protobuf não instalado")
+
+
+def dump(messages):
+    return [m.model_dump() for m in messages]
+
+
+@pytest.mark.parametrize("prev_id", [None, 0, 41])
+def test_batch_round_trip(prev_id):
+    # Fora da ordem de ID e com timestamps que voltam: deltas negativos
+    messages = make_messages(60)[::-1] + [
+        Message(id=2 ** 40, content="", lamport_timestamp=0, node_id=-1, physical_timestamp=-0.5),
+        Message(id=3, content="ç\n\"☃\U0001F600", lamport_timestamp=2 ** 62, node_id=8001, physical_timestamp=1e-9),
+    ]
+    decoded, decoded_prev = wire.decode_batch(wire.encode_batch(messages, prev_id), Message)
+    assert dump(decoded) == dump(messages)
+    assert decoded_prev == prev_id
+    assert wire.decode_batch(wire.encode_batch([]), Message) == ([], None)
+
+
+def test_leader_batch_is_about_a_byte_per_id_and_timestamp():
+    # Lote do líder: IDs e timestamps consecutivos
+    messages = [
+        Message(id=1000 + i, content="", lamport_timestamp=5000 + i, node_id=8001, physical_timestamp=0.0)
+        for i in range(100)
+    ]
+    batch = wire.batch_to_pb(messages)
+    assert batch.id_deltas[1:] == [1] * 99 and batch.lamport_deltas[1:] == [1] * 99
+    packed = wire.replication_pb2.LogBatch(id_deltas=batch.id_deltas).ByteSize()
+    assert packed < 100 + 8
+
+
+def test_frames_survive_arbitrary_splits():
+    messages = make_messages(50)
+    chunks = [messages[:7], messages[7:8], messages[8:30], messages[30:]]
+    stream = b"".join(wire.frame_chunks(chunks))
+
+    async def decode(pieces):
+        async def byte_stream():
+            for piece in pieces:
+                yield piece
+        return [block async for block in wire.iter_frames(byte_stream(), Message)]
+
+    for size in (1, 3, 64, len(stream)):
+        pieces = [stream[i:i + size] for i in range(0, len(stream), size)]
+        blocks = asyncio.run(decode(pieces))
+        assert [dump(block) for block in blocks] == [dump(chunk) for chunk in chunks]
+    # Frame incompleto no fim: não sai nada dele
+    assert len(asyncio.run(decode([stream[:-1]]))) == len(chunks) - 1
+
+
+def test_encoded_batch_formats_agree():
+    messages = make_messages(20)
+    batch = wire.EncodedBatch(messages, prev_id=7)
+    binary = batch.request_kwargs(binary=True)
+    text = batch.request_kwargs(binary=False)
+    assert binary["headers"]["Content-Type"] == wire.PROTOBUF_MEDIA_TYPE
+    assert text["headers"]["Content-Type"] == wire.JSON_MEDIA_TYPE
+    assert binary["params"] == text["params"] == {"prev_id": 7}
+    # Cada formato é codificado uma vez só
+    assert batch.binary() is binary["content"] and batch.request_kwargs(False)["content"] is text["content"]
+    decoded, prev_id = wire.decode_batch(binary["content"], Message)
+    assert dump(decoded) == json.loads(text["content"]) == dump(messages)
+    assert prev_id == 7
+    assert wire.EncodedBatch(messages).request_kwargs(binary=False)["params"] == {}
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# NO CHECKED-IN PROTOBUF GENCODE
+# source: vgrpc/replication.proto
+# Protobuf Python Version: 6.31.1
+"""Generated protocol buffer code."""
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import runtime_version as _runtime_version
+from google.protobuf import symbol_database as _symbol_database
+from google.protobuf.internal import builder as _builder
+_runtime_version.ValidateProtobufRuntimeVersion(
+    _runtime_version.Domain.PUBLIC,
+    6,
+    31,
+    1,
+    '',
+    'vgrpc/replication.proto'
+)
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x17vgrpc/replication.proto\"\x98\x01\n\x08LogBatch\x12\x14\n\x07prev_id\x18\x01 \x01(\x03H\x00\x88\x01\x01\x12\x11\n\tid_deltas\x18\x02 \x03(\x12\x12\x16\n\x0elamport_deltas\x18\x03 \x03(\x12\x12\x10\n\x08node_ids\x18\x04 \x03(\x03\x12\x1b\n\x13physical_timestamps\x18\x05 \x03(\x01\x12\x10\n\x08\x63ontents\x18\x06 \x03(\tB\n\n\x08_prev_id\"\x95\x01\n\x0cReplicateAck\x12\x15\n\rcontiguous_id\x18\x01 \x01(\x03\x12\x15\n\rlocal_lamport\x18\x02 \x01(\x03\x12\x10\n\x08received\x18\x03 \x01(\x03\x12\x13\n\x0b\x63onflict_id\x18\x04 \x01(\x03\x12\x1c\n\x0forigin_received\x18\x05 \x01(\x03H\x00\x88\x01\x01\x42\x12\n\x10_origin_received\"5\n\x0f\x45lectionRequest\x12\x14\n\x0c\x63\x61ndidate_id\x18\x01 \x01(\x03\x12\x0c\n\x04term\x18\x02 \x01(\x03\")\n\rElectionReply\x12\n\n\x02ok\x18\x01 \x01(\x08\x12\x0c\n\x04term\x18\x02 \x01(\x03\"5\n\x12\x43oordinatorRequest\x12\x11\n\tleader_id\x18\x01 \x01(\x03\x12\x0c\n\x04term\x18\x02 \x01(\x03\",\n\x10\x43oordinatorReply\x12\n\n\x02ok\x18\x01 \x01(\x08\x12\x0c\n\x04term\x18\x02 \x01(\x03\"R\n\rHeartbeatPing\x12\x11\n\tleader_id\x18\x01 \x01(\x03\x12\x0f\n\x07last_id\x18\x02 \x01(\x03\x12\x0f\n\x07lamport\x18\x03 \x01(\x03\x12\x0c\n\x04term\x18\x04 \x01(\x03\"E\n\rHeartbeatPong\x12\x0f\n\x07node_id\x18\x01 \x01(\x03\x12\x15\n\rcontiguous_id\x18\x02 \x01(\x03\x12\x0c\n\x04term\x18\x03 \x01(\x03\x32\xd6\x01\n\x0bNodeService\x12+\n\tReplicate\x12\t.LogBatch\x1a\r.ReplicateAck\"\x00(\x01\x30\x01\x12.\n\x08\x45lection\x12\x10.ElectionRequest\x1a\x0e.ElectionReply\"\x00\x12\x37\n\x0b\x43oordinator\x12\x13.CoordinatorRequest\x1a\x11.CoordinatorReply\"\x00\x12\x31\n\tHeartbeat\x12\x0e.HeartbeatPing\x1a\x0e.HeartbeatPong\"\x00(\x01\x30\x01\x62\x06proto3')
+
+_globals = globals()
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'vgrpc.replication_pb2', _globals)
+if not _descriptor._USE_C_DESCRIPTORS:
+  DESCRIPTOR._loaded_options = None
+  _globals['_LOGBATCH']._serialized_start=28
+  _globals['_LOGBATCH']._serialized_end=180
+  _globals['_REPLICATEACK']._serialized_start=183
+  _globals['_REPLICATEACK']._serialized_end=332
+  _globals['_ELECTIONREQUEST']._serialized_start=334
+  _globals['_ELECTIONREQUEST']._serialized_end=387
+  _globals['_ELECTIONREPLY']._serialized_start=389
+  _globals['_ELECTIONREPLY']._serialized_end=430
+  _globals['_COORDINATORREQUEST']._serialized_start=432
+  _globals['_COORDINATORREQUEST']._serialized_end=485
+  _globals['_COORDINATORREPLY']._serialized_start=487
+  _globals['_COORDINATORREPLY']._serialized_end=531
+  _globals['_HEARTBEATPING']._serialized_start=533
+  _globals['_HEARTBEATPING']._serialized_end=615
+  _globals['_HEARTBEATPONG']._serialized_start=617
+  _globals['_HEARTBEATPONG']._serialized_end=686
+  _globals['_NODESERVICE']._serialized_start=689
+  _globals['_NODESERVICE']._serialized_end=903
+# @@protoc_insertion_point(module_scope)
@@ -0,0 +1,91 @@
+from google.protobuf.internal import containers as _containers
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import message as _message
+from collections.abc import Iterable as _Iterable
+from typing import ClassVar as _ClassVar, Optional as _Optional
+
+DESCRIPTOR: _descriptor.FileDescriptor
+
+class LogBatch(_message.Message):
+    __slots__ = ("prev_id", "id_deltas", "lamport_deltas", "node_ids", "physical_timestamps", "contents")
+    PREV_ID_FIELD_NUMBER: _ClassVar[int]
+    ID_DELTAS_FIELD_NUMBER: _ClassVar[int]
+    LAMPORT_DELTAS_FIELD_NUMBER: _ClassVar[int]
+    NODE_IDS_FIELD_NUMBER: _ClassVar[int]
+    PHYSICAL_TIMESTAMPS_FIELD_NUMBER: _ClassVar[int]
+    CONTENTS_FIELD_NUMBER: _ClassVar[int]
+    prev_id: int
+    id_deltas: _containers.RepeatedScalarFieldContainer[int]
+    lamport_deltas: _containers.RepeatedScalarFieldContainer[int]
+    node_ids: _containers.RepeatedScalarFieldContainer[int]
+    physical_timestamps: _containers.RepeatedScalarFieldContainer[float]
+    contents: _containers.RepeatedScalarFieldContainer[str]
+    def __init__(self, prev_id: _Optional[int] = ..., id_deltas: _Optional[_Iterable[int]] = ..., lamport_deltas: _Optional[_Iterable[int]] = ..., node_ids: _Optional[_Iterable[int]] = ..., physical_timestamps: _Optional[_Iterable[float]] = ..., contents: _Optional[_Iterable[str]] = ...) -> None: ...
+
+class ReplicateAck(_message.Message):
+    __slots__ = ("contiguous_id", "local_lamport", "received", "conflict_id", "origin_received")
+    CONTIGUOUS_ID_FIELD_NUMBER: _ClassVar[int]
+    LOCAL_LAMPORT_FIELD_NUMBER: _ClassVar[int]
+    RECEIVED_FIELD_NUMBER: _ClassVar[int]
+    CONFLICT_ID_FIELD_NUMBER: _ClassVar[int]
+    ORIGIN_RECEIVED_FIELD_NUMBER: _ClassVar[int]
+    contiguous_id: int
+    local_lamport: int
+    received: int
+    conflict_id: int
+    origin_received: int
+    def __init__(self, contiguous_id: _Optional[int] = ..., local_lamport: _Optional[int] = ..., received: _Optional[int] = ..., conflict_id: _Optional[int] = ..., origin_received: _Optional[int] = ...) -> None: ...
+
+class ElectionRequest(_message.Message):
+    __slots__ = ("candidate_id", "term")
+    CANDIDATE_ID_FIELD_NUMBER: _ClassVar[int]
+    TERM_FIELD_NUMBER: _ClassVar[int]
+    candidate_id: int
+    term: int
+    def __init__(self, candidate_id: _Optional[int] = ..., term: _Optional[int] = ...) -> None: ...
+
+class ElectionReply(_message.Message):
+    __slots__ = ("ok", "term")
+    OK_FIELD_NUMBER: _ClassVar[int]
+    TERM_FIELD_NUMBER: _ClassVar[int]
+    ok: bool
+    term: int
+    def __init__(self, ok: bool = ..., term: _Optional[int] = ...) -> None: ...
+
+class CoordinatorRequest(_message.Message):
+    __slots__ = ("leader_id", "term")
+    LEADER_ID_FIELD_NUMBER: _ClassVar[int]
+    TERM_FIELD_NUMBER: _ClassVar[int]
+    leader_id: int
+    term: int
+    def __init__(self, leader_id: _Optional[int] = ..., term: _Optional[int] = ...) -> None: ...
+
+class CoordinatorReply(_message.Message):
+    __slots__ = ("ok", "term")
+    OK_FIELD_NUMBER: _ClassVar[int]
+    TERM_FIELD_NUMBER: _ClassVar[int]
+    ok: bool
+    term: int
+    def __init__(self, ok: bool = ..., term: _Optional[int] = ...) -> None: ...
+
+class HeartbeatPing(_message.Message):
+    __slots__ = ("leader_id", "last_id", "lamport", "term")
+    LEADER_ID_FIELD_NUMBER: _ClassVar[int]
+    LAST_ID_FIELD_NUMBER: _ClassVar[int]
+    LAMPORT_FIELD_NUMBER: _ClassVar[int]
+    TERM_FIELD_NUMBER: _ClassVar[int]
+    leader_id: int
+    last_id: int
+    lamport: int
+    term: int
+    def __init__(self, leader_id: _Optional[int] = ..., last_id: _Optional[int] = ..., lamport: _Optional[int] = ..., term: _Optional[int] = ...) -> None: ...
+
+class HeartbeatPong(_message.Message):
+    __slots__ = ("node_id", "contiguous_id", "term")
+    NODE_ID_FIELD_NUMBER: _ClassVar[int]
+    CONTIGUOUS_ID_FIELD_NUMBER: _ClassVar[int]
+    TERM_FIELD_NUMBER: _ClassVar[int]
+    node_id: int
+    contiguous_id: int
+    term: int
+    def __init__(self, node_id: _Optional[int] = ..., contiguous_id: _Optional[int] = ..., term: _Optional[int] = ...) -> None: ...
@@ -0,0 +1,232 @@
+# Generated by the gRPC Python protocol compiler plugin. DO NOT EDIT!
+"""Client and server classes corresponding to protobuf-defined services."""
+import grpc
+import warnings
+
+from vgrpc import replication_pb2 as vgrpc_dot_replication__pb2
+
+GRPC_GENERATED_VERSION = '1.76.0'
+GRPC_VERSION = grpc.__version__
+_version_not_supported = False
+
+try:
+    from grpc._utilities import first_version_is_lower
+    _version_not_supported = first_version_is_lower(GRPC_VERSION, GRPC_GENERATED_VERSION)
+except ImportError:
+    _version_not_supported = True
+
+if _version_not_supported:
+    raise RuntimeError(
+        f'The grpc package installed is at version {GRPC_VERSION},'
+        + ' but the generated code in vgrpc/replication_pb2_grpc.py depends on'
+        + f' grpcio>={GRPC_GENERATED_VERSION}.'
+        + f' Please upgrade your grpc module to grpcio>={GRPC_GENERATED_VERSION}'
+        + f' or downgrade your generated code using grpcio-tools<={GRPC_VERSION}.'
+    )
+
+
+class NodeServiceStub(object):
+    """Serviço de tráfego entre nós (roda ao lado da API FastAPI em GRPC_PORT)
+    """
+
+    def __init__(self, channel):
+        """Constructor.
+
+        Args:
+            channel: A grpc.Channel.
+        """
+        self.Replicate = channel.stream_stream(
+                '/NodeService/Replicate',
+                request_serializer=vgrpc_dot_replication__pb2.LogBatch.SerializeToString,
+                response_deserializer=vgrpc_dot_replication__pb2.ReplicateAck.FromString,
+                _registered_method=True)
+        self.Election = channel.unary_unary(
+                '/NodeService/Election',
+                request_serializer=vgrpc_dot_replication__pb2.ElectionRequest.SerializeToString,
+                response_deserializer=vgrpc_dot_replication__pb2.ElectionReply.FromString,
+                _registered_method=True)
+        self.Coordinator = channel.unary_unary(
+                '/NodeService/Coordinator',
+                request_serializer=vgrpc_dot_replication__pb2.CoordinatorRequest.SerializeToString,
+                response_deserializer=vgrpc_dot_replication__pb2.CoordinatorReply.FromString,
+                _registered_method=True)
+        self.Heartbeat = channel.stream_stream(
+                '/NodeService/Heartbeat',
+                request_serializer=vgrpc_dot_replication__pb2.HeartbeatPing.SerializeToString,
+                response_deserializer=vgrpc_dot_replication__pb2.HeartbeatPong.FromString,
+                _registered_method=True)
+
+
+class NodeServiceServicer(object):
+    """Serviço de tráfego entre nós (roda ao lado da API FastAPI em GRPC_PORT)
+    """
+
+    def Replicate(self, request_iterator, context):
+        """O líder envia lotes pelo stream; o follower responde um ack por lote
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Election(self, request, context):
+        """Mensagens do algoritmo Bully
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Coordinator(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Heartbeat(self, request_iterator, context):
+        """Batimentos do líder; o follower responde com seu cursor de replicação
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+
+def add_NodeServiceServicer_to_server(servicer, server):
+    rpc_method_handlers = {
+            'Replicate': grpc.stream_stream_rpc_method_handler(
+                    servicer.Replicate,
+                    request_deserializer=vgrpc_dot_replication__pb2.LogBatch.FromString,
+                    response_serializer=vgrpc_dot_replication__pb2.ReplicateAck.SerializeToString,
+            ),
+            'Election': grpc.unary_unary_rpc_method_handler(
+                    servicer.Election,
+                    request_deserializer=vgrpc_dot_replication__pb2.ElectionRequest.FromString,
+                    response_serializer=vgrpc_dot_replication__pb2.ElectionReply.SerializeToString,
+            ),
+            'Coordinator': grpc.unary_unary_rpc_method_handler(
+                    servicer.Coordinator,
+                    request_deserializer=vgrpc_dot_replication__pb2.CoordinatorRequest.FromString,
+                    response_serializer=vgrpc_dot_replication__pb2.CoordinatorReply.SerializeToString,
+            ),
+            'Heartbeat': grpc.stream_stream_rpc_method_handler(
+                    servicer.Heartbeat,
+                    request_deserializer=vgrpc_dot_replication__pb2.HeartbeatPing.FromString,
+                    response_serializer=vgrpc_dot_replication__pb2.HeartbeatPong.SerializeToString,
+            ),
+    }
+    generic_handler = grpc.method_handlers_generic_handler(
+            'NodeService', rpc_method_handlers)
+    server.add_generic_rpc_handlers((generic_handler,))
+    server.add_registered_method_handlers('NodeService', rpc_method_handlers)
+
+
+ # This class is part of an EXPERIMENTAL API.
+class NodeService(object):
+    """Serviço de tráfego entre nós (roda ao lado da API FastAPI em GRPC_PORT)
+    """
+
+    @staticmethod
+    def Replicate(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_stream(
+            request_iterator,
+            target,
+            '/NodeService/Replicate',
+            vgrpc_dot_replication__pb2.LogBatch.SerializeToString,
+            vgrpc_dot_replication__pb2.ReplicateAck.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def Election(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/NodeService/Election',
+            vgrpc_dot_replication__pb2.ElectionRequest.SerializeToString,
+            vgrpc_dot_replication__pb2.ElectionReply.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def Coordinator(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/NodeService/Coordinator',
+            vgrpc_dot_replication__pb2.CoordinatorRequest.SerializeToString,
+            vgrpc_dot_replication__pb2.CoordinatorReply.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def Heartbeat(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_stream(
+            request_iterator,
+            target,
+            '/NodeService/Heartbeat',
+            vgrpc_dot_replication__pb2.HeartbeatPing.SerializeToString,
+            vgrpc_dot_replication__pb2.HeartbeatPong.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)